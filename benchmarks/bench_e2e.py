@@ -0,0 +1,134 @@
+"""Benchmarks the collections end to end against the stand-in server.
+
+fia.fake_server.FakeTvServer is started on a local port and the
+collectors sign in, connect and get the data over it as they do over
+TradingView. Every concurrency level runs the collections of different
+symbols in a pool of threads (the rate limiter is disabled), the
+collections per second and the p50 and p99 latency of one collection
+are printed.
+
+The results can be saved to a JSON file and compared with it as the
+results of bench_parsing.py:
+    python benchmarks/bench_e2e.py --save e2e.json
+    python benchmarks/bench_e2e.py --compare e2e.json
+
+Usage:
+    python benchmarks/bench_e2e.py [--concurrency 1 2 4 8 16]
+        [--collections 64] [--bars 1000] [--latency 0.01]
+        [--bandwidth 0] [--disconnect 0] [--du-tail 0] [--heartbeats 0]
+"""
+import argparse
+import json
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List
+
+from fia.constants import Frame
+from fia.fake_server import FakeTvServer
+from fia.main import TvDataCollector
+from fia.rate_limit import RateLimiter
+
+
+def collect(number: int, bars: int) -> float:
+    """Gets the data of one symbol and returns the latency."""
+    tvdc = TvDataCollector(username=f"user{number}", password="bench",
+                           exchange="NASDAQ", ticker_sym=f"SYM{number}",
+                           currency="USD", frame=Frame.MIN1, bars=bars)
+    start = time.perf_counter()
+    raw_data = tvdc.get_data()
+    latency = time.perf_counter() - start
+    if not getattr(raw_data, "complete", True):
+        raise RuntimeError(f"The series of SYM{number} is not completed.")
+    return latency
+
+
+def run_level(concurrency: int, collections: int,
+              bars: int) -> Dict[str, Any]:
+    """Runs the collections with the concurrency."""
+    start = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        latencies = list(pool.map(lambda number: collect(number, bars),
+                                  range(collections)))
+    seconds = time.perf_counter() - start
+    percentiles = (statistics.quantiles(latencies, n=100)
+                   if len(latencies) > 1 else latencies * 99)
+    return {"concurrency": concurrency, "collections": collections,
+            "seconds": seconds, "per_second": collections / seconds,
+            "p50": percentiles[49], "p99": percentiles[98]}
+
+
+def compare(report: Dict[str, Any], baseline: Dict[str, Any],
+            threshold: float) -> List[str]:
+    """Gets the levels that are slower than the baseline."""
+    base = {result["concurrency"]: result
+            for result in baseline["results"]}
+    regressions = []
+    for result in report["results"]:
+        old = base.get(result["concurrency"])
+        if old and result["per_second"] * threshold < old["per_second"]:
+            regressions.append(f"concurrency {result['concurrency']}: "
+                               f"{result['per_second']:.1f}/s vs "
+                               f"{old['per_second']:.1f}/s")
+    return regressions
+
+
+def main() -> None:
+    """Runs the levels, saves or compares the results."""
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawTextHelpFormatter
+    )
+    parser.add_argument("--concurrency", type=int, nargs="+",
+                        default=[1, 2, 4, 8, 16])
+    parser.add_argument("--collections", type=int, default=64)
+    parser.add_argument("--bars", type=int, default=1000)
+    parser.add_argument("--latency", type=float, default=0.01,
+                        help="The delay of every server response, s.")
+    parser.add_argument("--bandwidth", type=float, default=0.0,
+                        help="The bandwidth, bytes/s (0 - unlimited).")
+    parser.add_argument("--disconnect", type=float, default=0.0,
+                        help="The probability of the disconnection.")
+    parser.add_argument("--du-tail", type=int, default=0)
+    parser.add_argument("--heartbeats", type=int, default=0)
+    parser.add_argument("--save", help="Saves the results to the JSON file.")
+    parser.add_argument("--compare",
+                        help="Compares the results with the JSON file.")
+    parser.add_argument("--threshold", type=float, default=1.2,
+                        help="The allowed slowdown against the baseline.")
+    args = parser.parse_args()
+    unlimited = (1e9, 10**9)
+    TvDataCollector.rate_limiter = RateLimiter(
+        {name: unlimited for name in ("sign_in", "connect", "series")}
+    )
+    results = []
+    with FakeTvServer(bars=max(args.bars, 1), latency=args.latency,
+                      bandwidth=args.bandwidth, du_tail=args.du_tail,
+                      heartbeats=args.heartbeats,
+                      disconnect=args.disconnect) as server:
+        TvDataCollector.sign_in_url = server.sign_in_url
+        TvDataCollector.ws_url = server.ws_url
+        print(f"{'concurrency':>11}{'collections/s':>15}{'p50, s':>10}"
+              f"{'p99, s':>10}")
+        for concurrency in args.concurrency:
+            result = run_level(concurrency, args.collections, args.bars)
+            results.append(result)
+            print(f"{concurrency:>11}{result['per_second']:>15.1f}"
+                  f"{result['p50']:>10.4f}{result['p99']:>10.4f}")
+    report = {"bars": args.bars, "latency": args.latency,
+              "bandwidth": args.bandwidth, "disconnect": args.disconnect,
+              "results": results}
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as file:
+            json.dump(report, file, indent=2)
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as file:
+            regressions = compare(report, json.load(file), args.threshold)
+        for regression in regressions:
+            print(f"Regression: {regression}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""Benchmarks the indicators against the naive pandas code.
+
+The naive versions are the row-wise loops and the rolling apply calls
+that are usually written when only pandas is used.
+
+Usage:
+    python benchmarks/bench_indicators.py [--bars 100000] [--repeat 3]
+"""
+import argparse
+import timeit
+
+import numpy as np
+import pandas as pd
+
+from fia import indicators
+
+
+def create_data(bars: int) -> pd.DataFrame:
+    """Creates the random walk market data."""
+    rng = np.random.default_rng(0)
+    close = 100.0 + np.cumsum(rng.normal(0.0, 1.0, bars))
+    return pd.DataFrame({
+        "Open": close,
+        "High": close + rng.uniform(0.0, 1.0, bars),
+        "Low": close - rng.uniform(0.0, 1.0, bars),
+        "Close": close,
+        "Volume": rng.uniform(1.0, 100.0, bars)
+    })
+
+
+def naive_sma(df: pd.DataFrame) -> pd.Series:
+    """SMA with rolling apply."""
+    return df["Close"].rolling(20).apply(np.mean, raw=True)
+
+
+def naive_rsi(df: pd.DataFrame) -> list:
+    """RSI with a row-wise loop."""
+    gains, losses, result = 0.0, 0.0, []
+    close = df["Close"]
+    for i in range(len(df)):
+        if i == 0:
+            result.append(np.nan)
+            continue
+        delta = close.iloc[i] - close.iloc[i - 1]
+        gains = (gains * 13 + max(delta, 0.0)) / 14
+        losses = (losses * 13 - min(delta, 0.0)) / 14
+        result.append(100.0 - 100.0 / (1.0 + gains / losses)
+                      if losses else 100.0)
+    return result
+
+
+def naive_atr(df: pd.DataFrame) -> pd.Series:
+    """ATR with a row-wise true range and rolling mean."""
+    true_range = []
+    for i, row in enumerate(df.itertuples()):
+        prev_close = df["Close"].iloc[i - 1] if i else row.Close
+        true_range.append(max(row.High - row.Low,
+                              abs(row.High - prev_close),
+                              abs(row.Low - prev_close)))
+    return pd.Series(true_range).rolling(14).mean()
+
+
+def naive_vwap(df: pd.DataFrame) -> list:
+    """VWAP with a row-wise loop."""
+    price_volume, volume, result = 0.0, 0.0, []
+    for row in df.itertuples():
+        price_volume += (row.High + row.Low + row.Close) / 3 * row.Volume
+        volume += row.Volume
+        result.append(price_volume / volume)
+    return result
+
+
+def naive_bollinger(df: pd.DataFrame) -> pd.DataFrame:
+    """Bollinger bands with rolling apply."""
+    close = df["Close"]
+    middle = close.rolling(20).apply(np.mean, raw=True)
+    std = close.rolling(20).apply(np.std, raw=True)
+    return pd.DataFrame({"Upper": middle + 2 * std,
+                         "Lower": middle - 2 * std})
+
+
+def incremental_rsi(df: pd.DataFrame) -> list:
+    """RSI updated bar by bar (the live mode)."""
+    indicator = indicators.RSI(14)
+    return [indicator.update(close) for close in df["Close"].tolist()]
+
+
+CASES = {
+    "SMA": (lambda df: indicators.sma(df["Close"], 20), naive_sma),
+    "EMA": (lambda df: indicators.ema(df["Close"], 20),
+            lambda df: df["Close"].rolling(20).apply(
+                lambda x: pd.Series(x).ewm(span=20).mean().iloc[-1],
+                raw=True)),
+    "RSI": (lambda df: indicators.rsi(df["Close"], 14), naive_rsi),
+    "ATR": (lambda df: indicators.atr(df, 14), naive_atr),
+    "VWAP": (indicators.vwap, naive_vwap),
+    "Bollinger": (lambda df: indicators.bollinger(df["Close"], 20),
+                  naive_bollinger),
+    "RSI (incremental)": (incremental_rsi, naive_rsi)
+}
+
+
+def main() -> None:
+    """Runs the benchmarks and prints the results."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--bars", type=int, default=20_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    df = create_data(args.bars)
+    print(f"{'indicator':<20}{'fia, s':>12}{'naive, s':>12}{'speedup':>10}")
+    for name, (fast, naive) in CASES.items():
+        fast_time = min(timeit.repeat(lambda: fast(df), number=1,
+                                      repeat=args.repeat))
+        naive_time = min(timeit.repeat(lambda: naive(df), number=1,
+                                       repeat=1))
+        print(f"{name:<20}{fast_time:>12.4f}{naive_time:>12.4f}"
+              f"{naive_time / fast_time:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
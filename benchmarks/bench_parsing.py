@@ -0,0 +1,143 @@
+"""Benchmarks the parsing and framing hot paths.
+
+The synthetic transcripts of fia.testing (the random walk bars, the du
+and heartbeat tail and several series) are parsed by the decoders and
+the converters. The best time of every case, the throughput in bars
+and megabytes per second and the peak memory (tracemalloc) are
+printed.
+
+The results can be saved to a JSON baseline and compared with it, the
+script exits with the code 1 if a case is slower than the baseline
+by more than the threshold:
+    python benchmarks/bench_parsing.py --save baseline.json
+    python benchmarks/bench_parsing.py --compare baseline.json
+
+Usage:
+    python benchmarks/bench_parsing.py [--sizes 100 1000 10000 100000]
+        [--series 1] [--du-tail 1000] [--heartbeats 100] [--repeat 3]
+"""
+import argparse
+import json
+import platform
+import sys
+import timeit
+import tracemalloc
+from typing import Any, Callable, Dict, List
+
+from fia.constants import Frame
+from fia.main import TvDataCollector
+from fia.messages import (merge_raw_data, parse_messages, slice_raw_data,
+                          split_messages)
+from fia.testing import make_transcript, synthetic_bars
+
+
+def create_collector(bars: int) -> TvDataCollector:
+    """Creates the collector (nothing is sent over the network)."""
+    return TvDataCollector(username="bench", password="bench",
+                           exchange="NASDAQ", ticker_sym="AAPL",
+                           currency="USD", frame=Frame.MIN1,
+                           bars=max(bars, 1))
+
+
+def create_cases(raw_data: str, bars: int
+                 ) -> Dict[str, Callable[[], Any]]:
+    """Creates the benchmarked calls of one transcript."""
+    tvdc = create_collector(bars)
+    series = [{"i": i, "v": bar} for i, bar in enumerate(synthetic_bars(bars))]
+    half = raw_data[:len(raw_data) // 2], raw_data
+    return {
+        "_create_message": lambda: TvDataCollector._create_message(
+            "timescale_update", ["cs_bench", {"sds_1": {"s": series}}]
+        ),
+        "split_messages": lambda: split_messages(raw_data),
+        "parse_messages": lambda: sum(1 for _ in parse_messages(raw_data)),
+        "get_json_data": lambda: TvDataCollector.get_json_data(raw_data),
+        "get_pandas_data": lambda: tvdc.get_pandas_data(raw_data),
+        "merge_raw_data": lambda: merge_raw_data(list(half)),
+        "slice_raw_data": lambda: slice_raw_data(raw_data, bars // 2 or 1),
+    }
+
+
+def measure(call: Callable[[], Any], repeat: int) -> Dict[str, float]:
+    """Measures the best time and the peak memory of the call."""
+    seconds = min(timeit.repeat(call, number=1, repeat=repeat))
+    tracemalloc.start()
+    try:
+        call()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return {"seconds": seconds, "peak_kib": peak / 1024}
+
+
+def run(args: argparse.Namespace) -> Dict[str, Any]:
+    """Runs the benchmarks and prints the results."""
+    results: List[Dict[str, Any]] = []
+    print(f"{'case':<18}{'bars':>9}{'seconds':>11}{'bars/s':>13}"
+          f"{'MB/s':>9}{'peak KiB':>12}")
+    for bars in args.sizes:
+        raw_data = make_transcript(bars, series=args.series,
+                                   du_tail=args.du_tail,
+                                   heartbeats=args.heartbeats)
+        megabytes = len(raw_data) / 1e6
+        for name, call in create_cases(raw_data, bars).items():
+            result = {"case": name, "bars": bars,
+                      **measure(call, args.repeat)}
+            results.append(result)
+            seconds = max(result["seconds"], 1e-9)
+            print(f"{name:<18}{bars:>9}{seconds:>11.5f}"
+                  f"{bars / seconds:>13.0f}{megabytes / seconds:>9.1f}"
+                  f"{result['peak_kib']:>12.1f}")
+    return {"python": platform.python_version(),
+            "series": args.series, "du_tail": args.du_tail,
+            "heartbeats": args.heartbeats, "results": results}
+
+
+def compare(report: Dict[str, Any], baseline: Dict[str, Any],
+            threshold: float) -> List[str]:
+    """Gets the cases that are slower than the baseline."""
+    base = {(result["case"], result["bars"]): result["seconds"]
+            for result in baseline["results"]}
+    regressions = []
+    for result in report["results"]:
+        seconds = base.get((result["case"], result["bars"]))
+        if seconds and result["seconds"] > seconds * threshold:
+            regressions.append(f"{result['case']} ({result['bars']} bars): "
+                               f"{result['seconds']:.5f} s vs {seconds:.5f} s"
+                               f" ({result['seconds'] / seconds:.2f}x)")
+    return regressions
+
+
+def main() -> None:
+    """Runs the benchmarks, saves or compares the baseline."""
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawTextHelpFormatter
+    )
+    parser.add_argument("--sizes", type=int, nargs="+",
+                        default=[100, 1000, 10_000, 100_000],
+                        help="The bars of every series (up to 1000000).")
+    parser.add_argument("--series", type=int, default=1)
+    parser.add_argument("--du-tail", type=int, default=1000)
+    parser.add_argument("--heartbeats", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--save", help="Saves the results to the JSON file.")
+    parser.add_argument("--compare",
+                        help="Compares the results with the JSON file.")
+    parser.add_argument("--threshold", type=float, default=1.2,
+                        help="The allowed slowdown against the baseline.")
+    args = parser.parse_args()
+    report = run(args)
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as file:
+            json.dump(report, file, indent=2)
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as file:
+            regressions = compare(report, json.load(file), args.threshold)
+        for regression in regressions:
+            print(f"Regression: {regression}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
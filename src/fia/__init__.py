@@ -49,17 +49,94 @@ The package includes the following modules:
     - main.py: The main module of the package.
     - cli-args.py: Parses the command line interface arguments.
     - constants.py: Includes all constants and enums.
+    - messages.py: Parses the messages received over Websocket.
+    - receiving.py: Receives the messages of an open Websocket
+      connection.
+    - resample.py: Resamples the market data to higher timeframes.
+    - aggregator.py: Aggregates the live bars to higher timeframes.
+    - indicators.py: Calculates the technical indicators.
+    - correlation.py: Calculates the rolling covariance and
+      correlation of many series.
+    - panel.py: Builds a wide panel from the market data of many
+      symbols.
+    - request.py: Includes the immutable request of the market data.
+    - batch.py: Collects the market data of many symbols from
+      a manifest file.
+    - cli.py: The entry point of the command line interface.
+    - serve.py: Refreshes a watchlist just after the bar close times.
+    - http_server.py: Serves the stored bars over HTTP.
+    - result_cache.py: Caches the raw data of the requests in the
+      process.
+    - symbols.py: Caches the symbol metadata on disk.
+    - timing.py: Records the latency of the phases of every
+      collection.
+    - metrics.py: Keeps the process-wide metrics of the long-running
+      fia processes.
+    - tracing.py: Traces the Websocket frames at a low cost.
+    - profiling.py: Profiles the phases of the collections.
+    - testing.py: Generates the synthetic TradingView transcripts.
+    - fake_server.py: Serves a local stand-in for TradingView.
+    - capture.py: Records and replays the received Websocket frames.
+    - convert.py: Converts the captured transcripts to columnar
+      storage.
+    - utils/lru_cache.py: Keeps the recently used values in
+      a size-bounded cache.
+    - utils/single_flight.py: Shares one call between the threads
+      with the same key.
+    - utils/trim_bars.py: Trims the bars collected in chunks to a time
+      range.
+    - store.py: Stores the bars on disk in columnar format.
+    - rate_limit.py: Paces the requests sent to TradingView.
+    - parallel.py: Collects the market data of many symbols in many
+      processes with the shared memory.
 
 Examples:
     See the detailed explanation with examples on:
     https://github.com/lexust1/fia/blob/main/README.md
 """
+import importlib
 import logging
 from logging import NullHandler
+from typing import TYPE_CHECKING, Any, Dict, List
 
-from fia.utils.set_logger import set_logger
-from fia.main import TvDataCollector
-from fia.constants import Frame
+if TYPE_CHECKING:
+    from fia.aggregator import Bar, BarAggregator
+    from fia.constants import Frame
+    from fia.main import TvDataCollector
+    from fia.panel import build_panel
+    from fia.resample import resample_bars
+    from fia.utils.set_logger import set_logger
+
+
+# The public names and their modules. The modules are imported on the
+# first access to the name, so "import fia" does not import pandas,
+# numpy and websocket.
+_LAZY: Dict[str, str] = {
+    "set_logger": "fia.utils.set_logger",
+    "TvDataCollector": "fia.main",
+    "Frame": "fia.constants",
+    "resample_bars": "fia.resample",
+    "Bar": "fia.aggregator",
+    "BarAggregator": "fia.aggregator",
+    "build_panel": "fia.panel",
+}
+
+__all__ = list(_LAZY)
+
+
+def __getattr__(name: str) -> Any:
+    """Imports the module of the public name on the first access."""
+    if name not in _LAZY:
+        raise AttributeError(f"module {__name__!r} has no attribute "
+                             f"{name!r}")
+    value = getattr(importlib.import_module(_LAZY[name]), name)
+    # The next accesses do not call __getattr__.
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> List[str]:
+    return sorted(list(globals()) + __all__)
 
 
 # The logging package recommendation to avoid "No handler found" and
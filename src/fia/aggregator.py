@@ -0,0 +1,247 @@
+# Copyright 2022 Aleksey Ustinov.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied. See the License for the specific language governing
+# permissions and limitations under the License.
+"""This module aggregates the live bars to higher timeframes.
+
+One live subscription to a lower timeframe (usually Frame.MIN1) is
+enough to keep the bars of several higher timeframes (Frame.MIN5,
+Frame.MIN15, Frame.HOUR1, etc.) up to date. The bars are aligned to
+the trading session in the same way as in fia.resample.
+
+Every update of the last bar (du message) takes O(1) work: the higher
+timeframe bar is a combination of the completed lower timeframe bars
+and the current lower timeframe bar, so the previous value of the
+current bar never has to be subtracted. The session open of the
+higher timeframe bars is calculated once for every trading date, the
+intraday bars of the date are found by steps from it.
+
+Classes:
+    - Bar: The market data of one bar.
+    - BarAggregator: Aggregates the live bars to higher timeframes.
+"""
+# Import the standard libraries.
+import logging
+from typing import (Any, Callable, Dict, Iterable, Mapping, NamedTuple,
+                    Optional, Sequence)
+
+# Import the third party libraries.
+import numpy as np
+
+# Import the local/project packages and modules.
+from fia.constants import FRAME_SECONDS, Frame
+from fia.messages import get_series_bars, parse_messages
+from fia.resample import Session, bucket_keys
+
+
+# Set the module logger.
+logger = logging.getLogger(__name__)
+
+
+class Bar(NamedTuple):
+    """The market data of one bar.
+
+    Attributes:
+        time: The opening time as UNIX timestamp (seconds).
+        open: The opening price.
+        high: The highest price.
+        low: The lowest price.
+        close: The closing price.
+        volume: The market volume.
+    """
+    time: float
+    open: float
+    high: float
+    low: float
+    close: float
+    volume: float
+
+
+def _combine(first: Bar, second: Bar, time: float) -> Bar:
+    """Combines two consecutive bars into one bar."""
+    return Bar(time,
+               first.open,
+               max(first.high, second.high),
+               min(first.low, second.low),
+               second.close,
+               first.volume + second.volume)
+
+
+class _FrameState:
+    """The state of the current bar of a higher timeframe."""
+    __slots__ = ("key", "end", "date_end", "done")
+
+    def __init__(self) -> None:
+        # The opening time of the current bar (seconds), the end of the
+        # bar and of its trading date (the key has to be calculated
+        # again after them) and the combination of its completed lower
+        # timeframe bars.
+        self.key: Optional[float] = None
+        self.end = 0.0
+        self.date_end = 0.0
+        self.done: Optional[Bar] = None
+
+
+class BarAggregator:
+    """Aggregates the live bars to higher timeframes.
+
+    Attributes:
+        frames: Higher timeframes as members of enum Frame.
+        symbol_info: The symbol_resolved payload (optional), see
+            fia.messages.get_symbol_resolved. The 24x7 session in the
+            UTC timezone is used by default.
+        on_close: A callback (optional) that is called with a timeframe
+            and a completed bar when the bar of the timeframe is closed.
+
+    Methods:
+        update(bar): Updates the higher timeframe bars with a bar.
+        feed(raw_data): Updates the higher timeframe bars with the
+            timescale_update and du messages.
+        flush(): Closes the current bars of all timeframes.
+        bars: The current bars of all timeframes.
+    """
+    def __init__(self,
+                 frames: Iterable[Frame],
+                 symbol_info: Optional[Mapping[str, Any]] = None,
+                 on_close: Optional[Callable[[Frame, Bar], None]] = None
+                 ) -> None:
+        """Class constructor.
+        See attributes in the class level docstring.
+        """
+        self.frames = tuple(frames)
+        self.on_close = on_close
+        self._session = Session.from_symbol_info(symbol_info)
+        self._states: Dict[Frame, _FrameState] = {
+            frame: _FrameState() for frame in self.frames
+        }
+        # The current (not completed) lower timeframe bar.
+        self._current: Optional[Bar] = None
+
+    @property
+    def bars(self) -> Dict[Frame, Bar]:
+        """The current bars of all timeframes.
+
+        Returns:
+            bars: The current bar of every timeframe that has data.
+        """
+        bars = {}
+        for frame, state in self._states.items():
+            bar = self._snapshot(state)
+            if bar is not None:
+                bars[frame] = bar
+        return bars
+
+    def update(self, bar: Sequence[float]) -> None:
+        """Updates the higher timeframe bars with a bar.
+
+        The bar with the same time as the previous one replaces it (the
+        live update of the last bar). The bar with a later time
+        completes the previous one. The older bars are skipped.
+
+        Args:
+            bar: A bar [time, open, high, low, close, volume], where
+                time is UNIX timestamp (seconds).
+        """
+        new = Bar(*bar)
+        current = self._current
+        if current is not None and new.time == current.time:
+            self._current = new
+            return
+        if current is not None and new.time < current.time:
+            logger.debug(f"The old bar was skipped: {new.time}")
+            return
+        for frame, state in self._states.items():
+            if current is not None:
+                state.done = (
+                    current if state.done is None
+                    else _combine(state.done, current, state.done.time)
+                )
+            if state.key is not None and new.time < state.end:
+                # The time is still in the current bar.
+                continue
+            key = self._bucket(frame, state, new.time)
+            if key != state.key:
+                self._close(frame, state)
+                state.key = key
+        self._current = new
+
+    def feed(self, raw_data: str, series: str = "sds_1") -> None:
+        """Updates the higher timeframe bars with the messages.
+
+        Args:
+            raw_data: The raw data that includes timescale_update or du
+                messages.
+            series: The series id used in create_series ("sds_1").
+        """
+        for message in parse_messages(raw_data):
+            for bar in get_series_bars(message, series):
+                self.update(bar)
+
+    def flush(self) -> None:
+        """Closes the current bars of all timeframes.
+
+        It is useful when the stream is stopped and the last bars have
+        to be emitted.
+        """
+        current = self._current
+        for frame, state in self._states.items():
+            if current is not None:
+                state.done = (
+                    current if state.done is None
+                    else _combine(state.done, current, state.done.time)
+                )
+            self._close(frame, state)
+            state.key = None
+        self._current = None
+
+    def _bucket(self, frame: Frame, state: _FrameState,
+                time: float) -> float:
+        """Gets the opening time of the higher timeframe bar and sets
+        the end of the bar.
+
+        The session open is calculated only once for every trading
+        date: the intraday bars of the same date are steps from it.
+        """
+        intraday = frame not in (Frame.DAY, Frame.WEEK, Frame.MONTH)
+        if intraday and state.key is not None and time < state.date_end:
+            step = FRAME_SECONDS[frame]
+            key = state.key + (time - state.key) // step * step
+        else:
+            utc = np.array([int(time * 10**9)], dtype="int64")
+            key = bucket_keys(utc, frame, self._session)[0] / 10**9
+            state.date_end = self._session.date_end(int(utc[0])) / 10**9
+        state.end = state.date_end
+        if intraday:
+            state.end = min(state.end, key + FRAME_SECONDS[frame])
+        return key
+
+    def _snapshot(self, state: _FrameState) -> Optional[Bar]:
+        """Gets the current bar of a timeframe."""
+        if state.key is None:
+            return None
+        if state.done is None:
+            if self._current is None:
+                return None
+            return self._current._replace(time=state.key)
+        if self._current is None:
+            return state.done._replace(time=state.key)
+        return _combine(state.done, self._current, state.key)
+
+    def _close(self, frame: Frame, state: _FrameState) -> None:
+        """Emits the completed bar of a timeframe."""
+        if state.done is None or state.key is None:
+            return
+        bar = state.done._replace(time=state.key)
+        state.done = None
+        logger.debug(f"The {frame.name} bar was closed: {bar}")
+        if self.on_close is not None:
+            self.on_close(frame, bar)
@@ -0,0 +1,285 @@
+# Copyright 2022 Aleksey Ustinov.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied. See the License for the specific language governing
+# permissions and limitations under the License.
+"""This module collects the market data of many symbols in one process.
+
+The jobs (exchange, ticker_sym, currency, frame, bars) are read from
+a manifest file in TOML or CSV format, the identical jobs are
+deduplicated, and the jobs are run by a pool of threads. The number of
+simultaneous Websocket connections is limited separately from the
+number of threads, so the conversion and the writing of the finished
+jobs do not wait for the network.
+
+Every finished job is appended to the state file. When the batch is
+run again with the same state file, the finished jobs are skipped.
+
+An example of the TOML manifest:
+    [defaults]
+    currency = "USD"
+    frame = "DAY"
+    bars = 50
+
+    [[jobs]]
+    exchange = "NASDAQ"
+    ticker_sym = "AAPL"
+
+    [[jobs]]
+    exchange = "CME"
+    ticker_sym = "BTC1!"
+    frame = "HOUR1"
+    bars = 500
+
+An example of the CSV manifest:
+    exchange,ticker_sym,currency,frame,bars
+    NASDAQ,AAPL,USD,DAY,50
+    CME,BTC1!,USD,HOUR1,500
+
+Usage:
+    fia batch manifest.toml -o ~/fia_output --format csv -w 8 -n 4
+
+Functions:
+    - read_manifest: Reads the jobs from the manifest file.
+    - run_batch: Runs the jobs and writes the results.
+    - batch_main: The entry point of the "fia batch" command.
+"""
+# Import the standard libraries.
+import argparse
+import csv
+import json
+import logging
+import os
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Mapping, Optional
+
+# Import the third party libraries.
+import pandas as pd
+
+# Import the local/project packages and modules.
+from fia import metrics
+from fia.capture import Capture
+from fia.constants import OUTPUT_PATH, Frame
+from fia.main import TvDataCollector, output_file_name
+from fia.request import TvRequest
+from fia.utils.write_data import write_data
+
+if sys.version_info >= (3, 11):
+    import tomllib
+else:
+    import tomli as tomllib
+
+
+# Set the module logger.
+logger = logging.getLogger(__name__)
+
+
+def _create_request(job: Mapping[str, Any]) -> TvRequest:
+    """Creates the request from a manifest row.
+
+    Raises:
+        SystemExit: If a field is missed or has a wrong value.
+    """
+    try:
+        request = TvRequest(exchange=str(job["exchange"]),
+                            ticker_sym=str(job["ticker_sym"]),
+                            currency=str(job["currency"]),
+                            frame=Frame[str(job["frame"])],
+                            bars=int(job["bars"]))
+    except (KeyError, ValueError) as e:
+        logger.error(f"The job has a missed or wrong field: {job}",
+                     exc_info=True,
+                     stack_info=True)
+        raise SystemExit(f"The job has a missed or wrong field: "
+                         f"{job}") from e
+    return request
+
+
+def read_manifest(path: str) -> List[TvRequest]:
+    """Reads the jobs from the manifest file.
+
+    The identical jobs are deduplicated, the order of the first
+    occurrences is kept.
+
+    Args:
+        path: The path of the manifest file (*.toml or *.csv).
+
+    Returns:
+        requests: A list of unique requests.
+
+    Raises:
+        SystemExit: If the manifest cannot be read.
+    """
+    try:
+        if path.endswith(".toml"):
+            with open(path, "rb") as file:
+                manifest = tomllib.load(file)
+            defaults = manifest.get("defaults", {})
+            jobs = [{**defaults, **job} for job in manifest.get("jobs", [])]
+        else:
+            with open(path, newline="", encoding="utf-8") as file:
+                jobs = list(csv.DictReader(file))
+    except (OSError, tomllib.TOMLDecodeError, csv.Error) as e:
+        logger.error(f"The manifest {path} cannot be read: {e}",
+                     exc_info=True,
+                     stack_info=True)
+        raise SystemExit(f"The manifest {path} cannot be read: {e}") from e
+    requests = [_create_request(job) for job in jobs]
+    unique = list(dict.fromkeys(requests))
+    logger.info(f"The manifest {path} includes {len(unique)} unique jobs "
+                f"({len(requests) - len(unique)} duplicates).")
+    return unique
+
+
+def _read_state(state_file: Optional[str]) -> Dict[str, str]:
+    """Reads the finished jobs from the state file."""
+    finished: Dict[str, str] = {}
+    if state_file is None or not os.path.exists(state_file):
+        return finished
+    with open(state_file, encoding="utf-8") as file:
+        for line in file:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # The last line can be broken if the process was killed.
+                continue
+            finished[record["key"]] = record["path"]
+    return finished
+
+
+class _Batch:
+    """Runs the jobs of one batch in many threads."""
+    def __init__(self,
+                 username: str,
+                 password: str,
+                 output_path: str,
+                 output_format: str,
+                 *,
+                 connections: int,
+                 state_file: Optional[str]) -> None:
+        self.username = username
+        self.password = password
+        self.output_path = output_path
+        self.output_format = output_format
+        self.state_file = state_file
+        self.finished = _read_state(state_file)
+        self._connection_limit = threading.BoundedSemaphore(connections)
+        self._state_lock = threading.Lock()
+
+    def run(self, request: TvRequest) -> Dict[str, Any]:
+        """Runs one job and returns its summary."""
+        metrics.inc("fia_queue_depth", -1, queue="batch")
+        summary: Dict[str, Any] = {**request._asdict(),
+                                   "frame": request.frame.name}
+        if request.key in self.finished:
+            logger.info(f"The job {request.key} was skipped.")
+            return {**summary, "status": "skipped",
+                    "path": self.finished[request.key]}
+        try:
+            path = self._collect(request)
+        # TvDataCollector raises SystemExit on errors. One failed job
+        # must not stop the whole batch.
+        except (SystemExit, Exception) as e:  # pylint: disable=broad-except
+            logger.error(f"The job {request.key} failed: {e}")
+            return {**summary, "status": "failed", "path": None}
+        if self.state_file is not None:
+            with self._state_lock, open(self.state_file, "a",
+                                        encoding="utf-8") as file:
+                file.write(json.dumps({"key": request.key, "path": path})
+                           + "\n")
+        logger.info(f"The job {request.key} was done.")
+        return {**summary, "status": "done", "path": path}
+
+    def _collect(self, request: TvRequest) -> str:
+        """Collects the market data and writes the output file."""
+        tvdc = TvDataCollector(self.username, self.password,
+                               request.exchange, request.ticker_sym,
+                               request.currency, request.frame,
+                               request.bars)
+        # Only the network part is limited by the connections number.
+        metrics.inc("fia_queue_depth", queue="connections")
+        with self._connection_limit:
+            metrics.inc("fia_queue_depth", -1, queue="connections")
+            raw_data = tvdc.get_data()
+        df = tvdc.get_pandas_data(raw_data)
+        # The currency and the bars keep the files of the jobs of one
+        # symbol and frame apart when they finish in the same second.
+        file_name = output_file_name(request.ticker_sym, request.exchange,
+                                     request.frame.name)
+        return write_data(df,
+                          self.output_path,
+                          f"{file_name}_{request.currency}_{request.bars}",
+                          self.output_format)
+
+
+def run_batch(requests: List[TvRequest],
+              username: str,
+              password: str,
+              output_path: str = OUTPUT_PATH,
+              output_format: str = "csv",
+              *,
+              workers: int = 4,
+              connections: int = 4,
+              state_file: Optional[str] = None) -> pd.DataFrame:
+    """Runs the jobs and writes the results.
+
+    Args:
+        requests: A list of requests.
+        username: A Trading View username.
+        password: A Trading View password.
+        output_path: The folder for the output files.
+        output_format: The output format ("csv", "json" or "parquet").
+        workers: The number of threads.
+        connections: The maximal number of simultaneous Websocket
+            connections.
+        state_file: The path of the state file (optional). The finished
+            jobs are appended to it and skipped in the next runs.
+
+    Returns:
+        summary: DataFrame with the request fields, the status ("done",
+            "skipped" or "failed") and the path of the output file.
+    """
+    batch = _Batch(username, password, output_path, output_format,
+                   connections=connections, state_file=state_file)
+    metrics.inc("fia_queue_depth", len(requests), queue="batch")
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        results = list(executor.map(batch.run, requests))
+    summary = pd.DataFrame(results)
+    if not summary.empty:
+        logger.info(f"The batch was finished: "
+                    f"{summary['status'].value_counts().to_dict()}")
+    return summary
+
+
+def batch_main(args: argparse.Namespace) -> pd.DataFrame:
+    """The entry point of the "fia batch" command.
+
+    Args:
+        args: The arguments parsed by fia.cli_args.parse_batch_args.
+
+    Returns:
+        summary: The summary of the jobs (see run_batch).
+    """
+    requests = read_manifest(args.MANIFEST)
+    if args.METRICS_PORT is not None:
+        metrics.start_http_server(args.METRICS_PORT)
+    if getattr(args, "CAPTURE", None) is not None:
+        TvDataCollector.capture = Capture(args.CAPTURE)
+    return run_batch(requests,
+                     args.USERNAME,
+                     args.PASSWORD,
+                     output_path=args.OUTPUT,
+                     output_format=args.FORMAT,
+                     workers=args.WORKERS,
+                     connections=args.CONNECTIONS,
+                     state_file=args.STATE)
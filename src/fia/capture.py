@@ -0,0 +1,351 @@
+# Copyright 2022 Aleksey Ustinov.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied. See the License for the specific language governing
+# permissions and limitations under the License.
+"""This module records and replays the received Websocket frames.
+
+The capture keeps the frames of every collection (get_data, collect)
+with the time of every frame relative to the start of the collection.
+The collections are appended to one file per UTC day and process
+({YYYY-MM-DD}.{pid}.capture.gz in the capture folder), so the worker
+processes of fia.parallel never append to the same file and the
+offsets of the index are right. Every collection is a separate gzip
+member, so the file is append-only and it is still one valid gzip
+file. A member includes the JSON lines:
+    {"key": "NASDAQ:AAPL:USD:DAY:50", "symbol": "NASDAQ:AAPL", ...,
+     "connections": [0, 57]}
+    [0.0213, "~m~362~m~{\"session_id\": ...}"]
+    [0.1024, "~m~5226~m~{\"m\":\"timescale_update\", ...}"]
+
+The connections of the header are the indexes of the first frames of
+every connection, so the raw data of a collection with the retries is
+merged by the bar time as get_data does.
+
+The index ({YYYY-MM-DD}.{pid}.capture.gz.idx) has a JSON line with the
+symbol, the series, the offset and the length of every member, so one
+collection is read without decompressing the whole file.
+
+The replayer reads the captured frames back at full speed or in real
+time (with the recorded delays), so the bars can be derived again with
+other time zones or parsers without TradingView:
+    replayer = Replayer("~/fia_output/capture")
+    for entry, raw_data in replayer.replay(symbol="NASDAQ:AAPL"):
+        df = tvdc.get_pandas_data(raw_data, tz="America/New_York")
+
+Usage:
+    TvDataCollector.capture = Capture("~/fia_output/capture")
+
+Classes:
+    - CaptureEntry: The index entry of one captured collection.
+    - Capture: Writes the received frames of the collections.
+    - Replayer: Reads the captured collections.
+
+Functions:
+    - read_index: Reads the index entries of the capture folder.
+    - iter_capture_file: Streams the collections of a capture file.
+"""
+# Import the standard libraries.
+import glob
+import gzip
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+# Import the local/project packages and modules.
+from fia.constants import CAPTURE_INDEX_SUFFIX, CAPTURE_PATH, CAPTURE_SUFFIX
+from fia.messages import RawData, merge_raw_data
+from fia.request import TvRequest
+
+
+# Set the module logger.
+logger = logging.getLogger(__name__)
+
+# The captured frame: the time in seconds from the start of the
+# collection and the frame.
+_Frame = Tuple[float, str]
+
+
+class CaptureEntry(NamedTuple):
+    """The index entry of one captured collection.
+
+    Attributes:
+        key: The key of the request ("NASDAQ:AAPL:USD:DAY:50").
+        symbol: The symbol ("NASDAQ:AAPL").
+        series: The series of the collection ("sds_1").
+        frame: The name of the timeframe ("DAY").
+        time: The Unix time of the start of the collection.
+        complete: False if the series was not completed.
+        frames: The number of the captured frames.
+        file: The capture file.
+        offset: The offset of the gzip member in the file.
+        length: The length of the gzip member.
+        connections: The indexes of the first frames of every
+            connection of the collection (the retries).
+    """
+    key: str
+    symbol: str
+    series: str
+    frame: str
+    time: float
+    complete: bool
+    frames: int
+    file: str
+    offset: int
+    length: int
+    connections: Tuple[int, ...] = (0,)
+
+
+class Capture:
+    """Writes the received frames of the collections.
+
+    The frames are kept by the thread of the collection and written
+    when the collection finishes, so the concurrent collections do not
+    mix their frames.
+
+    Attributes:
+        output_path: The folder of the capture files.
+
+    Methods:
+        start(): Starts the capture of the current thread.
+        connection(): Marks the start of a new connection (a retry).
+        received(frame): Keeps a received frame.
+        finish(request, complete): Writes the frames of the current
+            thread.
+    """
+    def __init__(self, output_path: str = CAPTURE_PATH) -> None:
+        """Class constructor.
+        See attributes in the class level docstring.
+        """
+        self.output_path = os.path.expanduser(output_path)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def start(self) -> None:
+        """Starts the capture of the current thread."""
+        self._local.frames = []
+        self._local.connections = [0]
+        self._local.start = time.monotonic()
+        self._local.time = time.time()
+
+    def connection(self) -> None:
+        """Marks the start of a new connection of the current thread
+        (the next frames are the raw data of another connection)."""
+        frames: Optional[List[_Frame]] = getattr(self._local, "frames", None)
+        connections: List[int] = getattr(self._local, "connections", [0])
+        if frames is not None and len(frames) > connections[-1]:
+            connections.append(len(frames))
+
+    def received(self, frame: str) -> None:
+        """Keeps a received frame (nothing happens if the capture of the
+        current thread is not started)."""
+        frames: Optional[List[_Frame]] = getattr(self._local, "frames", None)
+        if frames is not None:
+            frames.append((time.monotonic() - self._local.start, frame))
+
+    def finish(self, request: TvRequest,
+               complete: bool = True) -> Optional[CaptureEntry]:
+        """Writes the frames of the current thread.
+
+        Args:
+            request: The request of the collection.
+            complete: False if the series was not completed.
+
+        Returns:
+            entry: The index entry (None if the capture of the current
+                thread was not started).
+        """
+        frames: Optional[List[_Frame]] = getattr(self._local, "frames", None)
+        if frames is None:
+            return None
+        self._local.frames = None
+        header = {"key": request.key,
+                  "symbol": f"{request.exchange}:{request.ticker_sym}",
+                  "series": "sds_1",
+                  "frame": request.frame.name,
+                  "time": self._local.time,
+                  "complete": complete,
+                  "frames": len(frames),
+                  "connections": self._local.connections}
+        lines = [json.dumps(header)]
+        lines.extend(json.dumps([round(offset, 6), frame])
+                     for offset, frame in frames)
+        member = gzip.compress(("\n".join(lines) + "\n").encode(), mtime=0)
+        # The threads of the process share the file under the lock.
+        file_name = (time.strftime("%Y-%m-%d", time.gmtime(header["time"]))
+                     + f".{os.getpid()}{CAPTURE_SUFFIX}")
+        path = os.path.join(self.output_path, file_name)
+        with self._lock:
+            os.makedirs(self.output_path, exist_ok=True)
+            with open(path, "ab") as file:
+                offset = file.tell()
+                file.write(member)
+            entry = CaptureEntry(file=file_name, offset=offset,
+                                 length=len(member), **header)
+            with open(path + CAPTURE_INDEX_SUFFIX, "a",
+                      encoding="utf-8") as file:
+                file.write(json.dumps(entry._asdict()) + "\n")
+        logger.debug(f"{len(frames)} frames of {request.key} were captured "
+                     f"to {path}.")
+        return entry
+
+
+def read_index(output_path: str = CAPTURE_PATH) -> List[CaptureEntry]:
+    """Reads the index entries of the capture folder.
+
+    Args:
+        output_path: The folder of the capture files.
+
+    Returns:
+        entries: The entries of all capture files in the order of the
+            start time of the collections.
+    """
+    output_path = os.path.expanduser(output_path)
+    entries = []
+    pattern = os.path.join(output_path, "*" + CAPTURE_SUFFIX
+                           + CAPTURE_INDEX_SUFFIX)
+    for path in sorted(glob.glob(pattern)):
+        with open(path, encoding="utf-8") as file:
+            for line in file:
+                try:
+                    entries.append(CaptureEntry(**json.loads(line)))
+                except (ValueError, TypeError):
+                    # The line of an interrupted write.
+                    logger.warning(f"The broken index line in {path} was "
+                                   f"skipped.")
+    # The files of the processes overlap in time.
+    entries.sort(key=lambda entry: entry.time)
+    return entries
+
+
+def iter_capture_file(path: str) -> Iterator[Tuple[Dict[str, Any],
+                                                   List[_Frame]]]:
+    """Streams the collections of a capture file.
+
+    The file is read line by line without the index, so the memory is
+    bounded by one collection.
+
+    Args:
+        path: The capture file.
+
+    Yields:
+        header: The header of the collection (key, symbol, series,
+            frame, time, complete, frames).
+        frames: The (time, frame) tuples of the collection.
+    """
+    header: Optional[Dict[str, Any]] = None
+    frames: List[_Frame] = []
+    with gzip.open(path, "rt", encoding="utf-8") as file:
+        for line in file:
+            value = json.loads(line)
+            if isinstance(value, dict):
+                if header is not None:
+                    yield header, frames
+                header, frames = value, []
+            else:
+                frames.append((value[0], value[1]))
+    if header is not None:
+        yield header, frames
+
+
+class Replayer:
+    """Reads the captured collections.
+
+    Attributes:
+        output_path: The folder of the capture files.
+        speed: The speed of the replay (None - full speed, 1.0 - real
+            time, 2.0 - twice as fast as the real time).
+
+    Methods:
+        entries(symbol, series, key): Gets the index entries.
+        read(entry): Reads the frames of the collection.
+        frames(entry): Yields the frames with the recorded delays.
+        raw_data(entry): Gets the raw data of the collection (the
+            connections are merged).
+        replay(symbol, series, key): Yields the raw data of the
+            collections.
+    """
+    def __init__(self,
+                 output_path: str = CAPTURE_PATH,
+                 speed: Optional[float] = None) -> None:
+        """Class constructor.
+        See attributes in the class level docstring.
+        """
+        self.output_path = os.path.expanduser(output_path)
+        self.speed = speed
+
+    def entries(self,
+                symbol: Optional[str] = None,
+                series: Optional[str] = None,
+                key: Optional[str] = None) -> List[CaptureEntry]:
+        """Gets the index entries (all entries if there are no
+        filters)."""
+        return [entry for entry in read_index(self.output_path)
+                if (symbol is None or entry.symbol == symbol)
+                and (series is None or entry.series == series)
+                and (key is None or entry.key == key)]
+
+    def read(self, entry: CaptureEntry) -> List[_Frame]:
+        """Reads the (time, frame) tuples of the collection."""
+        path = os.path.join(self.output_path, entry.file)
+        with open(path, "rb") as file:
+            file.seek(entry.offset)
+            member = file.read(entry.length)
+        lines = gzip.decompress(member).decode().splitlines()
+        return [(value[0], value[1])
+                for value in map(json.loads, lines[1:])]
+
+    def frames(self, entry: CaptureEntry) -> Iterator[str]:
+        """Yields the frames (with the recorded delays divided by the
+        speed if the speed is set)."""
+        start = time.monotonic()
+        for offset, frame in self.read(entry):
+            if self.speed:
+                delay = start + offset / self.speed - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+            yield frame
+
+    def raw_data(self, entry: CaptureEntry) -> RawData:
+        """Gets the raw data of the collection (see get_data).
+
+        The raw data of many connections (the retries) is merged by the
+        bar time.
+        """
+        frames = list(self.frames(entry))
+        bounds = [*entry.connections, len(frames)]
+        parts = ["".join(frames[start:end])
+                 for start, end in zip(bounds, bounds[1:])]
+        if len(parts) == 1:
+            return RawData(parts[0], entry.complete)
+        return RawData(merge_raw_data(parts), entry.complete)
+
+    def replay(self,
+               symbol: Optional[str] = None,
+               series: Optional[str] = None,
+               key: Optional[str] = None
+               ) -> Iterator[Tuple[CaptureEntry, RawData]]:
+        """Yields the raw data of the collections.
+
+        Args:
+            symbol: The symbol ("NASDAQ:AAPL", optional).
+            series: The series ("sds_1", optional).
+            key: The key of the request (optional).
+
+        Yields:
+            entry: The index entry.
+            raw_data: The raw data of the collection.
+        """
+        for entry in self.entries(symbol, series, key):
+            yield entry, self.raw_data(entry)
@@ -0,0 +1,82 @@
+# Copyright 2022 Aleksey Ustinov.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied. See the License for the specific language governing
+# permissions and limitations under the License.
+"""The entry point of the fia command line interface.
+
+The first argument chooses the command:
+    - fia batch manifest.toml ...: Collects the jobs from a manifest
+      file (see fia.batch).
+    - fia serve watchlist.toml ...: Refreshes the symbols of
+      a watchlist after the bar close times (see fia.serve).
+    - fia http -o folder ...: Serves the stored bars over HTTP (see
+      fia.http_server).
+    - fia convert folder -o folder ...: Converts the captures and the
+      raw data files to the bar stores or Parquet (see fia.convert).
+    - fia -e exchange -t ticker_sym ...: Collects one symbol (see
+      fia.main.main).
+
+The arguments are parsed before the heavy modules (pandas, numpy,
+websocket) are imported, so "fia --help" and the argument errors are
+fast.
+
+This module is a part of the fia package and should not be used
+separately.
+
+Functions:
+    - main: Runs the command chosen by the first argument.
+"""
+# Import the standard libraries.
+import sys
+from typing import Any
+
+
+def main() -> Any:
+    """Runs the command chosen by the first argument.
+
+    Returns:
+        The value returned by the command (the market data or the
+        summary of the jobs in Pandas DataFrame format).
+    """
+    from fia.cli_args import (parse_batch_args, parse_cli_args,
+                              parse_convert_args, parse_http_args,
+                              parse_serve_args)
+    from fia.utils.set_logger import set_logger
+
+    command = sys.argv[1] if len(sys.argv) > 1 else ""
+    if command == "batch":
+        args = parse_batch_args(sys.argv[2:])
+        from fia.batch import batch_main
+        set_logger("INFO")
+        return batch_main(args)
+    if command == "serve":
+        args = parse_serve_args(sys.argv[2:])
+        from fia.serve import serve_main
+        set_logger("INFO")
+        return serve_main(args)
+    if command == "http":
+        args = parse_http_args(sys.argv[2:])
+        from fia.http_server import http_main
+        set_logger("INFO")
+        return http_main(args)
+    if command == "convert":
+        args = parse_convert_args(sys.argv[2:])
+        from fia.convert import convert_main
+        set_logger("INFO")
+        return convert_main(args)
+    cli_args = parse_cli_args(sys.argv[1:])
+    from fia.main import main as collect_main
+    return collect_main(cli_args)
+
+
+if __name__ == "__main__":
+    main()
@@ -13,40 +13,44 @@
 # permissions and limitations under the License.
 """This module parses the command line arguments.
 
-The module parses the command line interface arguments, checks that
-username and password is not None, sets the module logger.
+The module parses the command line interface arguments and checks that
+username and password is not None. The arguments are parsed only when
+a parse function is called (not at import time), so "fia --help" and
+the argument errors do not import the heavy dependencies.
 
 This module is a part of the fia package and should not be used
 separately.
 
 Functions:
-    - _cli_args: Parses CLI arguments
+    - parse_cli_args: Parses the arguments of the "fia" command.
+    - parse_batch_args: Parses the arguments of the "fia batch"
+      command.
+    - parse_serve_args: Parses the arguments of the "fia serve"
+      command.
+    - parse_http_args: Parses the arguments of the "fia http" command.
+    - parse_convert_args: Parses the arguments of the "fia convert"
+      command.
 """
 # Import the standard libraries.
 import argparse
 import logging
 import os
+from typing import Any, List, Optional
 
 # Import the local/project packages and modules.
-from fia.constants import Frame, REMEMBER, USER_AGENT
+from fia.constants import (CAPTURE_PATH, CONVERT_FORMATS, Frame,
+                           HTTP_CACHE_SIZE, HTTP_HOST, HTTP_PORT,
+                           OUTPUT_FORMATS, OUTPUT_PATH,
+                           PROFILE_MODES, PROFILE_PATH, REMEMBER,
+                           SERVE_DELAY, USER_AGENT)
 
 
 # Set the module logger.
 logger = logging.getLogger(__name__)
 
 
-def _cli_args() -> argparse.Namespace:
-    """Parses CLI arguments
-
-    Parses CLI arguments: username, password, exchange, ticker_sym,
-    currency, frame, bars, user_agent, remember.
-
-    Returns:
-        Namespace
-    """
-    parser = argparse.ArgumentParser(
-        description="The data collector from TradingView"
-    )
+def _add_credentials(parser: argparse.ArgumentParser) -> None:
+    """Adds the username and password arguments."""
     parser.add_argument(
         "-u", "--username",
         dest="USERNAME",
@@ -61,6 +65,42 @@ def _cli_args() -> argparse.Namespace:
         type=str,
         help="The TradingView PASSWORD."
     )
+
+
+def _check_credentials(args: argparse.Namespace) -> None:
+    """Checks that username and password is not None.
+
+    Raises:
+        SystemExit: If username or password is None.
+    """
+    if args.USERNAME is None or args.PASSWORD is None:
+        logger.error("You have to set up USERNAME OR/AND PASSWORD over "
+                     "command line interface or add environment "
+                     "variables.")
+        raise SystemExit("You have to set up USERNAME OR/AND PASSWORD over "
+                         "command line interface or add environment "
+                         "variables.")
+
+
+def parse_cli_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    """Parses the arguments of the "fia" command.
+
+    Parses CLI arguments: username, password, exchange, ticker_sym,
+    currency, frame, bars, user_agent, remember.
+
+    Args:
+        argv: The command line arguments (sys.argv[1:] by default).
+
+    Returns:
+        Namespace
+
+    Raises:
+        SystemExit: If username or password is None.
+    """
+    parser = argparse.ArgumentParser(
+        description="The data collector from TradingView"
+    )
+    _add_credentials(parser)
     parser.add_argument(
         "-e", "--exchange",
         dest="EXCHANGE",
@@ -113,14 +153,192 @@ def _cli_args() -> argparse.Namespace:
         type=str,
         help="Remember the use (default: on)"
     )
-    return parser.parse_args()
+    parser.add_argument(
+        "--profile",
+        dest="PROFILE",
+        default=None,
+        choices=PROFILE_MODES,
+        help="Profile the phases of the collection (cpu - cProfile, "
+             "memory - tracemalloc) and print the summary."
+    )
+    parser.add_argument(
+        "--profile-dir",
+        dest="PROFILE_DIR",
+        default=PROFILE_PATH,
+        type=str,
+        help="The folder of the profile files (default: "
+             "~/fia_output/profile)."
+    )
+    parser.add_argument(
+        "--capture",
+        dest="CAPTURE",
+        nargs="?",
+        default=None,
+        const=CAPTURE_PATH,
+        type=str,
+        help="Capture the received frames to the folder (default: "
+             "~/fia_output/capture), see fia.capture."
+    )
+    cli_args = parser.parse_args(argv)
+    logger.debug(f"Command line arguments: {cli_args}")
+    _check_credentials(cli_args)
+    return cli_args
+
+
+def parse_batch_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    """Parses the arguments of the "fia batch" command.
+
+    Args:
+        argv: The command line arguments after "batch".
+
+    Returns:
+        Namespace
+
+    Raises:
+        SystemExit: If username or password is None.
+    """
+    parser = argparse.ArgumentParser(
+        prog="fia batch",
+        description="Collects the market data of the jobs from a manifest"
+    )
+    parser.add_argument("MANIFEST", type=str,
+                        help="The manifest file (*.toml or *.csv).")
+    _add_credentials(parser)
+    parser.add_argument("-o", "--output", dest="OUTPUT", default=OUTPUT_PATH,
+                        type=str, help="The folder for the output files.")
+    parser.add_argument("--format", dest="FORMAT", default="csv",
+                        choices=OUTPUT_FORMATS, help="The output format.")
+    parser.add_argument("-w", "--workers", dest="WORKERS", default=4,
+                        type=int, help="The number of threads.")
+    parser.add_argument("-n", "--connections", dest="CONNECTIONS", default=4,
+                        type=int,
+                        help="The maximal number of simultaneous "
+                             "Websocket connections.")
+    parser.add_argument("-s", "--state", dest="STATE", default=None,
+                        type=str,
+                        help="The state file. The finished jobs are "
+                             "skipped when the batch is run again.")
+    parser.add_argument("--capture", dest="CAPTURE", nargs="?", default=None,
+                        const=CAPTURE_PATH, type=str,
+                        help="Capture the received frames to the folder "
+                             "(default: ~/fia_output/capture).")
+    parser.add_argument("--metrics-port", dest="METRICS_PORT", default=None,
+                        type=int,
+                        help="Serve the metrics in the Prometheus text "
+                             "format on http://127.0.0.1:PORT/metrics.")
+    args = parser.parse_args(argv)
+    _check_credentials(args)
+    return args
+
+
+def parse_serve_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    """Parses the arguments of the "fia serve" command.
+
+    Args:
+        argv: The command line arguments after "serve".
+
+    Returns:
+        Namespace
+
+    Raises:
+        SystemExit: If username or password is None.
+    """
+    parser = argparse.ArgumentParser(
+        prog="fia serve",
+        description="Refreshes the watchlist after the bar close times"
+    )
+    parser.add_argument("WATCHLIST", type=str,
+                        help="The watchlist file (*.toml or *.csv).")
+    _add_credentials(parser)
+    parser.add_argument("-o", "--output", dest="OUTPUT", default=OUTPUT_PATH,
+                        type=str, help="The folder for the bar stores.")
+    parser.add_argument("-d", "--delay", dest="DELAY", default=SERVE_DELAY,
+                        type=float,
+                        help="The delay after the bar close in seconds.")
+    parser.add_argument("--metrics-port", dest="METRICS_PORT", default=None,
+                        type=int,
+                        help="Serve the metrics in the Prometheus text "
+                             "format on http://127.0.0.1:PORT/metrics.")
+    args = parser.parse_args(argv)
+    _check_credentials(args)
+    return args
+
+
+def parse_http_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    """Parses the arguments of the "fia http" command.
+
+    The server does not connect to TradingView, so the username and
+    the password are not required.
 
+    Args:
+        argv: The command line arguments after "http".
 
-cli_args = _cli_args()
-logger.debug(f"Command line arguments: {cli_args}")
-# Check that username and password is not None.
-if cli_args.USERNAME is None or cli_args.PASSWORD is None:
-    logger.error("You have to set up USERNAME OR/AND PASSWORD over command "
-                 "line interface or add environment variables.")
-    raise SystemExit("You have to set up USERNAME OR/AND PASSWORD over "
-                     "command line interface or add environment variables.")
+    Returns:
+        Namespace
+    """
+    parser = argparse.ArgumentParser(
+        prog="fia http",
+        description="Serves the stored bars over HTTP"
+    )
+    parser.add_argument("-o", "--output", dest="OUTPUT", default=OUTPUT_PATH,
+                        type=str, help="The folder of the bar stores.")
+    parser.add_argument("--host", dest="HOST", default=HTTP_HOST, type=str,
+                        help="The host of the server.")
+    parser.add_argument("--port", dest="PORT", default=HTTP_PORT, type=int,
+                        help="The port of the server.")
+    parser.add_argument("--cache", dest="CACHE", default=HTTP_CACHE_SIZE,
+                        type=int,
+                        help="The number of the cached responses.")
+    return parser.parse_args(argv)
+
+
+def parse_convert_args(argv: Optional[List[str]] = None
+                       ) -> argparse.Namespace:
+    """Parses the arguments of the "fia convert" command.
+
+    The converter does not connect to TradingView, so the username and
+    the password are not required.
+
+    Args:
+        argv: The command line arguments after "convert".
+
+    Returns:
+        Namespace
+    """
+    parser = argparse.ArgumentParser(
+        prog="fia convert",
+        description="Converts the captures and the raw data files to the "
+                    "bar stores or Parquet"
+    )
+    parser.add_argument("INPUT", nargs="?", default=CAPTURE_PATH, type=str,
+                        help="The folder of the *.capture.gz and *.raw "
+                             "files (or one file).")
+    parser.add_argument("-o", "--output", dest="OUTPUT", default=OUTPUT_PATH,
+                        type=str,
+                        help="The folder of the bar stores or the Parquet "
+                             "files.")
+    parser.add_argument("-f", "--format", dest="FORMAT", default="store",
+                        choices=CONVERT_FORMATS,
+                        help="The output format.")
+    parser.add_argument("-w", "--workers", dest="WORKERS", default=None,
+                        type=int,
+                        help="The number of processes (the number of CPUs "
+                             "by default).")
+    parser.add_argument("--check", dest="CHECK", default="mtime",
+                        choices=("mtime", "hash"),
+                        help="Skip the files with the same modification "
+                             "time and size or the same SHA-256 hash.")
+    parser.add_argument("--force", dest="FORCE", action="store_true",
+                        help="Convert the up-to-date files too.")
+    return parser.parse_args(argv)
+
+
+def __getattr__(name: str) -> Any:
+    """Parses sys.argv when the cli_args attribute is used.
+
+    It keeps "from fia.cli_args import cli_args" working without
+    parsing the arguments at import time.
+    """
+    if name == "cli_args":
+        return parse_cli_args()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
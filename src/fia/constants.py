@@ -16,8 +16,9 @@
 This module is a part of the fia package and should not be used
 separately.
 """
+import os
 from enum import Enum
-from typing import Final
+from typing import Dict, Final, Tuple
 
 
 # Enum of acceptable bar timeframes of TvDataCollector class.
@@ -37,6 +38,28 @@ class Frame(Enum):
     MONTH = "M"
 
 
+# The bar duration in seconds for every timeframe that has a fixed
+# length. The month timeframe is not included because its length
+# depends on the calendar.
+FRAME_SECONDS: Final[Dict[Frame, int]] = {
+    Frame.MIN1: 60,
+    Frame.MIN5: 5 * 60,
+    Frame.MIN15: 15 * 60,
+    Frame.MIN30: 30 * 60,
+    Frame.MIN45: 45 * 60,
+    Frame.HOUR1: 60 * 60,
+    Frame.HOUR2: 2 * 60 * 60,
+    Frame.HOUR3: 3 * 60 * 60,
+    Frame.HOUR4: 4 * 60 * 60,
+    Frame.DAY: 24 * 60 * 60,
+    Frame.WEEK: 7 * 24 * 60 * 60
+}
+# The longest month is used where the month bar needs a duration.
+MONTH_SECONDS: Final[int] = 31 * 24 * 60 * 60
+# The column names of the market data in Pandas DataFrame format.
+COLUMNS: Final[Tuple[str, ...]] = (
+    "DateTime", "Open", "High", "Low", "Close", "Volume"
+)
 # User agent used during authorization on TradingView.
 USER_AGENT: Final[str] = ("Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7)"
                           "AppleWebKit/537.36 (KHTML, like Gecko)"
@@ -44,3 +67,100 @@ USER_AGENT: Final[str] = ("Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7)"
                           "Safari/537.36")
 # Remember the user or not ("on"/"off")
 REMEMBER: Final[str] = "on"
+# The sign in url and the Websocket url of TradingView.
+SIGN_IN_URL: Final[str] = "https://www.tradingview.com/accounts/signin/"
+WS_URL: Final[str] = "wss://data.tradingview.com/socket.io/websocket"
+# The timeout in seconds of the Websocket reads (TradingView sends
+# a heartbeat about every 10 seconds) and the messages of the errors
+# of the symbol and the series.
+WS_TIMEOUT: Final[float] = 30.0
+SERIES_ERRORS: Final[Tuple[str, ...]] = ("symbol_error", "series_error")
+# The messages of TradingView when the authorization token is rejected.
+AUTH_ERRORS: Final[Tuple[str, ...]] = ("critical_error", "protocol_error")
+# The rate limits of the requests to TradingView: the number of requests
+# per second and the number of requests without waiting (the burst).
+RATE_LIMITS: Final[Dict[str, Tuple[float, int]]] = {
+    "sign_in": (0.5, 2),
+    "connect": (2.0, 4),
+    "series": (5.0, 10)
+}
+# The number of retries when the Websocket connection is closed before
+# all bars are received and the base of the exponential backoff in
+# seconds (the random delay is up to RETRY_BACKOFF * 2 ** attempt).
+RETRIES: Final[int] = 3
+RETRY_BACKOFF: Final[float] = 1.0
+# The number of bars requested by every create_series and
+# request_more_data message of get_history.
+CHUNK_BARS: Final[int] = 5000
+# The delay in seconds after the bar close before "fia serve" requests
+# the finished bar.
+SERVE_DELAY: Final[float] = 2.0
+# The maximal delay in seconds before "fia serve" retries a failed
+# refresh (the delay is doubled after every failure of the request) and
+# the number of failures in a row that are logged as errors.
+SERVE_BACKOFF_MAX: Final[float] = 300.0
+SERVE_FAILURES: Final[int] = 5
+# The host, the port and the number of cached responses of "fia http".
+HTTP_HOST: Final[str] = "127.0.0.1"
+HTTP_PORT: Final[int] = 8000
+HTTP_CACHE_SIZE: Final[int] = 128
+# The maximal number of the results kept by ResultCache.
+RESULT_CACHE_SIZE: Final[int] = 256
+# The file of the symbol metadata cache and the age in seconds after
+# which the cached metadata is stale.
+SYMBOL_CACHE_PATH: Final[str] = os.path.join(os.path.expanduser("~"), ".fia",
+                                             "symbols.json")
+SYMBOL_MAX_AGE: Final[float] = 24 * 60 * 60
+# The output formats of the market data files.
+OUTPUT_FORMATS: Final[Tuple[str, ...]] = ("csv", "json", "parquet")
+# The folder for the output files created over command line interface.
+OUTPUT_PATH: Final[str] = os.path.join(os.path.expanduser("~"), "fia_output")
+# The upper bounds in seconds of the latency histogram buckets of
+# fia.metrics.
+METRICS_BUCKETS: Final[Tuple[float, ...]] = (0.001, 0.005, 0.01, 0.05, 0.1,
+                                             0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+                                             30.0)
+# The number of the last frames kept by fia.tracing.Tracer, the maximal
+# number of characters of a traced frame and the sampling of the debug
+# log (every n-th frame is logged).
+TRACE_SIZE: Final[int] = 200
+TRACE_MAX_CHARS: Final[int] = 500
+TRACE_SAMPLE: Final[int] = 1
+# The number of the functions (or allocation lines) of every phase in
+# the summary of fia.profiling.Profiler.
+PROFILE_TOP: Final[int] = 10
+# The modes of fia.profiling.Profiler and the folder of its files.
+PROFILE_MODES: Final[Tuple[str, ...]] = ("cpu", "memory")
+PROFILE_PATH: Final[str] = os.path.join(OUTPUT_PATH, "profile")
+# The open time of the first bar and the chart session of the synthetic
+# transcripts of fia.testing.
+SYNTHETIC_START: Final[int] = 1_600_000_000
+SYNTHETIC_CS_TOKEN: Final[str] = "cs_synthetic"
+# The number of bars of every symbol, the delay in seconds before
+# the idle connection is closed and the timeout in seconds of the
+# Websocket reads of fia.fake_server.FakeTvServer.
+FAKE_BARS: Final[int] = 10_000
+FAKE_LINGER: Final[float] = 0.05
+FAKE_TIMEOUT: Final[float] = 30.0
+# The folder of the captured Websocket frames of fia.capture and the
+# suffixes of the capture files and their indexes.
+CAPTURE_PATH: Final[str] = os.path.join(OUTPUT_PATH, "capture")
+CAPTURE_SUFFIX: Final[str] = ".capture.gz"
+CAPTURE_INDEX_SUFFIX: Final[str] = ".idx"
+# The output formats of "fia convert", the suffix of the raw data
+# files, the number of characters read at once from a raw data file and
+# the state file of the converted files in the output folder.
+CONVERT_FORMATS: Final[Tuple[str, ...]] = ("store", "parquet")
+RAW_SUFFIX: Final[str] = ".raw"
+CONVERT_CHUNK: Final[int] = 1 << 20
+CONVERT_STATE: Final[str] = ".fia_convert.jsonl"
+# The quote fields requested by quote_set_fields.
+QUOTE_FIELDS: Final[Tuple[str, ...]] = (
+    "base-currency-logoid", "ch", "chp", "currency-logoid", "currency_code",
+    "currency_id", "base_currency_id", "current_session", "description",
+    "exchange", "format", "fractional", "is_tradable", "language",
+    "local_description", "listed_exchange", "logoid", "lp", "lp_time",
+    "minmov", "minmove2", "original_name", "pricescale", "pro_name",
+    "short_name", "type", "typespecs", "update_mode", "volume",
+    "value_unit_id"
+)
@@ -0,0 +1,318 @@
+# Copyright 2022 Aleksey Ustinov.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied. See the License for the specific language governing
+# permissions and limitations under the License.
+"""This module converts the captured transcripts to columnar storage.
+
+The input folder is scanned for the files:
+    - *.capture.gz: The captures of fia.capture (the symbol and the
+      frame of every collection are in its header).
+    - *.raw: The saved raw data of one collection. The file name has to
+      start with TICKER_SYM_EXCHANGE_FRAME (see output_file_name), for
+      example, AAPL_NASDAQ_DAY_20221115_13_03_20.raw.
+
+Every file is decoded in a pool of processes. The files are streamed:
+a capture is read collection by collection and a raw data file is read
+in blocks of CONVERT_CHUNK characters, so the memory is bounded by the
+bars of one file. The parent process writes the bars:
+    - store: The bar stores of the symbols (see fia.store), so they
+      can be served by "fia http".
+    - parquet: The partitioned Parquet files (requires the pyarrow
+      package): {output}/exchange=NASDAQ/ticker_sym=AAPL/frame=DAY/
+      {input file name}.parquet.
+
+The signature of every converted file (the modification time and the
+size, or the SHA-256 hash) is appended to the state file in the output
+folder, and the unchanged files are skipped when the command is run
+again. A changed capture is converted again as a whole: the Parquet
+file is replaced, the duplicate bars appended to a store are dropped
+when the store is read.
+
+Usage:
+    fia convert ~/fia_output/capture -o ~/fia_output --format store
+
+Functions:
+    - find_inputs: Finds the capture and raw data files.
+    - decode_file: Decodes the bars of one file.
+    - run_convert: Converts the files in a pool of processes.
+    - convert_main: The entry point of the "fia convert" command.
+"""
+# Import the standard libraries.
+import argparse
+import hashlib
+import json
+import logging
+import os
+import time
+from concurrent.futures import Future, ProcessPoolExecutor, as_completed
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+# Import the third party libraries.
+import numpy as np
+import pandas as pd
+
+# Import the local/project packages and modules.
+from fia.capture import iter_capture_file
+from fia.constants import (CAPTURE_SUFFIX, COLUMNS, CONVERT_CHUNK,
+                           CONVERT_STATE, RAW_SUFFIX, Frame)
+from fia.messages import get_series_bars, iter_messages, split_messages
+from fia.store import BarStore, store_path
+from fia.utils.write_data import write_data
+
+
+# Set the module logger.
+logger = logging.getLogger(__name__)
+
+# The symbol and the frame of the bars: (exchange, ticker_sym, frame).
+_Key = Tuple[str, str, str]
+
+
+def find_inputs(input_path: str) -> List[str]:
+    """Finds the capture and raw data files.
+
+    Args:
+        input_path: A folder (it is scanned recursively) or a file.
+
+    Returns:
+        paths: The sorted paths of the files.
+    """
+    input_path = os.path.expanduser(input_path)
+    if os.path.isfile(input_path):
+        return [input_path]
+    paths: List[str] = []
+    for folder, _, files in os.walk(input_path):
+        paths.extend(os.path.join(folder, name) for name in files
+                     if name.endswith((CAPTURE_SUFFIX, RAW_SUFFIX)))
+    return sorted(paths)
+
+
+def _signature(path: str, check: str) -> str:
+    """Gets the signature of the file (mtime and size, or hash)."""
+    if check == "hash":
+        digest = hashlib.sha256()
+        with open(path, "rb") as file:
+            for block in iter(lambda: file.read(CONVERT_CHUNK), b""):
+                digest.update(block)
+        return digest.hexdigest()
+    stat = os.stat(path)
+    return f"{stat.st_mtime_ns}:{stat.st_size}"
+
+
+def _read_state(state_file: str) -> Dict[str, str]:
+    """Reads the signatures of the converted files."""
+    if not os.path.exists(state_file):
+        return {}
+    with open(state_file, encoding="utf-8") as file:
+        # The last line has no newline if the process was killed.
+        records = [json.loads(line) for line in file if line.endswith("\n")]
+    return {record["path"]: record["signature"] for record in records}
+
+
+def _file_stem(path: str) -> str:
+    """Gets the file name without the capture or raw data suffix."""
+    name = os.path.basename(path)
+    for suffix in (CAPTURE_SUFFIX, RAW_SUFFIX):
+        if name.endswith(suffix):
+            return name[:-len(suffix)]
+    return name
+
+
+def _decode_messages(messages: Iterator[str]) -> List[List[float]]:
+    """Gets the bars of the timescale_update and du messages."""
+    bars: List[List[float]] = []
+    for message in messages:
+        # Only the bar messages are decoded.
+        head = message[:32]
+        if '"m":"timescale_update"' in head or '"m":"du"' in head:
+            bars.extend(get_series_bars(json.loads(message)))
+    return bars
+
+
+def _iter_collections(path: str) -> Iterator[Tuple[_Key, List[List[float]]]]:
+    """Yields the symbol, the frame and the bars of every collection.
+
+    Raises:
+        ValueError: If the symbol of the raw data file is unknown.
+    """
+    if path.endswith(CAPTURE_SUFFIX):
+        for header, frames in iter_capture_file(path):
+            exchange, _, ticker_sym = header["symbol"].partition(":")
+            messages = (message for _, frame in frames
+                        for message in split_messages(frame))
+            yield ((exchange, ticker_sym, header["frame"]),
+                   _decode_messages(messages))
+        return
+    parts = _file_stem(path).split("_")
+    if len(parts) < 3 or parts[2] not in Frame.__members__:
+        raise ValueError(f"The name of {path} has to start with "
+                         f"TICKER_SYM_EXCHANGE_FRAME.")
+    with open(path, encoding="utf-8") as file:
+        chunks = iter(lambda: file.read(CONVERT_CHUNK), "")
+        yield ((parts[1], parts[0], parts[2]),
+               _decode_messages(iter_messages(chunks)))
+
+
+def decode_file(path: str, check: str = "mtime",
+                known: Optional[str] = None) -> Dict[str, Any]:
+    """Decodes the bars of one file (it runs in a worker process).
+
+    Args:
+        path: The capture or raw data file.
+        check: The signature of the file: "mtime" (the modification
+            time and the size) or "hash" (SHA-256).
+        known: The signature of the last conversion (None - the file
+            was not converted).
+
+    Returns:
+        result: The path, the signature, the status ("skipped" if the
+            signature is known, "decoded" otherwise), the number of
+            collections and the bars as a list of (exchange, ticker_sym,
+            frame, (n, 6) array) tuples. The bars are unique and sorted
+            by time.
+    """
+    signature = _signature(path, check)
+    result: Dict[str, Any] = {"path": path, "signature": signature,
+                              "status": "skipped", "collections": 0,
+                              "bars": []}
+    if signature == known:
+        return result
+    # The bars by time: the du updates and the retries repeat the bars,
+    # the last received bar wins as in BarStore.to_numpy.
+    merged: Dict[_Key, Dict[float, List[float]]] = {}
+    for key, bars in _iter_collections(path):
+        by_time = merged.setdefault(key, {})
+        for bar in bars:
+            by_time[bar[0]] = bar
+        result["collections"] += 1
+    result["status"] = "decoded"
+    result["bars"] = [
+        (*key, np.array([by_time[bar_time] for bar_time in sorted(by_time)],
+                        dtype="float64").reshape(-1, len(COLUMNS)))
+        for key, by_time in merged.items()
+    ]
+    return result
+
+
+def _write(result: Dict[str, Any], output_path: str,
+           output_format: str) -> int:
+    """Writes the decoded bars and returns their number."""
+    total = 0
+    for exchange, ticker_sym, frame, values in result["bars"]:
+        total += len(values)
+        if output_format == "store":
+            BarStore(store_path(output_path, exchange, ticker_sym,
+                                frame)).append(values)
+            continue
+        df = pd.DataFrame(values, columns=list(COLUMNS))
+        df["DateTime"] = pd.to_datetime(df["DateTime"], unit="s", utc=True)
+        write_data(df,
+                   os.path.join(output_path, f"exchange={exchange}",
+                                f"ticker_sym={ticker_sym}",
+                                f"frame={frame}"),
+                   _file_stem(result["path"]),
+                   "parquet")
+    return total
+
+
+def _finish(future: "Future[Dict[str, Any]]", path: str, output_path: str,
+            output_format: str) -> Dict[str, Any]:
+    """Writes the bars of the decoded file and the state line.
+
+    Returns:
+        summary: The path, the status, the number of collections and
+            bars of the file.
+    """
+    summary: Dict[str, Any] = {"path": path, "status": "failed",
+                               "collections": 0, "bars": 0}
+    try:
+        result = future.result()
+        summary["collections"] = result["collections"]
+        if result["status"] == "skipped":
+            summary["status"] = "skipped"
+            return summary
+        summary["bars"] = _write(result, output_path, output_format)
+        summary["status"] = "done"
+    # A broken file must not stop the others.
+    except (SystemExit, Exception) as e:  # pylint: disable=broad-except
+        logger.error(f"The file {path} cannot be converted: {e}")
+        return summary
+    with open(os.path.join(output_path, CONVERT_STATE), "a",
+              encoding="utf-8") as file:
+        file.write(json.dumps({"path": os.path.abspath(path),
+                               "signature": result["signature"]}) + "\n")
+    return summary
+
+
+def run_convert(input_path: str,
+                output_path: str,
+                output_format: str = "store",
+                *,
+                workers: Optional[int] = None,
+                check: str = "mtime",
+                force: bool = False) -> pd.DataFrame:
+    """Converts the files in a pool of processes.
+
+    Args:
+        input_path: The folder of the files (or one file).
+        output_path: The folder of the stores or the Parquet files.
+        output_format: "store" or "parquet".
+        workers: The number of processes (the number of CPUs by
+            default).
+        check: The signature of the up-to-date files: "mtime" or
+            "hash".
+        force: Converts the up-to-date files too.
+
+    Returns:
+        summary: DataFrame with the path, the status ("done",
+            "skipped" or "failed"), the number of collections and bars
+            and the seconds of every file.
+    """
+    paths = find_inputs(input_path)
+    os.makedirs(output_path, exist_ok=True)
+    known = {} if force else _read_state(
+        os.path.join(output_path, CONVERT_STATE)
+    )
+    results: List[Dict[str, Any]] = []
+    start = time.monotonic()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(decode_file, path, check,
+                                   known.get(os.path.abspath(path))): path
+                   for path in paths}
+        for done, future in enumerate(as_completed(futures), 1):
+            results.append(_finish(future, futures[future], output_path,
+                                   output_format))
+            results[-1]["seconds"] = time.monotonic() - start
+            logger.info(f"[{done}/{len(paths)}] {results[-1]['path']}: "
+                        f"{results[-1]['status']}, {results[-1]['bars']} "
+                        f"bars of {results[-1]['collections']} collections.")
+    summary = pd.DataFrame(results)
+    if not summary.empty:
+        logger.info(f"The conversion was finished: "
+                    f"{summary['status'].value_counts().to_dict()}")
+    return summary
+
+
+def convert_main(args: argparse.Namespace) -> pd.DataFrame:
+    """The entry point of the "fia convert" command.
+
+    Args:
+        args: The arguments parsed by fia.cli_args.parse_convert_args.
+
+    Returns:
+        summary: The summary of the files (see run_convert).
+    """
+    return run_convert(args.INPUT,
+                       args.OUTPUT,
+                       output_format=args.FORMAT,
+                       workers=args.WORKERS,
+                       check=args.CHECK,
+                       force=args.FORCE)
@@ -0,0 +1,244 @@
+# Copyright 2022 Aleksey Ustinov.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied. See the License for the specific language governing
+# permissions and limitations under the License.
+"""This module calculates the rolling covariance and correlation.
+
+The input is a panel of aligned bars: a 2-D array (or DataFrame) with
+one row per DateTime and one column per series (the volume of BTC on
+CME, COINBASE, BINANCE, etc.). The panel must not include NaN, for
+example, it can be joined with how="inner".
+
+The covariance of a window is calculated from the windowed sums of
+the values and of their cross products:
+    cov = (sum(x * x^T) - sum(x) * sum(x)^T / n) / (n - ddof)
+
+The values are shifted by the first row before summation to reduce the
+rounding errors. The shift does not change the covariance.
+
+Classes:
+    - RollingCovariance: Updates the windowed sums with every new row
+      in O(k^2), where k is the number of series.
+
+Functions:
+    - rolling_cov: Calculates the rolling covariance matrices of the
+      whole panel by blocked NumPy operations.
+    - rolling_corr: Calculates the rolling correlation matrices of the
+      whole panel by blocked NumPy operations.
+    - cov_to_corr: Converts the covariance matrices to the correlation
+      matrices.
+"""
+# Import the standard libraries.
+import logging
+from typing import Optional, Union
+
+# Import the third party libraries.
+import numpy as np
+import pandas as pd
+
+
+# Set the module logger.
+logger = logging.getLogger(__name__)
+
+
+def _check_values(values: np.ndarray) -> None:
+    """Checks that the values do not include NaN."""
+    if np.isnan(values).any():
+        logger.error("The panel includes NaN. Align the series without "
+                     "gaps (for example, how=\"inner\").",
+                     stack_info=True)
+        raise SystemExit("The panel includes NaN. Align the series without "
+                         "gaps (for example, how=\"inner\").")
+
+
+def _check_window(window: int, ddof: int) -> None:
+    """Checks that the window is larger than ddof."""
+    if not isinstance(window, int) or window <= ddof:
+        logger.error("Check your window value. It has to be an integer "
+                     "larger than ddof.",
+                     stack_info=True)
+        raise SystemExit("Check your window value. It has to be an integer "
+                         "larger than ddof.")
+
+
+def cov_to_corr(cov: np.ndarray) -> np.ndarray:
+    """Converts the covariance matrices to the correlation matrices.
+
+    Args:
+        cov: A covariance matrix (k, k) or matrices (m, k, k).
+
+    Returns:
+        corr: The correlation matrices of the same shape. The series
+            with zero variance have NaN correlation.
+    """
+    std = np.sqrt(np.diagonal(cov, axis1=-2, axis2=-1))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        corr = cov / (std[..., :, None] * std[..., None, :])
+    return np.clip(corr, -1.0, 1.0)
+
+
+class RollingCovariance:
+    """Updates the rolling covariance with every new row in O(k^2).
+
+    Attributes:
+        n_series: The number of series (k).
+        window: The number of rows in the window.
+        ddof: Delta degrees of freedom (1 - sample covariance).
+
+    Methods:
+        update(row): Adds a row of the panel.
+        cov(): Gets the covariance matrix of the current window.
+        corr(): Gets the correlation matrix of the current window.
+        ready: Checks that the window is full.
+    """
+    def __init__(self, n_series: int, window: int, ddof: int = 1) -> None:
+        """Class constructor.
+        See attributes in the class level docstring.
+        """
+        _check_window(window, ddof)
+        self.n_series = n_series
+        self.window = window
+        self.ddof = ddof
+        # The ring buffer of the shifted rows of the window.
+        self._rows = np.zeros((window, n_series))
+        self._pos = 0
+        self._count = 0
+        self._shift: Optional[np.ndarray] = None
+        self._sum = np.zeros(n_series)
+        self._cross = np.zeros((n_series, n_series))
+
+    @property
+    def ready(self) -> bool:
+        """Checks that the window is full."""
+        return self._count >= self.window
+
+    def update(self, row: np.ndarray) -> None:
+        """Adds a row of the panel.
+
+        Args:
+            row: The values of all series for one DateTime.
+        """
+        values = np.asarray(row, dtype="float64")
+        _check_values(values)
+        if self._shift is None:
+            self._shift = values.copy()
+        values = values - self._shift
+        if self._count >= self.window:
+            old = self._rows[self._pos]
+            self._sum -= old
+            self._cross -= np.outer(old, old)
+        self._rows[self._pos] = values
+        self._sum += values
+        self._cross += np.outer(values, values)
+        self._pos = (self._pos + 1) % self.window
+        self._count += 1
+
+    def cov(self) -> np.ndarray:
+        """Gets the covariance matrix of the current window.
+
+        Returns:
+            cov: The covariance matrix (k, k) or NaN matrix if the
+                window is not full.
+        """
+        if not self.ready:
+            return np.full((self.n_series, self.n_series), np.nan)
+        return ((self._cross - np.outer(self._sum, self._sum) / self.window)
+                / (self.window - self.ddof))
+
+    def corr(self) -> np.ndarray:
+        """Gets the correlation matrix of the current window.
+
+        Returns:
+            corr: The correlation matrix (k, k) or NaN matrix if the
+                window is not full.
+        """
+        return cov_to_corr(self.cov())
+
+
+def _prefix_cross(values: np.ndarray, idx: np.ndarray,
+                  block: int) -> np.ndarray:
+    """Gets the sums of cross products of the rows up to every index.
+
+    The rows are processed by blocks, so the memory is bounded by
+    block * k^2 values.
+    """
+    k = values.shape[1]
+    result = np.empty((len(idx), k, k))
+    carry = np.zeros((k, k))
+    pos = 0
+    for start in range(0, len(values), block):
+        chunk = values[start:start + block]
+        end = start + len(chunk)
+        stop = pos + int(np.searchsorted(idx[pos:], end))
+        if stop > pos:
+            cumsum = np.cumsum(chunk[:, :, None] * chunk[:, None, :], axis=0)
+            result[pos:stop] = carry + cumsum[idx[pos:stop] - start]
+            carry = carry + cumsum[-1]
+        else:
+            carry = carry + chunk.T @ chunk
+        pos = stop
+    return result
+
+
+def rolling_cov(panel: Union[np.ndarray, pd.DataFrame],
+                window: int,
+                step: int = 1,
+                ddof: int = 1,
+                block: int = 256) -> np.ndarray:
+    """Calculates the rolling covariance matrices of the whole panel.
+
+    Args:
+        panel: The aligned values (n, k) without NaN.
+        window: The number of rows in the window.
+        step: Calculate the matrix for every step-th window.
+        ddof: Delta degrees of freedom (1 - sample covariance).
+        block: The number of rows processed at once.
+
+    Returns:
+        cov: The covariance matrices (m, k, k) for the windows that end
+            at the rows window - 1, window - 1 + step, etc.
+    """
+    _check_window(window, ddof)
+    values = np.asarray(panel, dtype="float64")
+    _check_values(values)
+    if len(values) < window:
+        return np.empty((0, values.shape[1], values.shape[1]))
+    values = values - values[0]
+    ends = np.arange(window - 1, len(values), step)
+    starts = ends - window
+    prefix = np.cumsum(values, axis=0)
+    sums = prefix[ends] - np.where(starts[:, None] >= 0,
+                                   prefix[np.maximum(starts, 0)], 0.0)
+    cross = _prefix_cross(values, ends, block)
+    has_start = starts >= 0
+    cross[has_start] -= _prefix_cross(values, starts[has_start], block)
+    return ((cross - sums[:, :, None] * sums[:, None, :] / window)
+            / (window - ddof))
+
+
+def rolling_corr(panel: Union[np.ndarray, pd.DataFrame],
+                 window: int,
+                 step: int = 1,
+                 block: int = 256) -> np.ndarray:
+    """Calculates the rolling correlation matrices of the whole panel.
+
+    Args:
+        panel: The aligned values (n, k) without NaN.
+        window: The number of rows in the window.
+        step: Calculate the matrix for every step-th window.
+        block: The number of rows processed at once.
+
+    Returns:
+        corr: The correlation matrices (m, k, k) for the windows that
+            end at the rows window - 1, window - 1 + step, etc.
+    """
+    return cov_to_corr(rolling_cov(panel, window, step, 1, block))
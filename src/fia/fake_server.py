@@ -0,0 +1,466 @@
+# Copyright 2022 Aleksey Ustinov.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied. See the License for the specific language governing
+# permissions and limitations under the License.
+"""This module serves a local stand-in for TradingView.
+
+The server answers on one port:
+    - POST /accounts/signin/: The sign in request. Any username and
+      password are accepted, the authorization token is returned.
+    - GET /socket.io/websocket: The Websocket connection that speaks
+      the ~m~{n}~m~ protocol of TradingView.
+
+The Websocket connection sends the session message first and then
+answers the messages of the client:
+    - resolve_symbol: symbol_resolved with the 24x7 session in UTC
+      (symbol_error if the symbol is in invalid).
+    - set_auth_token: critical_error if the token is revoked.
+    - create_series: timescale_update with the last bars (or the bars
+      before the time of ["bar_count", frame, count, to]) and
+      series_completed, then the du and heartbeat tail (series_error
+      if the symbol or the timeframe is invalid).
+    - request_more_data: timescale_update with the older bars and
+      series_completed.
+    - chart_delete_session: The connection is kept for the next
+      series.
+The connection is closed if the client sends nothing for linger
+seconds after the series was completed (as TradingView closes the
+connection of get_data).
+
+The bars of every symbol and timeframe are the deterministic random
+walk of fia.testing. A recorded raw data (for example, the file saved
+by get_data) can be replayed instead: all its frames are sent in
+response to resolve_symbol.
+
+The network conditions are configurable: the latency of every
+response, the bandwidth and the probability of the disconnection in
+the middle of the series (only a half of the bars is sent).
+
+Usage:
+    with FakeTvServer(latency=0.01, disconnect=0.1) as server:
+        TvDataCollector.sign_in_url = server.sign_in_url
+        TvDataCollector.ws_url = server.ws_url
+        raw_data = tvdc.get_data()
+
+Classes:
+    - FakeTvServer: The stand-in TradingView server.
+"""
+# Import the standard libraries.
+import base64
+import hashlib
+import io
+import json
+import logging
+import random
+import socket
+import struct
+import threading
+import time
+import zlib
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Set, Tuple, Union
+from urllib.parse import parse_qs
+
+# Import the local/project packages and modules.
+from fia.constants import (FAKE_BARS, FAKE_LINGER, FAKE_TIMEOUT,
+                           FRAME_SECONDS, HTTP_HOST, MONTH_SECONDS, Frame)
+from fia.messages import split_messages
+from fia.testing import (frame_message, series_data, symbol_info,
+                         synthetic_bars, tail_frames)
+
+
+# Set the module logger.
+logger = logging.getLogger(__name__)
+
+# The GUID of the Websocket handshake (RFC 6455).
+_WS_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+# The Websocket opcodes.
+_TEXT, _CLOSE, _PING, _PONG = 0x1, 0x8, 0x9, 0xA
+
+
+def _encode_frame(opcode: int, payload: bytes) -> bytes:
+    """Encodes the unmasked server frame."""
+    length = len(payload)
+    if length < 126:
+        header = struct.pack("!BB", 0x80 | opcode, length)
+    elif length < 2**16:
+        header = struct.pack("!BBH", 0x80 | opcode, 126, length)
+    else:
+        header = struct.pack("!BBQ", 0x80 | opcode, 127, length)
+    return header + payload
+
+
+def _read_frame(rfile: io.BufferedIOBase) -> Tuple[int, bytes]:
+    """Reads and unmasks the client frame.
+
+    Returns:
+        opcode: The opcode (_CLOSE if the connection is closed).
+        payload: The unmasked payload.
+    """
+    header = rfile.read(2)
+    if len(header) < 2:
+        return _CLOSE, b""
+    opcode = header[0] & 0x0F
+    length = header[1] & 0x7F
+    if length == 126:
+        length = struct.unpack("!H", rfile.read(2))[0]
+    elif length == 127:
+        length = struct.unpack("!Q", rfile.read(8))[0]
+    mask = rfile.read(4) if header[1] & 0x80 else b"\0\0\0\0"
+    payload = rfile.read(length)
+    return opcode, bytes(byte ^ mask[i % 4] for i, byte in enumerate(payload))
+
+
+# pylint: disable-next=too-many-instance-attributes
+class FakeTvServer(ThreadingHTTPServer):
+    """The stand-in TradingView server.
+
+    Attributes:
+        bars: The number of bars of every symbol and timeframe.
+        latency: The delay in seconds before every response.
+        bandwidth: The bandwidth in bytes per second (0 - unlimited).
+        du_tail: The number of du messages after series_completed.
+        heartbeats: The number of heartbeats mixed into the tail.
+        disconnect: The probability that the connection is closed
+            after a half of the bars of create_series.
+        linger: The delay in seconds before the idle connection is
+            closed after the series was completed.
+        recording: The recorded raw data that is replayed instead of
+            the synthetic bars (None - the synthetic bars).
+        connections: The number of the Websocket connections.
+        invalid: The symbols answered with symbol_error ("NASDAQ:NOPE").
+        revoked: The authorization tokens answered with critical_error.
+        sign_ins: The number of the sign in requests.
+
+    Methods:
+        start(): Serves in a daemon thread.
+        stop(): Stops the server.
+        history(symbol, frame): Gets the bars of the symbol.
+        issue_token(username): Issues a new authorization token.
+    """
+    daemon_threads = True
+
+    def __init__(self,
+                 address: Tuple[str, int] = (HTTP_HOST, 0),
+                 *,
+                 bars: int = FAKE_BARS,
+                 latency: float = 0.0,
+                 bandwidth: float = 0.0,
+                 du_tail: int = 0,
+                 heartbeats: int = 0,
+                 disconnect: float = 0.0,
+                 linger: float = FAKE_LINGER,
+                 recording: Optional[str] = None,
+                 seed: int = 0) -> None:
+        """Class constructor.
+        See attributes in the class level docstring.
+
+        Args:
+            address: The host and the port (0 - any free port).
+            seed: The seed of the disconnections.
+        """
+        super().__init__(address, _Handler)
+        self.bars = bars
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self.du_tail = du_tail
+        self.heartbeats = heartbeats
+        self.disconnect = disconnect
+        self.linger = linger
+        self.recording = recording
+        self.connections = 0
+        self.invalid: Set[str] = set()
+        self.revoked: Set[str] = set()
+        self.sign_ins = 0
+        self._rng = random.Random(seed)
+        self._history: Dict[Tuple[str, str], List[List[float]]] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def sign_in_url(self) -> str:
+        """The sign in url (TvDataCollector.sign_in_url)."""
+        host, port = self.server_address[:2]
+        return f"http://{host!s}:{port}/accounts/signin/"
+
+    @property
+    def ws_url(self) -> str:
+        """The Websocket url (TvDataCollector.ws_url)."""
+        host, port = self.server_address[:2]
+        return f"ws://{host!s}:{port}/socket.io/websocket"
+
+    def start(self) -> "FakeTvServer":
+        """Serves in a daemon thread."""
+        # The short poll interval makes stop() fast in the tests.
+        threading.Thread(target=self.serve_forever, args=(0.05,),
+                         name="fia-fake-server", daemon=True).start()
+        logger.info(f"The stand-in server is serving {self.ws_url}.")
+        return self
+
+    def stop(self) -> None:
+        """Stops the server."""
+        self.shutdown()
+        self.server_close()
+
+    def __enter__(self) -> "FakeTvServer":
+        return self.start()
+
+    def __exit__(self, *args: Any) -> None:
+        self.stop()
+
+    def history(self, symbol: str, frame: Frame) -> List[List[float]]:
+        """Gets the bars of the symbol (the same for every call).
+
+        Args:
+            symbol: The symbol ("NASDAQ:AAPL").
+            frame: The timeframe of the bars.
+
+        Returns:
+            bars: The bars from the oldest to the newest.
+        """
+        key = (symbol, frame.value)
+        with self._lock:
+            if key not in self._history:
+                self._history[key] = synthetic_bars(
+                    self.bars, frame, seed=zlib.crc32(symbol.encode())
+                )
+            return self._history[key]
+
+    def drops(self) -> bool:
+        """Decides if the next series is disconnected."""
+        with self._lock:
+            return self._rng.random() < self.disconnect
+
+    def issue_token(self, username: str) -> str:
+        """Issues a new authorization token for every sign in."""
+        with self._lock:
+            self.sign_ins += 1
+            return f"fake_{username}_{int(time.time())}_{self.sign_ins}"
+
+    def count_connection(self) -> None:
+        """Counts the Websocket connection."""
+        with self._lock:
+            self.connections += 1
+
+
+class _Connection:
+    """The Websocket connection of one client."""
+    def __init__(self, server: FakeTvServer, handler: "_Handler") -> None:
+        self.server = server
+        self.handler = handler
+        self.symbol = ""
+        self.frame = Frame.DAY
+        # The index of the earliest sent bar of the series.
+        self.first = 0
+        # False - the connection is closed.
+        self.open = True
+
+    def send(self, frames: List[str]) -> None:
+        """Sends the text frames within the bandwidth."""
+        for frame in frames:
+            data = frame.encode()
+            if self.server.bandwidth > 0:
+                time.sleep(len(data) / self.server.bandwidth)
+            self.handler.wfile.write(_encode_frame(_TEXT, data))
+        self.handler.wfile.flush()
+
+    def receive(self, timeout: float) -> Optional[str]:
+        """Receives the text frame (None - the connection is closed)."""
+        self.handler.connection.settimeout(timeout)
+        while True:
+            try:
+                opcode, payload = _read_frame(self.handler.rfile)
+            except (OSError, struct.error):
+                return None
+            if opcode == _PING:
+                self.handler.wfile.write(_encode_frame(_PONG, payload))
+                self.handler.wfile.flush()
+            elif opcode == _CLOSE:
+                return None
+            elif opcode == _TEXT:
+                return payload.decode()
+
+    def run(self) -> None:
+        """Answers the messages until the connection is closed."""
+        self.send([frame_message({"session_id": "<0.1.0>_fake",
+                                  "timestamp": int(time.time()),
+                                  "protocol": "json",
+                                  "auth_scheme_vsn": 2})])
+        timeout = FAKE_TIMEOUT
+        while self.open:
+            text = self.receive(timeout)
+            if text is None:
+                break
+            timeout = FAKE_TIMEOUT
+            for message in split_messages(text):
+                if message.startswith("~h~"):
+                    continue
+                if self.answer(json.loads(message)):
+                    timeout = self.server.linger
+        if self.open:
+            # The idle timeout or the client closed the connection.
+            try:
+                self.handler.wfile.write(_encode_frame(_CLOSE, b""))
+                self.handler.wfile.flush()
+            except OSError:
+                pass
+
+    def answer(self, message: Dict[str, Any]) -> bool:
+        """Answers one message.
+
+        Returns:
+            completed: True if the series was completed.
+        """
+        m, p = message.get("m"), message.get("p", [])
+        if m == "set_auth_token" and p[0] in self.server.revoked:
+            self.send([frame_message({"m": "critical_error", "p": [
+                "set_auth_token", "invalid token"
+            ]})])
+        elif m == "resolve_symbol":
+            self.symbol = json.loads(p[2].lstrip("="))["symbol"]
+            time.sleep(self.server.latency)
+            if self.symbol in self.server.invalid:
+                self.send([frame_message({"m": "symbol_error", "p": [
+                    p[0], p[1], "invalid symbol"
+                ]})])
+            elif self.server.recording is not None:
+                self.send([f"~m~{len(part)}~m~{part}" for part
+                           in split_messages(self.server.recording)
+                           if '"session_id"' not in part])
+            else:
+                self.send([frame_message({"m": "symbol_resolved", "p": [
+                    p[0], p[1], symbol_info(self.symbol)
+                ]})])
+        elif m == "create_series":
+            if self.server.recording is None:
+                self.create_series(p[0], p[4], p[5])
+            return True
+        elif m == "request_more_data":
+            time.sleep(self.server.latency)
+            bars = self.server.history(self.symbol, self.frame)
+            first = max(0, self.first - int(p[2]))
+            self.send_series(p[0], bars, first, self.first)
+            self.first = first
+            return True
+        return False
+
+    def create_series(self, cs_token: str, frame: str,
+                      series: Union[int, List[Any]]) -> None:
+        """Sends the bars of create_series and the tail."""
+        time.sleep(self.server.latency)
+        try:
+            if self.symbol in self.server.invalid:
+                raise ValueError(f"The symbol {self.symbol} is invalid.")
+            self.frame = Frame(frame)
+        except ValueError:
+            self.send([frame_message({"m": "series_error", "p": [
+                cs_token, "sds_1", "s1", "invalid parameters"
+            ]})])
+            return
+        bars = self.server.history(self.symbol, self.frame)
+        if isinstance(series, list):
+            # ["bar_count", frame, count, to]
+            end = sum(1 for bar in bars if bar[0] < series[3])
+            count = int(series[2])
+        else:
+            end, count = len(bars), series
+        self.first = max(0, end - count)
+        if self.server.drops():
+            # Send the newer half of the bars and drop the connection.
+            self.send([frame_message({"m": "timescale_update", "p": [
+                cs_token, {"sds_1": series_data(
+                    bars[(self.first + end) // 2:end],
+                    (self.first + end) // 2, 0
+                )}
+            ]})])
+            self.handler.connection.shutdown(socket.SHUT_RDWR)
+            self.open = False
+            return
+        self.send_series(cs_token, bars, self.first, end)
+        if self.server.du_tail or self.server.heartbeats:
+            sent = [list(bar) for bar in bars[self.first:end]]
+            self.send(tail_frames([sent], self.server.du_tail,
+                                  self.server.heartbeats,
+                                  self._close_time(bars, end)))
+
+    def send_series(self, cs_token: str, bars: List[List[float]],
+                    first: int, end: int) -> None:
+        """Sends timescale_update of the bars and series_completed."""
+        self.send([
+            frame_message({"m": "timescale_update", "p": [
+                cs_token, {"sds_1": series_data(
+                    bars[first:end], first, self._close_time(bars, end)
+                )}
+            ]}),
+            frame_message({"m": "series_completed", "p": [
+                cs_token, "sds_1", "streaming", "s1"
+            ]}),
+        ])
+
+    def _close_time(self, bars: List[List[float]], end: int) -> float:
+        """Gets the close time of the last sent bar."""
+        if not end:
+            return 0.0
+        return bars[end - 1][0] + FRAME_SECONDS.get(self.frame, MONTH_SECONDS)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """Handles the sign in and the Websocket requests."""
+    server: FakeTvServer
+
+    # pylint: disable-next=invalid-name
+    def do_POST(self) -> None:
+        """Answers the sign in request."""
+        if not self.path.startswith("/accounts/signin"):
+            self.send_error(HTTPStatus.NOT_FOUND)
+            return
+        length = int(self.headers.get("Content-Length", 0))
+        form = parse_qs(self.rfile.read(length).decode())
+        username = form.get("username", ["user"])[0]
+        time.sleep(self.server.latency)
+        body = json.dumps({"user": {
+            "username": username,
+            "auth_token": self.server.issue_token(username)
+        }}).encode()
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    # pylint: disable-next=invalid-name
+    def do_GET(self) -> None:
+        """Upgrades the connection to Websocket and serves it."""
+        key = self.headers.get("Sec-WebSocket-Key")
+        if (not self.path.startswith("/socket.io/websocket")
+                or key is None
+                or self.headers.get("Upgrade", "").lower() != "websocket"):
+            self.send_error(HTTPStatus.NOT_FOUND)
+            return
+        time.sleep(self.server.latency)
+        accept = base64.b64encode(
+            hashlib.sha1((key + _WS_GUID).encode()).digest()
+        ).decode()
+        self.send_response(HTTPStatus.SWITCHING_PROTOCOLS)
+        self.send_header("Upgrade", "websocket")
+        self.send_header("Connection", "Upgrade")
+        self.send_header("Sec-WebSocket-Accept", accept)
+        self.end_headers()
+        self.wfile.flush()
+        self.server.count_connection()
+        _Connection(self.server, self).run()
+        self.close_connection = True
+
+    def log_message(self, format: str,  # pylint: disable=redefined-builtin
+                    *args: Any) -> None:
+        """Logs the requests to the module logger."""
+        logger.debug(f"{self.address_string()} {format % args}")
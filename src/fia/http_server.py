@@ -0,0 +1,338 @@
+# Copyright 2022 Aleksey Ustinov.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied. See the License for the specific language governing
+# permissions and limitations under the License.
+"""This module serves the stored bars over HTTP.
+
+The bars stored by "fia serve" (or by BarStore) are served by the
+range queries:
+    GET /bars/{exchange}/{ticker_sym}/{frame}?start=&end=&fields=
+
+The query parameters (all are optional):
+    - start, end: The range of the bar open times (ISO 8601 dates or
+      Unix time in seconds). The range includes both ends.
+    - after: The exclusive start of the range. A consumer passes the
+      time of its last bar to get only the new bars.
+    - fields: The comma-separated columns (Open,Close,...). The
+      DateTime column is always included.
+    - format: json, csv or arrow (the Arrow IPC stream requires the
+      pyarrow package). The Accept header is used if format is not
+      set, JSON is used by default.
+
+Every response has the ETag of the store version and the query. If
+one of the ETags of the If-None-Match header is the same (or the
+header is "*"), the response is 304 Not Modified without the body.
+The serialized responses are kept in an LRU cache by the store version
+and the query, so the hot slices are not read and serialized again.
+Any other error of the query is answered with 500 Internal Server
+Error.
+
+Usage:
+    fia http -o ~/fia_output --host 127.0.0.1 --port 8000
+
+Classes:
+    - BarServer: The HTTP server of the stored bars.
+
+Functions:
+    - http_main: The entry point of the "fia http" command.
+"""
+# Import the standard libraries.
+import argparse
+import hashlib
+import io
+import logging
+import os
+import re
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, unquote, urlsplit
+
+# Import the third party libraries.
+import numpy as np
+import pandas as pd
+
+# Import the local/project packages and modules.
+from fia.constants import COLUMNS, HTTP_CACHE_SIZE, Frame
+from fia.store import BarStore, store_path
+from fia.utils.lru_cache import LRUCache
+
+
+# Set the module logger.
+logger = logging.getLogger(__name__)
+
+# The content types of the response formats.
+CONTENT_TYPES: Dict[str, str] = {
+    "json": "application/json",
+    "csv": "text/csv",
+    "arrow": "application/vnd.apache.arrow.stream",
+}
+
+# The ETags of the If-None-Match header: "*", "abc" or W/"abc".
+_ETAGS = re.compile(r'\*|(?:W/)?"[^"]*"')
+
+
+class _QueryError(Exception):
+    """The query cannot be answered."""
+    def __init__(self, status: HTTPStatus, message: str) -> None:
+        super().__init__(message)
+        self.status = status
+
+
+def _parse_time(value: str) -> float:
+    """Parses an ISO 8601 date or Unix time to Unix time in seconds."""
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    try:
+        timestamp = pd.Timestamp(value)
+    except ValueError as e:
+        raise _QueryError(HTTPStatus.BAD_REQUEST,
+                          f"The time {value} cannot be parsed.") from e
+    if timestamp.tzinfo is None:
+        timestamp = timestamp.tz_localize("UTC")
+    return float(timestamp.timestamp())
+
+
+def _etag_matches(etag: str, if_none_match: str) -> bool:
+    """Checks that the If-None-Match header has the ETag.
+
+    The weak comparison is used (W/"abc" matches "abc") as RFC 9110
+    requires for If-None-Match.
+    """
+    tags = _ETAGS.findall(if_none_match)
+    return "*" in tags or etag in (tag.removeprefix("W/") for tag in tags)
+
+
+def _parse_fields(value: Optional[str]) -> List[str]:
+    """Parses the projected columns."""
+    if not value:
+        return list(COLUMNS)
+    fields = [field.strip() for field in value.split(",") if field.strip()]
+    unknown = set(fields) - set(COLUMNS)
+    if unknown:
+        raise _QueryError(HTTPStatus.BAD_REQUEST,
+                          f"Unknown fields {sorted(unknown)}, the fields "
+                          f"have to be from {list(COLUMNS)}.")
+    return ["DateTime"] + [column for column in COLUMNS[1:]
+                           if column in fields]
+
+
+def _choose_format(value: Optional[str], accept: str) -> str:
+    """Chooses the response format by the parameter or Accept."""
+    if value is None:
+        for output_format, content_type in CONTENT_TYPES.items():
+            if content_type in accept:
+                return output_format
+        return "json"
+    if value not in CONTENT_TYPES:
+        raise _QueryError(HTTPStatus.BAD_REQUEST,
+                          f"The format has to be one of "
+                          f"{list(CONTENT_TYPES)}.")
+    return value
+
+
+def _serialize(df: pd.DataFrame, output_format: str) -> bytes:
+    """Serializes the bars in the response format."""
+    if output_format == "csv":
+        return df.to_csv(index=False).encode()
+    if output_format == "json":
+        return df.to_json(orient="records", date_format="iso").encode()
+    try:
+        # pylint: disable-next=import-outside-toplevel
+        import pyarrow as pa  # type: ignore
+    except ImportError as e:
+        raise _QueryError(HTTPStatus.NOT_ACCEPTABLE,
+                          "The Arrow format requires the pyarrow "
+                          "package.") from e
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    sink = io.BytesIO()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue()
+
+
+class BarServer(ThreadingHTTPServer):
+    """The HTTP server of the stored bars.
+
+    Attributes:
+        output_path: The folder of the stores.
+        cache: The LRU cache of the serialized responses.
+
+    Methods:
+        query(path, params, accept, if_none_match): Answers a query.
+    """
+    def __init__(self,
+                 address: Tuple[str, int],
+                 output_path: str,
+                 cache_size: int = HTTP_CACHE_SIZE) -> None:
+        """Class constructor.
+
+        Args:
+            address: The host and the port (0 - any free port).
+            output_path: The folder of the stores.
+            cache_size: The maximal number of the cached responses.
+        """
+        super().__init__(address, _Handler)
+        self.output_path = output_path
+        self.cache = LRUCache(cache_size)
+
+    def query(self, path: str, params: Dict[str, List[str]],
+              accept: str = "",
+              if_none_match: str = "") -> Tuple[str, Optional[bytes], str]:
+        """Answers a query.
+
+        Args:
+            path: The URL path /bars/{exchange}/{ticker_sym}/{frame}.
+            params: The query parameters.
+            accept: The Accept header.
+            if_none_match: The If-None-Match header.
+
+        Returns:
+            etag: The ETag of the response.
+            body: The serialized bars (None if the ETag is in
+                if_none_match, the bars are not read then).
+            content_type: The content type of the body.
+
+        Raises:
+            _QueryError: If the query is wrong or the store is not
+                found.
+        """
+        store = self._open_store(path)
+
+        def param(name: str) -> Optional[str]:
+            return params[name][-1] if name in params else None
+
+        times = {name: _parse_time(value)
+                 for name in ("start", "end", "after")
+                 if (value := param(name)) is not None}
+        fields = _parse_fields(param("fields"))
+        output_format = _choose_format(param("format"), accept)
+        key = (store.path, store.version(), tuple(sorted(times.items())),
+               tuple(fields), output_format)
+        etag = f'"{hashlib.sha1(repr(key).encode()).hexdigest()[:20]}"'
+        if _etag_matches(etag, if_none_match):
+            return etag, None, CONTENT_TYPES[output_format]
+        body = self.cache.get(key)
+        if body is None:
+            body = _serialize(self._slice(store, times)[fields],
+                              output_format)
+            self.cache.put(key, body)
+        return etag, body, CONTENT_TYPES[output_format]
+
+    def _open_store(self, path: str) -> BarStore:
+        """Opens the store of the URL path."""
+        parts = [unquote(part) for part in path.strip("/").split("/")]
+        if len(parts) != 4 or parts[0] != "bars":
+            raise _QueryError(HTTPStatus.NOT_FOUND,
+                              "The path has to be "
+                              "/bars/{exchange}/{ticker_sym}/{frame}.")
+        _, exchange, ticker_sym, frame = parts
+        # The encoded separators must not lead out of the output folder.
+        if any(not part or "/" in part or "\\" in part or ".." in part
+               or os.path.isabs(part) for part in parts):
+            raise _QueryError(HTTPStatus.NOT_FOUND,
+                              "The path includes a wrong part.")
+        if frame not in Frame.__members__:
+            raise _QueryError(HTTPStatus.NOT_FOUND,
+                              f"The frame has to be one of "
+                              f"{list(Frame.__members__)}.")
+        folder = store_path(self.output_path, exchange, ticker_sym, frame)
+        root = os.path.realpath(self.output_path)
+        if (os.path.commonpath([root, os.path.realpath(folder)]) != root
+                or not os.path.isdir(folder)):
+            raise _QueryError(HTTPStatus.NOT_FOUND,
+                              f"There are no bars of {exchange}:"
+                              f"{ticker_sym} {frame}.")
+        return BarStore(folder)
+
+    @staticmethod
+    def _slice(store: BarStore, times: Dict[str, float]) -> pd.DataFrame:
+        """Gets the bars of the range as DataFrame."""
+        values = store.to_numpy()
+        low = int(np.searchsorted(values[:, 0], times.get("start", -np.inf),
+                                  "left"))
+        if "after" in times:
+            low = max(low, int(np.searchsorted(values[:, 0], times["after"],
+                                               "right")))
+        high = int(np.searchsorted(values[:, 0], times.get("end", np.inf),
+                                   "right"))
+        df = pd.DataFrame(values[low:high], columns=list(COLUMNS))
+        df["DateTime"] = pd.to_datetime(df["DateTime"], unit="s", utc=True)
+        return df
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """Handles the GET requests of BarServer."""
+    server: BarServer
+
+    # pylint: disable-next=invalid-name
+    def do_GET(self) -> None:
+        """Answers the GET request."""
+        url = urlsplit(self.path)
+        try:
+            etag, body, content_type = self.server.query(
+                url.path, parse_qs(url.query),
+                self.headers.get("Accept", ""),
+                self.headers.get("If-None-Match", "")
+            )
+        except _QueryError as e:
+            self._send(e.status, str(e).encode(), "text/plain")
+            return
+        # A broken store must not drop the connection of the client.
+        except (SystemExit, Exception) as e:  # pylint: disable=broad-except
+            logger.error(f"The request {self.path} failed: {e}",
+                         exc_info=True)
+            self._send(HTTPStatus.INTERNAL_SERVER_ERROR,
+                       b"The bars cannot be read.", "text/plain")
+            return
+        if body is None:
+            self._send(HTTPStatus.NOT_MODIFIED, b"", content_type, etag)
+            return
+        self._send(HTTPStatus.OK, body, content_type, etag)
+
+    def _send(self, status: HTTPStatus, body: bytes, content_type: str,
+              etag: Optional[str] = None) -> None:
+        """Sends the response."""
+        self.send_response(status)
+        if etag is not None:
+            self.send_header("ETag", etag)
+            # The consumers have to check the ETag before the reuse.
+            self.send_header("Cache-Control", "no-cache")
+        if status != HTTPStatus.NOT_MODIFIED:
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str,  # pylint: disable=redefined-builtin
+                    *args: Any) -> None:
+        """Logs the requests to the module logger."""
+        logger.debug(f"{self.address_string()} {format % args}")
+
+
+def http_main(args: argparse.Namespace) -> None:
+    """The entry point of the "fia http" command.
+
+    Args:
+        args: The arguments parsed by fia.cli_args.parse_http_args.
+    """
+    server = BarServer((args.HOST, args.PORT), args.OUTPUT, args.CACHE)
+    logger.info(f"The bars of {args.OUTPUT} are served on "
+                f"http://{args.HOST}:{server.server_address[1]}/bars/.")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        logger.info("The HTTP server was stopped.")
+    finally:
+        server.server_close()
@@ -0,0 +1,504 @@
+# Copyright 2022 Aleksey Ustinov.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied. See the License for the specific language governing
+# permissions and limitations under the License.
+"""This module calculates the technical indicators.
+
+Every indicator has two implementations:
+    1. A vectorized function for the market data returned by
+       TvDataCollector.get_pandas_data (the historical bars).
+    2. A class that updates the indicator in O(1) for every new bar
+       (the live bars).
+
+Both implementations use the same floating point operations in the
+same order, so the values calculated for the historical bars and the
+values updated bar by bar are equal. For this reason, the moving sums
+are calculated as differences of cumulative sums and the exponential
+moving averages repeat the pandas ewm(adjust=False) recurrence. The
+moving variance sums the deviations from a reference close that is
+moved every _ANCHOR_BARS bars, so the sums do not lose the precision
+on long series at high price levels.
+
+The input values must not include NaN.
+
+Functions:
+    - sma: Simple moving average.
+    - ema: Exponential moving average.
+    - rsi: Relative strength index (Wilder's smoothing).
+    - atr: Average true range (Wilder's smoothing).
+    - vwap: Volume weighted average price.
+    - bollinger: Bollinger bands.
+
+Classes:
+    - SMA, EMA, RSI, ATR, VWAP, Bollinger: The incremental versions of
+      the functions above.
+"""
+# Import the standard libraries.
+import logging
+import math
+from collections import deque
+from typing import Deque, Optional, Tuple
+
+# Import the third party libraries.
+import numpy as np
+import pandas as pd
+
+
+# Set the module logger.
+logger = logging.getLogger(__name__)
+
+# The number of bars after which the cumulative sums of the moving
+# variance are started again from a new reference value.
+_ANCHOR_BARS = 1024
+
+
+def _check_window(window: int) -> None:
+    """Checks that the window is a positive integer."""
+    if not isinstance(window, int) or window <= 0:
+        logger.error("Check your window value. It has to be a positive "
+                     "integer.",
+                     stack_info=True)
+        raise SystemExit("Check your window value. It has to be a positive "
+                         "integer.")
+
+
+def _moving_sum(values: np.ndarray, window: int) -> np.ndarray:
+    """Calculates the moving sum as a difference of cumulative sums."""
+    cumsum = np.cumsum(values)
+    result = np.full(len(values), np.nan)
+    if len(values) >= window:
+        previous = np.concatenate(([0.0], cumsum[:-window]))
+        result[window - 1:] = cumsum[window - 1:] - previous
+    return result
+
+
+def _moving_moments(values: np.ndarray,
+                    window: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Calculates the moving mean and the population variance.
+
+    The values are processed in blocks of _ANCHOR_BARS bars. The
+    cumulative sums of every block start window - 1 bars before the
+    block and sum the deviations from the first value of the block
+    segment, as _MovingMoments does.
+    """
+    mean = np.full(len(values), np.nan)
+    variance = np.full(len(values), np.nan)
+    for block in range(0, len(values), _ANCHOR_BARS):
+        first = max(0, block - window + 1)
+        segment = values[first:block + _ANCHOR_BARS]
+        deviations = segment - segment[0]
+        sums = np.concatenate(([0.0], np.cumsum(deviations)))
+        sums_sq = np.concatenate(([0.0], np.cumsum(deviations * deviations)))
+        # The bars of the block with the full window.
+        start = max(block, window - 1)
+        if start >= first + len(segment):
+            continue
+        ends = np.arange(start, first + len(segment)) - first + 1
+        moving_mean = (sums[ends] - sums[ends - window]) / window
+        moving_sq = (sums_sq[ends] - sums_sq[ends - window]) / window
+        mean[start:first + len(segment)] = moving_mean + segment[0]
+        variance[start:first + len(segment)] = (moving_sq
+                                                - moving_mean * moving_mean)
+    return mean, variance
+
+
+def _ewm_alpha(com: float) -> float:
+    """Calculates alpha from the center of mass as pandas does."""
+    return 1.0 / (1.0 + com)
+
+
+def _ewm(values: pd.Series, com: float, min_periods: int) -> pd.Series:
+    """Calculates the exponential moving average (adjust=False)."""
+    return values.ewm(com=com, adjust=False, min_periods=min_periods).mean()
+
+
+def sma(close: pd.Series, window: int) -> pd.Series:
+    """Simple moving average.
+
+    Args:
+        close: The close prices (or any other values).
+        window: The number of bars.
+
+    Returns:
+        sma: The simple moving average. The first window - 1 values are
+            NaN.
+    """
+    _check_window(window)
+    values = close.to_numpy(dtype="float64")
+    return pd.Series(_moving_sum(values, window) / window,
+                     index=close.index, name="SMA")
+
+
+def ema(close: pd.Series, window: int) -> pd.Series:
+    """Exponential moving average.
+
+    The smoothing factor is 2 / (window + 1). The first value is equal
+    to the first close price.
+
+    Args:
+        close: The close prices (or any other values).
+        window: The number of bars (span).
+
+    Returns:
+        ema: The exponential moving average.
+    """
+    _check_window(window)
+    result = _ewm(close.astype("float64"), (window - 1) / 2.0, 0)
+    return result.rename("EMA")
+
+
+def rsi(close: pd.Series, window: int = 14) -> pd.Series:
+    """Relative strength index (Wilder's smoothing).
+
+    Args:
+        close: The close prices.
+        window: The number of bars.
+
+    Returns:
+        rsi: The relative strength index from 0 to 100. The first
+            window values are NaN.
+    """
+    _check_window(window)
+    delta = close.astype("float64").diff()
+    com = (1.0 - 1.0 / window) * window
+    gain = _ewm(delta.clip(lower=0.0), com, window)
+    loss = _ewm(-delta.clip(upper=0.0), com, window)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        result = 100.0 - 100.0 / (1.0 + gain / loss)
+    return result.rename("RSI")
+
+
+def atr(df: pd.DataFrame, window: int = 14) -> pd.Series:
+    """Average true range (Wilder's smoothing).
+
+    Args:
+        df: The market data with High, Low and Close columns.
+        window: The number of bars.
+
+    Returns:
+        atr: The average true range. The first window - 1 values are
+            NaN.
+    """
+    _check_window(window)
+    high = df["High"].to_numpy(dtype="float64")
+    low = df["Low"].to_numpy(dtype="float64")
+    prev_close = df["Close"].shift(1).to_numpy(dtype="float64")
+    true_range = np.fmax(
+        high - low,
+        np.fmax(np.abs(high - prev_close), np.abs(low - prev_close))
+    )
+    com = (1.0 - 1.0 / window) * window
+    result = _ewm(pd.Series(true_range, index=df.index), com, window)
+    return result.rename("ATR")
+
+
+def vwap(df: pd.DataFrame) -> pd.Series:
+    """Volume weighted average price.
+
+    The typical price (High + Low + Close) / 3 is weighted by Volume
+    from the first bar of the data.
+
+    Args:
+        df: The market data with High, Low, Close and Volume columns.
+
+    Returns:
+        vwap: The volume weighted average price.
+    """
+    high = df["High"].to_numpy(dtype="float64")
+    low = df["Low"].to_numpy(dtype="float64")
+    close = df["Close"].to_numpy(dtype="float64")
+    volume = df["Volume"].to_numpy(dtype="float64")
+    typical = (high + low + close) / 3.0
+    with np.errstate(divide="ignore", invalid="ignore"):
+        result = np.cumsum(typical * volume) / np.cumsum(volume)
+    return pd.Series(result, index=df.index, name="VWAP")
+
+
+def bollinger(close: pd.Series,
+              window: int = 20,
+              num_std: float = 2.0) -> pd.DataFrame:
+    """Bollinger bands.
+
+    The middle band is the simple moving average. The upper and lower
+    bands are shifted by num_std population standard deviations.
+
+    Args:
+        close: The close prices.
+        window: The number of bars.
+        num_std: The number of standard deviations.
+
+    Returns:
+        bands: DataFrame with Middle, Upper and Lower columns. The first
+            window - 1 rows are NaN.
+    """
+    _check_window(window)
+    values = close.to_numpy(dtype="float64")
+    middle, variance = _moving_moments(values, window)
+    std = np.sqrt(np.maximum(variance, 0.0))
+    return pd.DataFrame({"Middle": middle,
+                         "Upper": middle + num_std * std,
+                         "Lower": middle - num_std * std},
+                        index=close.index)
+
+
+class _MovingSum:
+    """The moving sum as a difference of cumulative sums."""
+    __slots__ = ("window", "cumsum", "history")
+
+    def __init__(self, window: int) -> None:
+        self.window = window
+        self.cumsum = 0.0
+        # The cumulative sums before every bar of the window.
+        self.history: Deque[float] = deque(maxlen=window)
+
+    def update(self, value: float) -> float:
+        """Adds a value and returns the moving sum or NaN."""
+        self.history.append(self.cumsum)
+        self.cumsum += value
+        if len(self.history) < self.window:
+            return math.nan
+        return self.cumsum - self.history[0]
+
+
+class _MovingMoments:
+    """The moving mean and variance as _moving_moments."""
+    __slots__ = ("window", "count", "reference", "values", "sums",
+                 "sums_sq", "cumsum", "cumsum_sq")
+
+    def __init__(self, window: int) -> None:
+        self.window = window
+        self.count = 0
+        self.reference = 0.0
+        # The last window - 1 values and the cumulative sums before
+        # every bar of the window.
+        self.values: Deque[float] = deque(maxlen=max(window - 1, 1))
+        self.sums: Deque[float] = deque(maxlen=window)
+        self.sums_sq: Deque[float] = deque(maxlen=window)
+        self.cumsum = 0.0
+        self.cumsum_sq = 0.0
+
+    def _add(self, value: float) -> None:
+        """Adds the deviation of the value to the cumulative sums."""
+        self.sums.append(self.cumsum)
+        self.sums_sq.append(self.cumsum_sq)
+        deviation = value - self.reference
+        self.cumsum += deviation
+        self.cumsum_sq += deviation * deviation
+
+    def update(self, value: float) -> Tuple[float, float]:
+        """Adds a value and returns the mean and variance (or NaN)."""
+        if self.count % _ANCHOR_BARS == 0:
+            # Start the sums of the new block from the previous
+            # window - 1 values.
+            segment = list(self.values) if self.window > 1 else []
+            segment.append(value)
+            self.reference = segment[0]
+            self.sums.clear()
+            self.sums_sq.clear()
+            self.cumsum = self.cumsum_sq = 0.0
+            for item in segment:
+                self._add(item)
+        else:
+            self._add(value)
+        self.values.append(value)
+        self.count += 1
+        if self.count < self.window:
+            return math.nan, math.nan
+        mean = (self.cumsum - self.sums[0]) / self.window
+        mean_sq = (self.cumsum_sq - self.sums_sq[0]) / self.window
+        return mean + self.reference, mean_sq - mean * mean
+
+
+class _Ewm:
+    """The exponential moving average as pandas ewm(adjust=False)."""
+    __slots__ = ("alpha", "old_wt", "min_periods", "nobs", "weighted")
+
+    def __init__(self, com: float, min_periods: int) -> None:
+        self.alpha = _ewm_alpha(com)
+        self.old_wt = 1.0 - self.alpha
+        self.min_periods = min_periods
+        self.nobs = 0
+        self.weighted = math.nan
+
+    def update(self, value: float) -> float:
+        """Adds a value and returns the average or NaN."""
+        self.nobs += 1
+        if self.nobs == 1:
+            self.weighted = value
+        elif self.weighted != value:
+            self.weighted = (
+                (self.old_wt * self.weighted + self.alpha * value)
+                / (self.old_wt + self.alpha)
+            )
+        if self.nobs < self.min_periods:
+            return math.nan
+        return self.weighted
+
+
+class SMA:
+    """Simple moving average updated bar by bar.
+
+    Attributes:
+        window: The number of bars.
+
+    Methods:
+        update(close): Adds a close price and returns the indicator.
+    """
+    def __init__(self, window: int) -> None:
+        """Class constructor.
+        See attributes in the class level docstring.
+        """
+        _check_window(window)
+        self.window = window
+        self._sum = _MovingSum(window)
+
+    def update(self, close: float) -> float:
+        """Adds a close price and returns the indicator (or NaN)."""
+        return self._sum.update(close) / self.window
+
+
+class EMA:
+    """Exponential moving average updated bar by bar.
+
+    Attributes:
+        window: The number of bars (span).
+
+    Methods:
+        update(close): Adds a close price and returns the indicator.
+    """
+    def __init__(self, window: int) -> None:
+        """Class constructor.
+        See attributes in the class level docstring.
+        """
+        _check_window(window)
+        self.window = window
+        self._ewm = _Ewm((window - 1) / 2.0, 0)
+
+    def update(self, close: float) -> float:
+        """Adds a close price and returns the indicator."""
+        return self._ewm.update(close)
+
+
+class RSI:
+    """Relative strength index updated bar by bar.
+
+    Attributes:
+        window: The number of bars.
+
+    Methods:
+        update(close): Adds a close price and returns the indicator.
+    """
+    def __init__(self, window: int = 14) -> None:
+        """Class constructor.
+        See attributes in the class level docstring.
+        """
+        _check_window(window)
+        self.window = window
+        com = (1.0 - 1.0 / window) * window
+        self._gain = _Ewm(com, window)
+        self._loss = _Ewm(com, window)
+        self._prev_close: Optional[float] = None
+
+    def update(self, close: float) -> float:
+        """Adds a close price and returns the indicator (or NaN)."""
+        prev_close, self._prev_close = self._prev_close, close
+        if prev_close is None:
+            return math.nan
+        delta = close - prev_close
+        gain = self._gain.update(max(delta, 0.0))
+        loss = self._loss.update(-min(delta, 0.0))
+        if loss == 0.0:
+            return 100.0 if gain > 0.0 else math.nan
+        return 100.0 - 100.0 / (1.0 + gain / loss)
+
+
+class ATR:
+    """Average true range updated bar by bar.
+
+    Attributes:
+        window: The number of bars.
+
+    Methods:
+        update(high, low, close): Adds a bar and returns the indicator.
+    """
+    def __init__(self, window: int = 14) -> None:
+        """Class constructor.
+        See attributes in the class level docstring.
+        """
+        _check_window(window)
+        self.window = window
+        self._ewm = _Ewm((1.0 - 1.0 / window) * window, window)
+        self._prev_close: Optional[float] = None
+
+    def update(self, high: float, low: float, close: float) -> float:
+        """Adds a bar and returns the indicator (or NaN)."""
+        true_range = high - low
+        if self._prev_close is not None:
+            true_range = max(true_range,
+                             abs(high - self._prev_close),
+                             abs(low - self._prev_close))
+        self._prev_close = close
+        return self._ewm.update(true_range)
+
+
+class VWAP:
+    """Volume weighted average price updated bar by bar.
+
+    Methods:
+        update(high, low, close, volume): Adds a bar and returns the
+            indicator.
+    """
+    def __init__(self) -> None:
+        """Class constructor."""
+        self._price_volume = 0.0
+        self._volume = 0.0
+
+    def update(self, high: float, low: float, close: float,
+               volume: float) -> float:
+        """Adds a bar and returns the indicator."""
+        self._price_volume += (high + low + close) / 3.0 * volume
+        self._volume += volume
+        if self._volume == 0.0:
+            return math.nan
+        return self._price_volume / self._volume
+
+
+class Bollinger:
+    """Bollinger bands updated bar by bar.
+
+    Attributes:
+        window: The number of bars.
+        num_std: The number of standard deviations.
+
+    Methods:
+        update(close): Adds a close price and returns the middle, upper
+            and lower bands.
+    """
+    def __init__(self, window: int = 20, num_std: float = 2.0) -> None:
+        """Class constructor.
+        See attributes in the class level docstring.
+        """
+        _check_window(window)
+        self.window = window
+        self.num_std = num_std
+        self._moments = _MovingMoments(window)
+
+    def update(self, close: float) -> Tuple[float, float, float]:
+        """Adds a close price and returns the bands (or NaN)."""
+        middle, variance = self._moments.update(close)
+        if math.isnan(variance):
+            std = math.nan
+        else:
+            std = math.sqrt(max(variance, 0.0))
+        return (middle,
+                middle + self.num_std * std,
+                middle - self.num_std * std)
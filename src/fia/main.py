@@ -21,33 +21,61 @@ Functions:
     - main: The main function of the module.
 
 Classes:
+    - SignInFailed: The sign in returned no authorization token.
     - TvDataCollector: Gets the historical market data from TradingView.
 """
 # Import the standard libraries.
+import argparse
+import contextlib
 import datetime
 import json
 import logging
-import os
 import random
 import re
 import string
-from typing import Dict, List
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import (Any, Callable, Dict, Iterator, List, Optional, Set,
+                    Tuple, Union)
 
 # Import the third party libraries.
+import numpy as np
 import pandas as pd
 import requests
 import websocket
 from websocket import create_connection
 
 # Import the local/project packages and modules.
-from fia.constants import Frame, REMEMBER, USER_AGENT
+from fia import metrics, timing
+from fia.capture import Capture
+from fia.constants import (CHUNK_BARS, COLUMNS, OUTPUT_PATH, QUOTE_FIELDS,
+                           REMEMBER, RETRIES, RETRY_BACKOFF, SIGN_IN_URL,
+                           USER_AGENT, WS_TIMEOUT, WS_URL, Frame)
+from fia.messages import (RawData, find_message, get_bar_close_time,
+                          get_series_bars, merge_raw_data, parse_messages)
+from fia.profiling import Profiler
+from fia.rate_limit import RateLimiter
+from fia.receiving import (AuthRejected, receive_chunk, receive_series,
+                           receive_symbol_info, stop_on_error)
+from fia.request import TvRequest
+from fia.resample import Session
+from fia.result_cache import ResultCache
+from fia.symbols import SymbolCache, SymbolInfo
+from fia.tracing import Tracer
 from fia.utils.create_property import create_property
+from fia.utils.single_flight import SingleFlight
+from fia.utils.trim_bars import to_utc, trim_bars
+from fia.utils.write_data import write_data
 
 
 # Set the module logger.
 logger = logging.getLogger(__name__)
 
 
+class SignInFailed(SystemExit):
+    """The sign in returned no authorization token (not retried)."""
+
+
 class TvDataCollector:
     """Gets the historical market data from TradingView.
 
@@ -85,11 +113,24 @@ class TvDataCollector:
     Methods:
         get_auth_token(): Gets the authorization token.
         get_data(): Gets the raw data over Websocket.
+        collect(request): Gets the raw data of the immutable request
+            (thread-safe).
+        collect_many(tv_requests): Gets the raw data of many requests in
+            a pool of threads.
+        get_history(start, sink): Gets the deep history in chunks.
+        get_range(start, end): Gets the bars between two dates.
+        get_symbol_info(): Gets the symbol metadata.
+        connect(): Creates the websocket connection.
+        get_update(ws, request): Gets the last bars over an open
+            connection.
         get_pandas_data(raw_data): Gets the market data as Pandas
             DataFrame from the raw data.
         get_json_data(raw_data): Gets the market data in JSON format
             from the raw data.
     """
+    # The positional arguments are the public interface since the first
+    # release.
+    # pylint: disable-next=too-many-positional-arguments
     def __init__(self,
                  username: str,
                  password: str,
@@ -113,6 +154,40 @@ class TvDataCollector:
         self.user_agent = user_agent
         self.remember = remember
 
+    # The in-flight requests shared by all instances (the identical
+    # requests of the same user share one Websocket connection).
+    _in_flight = SingleFlight()
+    # The rate limiter shared by all instances (and by the processes
+    # forked after the import). Replace it to change the limits.
+    rate_limiter = RateLimiter()
+    # The number of retries when the connection is closed before the
+    # series is completed.
+    retries = RETRIES
+    # The cache of the results shared by all instances (None - the
+    # results are not cached). Set it to ResultCache() to reuse the
+    # fresh results of the identical requests.
+    result_cache: Optional[ResultCache] = None
+    # The persistent cache of the symbol metadata shared by all
+    # instances (None - the metadata is not cached). Set it to
+    # SymbolCache() to keep the symbol_resolved payloads.
+    symbol_cache: Optional[SymbolCache] = None
+    # The tracer of the Websocket frames shared by all instances. The
+    # last frames are dumped to the log when a collection fails.
+    tracer = Tracer()
+    # The sign in url and the Websocket url shared by all instances.
+    # Replace them to collect from a stand-in server (see
+    # fia.fake_server).
+    sign_in_url = SIGN_IN_URL
+    ws_url = WS_URL
+    # The authorization tokens by the sign in url and the username
+    # shared by all instances: every user signs in once per process and
+    # again only when TradingView rejects the token.
+    _auth_tokens: Dict[Tuple[str, str], str] = {}
+    # The capture of the received frames shared by all instances (None -
+    # the frames are not captured). Set it to Capture() to replay the
+    # collections later (see fia.capture).
+    capture: Optional[Capture] = None
+
     # Set property for username, password, exchange, ticker_sym,
     # currency, user_agent(optional), remember(optional).
     username = create_property("username")
@@ -200,9 +275,10 @@ class TvDataCollector:
 
         Raises:
             SystemExit: if there is a problem with WebSocket connection.
+            SignInFailed: if the response has no token (for example,
+                401 - Unauthorized or 429 - Too Many Requests).
         """
-        # Sign in url and headers for authorization on TradingView.
-        sign_in_url: str = "https://www.tradingview.com/accounts/signin/"
+        # Headers for authorization on TradingView.
         sign_in_headers: Dict[str, str] = {
             "Referer": "https://www.tradingview.com",
             "User-Agent": self.user_agent
@@ -212,22 +288,46 @@ class TvDataCollector:
             "password": self.password,
             "remember": self.remember
         }
+        with timing.phase("throttle"):
+            self.rate_limiter.acquire("sign_in")
         try:
-            response: requests.Response = requests.post(
-                url=sign_in_url,
-                data=data,
-                headers=sign_in_headers,
-                timeout=5
-            )
+            with timing.phase("sign_in"):
+                response: requests.Response = requests.post(
+                    url=self.sign_in_url,
+                    data=data,
+                    headers=sign_in_headers,
+                    timeout=5
+                )
         except requests.ConnectionError as e:
+            self.rate_limiter.penalize("sign_in")
+            metrics.inc("fia_sign_ins_total", outcome="failed")
             logger.error(f"Problems with Websocket connection: {e}",
                          exc_info=True,
                          stack_info=True)
             raise SystemExit(f"Problems with Websocket connection: {e}") from e
-        auth_token: str = response.json()["user"]["auth_token"]
+        # 429 - Too Many Requests.
+        if response.status_code == 429:
+            self.rate_limiter.penalize("sign_in")
+        try:
+            response.raise_for_status()
+            auth_token: str = response.json()["user"]["auth_token"]
+        except (requests.HTTPError, ValueError, KeyError, TypeError) as e:
+            metrics.inc("fia_sign_ins_total", outcome="failed")
+            logger.error(f"The authorization token was not received: {e}",
+                         stack_info=True)
+            raise SignInFailed(f"The authorization token was not "
+                               f"received: {e}") from e
+        self.rate_limiter.reward("sign_in")
+        metrics.inc("fia_sign_ins_total", outcome="ok")
         logger.debug(f"The authorization token was received: {auth_token}")
         return auth_token
 
+    @property
+    def request(self) -> TvRequest:
+        """The immutable request built from the current attributes."""
+        return TvRequest(self.exchange, self.ticker_sym, self.currency,
+                         Frame(self.frame), self.bars)
+
     def get_data(self) -> str:
         """Gets the raw data.
 
@@ -239,32 +339,536 @@ class TvDataCollector:
             - Gets the raw data that includes all received messages in
               response to the output messages over the websocket
               connection.
+            - Reconnects and requests only the missing bars if the
+              connection is closed before all bars are received.
+
+        Returns:
+            raw_data: The raw data. It is a string with the additional
+                attribute complete (False if the series was not
+                completed after all retries).
+        """
+        return self._fetch_cached(self.request)
+
+    def collect(self, request: TvRequest) -> str:
+        """Gets the raw data of the request.
+
+        The method does not use or change the exchange, ticker_sym,
+        currency, frame and bars attributes, so it can be called from
+        many threads. The identical requests of the same user that run
+        at the same moment share one Websocket connection.
+
+        Args:
+            request: The request of the market data.
+
+        Returns:
+            raw_data: The raw data.
+        """
+        return self._in_flight.do((self.username, request),
+                                  lambda: self._fetch_cached(request))
+
+    def collect_many(self, tv_requests: List[TvRequest],
+                     workers: int = 4) -> List[str]:
+        """Gets the raw data of many requests in a pool of threads.
+
+        Args:
+            tv_requests: A list of requests.
+            workers: The number of threads.
+
+        Returns:
+            raw_data: A list of the raw data in the order of requests.
+        """
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(self.collect, tv_requests))
+
+    def _fetch_cached(self, request: TvRequest) -> RawData:
+        """Gets the raw data from result_cache or over Websocket.
+
+        The timing record of the collection is kept in raw_data.timing
+        (see fia.timing).
+        """
+        with timing.record("collect", request.key) as record:
+            cached = (None if self.result_cache is None
+                      else self.result_cache.get(self.username, request))
+            if cached is not None:
+                logger.info(f"The raw data of {request.key} was taken "
+                            f"from the cache.")
+                record.count(cached=1, bars=request.bars)
+                metrics.inc("fia_requests_total", outcome="cached")
+                # The cached object is shared, the copy gets the record.
+                raw_data = RawData(cached, cached.complete)
+            else:
+                capture = self.capture
+                if capture is not None:
+                    capture.start()
+                try:
+                    raw_data = self._fetch(request)
+                except SystemExit:
+                    metrics.inc("fia_requests_total", outcome="failed")
+                    if capture is not None:
+                        capture.finish(request, complete=False)
+                    raise
+                complete = getattr(raw_data, "complete", True)
+                if capture is not None:
+                    capture.finish(request, complete)
+                metrics.inc("fia_requests_total",
+                            outcome="complete" if complete else "incomplete")
+                self._remember_symbol(request, raw_data)
+                if self.result_cache is not None:
+                    self.result_cache.put(self.username, request, raw_data)
+        if isinstance(raw_data, RawData):
+            raw_data.timing = record
+        return raw_data
+
+    def _remember_symbol(self, request: TvRequest, raw_data: str) -> None:
+        """Puts the symbol_resolved payload into symbol_cache.
+
+        The cache file is rewritten by every put, so only the missing
+        or stale metadata is put.
+        """
+        if (self.symbol_cache is None
+                or self.symbol_cache.get(request) is not None):
+            return
+        message = find_message(raw_data, "symbol_resolved")
+        if message is not None:
+            self.symbol_cache.put(request, message["p"][2])
+
+    def get_symbol_info(self, max_age: Optional[float] = None) -> SymbolInfo:
+        """Gets the metadata of the symbol.
+
+        The metadata is taken from symbol_cache if it is fresh.
+        Otherwise, the symbol is resolved over Websocket (the series is
+        not created) and the metadata is cached.
+
+        Args:
+            max_age: The maximal age of the cached metadata in seconds
+                (symbol_cache.max_age by default).
+
+        Returns:
+            info: The symbol metadata (pricescale, timezone, session,
+                session_holidays, has_intraday, etc.)
+        """
+        request = self.request
+        if self.symbol_cache is not None:
+            info = self.symbol_cache.get(request, max_age)
+            if info is not None:
+                return info
+        with self._connection() as ws:
+            self._open_session(ws, request)
+            symbol_info = receive_symbol_info(ws, self.tracer)
+        if self.symbol_cache is not None:
+            return self.symbol_cache.put(request, symbol_info)
+        return SymbolInfo.from_payload(symbol_info)
+
+    def _fetch(self, request: TvRequest) -> RawData:
+        """Gets the raw data of the request with retries.
+
+        If the Websocket connection is closed before the series is
+        completed, the method waits for a random delay (exponential
+        backoff with jitter), reconnects and requests only the bars
+        older than the earliest received bar. The raw data of all
+        connections is merged by the bar time. If the last retry
+        fails, the bars received before are returned.
+
+        Returns:
+            raw_data: The raw data. raw_data.complete is False if the
+                series was not completed after all retries.
+
+        Raises:
+            SignInFailed: If the sign in failed (without retries).
+            SystemExit: If no bars were received after all retries.
+        """
+        parts: List[str] = []
+        times: Set[float] = set()
+        series: Any = request.bars
+        complete = False
+        for attempt in range(self.retries + 1):
+            if attempt > 0:
+                delay = random.uniform(0, RETRY_BACKOFF * 2 ** (attempt - 1))
+                logger.warning(f"Retry {attempt} of {self.retries} in "
+                               f"{delay:.2f} s, {len(times)} of "
+                               f"{request.bars} bars were received.")
+                timing.current().count(retries=1)
+                metrics.inc("fia_reconnects_total")
+                with timing.phase("retry_wait"):
+                    time.sleep(delay)
+            try:
+                part = self._fetch_once(request, series)
+            except SignInFailed:
+                raise
+            except SystemExit as e:
+                if attempt < self.retries:
+                    continue
+                self.tracer.dump(str(e))
+                if not parts:
+                    raise
+                break
+            parts.append(part)
+            with timing.phase("parse"):
+                for message in parse_messages(part):
+                    metrics.inc("fia_messages_total",
+                                type=str(message.get("m")))
+                    if message.get("m") == "timescale_update":
+                        times.update(bar[0]
+                                     for bar in get_series_bars(message))
+            complete = '"m":"series_completed"' in part
+            remaining = request.bars - len(times)
+            if complete or remaining <= 0:
+                complete = True
+                break
+            self.rate_limiter.penalize("connect")
+            # Request only the missing bars before the earliest one.
+            if times:
+                series = ["bar_count", request.frame.value, remaining,
+                          int(min(times))]
+        if not complete:
+            logger.warning(f"The series is not completed: {len(times)} of "
+                           f"{request.bars} bars were received.")
+            self.tracer.dump("The series is not completed.")
+        timing.current().count(bars=len(times))
+        if len(parts) == 1:
+            return RawData(parts[0], complete)
+        with timing.phase("parse"):
+            return RawData(merge_raw_data(parts), complete)
+
+    def _fetch_once(self, request: TvRequest, series: Any) -> str:
+        """Gets the raw data of the request over one connection.
+
+        Args:
+            request: The request of the market data.
+            series: The number of bars or the range of the bars
+                (["bar_count", frame, count, to]) of create_series.
 
         Returns:
             raw_data: The raw data.
         """
-        # Create the websocket connection and generate session tokens.
-        ws: websocket.WebSocket = self._create_ws_connection()
+        record = timing.current()
+        if self.capture is not None:
+            self.capture.connection()
+        with self._connection() as ws:
+            self._open_series(ws, request, series)
+            # Collect all received messages in one string raw_data and
+            # stop the connection when all data is received.
+            logger.debug("Start to collect the raw data.")
+            record.begin("symbol_resolved")
+            raw_data = ""
+            packets = 0
+            while True:
+                try:
+                    result = ws.recv()
+                    raw_data += result
+                    self.tracer.received(result)
+                    if self.capture is not None:
+                        self.capture.received(result)
+                except websocket.WebSocketTimeoutException:
+                    logger.warning(f"Nothing was received in {WS_TIMEOUT} "
+                                   f"s.")
+                    break
+                except websocket.WebSocketConnectionClosedException:
+                    logger.warning("The remote host closed the Websocket "
+                                   "connection or a network error "
+                                   "happened.")
+                    break
+                packets += 1
+                stop_on_error(result, self.tracer)
+                if '"m":"symbol_resolved"' in result:
+                    record.begin("timescale_update")
+                if '"m":"series_completed"' in result:
+                    record.begin("close")
+        record.end_phase()
+        record.count(bytes=len(raw_data), packets=packets)
+        metrics.inc("fia_received_bytes_total", len(raw_data))
+        metrics.inc("fia_received_packets_total", packets)
+        logger.info(
+            "The raw data is collected and the WebSocket connection is closed."
+        )
+        self.rate_limiter.observe(raw_data)
+        return raw_data
+
+    def get_history(self,
+                    start: Union[str, datetime.datetime],
+                    sink: Callable[[np.ndarray], Any],
+                    chunk_bars: int = CHUNK_BARS) -> int:
+        """Gets the deep history in chunks over one connection.
+
+        The first chunk is requested by create_series, the older chunks
+        are requested by request_more_data on the same series until the
+        start date is reached or there are no older bars. Every chunk
+        is passed to the sink as soon as it is received, so the memory
+        is bounded by the chunk size. The bars of a chunk that overlap
+        the previous chunk are dropped.
+
+        Args:
+            start: The start date (UTC if it has no timezone).
+            sink: The function that gets every chunk as a (n, 6) array
+                (DateTime in seconds, Open, High, Low, Close, Volume)
+                sorted by DateTime, for example, BarStore.append. The
+                chunks are passed from the newest to the oldest.
+            chunk_bars: The number of bars in one request.
+
+        Returns:
+            total: The number of bars passed to the sink.
+
+        Raises:
+            SystemExit: If the connection is closed before a chunk is
+                completed (the previous chunks are already passed to
+                the sink).
+        """
+        start_seconds = to_utc(start).timestamp()
+        total = 0
+        earliest = float("inf")
+        with self._connection() as ws:
+            cs_token = self._open_series(ws, self.request, chunk_bars)
+            while True:
+                bars = receive_chunk(ws, self.tracer)
+                values = np.array(bars, dtype="float64").reshape(
+                    -1, len(COLUMNS)
+                )
+                # Drop the overlap with the previous chunk.
+                values = values[values[:, 0] < earliest]
+                if len(values) == 0:
+                    break
+                values = values[np.argsort(values[:, 0], kind="stable")]
+                earliest = values[0, 0]
+                values = values[values[:, 0] >= start_seconds]
+                if len(values):
+                    sink(values)
+                    total += len(values)
+                logger.info(f"{total} bars were received.")
+                if earliest <= start_seconds:
+                    break
+                # The sample message for "request_more_data":
+                # ~m~55~m~{"m":"request_more_data","p":["cs_h2k...0xq",
+                # "sds_1",5000]}
+                self.rate_limiter.acquire("series")
+                ws.send(self._create_message(m="request_more_data",
+                                             p=[cs_token, "sds_1",
+                                                chunk_bars]))
+        logger.info(f"The history was received: {total} bars.")
+        return total
+
+    def get_range(self,
+                  start: Union[str, datetime.datetime],
+                  end: Union[str, datetime.datetime],
+                  frame: Optional[Frame] = None,
+                  tz: str = "UTC") -> pd.DataFrame:
+        """Gets the bars that open between two dates.
+
+        The symbol is resolved before the series is created, so the
+        number of bars is estimated by the trading session calendar
+        (the trading days, the holidays and the session hours) from
+        the symbol_resolved message. Only the bars up to the end date
+        are requested. If the first received bar is still after the
+        start date, only the missing bars are requested by
+        request_more_data.
+
+        Args:
+            start: The start date (UTC if it has no timezone).
+            end: The end date (UTC if it has no timezone).
+            frame: A bar timeframe as a member of enum Frame (the frame
+                attribute by default).
+            tz: A timezone (optional) of the DateTime column. The UTC
+                time is used by default.
+
+        Returns:
+            df: The market data with the same columns as
+                get_pandas_data returns. The bars are trimmed to the
+                range [start, end].
+
+        Raises:
+            SystemExit: If the connection is closed before the series
+                is completed.
+        """
+        start_ns = to_utc(start).value
+        end_ns = to_utc(end).value
+        request = self.request
+        if frame is not None:
+            request = request._replace(frame=frame)
+        with self._connection() as ws:
+            cs_token = self._open_session(ws, request)
+            session = self._session(ws, request)
+            count = max(1, session.count_bars(request.frame, start_ns,
+                                              end_ns))
+            logger.info(f"{count} bars are requested for the range.")
+            self._create_series(ws, cs_token, request,
+                                ["bar_count", request.frame.value, count,
+                                 end_ns // 10**9])
+            bars = receive_chunk(ws, self.tracer)
+            self._top_up(ws, cs_token, request.frame, session,
+                         start_ns=start_ns, bars=bars)
+        df = trim_bars(bars, start_ns, end_ns, tz)
+        logger.info(f"The range includes {len(df)} bars.")
+        return df
+
+    def get_update(self,
+                   ws: websocket.WebSocket,
+                   request: TvRequest,
+                   auth_token: Optional[str] = None
+                   ) -> Tuple[List[List[float]], Optional[float],
+                              Optional[Dict[str, Any]]]:
+        """Gets the last bars over an open connection.
+
+        The chart and quote sessions are deleted after the series is
+        received, so the same connection can be reused by the next
+        requests without keeping the sessions of every request.
+
+        Args:
+            ws: The websocket connection created by connect.
+            request: The request of the market data (request.bars is
+                the number of the last bars).
+            auth_token: The authorization token (optional). The token
+                of the username is signed in once and reused by
+                default.
+
+        Returns:
+            bars: A list of bars [time, open, high, low, close, volume].
+            bar_close_time: The close time of the last bar in seconds
+                (None if it is unknown).
+            symbol_info: The symbol_resolved payload (None if it was
+                not received).
+
+        Raises:
+            SystemExit: If the connection is closed before the
+                series_completed message.
+        """
+        cs_token = self._open_session(ws, request, auth_token)
+        self._create_series(ws, cs_token, request, request.bars)
+        messages = receive_series(ws, self.tracer)
+        # The sample message for "chart_delete_session":
+        # ~m~53~m~{"m":"chart_delete_session","p":["cs_h2k...0xq"]}
+        ws.send(self._create_message(m="chart_delete_session",
+                                     p=[cs_token]))
+        # The sample message for "quote_delete_session":
+        # ~m~53~m~{"m":"quote_delete_session","p":["qs_h2k...0xq"]}
+        ws.send(self._create_message(m="quote_delete_session",
+                                     p=[self._quote_token(cs_token)]))
+        bars = [bar for message in messages for bar in
+                get_series_bars(message)]
+        close_times = [get_bar_close_time(message) for message in messages]
+        known = [value for value in close_times if value is not None]
+        symbol_info = next((message["p"][2] for message in messages
+                            if message.get("m") == "symbol_resolved"), None)
+        return bars, (known[-1] if known else None), symbol_info
+
+    def _session(self, ws: websocket.WebSocket,
+                 request: TvRequest) -> Session:
+        """Gets the session from symbol_cache or symbol_resolved.
+
+        The fresh cached metadata is used without waiting for the
+        symbol_resolved message.
+        """
+        if self.symbol_cache is not None:
+            info = self.symbol_cache.get(request)
+            if info is not None:
+                return info.trading_session
+            return self.symbol_cache.put(
+                request, receive_symbol_info(ws, self.tracer)
+            ).trading_session
+        return Session.from_symbol_info(receive_symbol_info(ws, self.tracer))
+
+    def _top_up(self, ws: websocket.WebSocket, cs_token: str, frame: Frame,
+                session: Session, *, start_ns: int,
+                bars: List[List[float]]) -> None:
+        """Requests the missing bars until the first bar is at start."""
+        while bars:
+            earliest = int(min(bar[0] for bar in bars) * 10**9)
+            missing = session.count_bars(frame, start_ns, earliest - 1)
+            if earliest <= start_ns or missing == 0:
+                return
+            logger.info(f"{missing} more bars are requested.")
+            self.rate_limiter.acquire("series")
+            ws.send(self._create_message(m="request_more_data",
+                                         p=[cs_token, "sds_1", missing]))
+            more = [bar for bar in receive_chunk(ws, self.tracer)
+                    if bar[0] * 10**9 < earliest]
+            if not more:
+                return
+            bars.extend(more)
+
+    def connect(self) -> websocket.WebSocket:
+        """Creates the websocket connection within the rate limit."""
+        with timing.phase("throttle"):
+            self.rate_limiter.acquire("connect")
+        try:
+            with timing.phase("connect"):
+                ws: websocket.WebSocket = self._create_ws_connection()
+        except SystemExit:
+            self.rate_limiter.penalize("connect")
+            metrics.inc("fia_connections_total", outcome="failed")
+            raise
+        metrics.inc("fia_connections_total", outcome="ok")
+        return ws
+
+    @contextlib.contextmanager
+    def _connection(self) -> Iterator[websocket.WebSocket]:
+        """Connects and forgets the token if TradingView rejected it."""
+        ws = self.connect()
+        try:
+            yield ws
+        except AuthRejected:
+            self._auth_tokens.pop((self.sign_in_url, self.username), None)
+            raise
+        finally:
+            ws.close()
+
+    def _auth_token(self) -> str:
+        """Gets the token of the username, signs in only once.
+
+        The concurrent sign ins of the same username share one request.
+        """
+        key = (self.sign_in_url, self.username)
+        auth_token = self._auth_tokens.get(key)
+        if auth_token is None:
+            auth_token = self._in_flight.do(("sign_in",) + key,
+                                            self.get_auth_token)
+            self._auth_tokens[key] = auth_token
+        return auth_token
+
+    def _open_series(self, ws: websocket.WebSocket, request: TvRequest,
+                     series: Any) -> str:
+        """Signs in, resolves the symbol and creates the series.
+
+        Args:
+            ws: The websocket connection.
+            request: The request of the market data.
+            series: The number of bars or the range of the bars of
+                create_series.
+
+        Returns:
+            cs_token: The chart session token.
+        """
+        cs_token = self._open_session(ws, request)
+        self._create_series(ws, cs_token, request, series)
+        return cs_token
+
+    def _open_session(self, ws: websocket.WebSocket,
+                      request: TvRequest,
+                      auth_token: Optional[str] = None) -> str:
+        """Signs in, creates the sessions and resolves the symbol.
+
+        Args:
+            ws: The websocket connection.
+            request: The request of the market data.
+            auth_token: The authorization token (optional). The token
+                of the username is signed in once and reused by
+                default.
+
+        Returns:
+            cs_token: The chart session token.
+        """
+        # Generate session tokens.
         cs_token = "cs_" + self._generate_random_token()
-        qs_token = "qs_" + self._generate_random_token()
+        qs_token = self._quote_token(cs_token)
         # Send the messages to TV.
         # The sample message for "set_auth_token":
         # ~m~526~m~{"m":"set_auth_token","p":["eyJ...9U0"]}
-        ws.send(
-            self._create_message(
-                m="set_auth_token",
-                p=[self.get_auth_token()]
-            )
-        )
+        ws.send(self._create_message(
+            m="set_auth_token", p=[auth_token or self._auth_token()]
+        ))
         logger.debug("The message was sent.")
         # The sample message for "chart_create_session":
         # ~m~55~m~{"m":"chart_create_session","p":["cs_h2k...0xq",""]}
-        ws.send(
-            self._create_message(
-                m="chart_create_session",
-                p=[cs_token, ""]
-            )
-        )
+        ws.send(self._create_message(m="chart_create_session",
+                                     p=[cs_token, ""]))
         logger.debug("The message was sent.")
         # The sample message for "quote_create_session":
         # ~m~52~m~{"m":"quote_create_session","p":["qs_mOM...p5Y"]}
@@ -273,44 +877,8 @@ class TvDataCollector:
         # The sample message for "quote_set_fields":
         # ~m~432~m~{"m":"quote_set_fields","p":["qs_uIk...Rqj",
         # "base-currency-logoid","ch", ..., "volume","value_unit_id"]}
-        ws.send(
-            self._create_message(
-                m="quote_set_fields",
-                p=[
-                    qs_token,
-                    "base-currency-logoid",
-                    "ch",
-                    "chp",
-                    "currency-logoid",
-                    "currency_code",
-                    "currency_id",
-                    "base_currency_id",
-                    "current_session",
-                    "description",
-                    "exchange",
-                    "format",
-                    "fractional",
-                    "is_tradable",
-                    "language",
-                    "local_description",
-                    "listed_exchange",
-                    "logoid",
-                    "lp",
-                    "lp_time",
-                    "minmov",
-                    "minmove2",
-                    "original_name",
-                    "pricescale",
-                    "pro_name",
-                    "short_name",
-                    "type",
-                    "typespecs",
-                    "update_mode",
-                    "volume",
-                    "value_unit_id"
-                ]
-            )
-        )
+        ws.send(self._create_message(m="quote_set_fields",
+                                     p=[qs_token, *QUOTE_FIELDS]))
         logger.debug("The message was sent.")
         # The sample message for "quote_add_symbols":
         # ~m~63~m~{"m":"quote_add_symbols","p":["qs_mOM...p5Y",
@@ -318,7 +886,7 @@ class TvDataCollector:
         ws.send(
             self._create_message(
                 m="quote_add_symbols",
-                p=[qs_token, f"{self.exchange}:{self.ticker_sym}"]
+                p=[qs_token, f"{request.exchange}:{request.ticker_sym}"]
             )
         )
         logger.debug("The message was sent.")
@@ -328,7 +896,7 @@ class TvDataCollector:
         ws.send(
             self._create_message(
                 m="quote_fast_symbols",
-                p=[qs_token, f"{self.exchange}:{self.ticker_sym}"]
+                p=[qs_token, f"{request.exchange}:{request.ticker_sym}"]
             )
         )
         logger.debug("The message was sent.")
@@ -344,16 +912,30 @@ class TvDataCollector:
                     "sds_sym_1",
                     ("={"
                      + '"adjustment":"splits",'
-                     + f'"currency-id":"{self.currency}",'
-                     + f'"symbol":"{self.exchange}:{self.ticker_sym}"'
+                     + f'"currency-id":"{request.currency}",'
+                     + f'"symbol":"{request.exchange}:{request.ticker_sym}"'
                      + "}")
                 ]
             )
         )
         logger.debug("The message was sent.")
+        return cs_token
+
+    def _create_series(self, ws: websocket.WebSocket, cs_token: str,
+                       request: TvRequest, series: Any) -> None:
+        """Creates the series of bars.
+
+        Args:
+            ws: The websocket connection.
+            cs_token: The chart session token.
+            request: The request of the market data.
+            series: The number of bars or the range of the bars
+                (["bar_count", frame, count, to]).
+        """
         # The sample message for "create_series":
         # ~m~81~m~{"m":"create_series","p":["cs_h2k...0xq",
         # "sds_1","s1","sds_sym_1","D",300,""]}
+        self.rate_limiter.acquire("series")
         ws.send(
             self._create_message(
                 m="create_series",
@@ -362,31 +944,14 @@ class TvDataCollector:
                     "sds_1",
                     "s1",
                     "sds_sym_1",
-                    self.frame,
-                    self.bars,
+                    request.frame.value,
+                    series,
                     ""
                 ]
             )
         )
         logger.debug("The message was sent.")
         logger.info("All messages were created and sent. Wait...")
-        # Collect all received messages in one string raw_data and stop
-        # the connection when all data is received.
-        logger.debug("Start to collect the raw data.")
-        raw_data = ""
-        while True:
-            try:
-                result = ws.recv()
-                raw_data += result
-                logger.debug(f"The message was received: {result}")
-            except websocket.WebSocketConnectionClosedException:
-                logger.warning("The remote host closed the Websocket "
-                               "connection or a network error happened.")
-                break
-        logger.info(
-            "The raw data is collected and the WebSocket connection is closed."
-        )
-        return raw_data
 
     def get_pandas_data(self, raw_data: str, tz: str = "UTC") -> pd.DataFrame:
         """Gets the market data as DataFrame object.
@@ -417,20 +982,29 @@ class TvDataCollector:
                     - Close: the closing price of the chosen timeframe.
                     - Volume: the market volume.
                 There are n rows, where n is the number of chosen bars.
+                The timing record of the conversion is kept in
+                df.attrs["timing"] (see fia.timing).
         """
-        # Convert the raw data to json format.
-        market_data_json = self.get_json_data(raw_data)
-        # Create the DataFrame with market data.
-        df = pd.read_json(market_data_json)
-        data = df["v"].to_list()
-        columns = ["DateTime", "Open", "High", "Low", "Close", "Volume"]
-        df = pd.DataFrame(data=data, columns=columns)
-        # Convert the local timezone to the exchange time zone.
-        df["DateTime"] = (
-            pd.to_datetime(df["DateTime"], unit="s")
-            .dt.tz_localize("UTC")
-            .dt.tz_convert(tz)
-        )
+        collected = getattr(raw_data, "timing", None)
+        with timing.record("convert",
+                           "" if collected is None else collected.key
+                           ) as record:
+            # Convert the raw data to json format.
+            with record.phase("get_json_data"):
+                market_data_json = self.get_json_data(raw_data)
+            # Create the DataFrame with market data.
+            with record.phase("dataframe"):
+                df = pd.read_json(market_data_json)
+                data = df["v"].to_list()
+                df = pd.DataFrame(data=data, columns=list(COLUMNS))
+                # Convert the local timezone to the exchange time zone.
+                df["DateTime"] = (
+                    pd.to_datetime(df["DateTime"], unit="s")
+                    .dt.tz_localize("UTC")
+                    .dt.tz_convert(tz)
+                )
+            record.count(bars=len(df))
+        df.attrs["timing"] = record
         logger.info("The dataframe market data was created.")
         return df
 
@@ -493,6 +1067,12 @@ class TvDataCollector:
         logger.info("The json market data was created.")
         return market_data_json
 
+    @staticmethod
+    def _quote_token(cs_token: str) -> str:
+        """Gets the quote session token paired with the chart session
+        token ("cs_h2k...0xq" -> "qs_h2k...0xq")."""
+        return "qs_" + cs_token[len("cs_"):]
+
     @staticmethod
     def _generate_random_token() -> str:
         """Generates random token.
@@ -510,11 +1090,11 @@ class TvDataCollector:
         logger.debug(f"The random token was generated: {rand_token}")
         return rand_token
 
-    @staticmethod
-    def _create_ws_connection() -> websocket.WebSocket:
+    @classmethod
+    def _create_ws_connection(cls) -> websocket.WebSocket:
         """Creates the websocket connection with TradingView.
 
-        Creates the websocket connection with TradingView using wss url,
+        Creates the websocket connection with TradingView using ws_url,
         headers.
 
         Returns:
@@ -524,14 +1104,14 @@ class TvDataCollector:
         Raises:
             SystemExit: If there is a problem with Websocket connection.
         """
-        ws_url = "wss://data.tradingview.com/socket.io/websocket"
         headers = json.dumps({"Origin": "https://data.tradingview.com"})
         try:
             ws: websocket.WebSocket = create_connection(
-                url=ws_url,
+                url=cls.ws_url,
                 headers=headers,
+                timeout=WS_TIMEOUT,
             )
-        except websocket.WebSocketException as e:
+        except (websocket.WebSocketException, OSError) as e:
             logger.error(f"Problems with Websocket connection: {e}",
                          exc_info=True,
                          stack_info=True)
@@ -541,7 +1121,7 @@ class TvDataCollector:
         return ws
 
     @staticmethod
-    def _create_message(m: str, p: List[str | int]) -> str:
+    def _create_message(m: str, p: List[Any]) -> str:
         """Creates the websocket message.
 
         Creates the message that can be sent over Websocket.
@@ -565,11 +1145,33 @@ class TvDataCollector:
         """
         mes = json.dumps({"m": m, "p": p}, separators=(",", ":"))
         mes = f"~m~{len(mes)}~m~{mes}"
-        logger.debug(f"The message was created: {mes}")
+        TvDataCollector.tracer.sent(mes)
         return mes
 
 
-def main() -> pd.DataFrame:
+def output_file_name(ticker_sym: str, exchange: str, frame: str) -> str:
+    """Creates the output file name without the extension.
+
+    The file name is similar to "TICKER_SYM_EXCHANGE_FRAME_DATE_TIME"
+    (for example, BTC1!_CME_DAY_20221115_13_03_20).
+
+    Args:
+        ticker_sym: A ticker symbol (AAPL, BTC, etc.)
+        exchange: An exchange (NYSE, CME, etc.).
+        frame: A name of the member of enum Frame (DAY, MIN1, etc.)
+
+    Returns:
+        file_name: The file name without the extension.
+    """
+    return (
+        f'{ticker_sym}'
+        f'_{exchange}'
+        f'_{frame}'
+        f'_{datetime.datetime.now().strftime("%Y%m%d_%H_%M_%S")}'
+    )
+
+
+def main(cli_args: Optional[argparse.Namespace] = None) -> pd.DataFrame:
     """ Returns the market data in CSV format.
 
     This function:
@@ -584,13 +1186,20 @@ def main() -> pd.DataFrame:
     - Shows in CLI interface the market historical data in DataFrame
       format.
 
+    Args:
+        cli_args: The parsed command line arguments (optional). The
+            sys.argv is parsed by parse_cli_args by default.
+
     Returns:
         df: The market data in Pandas DataFrame format.
     """
     # Import the logger.
     from fia.utils.set_logger import set_logger
-    # Import the command line interface arguments.
-    from fia.cli_args import cli_args
+    # Parse the command line interface arguments.
+    from fia.cli_args import parse_cli_args
+
+    if cli_args is None:
+        cli_args = parse_cli_args()
 
     # Set the logger. Use the root logger to see the log messages from
     # external libraries/package too.
@@ -606,24 +1215,28 @@ def main() -> pd.DataFrame:
                            cli_args.BARS,
                            cli_args.USER_AGENT,
                            cli_args.REMEMBER)
-    # Get raw_data
-    raw_data: str = tvdc.get_data()
-    logger.debug(f"The rawdata finally was received: {raw_data}")
-    # Get the market data in Pandas DataFrame format.
-    df: pd.DataFrame = tvdc.get_pandas_data(raw_data)
-    # Create path and convert DataFrame to CSV file.
-    path = os.path.join(os.path.expanduser("~"), "fia_output")
-    file_name = (
-        f'{cli_args.TICKER_SYM}'
-        f'_{cli_args.EXCHANGE}'
-        f'_{cli_args.FRAME}'
-        f'_{datetime.datetime.now().strftime("%Y%m%d_%H_%M_%S")}'
-        f'.{"csv"}'
+    # Profile the phases if the --profile flag is set.
+    profiler: contextlib.AbstractContextManager[Any] = (
+        contextlib.nullcontext() if getattr(cli_args, "PROFILE", None) is None
+        else Profiler(cli_args.PROFILE, cli_args.PROFILE_DIR)
     )
-    # TODO: add exception when convert to csv
-    os.makedirs(path, exist_ok=True)
-    df.to_csv(os.path.join(path, file_name), index=False)
-    logger.info(f"The CSV file {file_name} was created in {path}.")
+    # Capture the received frames if the --capture flag is set.
+    if getattr(cli_args, "CAPTURE", None) is not None:
+        TvDataCollector.capture = Capture(cli_args.CAPTURE)
+    with profiler:
+        # Get raw_data
+        raw_data: str = tvdc.get_data()
+        logger.debug(f"The raw data was received: {len(raw_data)} "
+                     f"characters.")
+        # Get the market data in Pandas DataFrame format.
+        df: pd.DataFrame = tvdc.get_pandas_data(raw_data)
+        # Create path and convert DataFrame to CSV file.
+        path = OUTPUT_PATH
+        file_name = output_file_name(cli_args.TICKER_SYM,
+                                     cli_args.EXCHANGE,
+                                     cli_args.FRAME)
+        write_data(df, path, file_name, "csv")
+    logger.info(f"The CSV file {file_name}.csv was created in {path}.")
     return df
 
 
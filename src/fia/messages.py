@@ -0,0 +1,314 @@
+# Copyright 2022 Aleksey Ustinov.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied. See the License for the specific language governing
+# permissions and limitations under the License.
+"""This module parses the messages received over Websocket.
+
+Every message received from TradingView has the prefix ~m~{n}~m~,
+where {n} is a number of symbols after the prefix. The raw data
+collected by TvDataCollector is a concatenation of such messages
+(JSON messages and heartbeats ~h~{n}).
+
+This module is a part of the fia package and should not be used
+separately.
+
+Functions:
+    - split_messages: Splits the raw data into separate messages.
+    - iter_messages: Yields the messages of the raw data read in
+      chunks.
+    - parse_messages: Yields the JSON messages from the raw data.
+    - find_message: Finds the first JSON message with a given name.
+    - get_symbol_resolved: Gets the symbol_resolved payload.
+    - get_series_bars: Gets the bars from timescale_update and du
+      messages.
+    - get_bar_close_time: Gets the close time of the last bar.
+    - merge_raw_data: Merges the raw data of many connections.
+    - slice_raw_data: Keeps only the last bars of the raw data.
+
+Classes:
+    - RawData: The raw data with the completeness flag.
+"""
+# Import the standard libraries.
+import json
+import logging
+import re
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+# Import the local/project packages and modules.
+from fia.timing import Timing
+
+# Set the module logger.
+logger = logging.getLogger(__name__)
+
+# The prefix of every message: ~m~{n}~m~.
+_PREFIX = re.compile(r"~m~(\d+)~m~")
+
+
+def split_messages(raw_data: str) -> List[str]:
+    """Splits the raw data into separate messages.
+
+    An example of the raw data with 2 messages:
+    ~m~45~m~{"m":"quote_completed","p":["qs_LU8...5adt"]}~m~4~m~~h~1
+
+    Args:
+        raw_data: The raw data collected over Websocket connection.
+
+    Returns:
+        messages: A list of messages without prefixes.
+    """
+    messages = []
+    pos = 0
+    while True:
+        prefix = _PREFIX.search(raw_data, pos)
+        if prefix is None:
+            break
+        start = prefix.end()
+        pos = start + int(prefix.group(1))
+        messages.append(raw_data[start:pos])
+    return messages
+
+
+def iter_messages(chunks: Iterable[str]) -> Iterator[str]:
+    """Yields the messages of the raw data read in chunks.
+
+    A message can be split between the chunks, only the incomplete
+    message at the end of the chunk is kept until the next chunk.
+
+    Args:
+        chunks: The chunks of the raw data (for example, the blocks of
+            a file).
+
+    Yields:
+        message: A message without the prefix.
+    """
+    buffer = ""
+    for chunk in chunks:
+        buffer += chunk
+        pos = 0
+        while True:
+            prefix = _PREFIX.search(buffer, pos)
+            if prefix is None:
+                break
+            end = prefix.end() + int(prefix.group(1))
+            if end > len(buffer):
+                break
+            yield buffer[prefix.end():end]
+            pos = end
+        buffer = buffer[pos:]
+
+
+def parse_messages(raw_data: str) -> Iterator[Dict[str, Any]]:
+    """Yields the JSON messages from the raw data.
+
+    Heartbeats (~h~{n}) and broken messages are skipped.
+
+    Args:
+        raw_data: The raw data collected over Websocket connection.
+
+    Yields:
+        message: A message as a dictionary ({"m": ..., "p": [...]}).
+    """
+    for message in split_messages(raw_data):
+        if not message.startswith("{"):
+            continue
+        try:
+            yield json.loads(message)
+        except json.JSONDecodeError:
+            logger.debug("The broken message was skipped.")
+
+
+def find_message(raw_data: str, m: str) -> Optional[Dict[str, Any]]:
+    """Finds the first JSON message with a given name.
+
+    Args:
+        raw_data: The raw data collected over Websocket connection.
+        m: The message name ("symbol_resolved", "timescale_update",
+            etc.)
+
+    Returns:
+        message: The first message with the name or None if there is
+            no such message.
+    """
+    # Skip decoding of the messages that cannot include the name.
+    if f'"m":"{m}"' not in raw_data:
+        return None
+    for message in parse_messages(raw_data):
+        if message.get("m") == m:
+            return message
+    return None
+
+
+def get_symbol_resolved(raw_data: str) -> Dict[str, Any]:
+    """Gets the symbol_resolved payload.
+
+    The payload describes the symbol: "timezone", "session",
+    "session_holidays", "pricescale", "has_intraday", etc.
+
+    Args:
+        raw_data: The raw data collected over Websocket connection.
+
+    Returns:
+        symbol_info: The symbol description as a dictionary.
+
+    Raises:
+        SystemExit: If there is no symbol_resolved message in the raw
+            data.
+    """
+    # The sample message for "symbol_resolved":
+    # ~m~4176~m~{"m":"symbol_resolved","p":["cs_Ift...wIpg",
+    # "sds_sym_1",{"currency_code":"USD","session":"0930-1600", ...}]}
+    message = find_message(raw_data, "symbol_resolved")
+    if message is None:
+        logger.error("There is no symbol_resolved message in the raw data.",
+                     stack_info=True)
+        raise SystemExit("There is no symbol_resolved message in the raw "
+                         "data.")
+    symbol_info: Dict[str, Any] = message["p"][2]
+    return symbol_info
+
+
+def get_series_bars(message: Dict[str, Any],
+                    series: str = "sds_1") -> List[List[float]]:
+    """Gets the bars from timescale_update and du messages.
+
+    The timescale_update message includes the historical bars. The du
+    message includes the live updates of the last bar:
+    {"m":"du","p":["cs_Ift...wIpg",{"sds_1":{"s":[{"i":49,
+    "v":[1670855400.0,142.7,144.5,141.06,144.49,70462654.0]}], ...}}]}
+
+    Args:
+        message: A message as a dictionary.
+        series: The series id used in create_series ("sds_1").
+
+    Returns:
+        bars: A list of bars [time, open, high, low, close, volume].
+            The list is empty for other messages.
+    """
+    if message.get("m") not in ("timescale_update", "du"):
+        return []
+    data = message["p"][1].get(series) or {}
+    return [bar["v"] for bar in data.get("s", [])]
+
+
+def get_bar_close_time(message: Dict[str, Any],
+                       series: str = "sds_1") -> Optional[float]:
+    """Gets the close time of the last bar from timescale_update.
+
+    The timescale_update message includes the close time of the last
+    (probably not finished) bar:
+    {"m":"timescale_update","p":["cs_Ift...wIpg",{"sds_1":{"s":[...],
+    "lbs":{"bar_close_time":1670878799}}}]}
+
+    Args:
+        message: A message as a dictionary.
+        series: The series id used in create_series ("sds_1").
+
+    Returns:
+        bar_close_time: The close time in seconds (None for other
+            messages or if the message has no close time).
+    """
+    if message.get("m") not in ("timescale_update", "du"):
+        return None
+    data = message["p"][1].get(series) or {}
+    bar_close_time = (data.get("lbs") or {}).get("bar_close_time")
+    return None if bar_close_time is None else float(bar_close_time)
+
+
+class RawData(str):
+    """The raw data with the completeness flag.
+
+    RawData is a string, so it can be used everywhere the raw data is
+    used.
+
+    Attributes:
+        complete: True if the series_completed message was received.
+        timing: The timing record of the collection (see fia.timing).
+            None if the raw data was not collected by TvDataCollector.
+    """
+    complete: bool
+    timing: Optional[Timing] = None
+
+    def __new__(cls, raw_data: str, complete: bool = True) -> "RawData":
+        obj = super().__new__(cls, raw_data)
+        obj.complete = complete
+        return obj
+
+
+def _frame(message: Dict[str, Any]) -> str:
+    """Adds the prefix ~m~{n}~m~ to the compact JSON message."""
+    mes = json.dumps(message, separators=(",", ":"))
+    return f"~m~{len(mes)}~m~{mes}"
+
+
+def _read_series(
+        parts: List[str], series: str
+) -> Tuple[Optional[Dict[str, Any]], Dict[float, List[float]]]:
+    """Reads the first symbol_resolved message and the bars by time."""
+    bars: Dict[float, List[float]] = {}
+    symbol_resolved: Optional[Dict[str, Any]] = None
+    for part in parts:
+        for message in parse_messages(part):
+            if message.get("m") == "symbol_resolved":
+                symbol_resolved = symbol_resolved or message
+            elif message.get("m") == "timescale_update":
+                for bar in get_series_bars(message, series):
+                    bars[bar[0]] = bar
+    return symbol_resolved, bars
+
+
+def _write_series(symbol_resolved: Optional[Dict[str, Any]],
+                  bars: List[List[float]], series: str) -> str:
+    """Writes the raw data of one connection with the sorted bars."""
+    merged = [{"i": i, "v": bar} for i, bar in enumerate(bars)]
+    raw_data = "" if symbol_resolved is None else _frame(symbol_resolved)
+    raw_data += _frame({"m": "timescale_update",
+                        "p": ["", {series: {"s": merged}}]})
+    raw_data += _frame({"m": "series_completed", "p": ["", series]})
+    return raw_data
+
+
+def merge_raw_data(parts: List[str], series: str = "sds_1") -> str:
+    """Merges the raw data of many connections.
+
+    The historical bars of all timescale_update messages are merged by
+    the bar time (the later part wins for the same time) and written
+    into one timescale_update message with the bars sorted by time.
+    The first symbol_resolved message is kept, so the merged raw data
+    can be used as the raw data of one connection.
+
+    Args:
+        parts: The raw data of every connection.
+        series: The series id used in create_series ("sds_1").
+
+    Returns:
+        raw_data: The merged raw data.
+    """
+    symbol_resolved, bars = _read_series(parts, series)
+    return _write_series(symbol_resolved,
+                         [bars[time] for time in sorted(bars)], series)
+
+
+def slice_raw_data(raw_data: str, bars: int, series: str = "sds_1") -> str:
+    """Keeps only the last bars of the raw data.
+
+    Args:
+        raw_data: The raw data collected over Websocket connection.
+        bars: The number of the last bars.
+        series: The series id used in create_series ("sds_1").
+
+    Returns:
+        raw_data: The raw data of one connection with the last bars.
+    """
+    symbol_resolved, values = _read_series([raw_data], series)
+    last = sorted(values)[-bars:] if bars > 0 else []
+    return _write_series(symbol_resolved, [values[time] for time in last],
+                         series)
@@ -0,0 +1,345 @@
+# Copyright 2022 Aleksey Ustinov.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied. See the License for the specific language governing
+# permissions and limitations under the License.
+"""This module keeps the process-wide metrics of the long-running fia
+processes.
+
+The metrics are disabled by default: every update is one check of the
+module variable. The metrics are enabled by enable() and are updated
+by the collector, the parser and the writers:
+    - fia_requests_total{outcome}: The collections by outcome
+      (complete, incomplete, cached, failed).
+    - fia_sign_ins_total{outcome}: The sign in requests (ok, failed).
+    - fia_connections_total{outcome}: The Websocket connections (ok,
+      failed).
+    - fia_reconnects_total: The reconnections after the connection was
+      closed before the series was completed.
+    - fia_received_bytes_total: The received characters of the
+      Websocket frames.
+    - fia_received_packets_total: The received Websocket frames.
+    - fia_messages_total{type}: The received JSON messages by type.
+    - fia_written_rows_total{format}: The rows written to the files and
+      the stores.
+    - fia_queue_depth{queue}: The jobs waiting in the queues of "fia
+      batch" and "fia serve".
+    - fia_phase_seconds{record,phase}: The latency of the phases of
+      the collections and the conversions (see fia.timing), including
+      the parse latency.
+
+The metrics are exposed in the Prometheus text format by expose() or
+by the local HTTP endpoint /metrics:
+    fia.metrics.enable()
+    fia.metrics.start_http_server(9100)
+
+Classes:
+    - Registry: The registry of the counters, gauges and histograms.
+
+Functions:
+    - enable: Enables the process-wide registry.
+    - disable: Disables the process-wide registry.
+    - get_registry: Gets the process-wide registry (None if disabled).
+    - inc: Increases a counter or a gauge.
+    - set_gauge: Sets a gauge.
+    - observe: Observes a value of a histogram.
+    - expose: Gets the metrics in the Prometheus text format.
+    - start_http_server: Serves the metrics on /metrics.
+"""
+# Import the standard libraries.
+import bisect
+import threading
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+# Import the local/project packages and modules.
+from fia import timing
+from fia.constants import HTTP_HOST, METRICS_BUCKETS
+
+
+# The type and the help of every metric.
+METRICS: Dict[str, Tuple[str, str]] = {
+    "fia_requests_total": ("counter", "The collections by outcome."),
+    "fia_sign_ins_total": ("counter", "The sign in requests by outcome."),
+    "fia_connections_total": ("counter",
+                              "The Websocket connections by outcome."),
+    "fia_reconnects_total": ("counter",
+                             "The reconnections before the series was "
+                             "completed."),
+    "fia_received_bytes_total": ("counter",
+                                 "The received characters of the "
+                                 "Websocket frames."),
+    "fia_received_packets_total": ("counter",
+                                   "The received Websocket frames."),
+    "fia_messages_total": ("counter",
+                           "The received JSON messages by type."),
+    "fia_written_rows_total": ("counter",
+                               "The written rows by output format."),
+    "fia_queue_depth": ("gauge", "The jobs waiting in the queue."),
+    "fia_phase_seconds": ("histogram",
+                          "The latency of the collection phases."),
+}
+
+# The content type of the Prometheus text format.
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# The labels of one series as the sorted (name, value) tuples.
+_Labels = Tuple[Tuple[str, str], ...]
+
+
+def _format_labels(labels: _Labels) -> str:
+    """Formats the labels as {name="value",...}."""
+    if not labels:
+        return ""
+    values = ",".join(
+        f'{name}="' + value.replace("\\", "\\\\").replace('"', '\\"')
+        .replace("\n", "\\n") + '"'
+        for name, value in labels
+    )
+    return f"{{{values}}}"
+
+
+def _format_value(value: float) -> str:
+    """Formats the value (the integers without the fraction)."""
+    return str(int(value)) if float(value).is_integer() else repr(value)
+
+
+class _Histogram:
+    """The bucket counts, the sum and the count of one series."""
+    def __init__(self, buckets: Sequence[float]) -> None:
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+
+class Registry:
+    """The registry of the counters, gauges and histograms.
+
+    Every metric has its own lock, so the updates of different metrics
+    do not wait for each other. The lock is held only for one
+    addition.
+
+    Attributes:
+        buckets: The upper bounds of the histogram buckets.
+
+    Methods:
+        inc(name, value, labels): Increases a counter or a gauge.
+        set(name, value, labels): Sets a gauge.
+        observe(name, value, labels): Observes a value of a histogram.
+        get(name, labels): Gets the value of a counter or a gauge.
+        expose(): Gets the metrics in the Prometheus text format.
+    """
+    def __init__(self, buckets: Sequence[float] = METRICS_BUCKETS) -> None:
+        """Class constructor.
+        See attributes in the class level docstring.
+        """
+        self.buckets = tuple(sorted(buckets))
+        self._locks = {name: threading.Lock() for name in METRICS}
+        self._values: Dict[str, Dict[_Labels, float]] = {
+            name: {} for name, (kind, _) in METRICS.items()
+            if kind != "histogram"
+        }
+        self._histograms: Dict[str, Dict[_Labels, _Histogram]] = {
+            name: {} for name, (kind, _) in METRICS.items()
+            if kind == "histogram"
+        }
+
+    def inc(self, name: str, value: float = 1.0,
+            labels: Optional[Dict[str, str]] = None) -> None:
+        """Increases a counter or a gauge (a gauge can be decreased)."""
+        key = tuple(sorted(labels.items())) if labels else ()
+        values = self._values[name]
+        with self._locks[name]:
+            values[key] = values.get(key, 0.0) + value
+
+    def set(self, name: str, value: float,
+            labels: Optional[Dict[str, str]] = None) -> None:
+        """Sets a gauge."""
+        key = tuple(sorted(labels.items())) if labels else ()
+        with self._locks[name]:
+            self._values[name][key] = value
+
+    def observe(self, name: str, value: float,
+                labels: Optional[Dict[str, str]] = None) -> None:
+        """Observes a value of a histogram."""
+        key = tuple(sorted(labels.items())) if labels else ()
+        pos = bisect.bisect_left(self.buckets, value)
+        series = self._histograms[name]
+        with self._locks[name]:
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = _Histogram(self.buckets)
+            histogram.counts[pos] += 1
+            histogram.sum += value
+            histogram.count += 1
+
+    def get(self, name: str,
+            labels: Optional[Dict[str, str]] = None) -> float:
+        """Gets the value of a counter or a gauge (0 if not set)."""
+        key = tuple(sorted(labels.items())) if labels else ()
+        with self._locks[name]:
+            return self._values[name].get(key, 0.0)
+
+    def expose(self) -> str:
+        """Gets the metrics in the Prometheus text format.
+
+        Returns:
+            text: The HELP and TYPE lines and the samples of every
+                metric that has at least one series.
+        """
+        lines: List[str] = []
+        for name, (kind, help_text) in METRICS.items():
+            with self._locks[name]:
+                samples = (self._histogram_samples(name)
+                           if kind == "histogram"
+                           else [(name, labels, value) for labels, value
+                                 in self._values[name].items()])
+            if not samples:
+                continue
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            lines.extend(f"{sample}{_format_labels(labels)} "
+                         f"{_format_value(value)}"
+                         for sample, labels, value in samples)
+        return "\n".join(lines) + "\n" if lines else ""
+
+    def _histogram_samples(self, name: str
+                           ) -> List[Tuple[str, _Labels, float]]:
+        """Gets the cumulative buckets, the sum and the count."""
+        samples: List[Tuple[str, _Labels, float]] = []
+        for labels, histogram in self._histograms[name].items():
+            cumulative = 0
+            for bound, count in zip((*self.buckets, float("inf")),
+                                    histogram.counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                samples.append((f"{name}_bucket", (*labels, ("le", le)),
+                                cumulative))
+            samples.append((f"{name}_sum", labels, histogram.sum))
+            samples.append((f"{name}_count", labels, histogram.count))
+        return samples
+
+
+# The process-wide registry (None - the metrics are disabled).
+_registry: Optional[Registry] = None  # pylint: disable=invalid-name
+_enable_lock = threading.Lock()
+
+
+def _observe_timing(record: timing.Timing) -> None:
+    """Observes the phases of a finished timing record."""
+    registry = _registry
+    if registry is None:
+        return
+    for phase, seconds in record.durations().items():
+        registry.observe("fia_phase_seconds", seconds,
+                         {"record": record.name, "phase": phase})
+
+
+def enable(registry: Optional[Registry] = None) -> Registry:
+    """Enables the process-wide registry.
+
+    Args:
+        registry: The registry (optional). The current registry is kept
+            if the metrics are enabled, a new one is created otherwise.
+
+    Returns:
+        registry: The process-wide registry.
+    """
+    global _registry  # pylint: disable=global-statement
+    with _enable_lock:
+        if registry is not None or _registry is None:
+            _registry = registry or Registry()
+        timing.remove_hook(_observe_timing)
+        timing.add_hook(_observe_timing)
+        return _registry
+
+
+def disable() -> None:
+    """Disables the process-wide registry (the values are dropped)."""
+    global _registry  # pylint: disable=global-statement
+    with _enable_lock:
+        _registry = None
+        timing.remove_hook(_observe_timing)
+
+
+def get_registry() -> Optional[Registry]:
+    """Gets the process-wide registry (None if disabled)."""
+    return _registry
+
+
+def inc(name: str, value: float = 1.0, **labels: str) -> None:
+    """Increases a counter or a gauge if the metrics are enabled."""
+    registry = _registry
+    if registry is not None:
+        registry.inc(name, value, labels)
+
+
+def set_gauge(name: str, value: float, **labels: str) -> None:
+    """Sets a gauge if the metrics are enabled."""
+    registry = _registry
+    if registry is not None:
+        registry.set(name, value, labels)
+
+
+def observe(name: str, value: float, **labels: str) -> None:
+    """Observes a value of a histogram if the metrics are enabled."""
+    registry = _registry
+    if registry is not None:
+        registry.observe(name, value, labels)
+
+
+def expose() -> str:
+    """Gets the metrics in the Prometheus text format ("" if the
+    metrics are disabled)."""
+    registry = _registry
+    return "" if registry is None else registry.expose()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """Answers GET /metrics."""
+    # pylint: disable-next=invalid-name
+    def do_GET(self) -> None:
+        """Sends the metrics."""
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(HTTPStatus.NOT_FOUND)
+            return
+        body = expose().encode()
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str,  # pylint: disable=redefined-builtin
+                    *args: Any) -> None:
+        """Does not log the scrapes."""
+
+
+def start_http_server(port: int,
+                      host: str = HTTP_HOST) -> ThreadingHTTPServer:
+    """Serves the metrics on /metrics in a daemon thread.
+
+    The metrics are enabled if they are disabled.
+
+    Args:
+        port: The port (0 - any free port).
+        host: The host (the local host by default).
+
+    Returns:
+        server: The server (server.shutdown() stops it).
+    """
+    enable()
+    server = ThreadingHTTPServer((host, port), _Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="fia-metrics",
+                     daemon=True).start()
+    return server
@@ -0,0 +1,137 @@
+# Copyright 2022 Aleksey Ustinov.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied. See the License for the specific language governing
+# permissions and limitations under the License.
+"""This module builds a wide panel from the market data of many symbols.
+
+The panel has one row per DateTime and one column per symbol, for
+example, the BTC volume on CME, COINBASE, GEMINI, KRAKEN, BITSTAMP and
+BINANCE.
+
+The DateTime values of all symbols are joined once (a sorted union or
+intersection of int64 arrays) and the values are written into
+a preallocated 2-D array, so there are no repeated set_index, reindex
+and concat calls.
+
+Functions:
+    - build_panel: Builds a wide panel from the market data of many
+      symbols.
+"""
+# Import the standard libraries.
+import logging
+from functools import reduce
+from typing import List, Mapping, Optional, Tuple, Union
+
+# Import the third party libraries.
+import numpy as np
+import pandas as pd
+
+
+# Set the module logger.
+logger = logging.getLogger(__name__)
+
+
+def _series(df: pd.DataFrame, field: str,
+            step: Optional[int]) -> Tuple[np.ndarray, np.ndarray]:
+    """Gets the sorted UTC time (int64 ns) and the values of a field.
+
+    If step is set, the time is floored to it. The values within a step
+    are summed for Volume, the last value is used for prices.
+    """
+    times = (df["DateTime"].dt.tz_convert("UTC").dt.tz_localize(None)
+             .to_numpy().astype("datetime64[ns]").astype("int64"))
+    values = df[field].to_numpy(dtype="float64")
+    if step is None:
+        return times, values
+    times = times - times % step
+    starts = np.flatnonzero(np.r_[True, times[1:] != times[:-1]])
+    if field == "Volume":
+        values = np.add.reduceat(values, starts)
+    else:
+        values = values[np.r_[starts[1:], len(times)] - 1]
+    return times[starts], values
+
+
+def _join(times: List[np.ndarray], how: str) -> np.ndarray:
+    """Joins the sorted DateTime values of all symbols."""
+    if not times:
+        return np.empty(0, dtype="int64")
+    if how == "inner":
+        return reduce(
+            lambda left, right: np.intersect1d(left, right,
+                                               assume_unique=True),
+            times
+        )
+    return np.unique(np.concatenate(times))
+
+
+def _fill(index: np.ndarray,
+          series: List[Tuple[np.ndarray, np.ndarray]]) -> np.ndarray:
+    """Writes the values of all symbols into a preallocated array."""
+    matrix = np.full((len(index), len(series)), np.nan)
+    for column, (times, values) in enumerate(series):
+        pos = np.searchsorted(index, times)
+        found = pos < len(index)
+        found[found] = index[pos[found]] == times[found]
+        matrix[pos[found], column] = values[found]
+    return matrix
+
+
+def build_panel(results: Mapping[str, pd.DataFrame],
+                field: str = "Close",
+                how: str = "inner",
+                freq: Optional[str] = None,
+                as_frame: bool = True
+                ) -> Union[pd.DataFrame, Tuple[np.ndarray, pd.DatetimeIndex]]:
+    """Builds a wide panel from the market data of many symbols.
+
+    Args:
+        results: The market data returned by get_pandas_data by the
+            column name ({"CME": df_cme, "BINANCE": df_binance}).
+        field: The column used as values ("Close", "Volume", etc.)
+        how: "inner" - only DateTime values that all symbols have,
+            "outer" - all DateTime values (the gaps are NaN).
+        freq: The frequency (optional) that the DateTime values are
+            floored to before the join ("1H", "1D", etc.) It helps to
+            join the symbols with different session times. The volumes
+            within the frequency are summed, the last value is used
+            for other fields.
+        as_frame: Return DataFrame (True) or the 2-D array and the
+            index (False).
+
+    Returns:
+        panel: The wide DataFrame with the DateTime index or the tuple
+            of the 2-D array (rows - DateTime, columns - symbols) and
+            the DatetimeIndex.
+
+    Raises:
+        SystemExit: If the how value is not "inner" or "outer".
+    """
+    if how not in ("inner", "outer"):
+        logger.error("The how value has to be \"inner\" or \"outer\".",
+                     stack_info=True)
+        raise SystemExit("The how value has to be \"inner\" or \"outer\".")
+    step = pd.Timedelta(freq).value if freq is not None else None
+    labels = list(results)
+    series = [_series(results[label], field, step) for label in labels]
+    index = _join([times for times, _ in series], how)
+    matrix = _fill(index, series)
+    tz = results[labels[0]]["DateTime"].dt.tz if labels else "UTC"
+    datetime_index = (pd.DatetimeIndex(index.astype("datetime64[ns]"),
+                                       name="DateTime")
+                      .tz_localize("UTC").tz_convert(tz))
+    logger.info(f"The panel was created: {len(index)} rows, "
+                f"{len(labels)} columns.")
+    if not as_frame:
+        return matrix, datetime_index
+    return pd.DataFrame(matrix, index=datetime_index, columns=labels,
+                        copy=False)
@@ -0,0 +1,251 @@
+# Copyright 2022 Aleksey Ustinov.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied. See the License for the specific language governing
+# permissions and limitations under the License.
+"""This module collects the market data of many symbols in parallel.
+
+The requests are run in a pool of processes, so the decoding uses all
+CPU cores.
+
+Every worker process collects the raw data, decodes the bars and writes
+them into a shared memory block as a (6, n) float64 array (DateTime in
+seconds, Open, High, Low, Close, Volume). Only a small descriptor (the
+name of the block and the number of bars) is pickled back to the parent
+process, so the deep histories are not serialized.
+
+The parent process attaches the blocks and gets the NumPy arrays or
+the DataFrames whose price and volume columns are views of the shared
+memory. The blocks are released by SharedResults.close (or by the with
+statement).
+
+Classes:
+    - SharedBars: The descriptor of the bars in a shared memory block.
+    - SharedResults: The collected bars of many requests.
+
+Functions:
+    - collect_parallel: Collects the market data of many requests in
+      many processes.
+"""
+# Import the standard libraries.
+import json
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+from types import TracebackType
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Type
+
+# Import the third party libraries.
+import numpy as np
+import pandas as pd
+
+# Import the local/project packages and modules.
+from fia.constants import COLUMNS
+from fia.main import TvDataCollector
+from fia.request import TvRequest
+
+
+# Set the module logger.
+logger = logging.getLogger(__name__)
+
+# The state of the worker process (set by _init_worker).
+_WORKER_STATE: Dict[str, Any] = {}
+
+
+class SharedBars(NamedTuple):
+    """The descriptor of the bars in a shared memory block.
+
+    Attributes:
+        request: The request of the market data.
+        name: The name of the shared memory block.
+        rows: The number of bars.
+    """
+    request: TvRequest
+    name: str
+    rows: int
+
+
+def _decode(raw_data: str) -> np.ndarray:
+    """Decodes the raw data to a (6, n) float64 array."""
+    bars = json.loads(TvDataCollector.get_json_data(raw_data))
+    values = np.array([bar["v"] for bar in bars], dtype="float64")
+    return values.reshape(-1, len(COLUMNS)).T
+
+
+def _init_worker(connection_limit: Any) -> None:
+    """Sets the connection limit shared by all worker processes."""
+    _WORKER_STATE["connection_limit"] = connection_limit
+
+
+def _collect(request: TvRequest, username: str,
+             password: str) -> SharedBars:
+    """Collects and decodes the bars in a worker process."""
+    tvdc = TvDataCollector(username, password, request.exchange,
+                           request.ticker_sym, request.currency,
+                           request.frame, request.bars)
+    with _WORKER_STATE["connection_limit"]:
+        raw_data = tvdc.get_data()
+    values = _decode(raw_data)
+    # The size of a shared memory block has to be positive.
+    shm = SharedMemory(create=True, size=max(values.nbytes, 1))
+    try:
+        np.ndarray(values.shape, dtype="float64", buffer=shm.buf)[:] = values
+    finally:
+        shm.close()
+    return SharedBars(request, shm.name, values.shape[1])
+
+
+class SharedResults:
+    """The collected bars of many requests.
+
+    The bars stay in the shared memory until close is called. The
+    arrays and the DataFrames must not be used after close.
+
+    Attributes:
+        bars: The descriptors by the request.
+        errors: The error messages of the failed requests.
+
+    Methods:
+        to_numpy(request): Gets the (6, n) array of the bars.
+        to_pandas(request, tz): Gets the bars as DataFrame.
+        close(): Releases all shared memory blocks.
+    """
+    def __init__(self, bars: Dict[TvRequest, SharedBars],
+                 errors: Dict[TvRequest, str]) -> None:
+        """Class constructor.
+        See attributes in the class level docstring.
+        """
+        self.bars = bars
+        self.errors = errors
+        self._blocks: Dict[str, SharedMemory] = {}
+
+    def __len__(self) -> int:
+        return len(self.bars)
+
+    def __iter__(self) -> Iterator[TvRequest]:
+        return iter(self.bars)
+
+    def __enter__(self) -> "SharedResults":
+        return self
+
+    def __exit__(self,
+                 exc_type: Optional[Type[BaseException]],
+                 exc_value: Optional[BaseException],
+                 traceback: Optional[TracebackType]) -> None:
+        self.close()
+
+    def to_numpy(self, request: TvRequest) -> np.ndarray:
+        """Gets the bars as a (6, n) array without copying.
+
+        Args:
+            request: The request of the market data.
+
+        Returns:
+            values: The rows are DateTime (seconds), Open, High, Low,
+                Close and Volume.
+        """
+        descriptor = self.bars[request]
+        if descriptor.name not in self._blocks:
+            self._blocks[descriptor.name] = SharedMemory(name=descriptor.name)
+        return np.ndarray((len(COLUMNS), descriptor.rows), dtype="float64",
+                          buffer=self._blocks[descriptor.name].buf)
+
+    def to_pandas(self, request: TvRequest, tz: str = "UTC") -> pd.DataFrame:
+        """Gets the bars as DataFrame.
+
+        The DataFrame has the same columns as get_pandas_data returns.
+        The price and volume columns are views of the shared memory,
+        only the DateTime column is created.
+
+        Args:
+            request: The request of the market data.
+            tz: A timezone (optional). The UTC time is used by default.
+
+        Returns:
+            df: The market data in Pandas DataFrame format.
+        """
+        values = self.to_numpy(request)
+        df = pd.DataFrame(values[1:].T, columns=list(COLUMNS[1:]),
+                          copy=False)
+        df.insert(0, "DateTime",
+                  pd.to_datetime(values[0], unit="s", utc=True)
+                  .tz_convert(tz))
+        return df
+
+    def close(self) -> None:
+        """Releases all shared memory blocks."""
+        for descriptor in self.bars.values():
+            shm = self._blocks.pop(descriptor.name, None)
+            if shm is None:
+                try:
+                    shm = SharedMemory(name=descriptor.name)
+                except FileNotFoundError:
+                    continue
+            shm.unlink()
+            try:
+                shm.close()
+            except BufferError:
+                # The arrays are still used. The memory is freed when
+                # they are deleted because the block is unlinked.
+                pass
+        self.bars = {}
+
+
+def collect_parallel(requests: List[TvRequest],
+                     username: str,
+                     password: str,
+                     workers: Optional[int] = None,
+                     connections: int = 4) -> SharedResults:
+    """Collects the market data of many requests in many processes.
+
+    Args:
+        requests: A list of requests. The identical requests are
+            collected once.
+        username: A Trading View username.
+        password: A Trading View password.
+        workers: The number of processes (the number of CPUs by
+            default).
+        connections: The maximal number of simultaneous Websocket
+            connections.
+
+    Returns:
+        results: The collected bars. Use it in the with statement or
+            call close to release the shared memory.
+    """
+    bars: Dict[TvRequest, SharedBars] = {}
+    errors: Dict[TvRequest, str] = {}
+    # The workers have to share the resource tracker of the parent
+    # process. Otherwise, the tracker of every worker unlinks its blocks
+    # when the worker exits.
+    resource_tracker.ensure_running()
+    connection_limit = multiprocessing.get_context().BoundedSemaphore(
+        connections
+    )
+    with ProcessPoolExecutor(max_workers=workers,
+                             initializer=_init_worker,
+                             initargs=(connection_limit,)) as executor:
+        futures = {request: executor.submit(_collect, request, username,
+                                            password)
+                   for request in dict.fromkeys(requests)}
+        for request, future in futures.items():
+            try:
+                bars[request] = future.result()
+            # TvDataCollector raises SystemExit on errors. One failed
+            # request must not stop the others.
+            # pylint: disable-next=broad-except
+            except (SystemExit, Exception) as e:
+                logger.error(f"The request {request.key} failed: {e}")
+                errors[request] = str(e)
+    logger.info(f"The parallel collection was finished: {len(bars)} done, "
+                f"{len(errors)} failed.")
+    return SharedResults(bars, errors)
@@ -0,0 +1,266 @@
+# Copyright 2022 Aleksey Ustinov.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied. See the License for the specific language governing
+# permissions and limitations under the License.
+"""This module profiles the phases of the collections.
+
+The profiler follows the phases of fia.timing in the thread where it
+is entered and profiles every phase separately:
+    - sign_in, connect: The sign in and the Websocket handshake.
+    - recv: The receive loop (symbol_resolved, timescale_update and
+      close phases of fia.timing).
+    - parse: Parsing the received messages.
+    - get_json_data: The conversion of the raw data to JSON.
+    - get_pandas_data: The creation of the DataFrame.
+    - write: Writing the output file (write_data).
+    - other: The time out of the phases.
+
+The cpu mode keeps a cProfile profile of every phase and writes it to
+{phase}.prof (it can be read by pstats or snakeviz). The memory mode
+traces the allocations with tracemalloc, keeps the peak allocation of
+every phase and the lines whose memory grew the most, and writes
+them to memory.txt (and the last snapshot to memory.snapshot). A short
+summary of the top functions or lines of every phase is printed when
+the profiler exits.
+
+Usage:
+    with Profiler("cpu", output_path="profile"):
+        raw_data = tvdc.get_data()
+        df = tvdc.get_pandas_data(raw_data)
+
+Classes:
+    - Profiler: Profiles the phases of the collections.
+"""
+# Import the standard libraries.
+import cProfile
+import logging
+import os
+import pstats
+import sys
+import threading
+import tracemalloc
+from collections import Counter
+from types import TracebackType
+from typing import Dict, List, Optional, TextIO, Tuple, Type
+
+# Import the local/project packages and modules.
+from fia import timing
+from fia.constants import PROFILE_MODES, PROFILE_PATH, PROFILE_TOP
+
+
+# Set the module logger.
+logger = logging.getLogger(__name__)
+
+# The profiled phases of the fia.timing phases (the other phases are
+# profiled under their own names).
+PHASES: Dict[str, str] = {
+    "symbol_resolved": "recv",
+    "timescale_update": "recv",
+    "close": "recv",
+    "dataframe": "get_pandas_data",
+}
+# The phase of the time out of the fia.timing phases.
+OTHER = "other"
+
+
+def _function_name(function: Tuple[str, int, str]) -> str:
+    """Formats the pstats function key as file:line(name)."""
+    file_name, line, name = function
+    if file_name == "~":
+        return name
+    return f"{os.path.basename(file_name)}:{line}({name})"
+
+
+class Profiler:
+    """Profiles the phases of the collections.
+
+    The profiler is a context manager. Only the thread that entered it
+    is profiled.
+
+    Attributes:
+        mode: The profiling mode: "cpu" (cProfile) or "memory"
+            (tracemalloc).
+        output_path: The folder of the profile files.
+        top: The number of the functions (or lines) of every phase in
+            the summary.
+        stream: The stream of the summary (None - sys.stderr).
+        files: The written files (after the exit).
+
+    Methods:
+        summary(): Gets the summary of the top functions or lines.
+    """
+    def __init__(self,
+                 mode: str = "cpu",
+                 output_path: str = PROFILE_PATH,
+                 top: int = PROFILE_TOP,
+                 stream: Optional[TextIO] = None) -> None:
+        """Class constructor.
+        See attributes in the class level docstring.
+
+        Raises:
+            SystemExit: If the mode is not supported.
+        """
+        if mode not in PROFILE_MODES:
+            logger.error(f"The profiling mode has to be one of "
+                         f"{PROFILE_MODES}.",
+                         stack_info=True)
+            raise SystemExit(f"The profiling mode has to be one of "
+                             f"{PROFILE_MODES}.")
+        self.mode = mode
+        self.output_path = output_path
+        self.top = top
+        self.stream = stream
+        self.files: List[str] = []
+        self._thread: Optional[int] = None
+        self._stack: List[str] = []
+        self._profiles: Dict[str, cProfile.Profile] = {}
+        self._peaks: Dict[str, int] = {}
+        self._allocations: Dict[str, Counter[str]] = {}
+        # The snapshot and the traced memory at the segment start.
+        self._segment: Optional[Tuple[tracemalloc.Snapshot, int]] = None
+        self._started_tracemalloc = False
+
+    def __enter__(self) -> "Profiler":
+        self._thread = threading.get_ident()
+        if self.mode == "memory":
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self._started_tracemalloc = True
+            self._segment = (self._take_snapshot(),
+                             tracemalloc.get_traced_memory()[0])
+            tracemalloc.reset_peak()
+        else:
+            self._profile(OTHER).enable()
+        timing.set_observer(self._observe)
+        return self
+
+    def __exit__(self,
+                 exc_type: Optional[Type[BaseException]],
+                 exc_value: Optional[BaseException],
+                 traceback: Optional[TracebackType]) -> None:
+        timing.set_observer(None)
+        phase = self._stack[-1] if self._stack else OTHER
+        if self.mode == "memory":
+            self._close_segment(phase)
+            if self._started_tracemalloc:
+                tracemalloc.stop()
+        else:
+            self._profile(phase).disable()
+        self._write()
+        print(self.summary(), file=self.stream or sys.stderr)
+
+    def _profile(self, phase: str) -> cProfile.Profile:
+        """Gets the cProfile profile of the phase."""
+        if phase not in self._profiles:
+            self._profiles[phase] = cProfile.Profile()
+        return self._profiles[phase]
+
+    def _observe(self, name: str, begins: bool) -> None:
+        """Switches the profiled phase (the fia.timing observer)."""
+        if threading.get_ident() != self._thread:
+            return
+        phase = PHASES.get(name, name)
+        previous = self._stack[-1] if self._stack else OTHER
+        if begins:
+            self._stack.append(phase)
+            self._switch(previous, phase)
+        elif self._stack:
+            self._stack.pop()
+            self._switch(phase, self._stack[-1] if self._stack else OTHER)
+
+    def _switch(self, previous: str, phase: str) -> None:
+        """Stops profiling the previous phase and starts the next."""
+        if previous == phase:
+            return
+        if self.mode == "memory":
+            self._close_segment(previous)
+        else:
+            self._profile(previous).disable()
+            self._profile(phase).enable()
+
+    @staticmethod
+    def _take_snapshot() -> tracemalloc.Snapshot:
+        """Takes the snapshot without the allocations of the tools."""
+        return tracemalloc.take_snapshot().filter_traces([
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, __file__),
+        ])
+
+    def _close_segment(self, phase: str) -> None:
+        """Keeps the peak and the allocations of the phase segment."""
+        if self._segment is None:
+            return
+        start, base = self._segment
+        current, peak = tracemalloc.get_traced_memory()
+        self._peaks[phase] = max(self._peaks.get(phase, 0), peak - base)
+        snapshot = self._take_snapshot()
+        allocations = self._allocations.setdefault(phase, Counter())
+        for stat in snapshot.compare_to(start, "lineno"):
+            if stat.size_diff > 0:
+                allocations[str(stat.traceback[0])] += stat.size_diff
+        self._segment = (snapshot, current)
+        tracemalloc.reset_peak()
+
+    def _write(self) -> None:
+        """Writes the profile files."""
+        os.makedirs(self.output_path, exist_ok=True)
+        if self.mode == "memory":
+            path = os.path.join(self.output_path, "memory.txt")
+            with open(path, "w", encoding="utf-8") as file:
+                file.write(self._memory_summary(None) + "\n")
+            self.files.append(path)
+            if self._segment is not None:
+                path = os.path.join(self.output_path, "memory.snapshot")
+                self._segment[0].dump(path)
+                self.files.append(path)
+        else:
+            for phase, profile in self._profiles.items():
+                path = os.path.join(self.output_path, f"{phase}.prof")
+                profile.dump_stats(path)
+                self.files.append(path)
+        logger.info(f"The profile files were written to "
+                    f"{self.output_path}.")
+
+    def summary(self) -> str:
+        """Gets the summary of the top functions or lines.
+
+        Returns:
+            summary: The total time (or the peak allocation) of every
+                phase and its top functions by the own time (or the
+                lines by the allocated memory).
+        """
+        if self.mode == "memory":
+            return self._memory_summary(self.top)
+        lines = [f"CPU profile by phase (files in {self.output_path}):"]
+        for phase, profile in self._profiles.items():
+            try:
+                stats = pstats.Stats(profile).stats  # type: ignore
+            except TypeError:
+                # The phase has no profiled calls.
+                continue
+            total = sum(row[2] for row in stats.values())
+            lines.append(f"{phase}: {total:.3f} s")
+            ordered = sorted(stats.items(), key=lambda item: item[1][2],
+                             reverse=True)
+            lines.extend(f"  {row[2]:9.4f} s  {_function_name(function)}"
+                         for function, row in ordered[:self.top])
+        return "\n".join(lines)
+
+    def _memory_summary(self, top: Optional[int]) -> str:
+        """Gets the peaks and the top allocating lines of the phases."""
+        lines = [f"Memory profile by phase (files in {self.output_path}):"]
+        for phase, peak in self._peaks.items():
+            lines.append(f"{phase}: peak {peak / 1024:.1f} KiB")
+            allocations = self._allocations.get(phase, Counter())
+            lines.extend(f"  {size / 1024:9.1f} KiB  {line}"
+                         for line, size in allocations.most_common(top))
+        return "\n".join(lines)
@@ -0,0 +1,261 @@
+# Copyright 2022 Aleksey Ustinov.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied. See the License for the specific language governing
+# permissions and limitations under the License.
+"""This module paces the requests sent to TradingView.
+
+Every budget (sign in, Websocket connection, series creation) is
+a token bucket. The bucket keeps the time when the next token is free
+(the theoretical arrival time), so a request reserves its slot under
+a short lock and sleeps outside the lock. The state is kept in shared
+memory, so the same bucket paces the threads, the asyncio tasks and
+the worker processes forked after the bucket was created.
+
+The rate is adaptive (additive increase, multiplicative decrease): it
+is decreased on disconnects and error packets and is slowly increased
+back to the maximal rate on successful requests.
+
+Classes:
+    - TokenBucket: The adaptive token bucket.
+    - RateLimiter: The token buckets by the budget name.
+"""
+# Import the standard libraries.
+import asyncio
+import logging
+import multiprocessing
+import time
+from typing import Dict, Mapping, Optional, Tuple
+
+# Import the local/project packages and modules.
+from fia.constants import RATE_LIMITS
+
+
+# Set the module logger.
+logger = logging.getLogger(__name__)
+
+# The error packets received over Websocket by the budget name. The
+# rate of the budget is decreased when the raw data includes them.
+ERROR_PACKETS: Dict[str, Tuple[str, ...]] = {
+    "connect": ("critical_error", "protocol_error"),
+    "series": ("series_error", "symbol_error")
+}
+
+# The positions of the values in the shared state of the bucket.
+_TAT, _RATE, _ACQUIRED, _TOTAL_WAIT, _MAX_WAIT, _WAITING = range(6)
+
+
+class TokenBucket:
+    """The adaptive token bucket.
+
+    Attributes:
+        rate: The maximal number of tokens per second.
+        burst: The number of tokens that can be taken without waiting.
+        min_rate: The minimal rate after the decreases.
+        increase: The rate increase on success as a share of rate.
+        decrease: The rate multiplier on a failure.
+
+    Methods:
+        acquire(tokens): Waits for the tokens.
+        acquire_async(tokens): Waits for the tokens in asyncio.
+        penalize(): Decreases the current rate.
+        reward(): Increases the current rate.
+        metrics(): Gets the queue-wait metrics.
+    """
+    def __init__(self,
+                 rate: float,
+                 burst: int = 1,
+                 min_rate: Optional[float] = None,
+                 increase: float = 0.1,
+                 decrease: float = 0.5) -> None:
+        """Class constructor.
+        See attributes in the class level docstring.
+        """
+        if rate <= 0 or burst < 1:
+            logger.error("The rate has to be positive and the burst has to "
+                         "be at least 1.",
+                         stack_info=True)
+            raise SystemExit("The rate has to be positive and the burst has "
+                             "to be at least 1.")
+        self.rate = rate
+        self.burst = burst
+        self.min_rate = min_rate if min_rate is not None else rate / 16
+        self.increase = increase
+        self.decrease = decrease
+        self._lock = multiprocessing.Lock()
+        self._state = multiprocessing.RawArray(
+            "d", [0.0, rate, 0.0, 0.0, 0.0, 0.0]
+        )
+
+    @property
+    def current_rate(self) -> float:
+        """The current rate after the adaptive changes."""
+        return self._state[_RATE]
+
+    def _reserve(self, tokens: int) -> float:
+        """Reserves the tokens and returns the waiting time."""
+        with self._lock:
+            now = time.monotonic()
+            interval = 1 / self._state[_RATE]
+            # The reserved tokens are emitted by tat. The request waits
+            # only if more than burst tokens are reserved ahead of now.
+            tat = max(self._state[_TAT], now) + tokens * interval
+            self._state[_TAT] = tat
+            wait = max(0.0, tat - now - self.burst * interval)
+            self._state[_ACQUIRED] += 1
+            self._state[_TOTAL_WAIT] += wait
+            self._state[_MAX_WAIT] = max(self._state[_MAX_WAIT], wait)
+            if wait > 0:
+                self._state[_WAITING] += 1
+        return wait
+
+    def _release(self, wait: float) -> None:
+        """Marks the end of the waiting."""
+        if wait > 0:
+            with self._lock:
+                self._state[_WAITING] -= 1
+
+    def acquire(self, tokens: int = 1) -> float:
+        """Waits for the tokens.
+
+        Args:
+            tokens: The number of tokens.
+
+        Returns:
+            wait: The waiting time in seconds.
+        """
+        wait = self._reserve(tokens)
+        try:
+            time.sleep(wait)
+        finally:
+            self._release(wait)
+        return wait
+
+    async def acquire_async(self, tokens: int = 1) -> float:
+        """Waits for the tokens without blocking the event loop.
+
+        Args:
+            tokens: The number of tokens.
+
+        Returns:
+            wait: The waiting time in seconds.
+        """
+        wait = self._reserve(tokens)
+        try:
+            await asyncio.sleep(wait)
+        finally:
+            self._release(wait)
+        return wait
+
+    def penalize(self) -> None:
+        """Decreases the current rate (a disconnect or an error)."""
+        with self._lock:
+            self._state[_RATE] = max(self.min_rate,
+                                     self._state[_RATE] * self.decrease)
+            rate = self._state[_RATE]
+        logger.warning(f"The rate was decreased to {rate:.3f} per second.")
+
+    def reward(self) -> None:
+        """Increases the current rate up to the maximal rate."""
+        with self._lock:
+            self._state[_RATE] = min(self.rate,
+                                     self._state[_RATE]
+                                     + self.rate * self.increase)
+
+    def metrics(self) -> Dict[str, float]:
+        """Gets the queue-wait metrics.
+
+        Returns:
+            metrics: The number of acquired slots, the total, mean and
+                maximal waiting time in seconds, the number of waiting
+                requests and the current rate.
+        """
+        with self._lock:
+            acquired = self._state[_ACQUIRED]
+            return {
+                "acquired": acquired,
+                "total_wait": self._state[_TOTAL_WAIT],
+                "mean_wait": (self._state[_TOTAL_WAIT] / acquired
+                              if acquired else 0.0),
+                "max_wait": self._state[_MAX_WAIT],
+                "waiting": self._state[_WAITING],
+                "rate": self._state[_RATE],
+            }
+
+
+class RateLimiter:
+    """The token buckets by the budget name.
+
+    The default budgets are "sign_in", "connect" and "series" (see
+    RATE_LIMITS in constants.py).
+
+    Attributes:
+        buckets: The token buckets by the budget name.
+
+    Methods:
+        acquire(name): Waits for a token of the budget.
+        acquire_async(name): Waits for a token in asyncio.
+        penalize(name): Decreases the rate of the budget.
+        reward(name): Increases the rate of the budget.
+        observe(raw_data): Changes the rates by the error packets.
+        metrics(): Gets the queue-wait metrics of all budgets.
+    """
+    def __init__(self,
+                 limits: Optional[Mapping[str, Tuple[float, int]]] = None
+                 ) -> None:
+        """Class constructor.
+
+        Args:
+            limits: The rate (per second) and the burst by the budget
+                name (RATE_LIMITS by default).
+        """
+        if limits is None:
+            limits = RATE_LIMITS
+        self.buckets = {name: TokenBucket(rate, burst)
+                        for name, (rate, burst) in limits.items()}
+
+    def acquire(self, name: str) -> float:
+        """Waits for a token of the budget."""
+        wait = self.buckets[name].acquire()
+        if wait > 0:
+            logger.debug(f"The {name} request waited {wait:.3f} s.")
+        return wait
+
+    async def acquire_async(self, name: str) -> float:
+        """Waits for a token of the budget in asyncio."""
+        return await self.buckets[name].acquire_async()
+
+    def penalize(self, name: str) -> None:
+        """Decreases the rate of the budget."""
+        self.buckets[name].penalize()
+
+    def reward(self, name: str) -> None:
+        """Increases the rate of the budget."""
+        self.buckets[name].reward()
+
+    def observe(self, raw_data: str) -> None:
+        """Changes the rates by the error packets in the raw data.
+
+        Args:
+            raw_data: The raw data collected over Websocket connection.
+        """
+        for name, packets in ERROR_PACKETS.items():
+            if name not in self.buckets:
+                continue
+            if any(f'"m":"{packet}"' in raw_data for packet in packets):
+                self.penalize(name)
+            else:
+                self.reward(name)
+
+    def metrics(self) -> Dict[str, Dict[str, float]]:
+        """Gets the queue-wait metrics of all budgets."""
+        return {name: bucket.metrics()
+                for name, bucket in self.buckets.items()}
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+# Copyright 2022 Aleksey Ustinov.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied. See the License for the specific language governing
+"""This module receives the messages of an open Websocket connection.
+
+The messages are received until the awaited message ("symbol_resolved",
+"series_completed") while the heartbeats are sent back to keep the
+connection alive. The receiving stops if the connection is closed,
+nothing is received in WS_TIMEOUT seconds (the timeout of the
+connection) or TradingView sends symbol_error or series_error, so a
+silent server or an invalid symbol cannot hold the connection open.
+AuthRejected is raised if TradingView rejects the authorization token,
+so the collector can forget the token and sign in again.
+
+This module is a part of the fia package and should not be used
+separately.
+
+Classes:
+    - AuthRejected: The authorization token was rejected.
+
+Functions:
+    - stop_on_error: Raises if the frame has an error message.
+    - receive_until: Receives the JSON messages until the message with
+      the name.
+    - receive_symbol_info: Receives the symbol_resolved payload.
+    - receive_series: Receives the messages until series_completed.
+    - receive_chunk: Receives the bars until series_completed.
+"""
+# Import the standard libraries.
+import json
+import logging
+from typing import Any, Dict, List
+
+# Import the third party libraries.
+import websocket
+
+# Import the local/project packages and modules.
+from fia import metrics
+from fia.constants import AUTH_ERRORS, SERIES_ERRORS, WS_TIMEOUT
+from fia.messages import get_series_bars, split_messages
+from fia.tracing import Tracer
+
+
+# Set the module logger.
+logger = logging.getLogger(__name__)
+
+
+class AuthRejected(SystemExit):
+    """The authorization token was rejected by TradingView."""
+
+
+def stop_on_error(result: str, tracer: Tracer) -> None:
+    """Raises if TradingView sent an error message.
+
+    Args:
+        result: The received frame.
+        tracer: The tracer of the frames (dumped before the raise).
+
+    Raises:
+        AuthRejected: If the authorization token was rejected.
+        SystemExit: If the frame has symbol_error or series_error.
+    """
+    for m in AUTH_ERRORS + SERIES_ERRORS:
+        if f'"m":"{m}"' in result:
+            tracer.dump(f"TradingView sent {m}.")
+            logger.error(f"TradingView sent {m}: {result}", stack_info=True)
+            if m in AUTH_ERRORS:
+                raise AuthRejected(f"TradingView sent {m}: {result}")
+            raise SystemExit(f"TradingView sent {m}: {result}")
+
+
+def receive_until(ws: websocket.WebSocket, m: str,
+                  tracer: Tracer) -> List[Dict[str, Any]]:
+    """Receives the JSON messages until the message with the name.
+
+    The heartbeats are sent back to keep the connection alive. If the
+    connection is closed or nothing is received in WS_TIMEOUT seconds,
+    the received messages are returned.
+
+    Args:
+        ws: The websocket connection.
+        m: The name of the last message ("series_completed", etc.)
+        tracer: The tracer of the received frames.
+
+    Returns:
+        messages: The received messages including the last one.
+
+    Raises:
+        SystemExit: If TradingView sent an error message (see
+            stop_on_error).
+    """
+    messages: List[Dict[str, Any]] = []
+    while True:
+        try:
+            result = ws.recv()
+        except websocket.WebSocketTimeoutException:
+            logger.warning(f"Nothing was received in {WS_TIMEOUT} s.")
+            return messages
+        except websocket.WebSocketConnectionClosedException:
+            logger.warning("The remote host closed the Websocket "
+                           "connection or a network error happened.")
+            return messages
+        tracer.received(result)
+        metrics.inc("fia_received_bytes_total", len(result))
+        metrics.inc("fia_received_packets_total")
+        stop_on_error(result, tracer)
+        for message in split_messages(result):
+            if message.startswith("~h~"):
+                ws.send(f"~m~{len(message)}~m~{message}")
+                continue
+            messages.append(json.loads(message))
+            metrics.inc("fia_messages_total",
+                        type=str(messages[-1].get("m")))
+            if messages[-1].get("m") == m:
+                return messages
+
+
+def receive_symbol_info(ws: websocket.WebSocket,
+                        tracer: Tracer) -> Dict[str, Any]:
+    """Receives the symbol_resolved payload.
+
+    Raises:
+        SystemExit: If the connection is closed before the
+            symbol_resolved message.
+    """
+    messages = receive_until(ws, "symbol_resolved", tracer)
+    if not messages or messages[-1].get("m") != "symbol_resolved":
+        logger.error("There is no symbol_resolved message in the raw data.",
+                     stack_info=True)
+        raise SystemExit("There is no symbol_resolved message in the raw "
+                         "data.")
+    symbol_info: Dict[str, Any] = messages[-1]["p"][2]
+    return symbol_info
+
+
+def receive_series(ws: websocket.WebSocket,
+                   tracer: Tracer) -> List[Dict[str, Any]]:
+    """Receives the messages until the series_completed message.
+
+    Raises:
+        SystemExit: If the connection is closed before the
+            series_completed message.
+    """
+    messages = receive_until(ws, "series_completed", tracer)
+    if not messages or messages[-1].get("m") != "series_completed":
+        tracer.dump("The connection was closed before the "
+                    "series_completed message.")
+        logger.error("The connection was closed before the "
+                     "series_completed message.",
+                     stack_info=True)
+        raise SystemExit("The connection was closed before the "
+                         "series_completed message.")
+    return messages
+
+
+def receive_chunk(ws: websocket.WebSocket,
+                  tracer: Tracer) -> List[List[float]]:
+    """Receives the bars until the series_completed message.
+
+    Raises:
+        SystemExit: If the connection is closed before the
+            series_completed message.
+    """
+    return [bar
+            for message in receive_series(ws, tracer)
+            if message.get("m") == "timescale_update"
+            for bar in get_series_bars(message)]
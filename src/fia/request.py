@@ -0,0 +1,51 @@
+# Copyright 2022 Aleksey Ustinov.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied. See the License for the specific language governing
+# permissions and limitations under the License.
+"""The module includes the immutable request of the market data.
+
+This module is a part of the fia package and should not be used
+separately.
+
+Classes:
+    - TvRequest: The immutable request of the market data.
+"""
+from typing import NamedTuple
+
+from fia.constants import Frame
+
+
+class TvRequest(NamedTuple):
+    """The immutable request of the market data.
+
+    The request does not include the username and the password, so the
+    identical requests of different users are equal and can be
+    deduplicated.
+
+    Attributes:
+        exchange: An exchange (NYSE, CME, etc.).
+        ticker_sym: A ticker symbol (AAPL, BTC, etc.)
+        currency: A currency (USD, EUR, etc.).
+        frame: A bar timeframe as a member of enum Frame.
+        bars: A number of bars.
+    """
+    exchange: str
+    ticker_sym: str
+    currency: str
+    frame: Frame
+    bars: int
+
+    @property
+    def key(self) -> str:
+        """The string key of the request ("NASDAQ:AAPL:USD:DAY:50")."""
+        return (f"{self.exchange}:{self.ticker_sym}:{self.currency}:"
+                f"{self.frame.name}:{self.bars}")
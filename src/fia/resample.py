@@ -0,0 +1,373 @@
+# Copyright 2022 Aleksey Ustinov.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied. See the License for the specific language governing
+# permissions and limitations under the License.
+"""This module resamples the market data to higher timeframes.
+
+It derives the bars of a higher timeframe (Frame.MIN5, Frame.HOUR1,
+Frame.DAY, Frame.WEEK, etc.) from the stored bars of a lower timeframe
+(usually Frame.MIN1), so every timeframe does not have to be collected
+separately.
+
+The bars are aligned to the trading session reported by TradingView in
+the symbol_resolved message ("session", "timezone",
+"session_holidays"):
+    - Intraday bars start at the session open (09:30, 10:30, etc. for
+      NASDAQ with Frame.HOUR1).
+    - Daily bars include the whole trading day. If the session starts
+      on the previous calendar day (CME: 17:00-16:00), the bars after
+      the session open belong to the next trading day.
+    - Weekly and monthly bars include the trading days of the week and
+      the month.
+    - The bars that fall on holidays or days without trading belong to
+      the next trading day.
+
+Classes:
+    - Session: The trading session of a symbol.
+
+Functions:
+    - bucket_keys: Gets the opening time of the higher timeframe bar
+      for every bar.
+    - resample_bars: Resamples the market data to a higher timeframe.
+"""
+# Import the standard libraries.
+import logging
+from typing import Any, Mapping, NamedTuple, Optional
+
+# Import the third party libraries.
+import numpy as np
+import pandas as pd
+
+# Import the local/project packages and modules.
+from fia.constants import COLUMNS, FRAME_SECONDS, Frame
+
+
+# Set the module logger.
+logger = logging.getLogger(__name__)
+
+# Numpy weekmask order (Monday first) and TradingView day numbers
+# (1 - Sunday, 2 - Monday, ..., 7 - Saturday).
+_TV_DAYS = "2345671"
+# The number of the trading days searched for the next session open.
+_NEXT_OPEN_DAYS = 16
+
+
+class Session(NamedTuple):
+    """The trading session of a symbol.
+
+    Attributes:
+        start: The session open in minutes after local midnight.
+        end: The session close in minutes after local midnight.
+        weekmask: The trading days in numpy format ("1111100" - from
+            Monday to Friday).
+        holidays: The holidays as numpy datetime64[D] array.
+        timezone: The exchange timezone ("America/New_York", etc.)
+    """
+    start: int
+    end: int
+    weekmask: str
+    holidays: np.ndarray
+    timezone: str
+
+    @property
+    def overnight(self) -> bool:
+        """Checks that the session starts on the previous day."""
+        return self.start >= self.end and self.start != 0
+
+    @classmethod
+    def from_symbol_info(cls,
+                         symbol_info: Optional[Mapping[str, Any]] = None
+                         ) -> "Session":
+        """Creates the session from the symbol_resolved payload.
+
+        The 24x7 session in the UTC timezone is used when the
+        symbol_info is None.
+
+        Args:
+            symbol_info: The symbol_resolved payload (see
+                fia.messages.get_symbol_resolved).
+
+        Returns:
+            session: The trading session.
+        """
+        symbol_info = symbol_info or {}
+        # The session is similar to "0930-1600", "1700-1600:23456",
+        # "0930-1200,1300-1600:23456|0930-1300:6" or "24x7". Only the
+        # first part before "|" describes the regular trading days.
+        session = str(symbol_info.get("session", "24x7"))
+        session = session.split("|", maxsplit=1)[0]
+        if session == "24x7":
+            start, end, days = 0, 0, "1234567"
+        else:
+            ranges, _, days = session.partition(":")
+            ranges_list = ranges.split(",")
+            start = _to_minutes(ranges_list[0].split("-")[0])
+            end = _to_minutes(ranges_list[-1].split("-")[1])
+            days = days or "23456"
+        weekmask = "".join("1" if day in days else "0" for day in _TV_DAYS)
+        holidays_str = symbol_info.get("session_holidays", "")
+        holidays = np.array(
+            [f"{h[:4]}-{h[4:6]}-{h[6:8]}"
+             for h in holidays_str.split(",") if h],
+            dtype="datetime64[D]"
+        )
+        return cls(start=start,
+                   end=end,
+                   weekmask=weekmask,
+                   holidays=holidays,
+                   timezone=symbol_info.get("timezone", "Etc/UTC"))
+
+    def trading_dates(self, local: np.ndarray) -> np.ndarray:
+        """Gets the trading dates of the bars.
+
+        Args:
+            local: The local exchange time of the bars as numpy
+                datetime64[ns] array.
+
+        Returns:
+            dates: The trading dates as numpy datetime64[D] array.
+        """
+        if self.overnight:
+            shift = np.timedelta64(self.start, "m")
+            dates = (local - shift).astype("datetime64[D]") + 1
+        else:
+            dates = local.astype("datetime64[D]")
+        return np.busday_offset(dates, 0,
+                                roll="forward",
+                                weekmask=self.weekmask,
+                                holidays=self.holidays)
+
+    def session_open(self, dates: np.ndarray) -> np.ndarray:
+        """Gets the session open for the trading dates.
+
+        Args:
+            dates: The trading dates as numpy datetime64[D] array.
+
+        Returns:
+            session_open: The UTC session open as int64 nanoseconds.
+        """
+        local = (dates.astype("datetime64[ns]")
+                 + np.timedelta64(self.start, "m"))
+        if self.overnight:
+            local = local - np.timedelta64(1, "D")
+        utc = pd.DatetimeIndex(local).tz_localize(
+            self.timezone,
+            ambiguous=np.zeros(len(local), dtype=bool),
+            nonexistent="shift_forward"
+        )
+        return utc.asi8
+
+    def next_open(self, time: int) -> int:
+        """Gets the first time when the session is open.
+
+        Args:
+            time: The UTC time as int64 nanoseconds.
+
+        Returns:
+            time: The UTC time as int64 nanoseconds (the same time if
+                the session is open, the next session open otherwise).
+        """
+        local = (
+            pd.DatetimeIndex(np.array([time], dtype="datetime64[ns]"))
+            .tz_localize("UTC")
+            .tz_convert(self.timezone)
+            .tz_localize(None)
+            .to_numpy()
+        )
+        # The session of the previous day can still be open, the
+        # holidays can take more than a week.
+        first = local.astype("datetime64[D]")[0] - 1
+        dates = np.busday_offset(first, np.arange(_NEXT_OPEN_DAYS),
+                                 roll="forward",
+                                 weekmask=self.weekmask,
+                                 holidays=self.holidays)
+        opens = self.session_open(dates)
+        length = ((self.end - self.start) % (24 * 60) or 24 * 60) * 60 * 10**9
+        after = np.nonzero(opens + length > time)[0]
+        return max(int(opens[after[0]]), time) if len(after) else time
+
+    def date_end(self, time: int) -> int:
+        """Gets the next time when the trading date can change.
+
+        The trading dates (see trading_dates) of all times from the
+        time till the returned time are the same.
+
+        Args:
+            time: The UTC time as int64 nanoseconds.
+
+        Returns:
+            end: The UTC time as int64 nanoseconds (the next local
+                midnight or the next session open of the overnight
+                session).
+        """
+        local = (
+            pd.DatetimeIndex(np.array([time], dtype="datetime64[ns]"))
+            .tz_localize("UTC")
+            .tz_convert(self.timezone)
+            .tz_localize(None)
+            .to_numpy()
+        )
+        shift = np.timedelta64(self.start if self.overnight else 0, "m")
+        boundary = ((local - shift).astype("datetime64[D]") + 1
+                    ).astype("datetime64[ns]") + shift
+        # The earlier UTC time is taken around the DST transitions, so
+        # the end is never later than the real change.
+        utc = pd.DatetimeIndex(boundary).tz_localize(
+            self.timezone,
+            ambiguous=np.ones(len(boundary), dtype=bool),
+            nonexistent="shift_backward"
+        )
+        return int(utc.asi8[0])
+
+    def count_bars(self, frame: Frame, start: int, end: int) -> int:
+        """Counts the bars that open between two times.
+
+        The bars are counted by the session calendar (the trading days,
+        the holidays and the session hours), so it is an estimate: the
+        breaks inside the session and the days without trading that
+        are not in session_holidays are counted too.
+
+        Args:
+            frame: A timeframe as a member of enum Frame.
+            start: The UTC start time as int64 nanoseconds.
+            end: The UTC end time as int64 nanoseconds.
+
+        Returns:
+            count: The number of bars.
+        """
+        if end < start:
+            return 0
+        local = (
+            pd.DatetimeIndex(np.array([start, end], dtype="datetime64[ns]"))
+            .tz_localize("UTC")
+            .tz_convert(self.timezone)
+            .tz_localize(None)
+            .to_numpy()
+        )
+        first, last = self.trading_dates(local)
+        dates = np.arange(first, last + 1)
+        dates = dates[np.is_busday(dates, weekmask=self.weekmask,
+                                   holidays=self.holidays)]
+        if frame in (Frame.WEEK, Frame.MONTH):
+            if frame is Frame.WEEK:
+                weekday = (dates.astype("int64") + 3) % 7
+                periods = dates - weekday.astype("timedelta64[D]")
+            else:
+                periods = dates.astype("datetime64[M]")
+            return len(np.unique(periods))
+        opens = self.session_open(dates)
+        if frame is not Frame.DAY:
+            step = FRAME_SECONDS[frame] * 10**9
+            length = ((self.end - self.start) % (24 * 60) or 24 * 60) * 60
+            per_day = -(-length * 10**9 // step)
+            opens = (opens[:, None] + np.arange(per_day) * step).ravel()
+        return int(np.count_nonzero((opens >= start) & (opens <= end)))
+
+
+def _to_minutes(hhmm: str) -> int:
+    """Converts "HHMM" to minutes after midnight."""
+    return int(hhmm[:2]) * 60 + int(hhmm[2:4])
+
+
+def bucket_keys(utc: np.ndarray, frame: Frame,
+                session: Session) -> np.ndarray:
+    """Gets the opening time of the higher timeframe bar for every bar.
+
+    Args:
+        utc: The UTC time of the bars as int64 nanoseconds.
+        frame: A higher timeframe as a member of enum Frame.
+        session: The trading session.
+
+    Returns:
+        keys: The UTC opening time of the higher timeframe bars as
+            int64 nanoseconds.
+    """
+    local = (
+        pd.DatetimeIndex(utc.astype("datetime64[ns]"))
+        .tz_localize("UTC")
+        .tz_convert(session.timezone)
+        .tz_localize(None)
+        .to_numpy()
+    )
+    dates = session.trading_dates(local)
+    # The session open is calculated only once for every trading day.
+    unique_dates, inverse = np.unique(dates, return_inverse=True)
+    if frame is Frame.WEEK:
+        # Numpy weeks start on Thursday (1970-01-01), shift them to
+        # Monday.
+        weekday = (unique_dates.astype("int64") + 3) % 7
+        unique_dates = unique_dates - weekday.astype("timedelta64[D]")
+    elif frame is Frame.MONTH:
+        unique_dates = (unique_dates.astype("datetime64[M]")
+                        .astype("datetime64[D]"))
+    anchors = session.session_open(unique_dates)[inverse]
+    if frame in (Frame.DAY, Frame.WEEK, Frame.MONTH):
+        return anchors
+    step = FRAME_SECONDS[frame] * 10**9
+    return anchors + (utc - anchors) // step * step
+
+
+def resample_bars(df: pd.DataFrame,
+                  frame: Frame,
+                  symbol_info: Optional[Mapping[str, Any]] = None
+                  ) -> pd.DataFrame:
+    """Resamples the market data to a higher timeframe.
+
+    The bars are grouped by the opening time of the higher timeframe
+    bar and aggregated without loops over the rows:
+        - Open: the first open price.
+        - High: the highest price.
+        - Low: the lowest price.
+        - Close: the last close price.
+        - Volume: the sum of volumes.
+
+    Args:
+        df: The market data returned by TvDataCollector.get_pandas_data
+            sorted by DateTime.
+        frame: A higher timeframe as a member of enum Frame.
+        symbol_info: The symbol_resolved payload (optional), see
+            fia.messages.get_symbol_resolved. The 24x7 session in the
+            UTC timezone is used by default.
+
+    Returns:
+        df: The resampled market data with the same columns and the
+            same timezone of the DateTime column.
+    """
+    session = Session.from_symbol_info(symbol_info)
+    if df.empty:
+        return df.copy()
+    tz = df["DateTime"].dt.tz
+    utc = df["DateTime"].dt.tz_convert("UTC").dt.tz_localize(None)
+    keys = bucket_keys(
+        utc.to_numpy().astype("datetime64[ns]").astype("int64"),
+        frame,
+        session
+    )
+    # The bars are sorted, so every group is a contiguous slice.
+    starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+    ends = np.r_[starts[1:], len(keys)] - 1
+    values = df[list(COLUMNS[1:])].to_numpy(dtype="float64")
+    resampled = pd.DataFrame({
+        "DateTime": (
+            pd.to_datetime(keys[starts], unit="ns")
+            .tz_localize("UTC")
+            .tz_convert(tz)
+        ),
+        "Open": values[starts, 0],
+        "High": np.maximum.reduceat(values[:, 1], starts),
+        "Low": np.minimum.reduceat(values[:, 2], starts),
+        "Close": values[ends, 3],
+        "Volume": np.add.reduceat(values[:, 4], starts)
+    })
+    logger.info(f"The market data was resampled to {frame.name}: "
+                f"{len(df)} -> {len(resampled)} bars.")
+    return resampled
@@ -0,0 +1,160 @@
+# Copyright 2022 Aleksey Ustinov.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied. See the License for the specific language governing
+# permissions and limitations under the License.
+"""This module caches the raw data of the requests in the process.
+
+The raw data is kept by the user and the request without the number of
+bars, so a cached result with more bars answers the requests with
+fewer bars (the last bars are sliced).
+
+A result is fresh until the close of its last bar (the bar_close_time
+of the timescale_update message): a DAY result is fresh until the
+session close, a MIN1 result expires within the minute. If the close
+time is unknown or passed (for example, the market is closed), the
+result is fresh for the bar duration of the frame.
+
+Usage:
+    TvDataCollector.result_cache = ResultCache()
+
+Classes:
+    - ResultCache: The TTL and LRU cache of the raw data.
+"""
+# Import the standard libraries.
+import logging
+import threading
+import time
+from typing import Dict, Hashable, Optional, Tuple
+
+# Import the local/project packages and modules.
+from fia.constants import FRAME_SECONDS, MONTH_SECONDS, RESULT_CACHE_SIZE
+from fia.messages import (RawData, find_message, get_bar_close_time,
+                          slice_raw_data)
+from fia.request import TvRequest
+from fia.utils.lru_cache import LRUCache
+
+
+# Set the module logger.
+logger = logging.getLogger(__name__)
+
+
+class ResultCache:
+    """The TTL and LRU cache of the raw data.
+
+    Attributes:
+        maxsize: The maximal number of cached results.
+
+    Methods:
+        get(username, request): Gets the fresh raw data or None.
+        put(username, request, raw_data): Caches the raw data.
+        expires(request, raw_data): Gets the expiration time.
+        clear(): Removes all results.
+        metrics(): Gets the counters.
+    """
+    def __init__(self, maxsize: int = RESULT_CACHE_SIZE) -> None:
+        """Class constructor.
+        See attributes in the class level docstring.
+        """
+        self.maxsize = maxsize
+        self._cache = LRUCache(maxsize)
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "misses": 0, "sliced": 0}
+
+    @staticmethod
+    def _key(username: str, request: TvRequest) -> Hashable:
+        """Gets the key of the request without the number of bars."""
+        return username, request._replace(bars=0)
+
+    def _count(self, name: str) -> None:
+        """Increases the counter."""
+        with self._lock:
+            self._counters[name] += 1
+
+    def get(self, username: str, request: TvRequest) -> Optional[RawData]:
+        """Gets the fresh raw data of the request.
+
+        Args:
+            username: A Trading View username.
+            request: The request of the market data.
+
+        Returns:
+            raw_data: The cached raw data or the last request.bars of
+                the cached raw data with more bars. None if there is no
+                fresh result with enough bars.
+        """
+        entry: Optional[Tuple[int, RawData]] = self._cache.get(
+            self._key(username, request)
+        )
+        if entry is None or entry[0] < request.bars:
+            self._count("misses")
+            return None
+        self._count("hits")
+        bars, raw_data = entry
+        if bars == request.bars:
+            return raw_data
+        self._count("sliced")
+        return RawData(slice_raw_data(raw_data, request.bars))
+
+    def put(self, username: str, request: TvRequest, raw_data: str) -> None:
+        """Caches the raw data of the request.
+
+        The incomplete raw data (see RawData) is not cached.
+
+        Args:
+            username: A Trading View username.
+            request: The request of the market data.
+            raw_data: The raw data.
+        """
+        if not getattr(raw_data, "complete", True):
+            return
+        self._cache.put(self._key(username, request),
+                        (request.bars, RawData(raw_data)),
+                        self.expires(request, raw_data))
+
+    @staticmethod
+    def expires(request: TvRequest, raw_data: str) -> float:
+        """Gets the expiration time of the raw data.
+
+        Args:
+            request: The request of the market data.
+            raw_data: The raw data.
+
+        Returns:
+            expires: The close time of the last bar or the current
+                time plus the bar duration as Unix time in seconds.
+        """
+        now = time.time()
+        message = find_message(raw_data, "timescale_update")
+        bar_close_time = (None if message is None
+                          else get_bar_close_time(message))
+        if bar_close_time is not None and bar_close_time > now:
+            return bar_close_time
+        return now + FRAME_SECONDS.get(request.frame, MONTH_SECONDS)
+
+    def clear(self) -> None:
+        """Removes all results."""
+        self._cache.clear()
+
+    def metrics(self) -> Dict[str, int]:
+        """Gets the counters.
+
+        Returns:
+            metrics: The number of hits, misses, sliced hits (served
+                from a result with more bars), evictions, expirations
+                and cached results.
+        """
+        cache = self._cache.metrics()
+        with self._lock:
+            return {**self._counters,
+                    "evictions": cache["evictions"],
+                    "expirations": cache["expirations"],
+                    "size": cache["size"]}
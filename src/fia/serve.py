@@ -0,0 +1,269 @@
+# Copyright 2022 Aleksey Ustinov.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied. See the License for the specific language governing
+# permissions and limitations under the License.
+"""This module refreshes a watchlist just after the bar close times.
+
+The watchlist has the same format as the manifest of "fia batch" (see
+fia.batch), the bars field is the number of bars of the first refresh.
+
+Every symbol and frame is refreshed just after the close of its last
+bar (the bar_close_time of the timescale_update message), so only the
+finished bars are stored. If the last bar is already closed (the
+market is closed), the refresh waits for the next open of the trading
+session of the symbol (see fia.resample.Session). The refreshes are
+kept in a priority queue by the due time. The process sleeps until the
+next due refresh and answers the heartbeats of the open connection
+while it waits.
+
+All refreshes use one Websocket connection and one authorization
+token. The connection is created again only if it is closed or a
+refresh failed, the token is requested again only if the sign in
+failed or TradingView rejected it. Every refresh requests only the bars
+since the last stored bar and appends the new finished bars to the
+BarStore of the symbol and frame:
+    output/AAPL_NASDAQ_DAY/DateTime.f8
+    ...
+
+The refreshes run one by one over the shared connection, so a slow
+refresh delays the other refreshes due at the same time (up to
+WS_TIMEOUT seconds if TradingView does not answer). A failed refresh
+is retried after RETRY_BACKOFF seconds, the delay is doubled after
+every failure of the same request up to SERVE_BACKOFF_MAX seconds, and
+SERVE_FAILURES failures in a row are logged as errors.
+
+Usage:
+    fia serve watchlist.toml -o ~/fia_output --delay 2
+
+Classes:
+    - Scheduler: Refreshes the watchlist after the bar close times.
+
+Functions:
+    - serve_main: The entry point of the "fia serve" command.
+"""
+# Import the standard libraries.
+import argparse
+import heapq
+import logging
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+# Import the third party libraries.
+import numpy as np
+import websocket
+
+# Import the local/project packages and modules.
+from fia import metrics
+from fia.batch import read_manifest
+from fia.constants import (COLUMNS, FRAME_SECONDS, MONTH_SECONDS,
+                           OUTPUT_PATH, RETRY_BACKOFF, SERVE_BACKOFF_MAX,
+                           SERVE_DELAY, SERVE_FAILURES, WS_TIMEOUT)
+from fia.main import SignInFailed, TvDataCollector
+from fia.messages import split_messages
+from fia.receiving import AuthRejected
+from fia.request import TvRequest
+from fia.resample import Session
+from fia.store import BarStore, store_path
+
+
+# Set the module logger.
+logger = logging.getLogger(__name__)
+
+
+class Scheduler:
+    """Refreshes the watchlist after the bar close times.
+
+    Attributes:
+        tvdc: The collector used for the sign in and the connection.
+        requests: The watchlist.
+        output_path: The folder of the stores.
+        delay: The delay after the bar close in seconds.
+
+    Methods:
+        store(request): Gets the store of the request.
+        run(cycles): Runs the refreshes.
+    """
+    def __init__(self,
+                 tvdc: TvDataCollector,
+                 requests: List[TvRequest],
+                 output_path: str = OUTPUT_PATH,
+                 delay: float = SERVE_DELAY) -> None:
+        """Class constructor.
+        See attributes in the class level docstring.
+        """
+        self.tvdc = tvdc
+        self.requests = list(dict.fromkeys(requests))
+        self.output_path = output_path
+        self.delay = delay
+        self._ws: Optional[websocket.WebSocket] = None
+        self._auth_token: Optional[str] = None
+        self._last: Dict[TvRequest, float] = {}
+        self._sessions: Dict[TvRequest, Session] = {}
+        # The number of the failed refreshes in a row of every request.
+        self._failures: Dict[TvRequest, int] = {}
+        # The queue of (due time, position, request). The position
+        # keeps the order of the requests with the same due time.
+        self._queue: List[Tuple[float, int, TvRequest]] = [
+            (0.0, pos, request) for pos, request in enumerate(self.requests)
+        ]
+        heapq.heapify(self._queue)
+
+    def store(self, request: TvRequest) -> BarStore:
+        """Gets the store of the request."""
+        return BarStore(store_path(self.output_path, request.exchange,
+                                   request.ticker_sym, request.frame.name))
+
+    def run(self, cycles: Optional[int] = None) -> None:
+        """Runs the refreshes.
+
+        Args:
+            cycles: The number of refreshes (optional). The scheduler
+                runs until it is interrupted by default.
+        """
+        try:
+            while self._queue and (cycles is None or cycles > 0):
+                due, pos, request = heapq.heappop(self._queue)
+                if metrics.get_registry() is not None:
+                    # The refreshes that are due (including this one).
+                    now = time.time()
+                    metrics.set_gauge("fia_queue_depth",
+                                      1 + sum(other <= now for other, _, _
+                                              in self._queue),
+                                      queue="serve")
+                self._idle(due - time.time())
+                heapq.heappush(self._queue,
+                               (self._refresh(request), pos, request))
+                if cycles is not None:
+                    cycles -= 1
+        finally:
+            self._close()
+
+    def _refresh(self, request: TvRequest) -> float:
+        """Refreshes one request and returns the next due time."""
+        store = self.store(request)
+        if request not in self._last:
+            values = store.to_numpy()
+            if len(values):
+                self._last[request] = values[-1, 0]
+        now = time.time()
+        step = FRAME_SECONDS.get(request.frame, MONTH_SECONDS)
+        last = self._last.get(request)
+        update = request
+        if last is not None:
+            # The bars that open from the last stored bar till now.
+            count = int((now - last) // step) + 1
+            update = request._replace(bars=max(2, min(request.bars, count)))
+        try:
+            bars, bar_close_time, symbol_info = self._update(update)
+        # TvDataCollector raises SystemExit on errors. One failed
+        # refresh must not stop the scheduler.
+        # pylint: disable-next=broad-except
+        except (SystemExit, Exception) as e:
+            return now + self._fail(request, e)
+        self._failures.pop(request, None)
+        values = np.array(bars, dtype="float64").reshape(-1, len(COLUMNS))
+        values = values[np.argsort(values[:, 0], kind="stable")]
+        if bar_close_time is not None and bar_close_time > now:
+            # The last bar is not finished yet.
+            values = values[:-1]
+            due = bar_close_time + self.delay
+        else:
+            due = self._next_open(request, symbol_info, now + step)
+        if last is not None:
+            values = values[values[:, 0] > last]
+        if len(values):
+            store.append(values)
+            self._last[request] = values[-1, 0]
+        logger.info(f"{len(values)} bars of {request.key} were stored, "
+                    f"the next refresh in {due - now:.1f} s.")
+        return due
+
+    def _fail(self, request: TvRequest, error: BaseException) -> float:
+        """Closes the connection and returns the retry delay."""
+        failures = self._failures.get(request, 0) + 1
+        self._failures[request] = failures
+        delay = min(SERVE_BACKOFF_MAX, RETRY_BACKOFF * 2 ** (failures - 1))
+        log = logger.error if failures >= SERVE_FAILURES else logger.warning
+        log(f"The refresh of {request.key} failed {failures} times in a "
+            f"row, the next try in {delay:.1f} s: {error}")
+        self._close()
+        if isinstance(error, (SignInFailed, AuthRejected)):
+            self._auth_token = None
+        return delay
+
+    def _next_open(self, request: TvRequest,
+                   symbol_info: Optional[Dict[str, Any]], due: float) -> float:
+        """Gets the due time of the closed market (the next session
+        open after the due time)."""
+        if symbol_info is not None:
+            self._sessions[request] = Session.from_symbol_info(symbol_info)
+        session = self._sessions.get(request)
+        if session is None:
+            return due
+        next_open = session.next_open(int(due * 10**9)) / 10**9
+        return next_open + self.delay if next_open > due else due
+
+    def _update(self, request: TvRequest
+                ) -> Tuple[List[List[float]], Optional[float],
+                           Optional[Dict[str, Any]]]:
+        """Gets the last bars over the shared connection."""
+        if self._ws is None:
+            self._ws = self.tvdc.connect()
+        if self._auth_token is None:
+            self._auth_token = self.tvdc.get_auth_token()
+        return self.tvdc.get_update(self._ws, request, self._auth_token)
+
+    def _idle(self, seconds: float) -> None:
+        """Waits and answers the heartbeats of the open connection."""
+        deadline = time.time() + seconds
+        while self._ws is not None and time.time() < deadline:
+            self._ws.settimeout(deadline - time.time())
+            try:
+                result = self._ws.recv()
+            except websocket.WebSocketTimeoutException:
+                break
+            except (websocket.WebSocketException, OSError):
+                logger.warning("The idle Websocket connection was closed.")
+                self._close()
+                break
+            for message in split_messages(result):
+                if message.startswith("~h~"):
+                    self._ws.send(f"~m~{len(message)}~m~{message}")
+        if self._ws is not None:
+            self._ws.settimeout(WS_TIMEOUT)
+        time.sleep(max(0.0, deadline - time.time()))
+
+    def _close(self) -> None:
+        """Closes the shared connection (the token is kept)."""
+        if self._ws is not None:
+            self._ws.close()
+        self._ws = None
+
+
+def serve_main(args: argparse.Namespace) -> None:
+    """The entry point of the "fia serve" command.
+
+    Args:
+        args: The arguments parsed by fia.cli_args.parse_serve_args.
+    """
+    requests = read_manifest(args.WATCHLIST)
+    if not requests:
+        logger.error(f"The watchlist {args.WATCHLIST} is empty.")
+        raise SystemExit(f"The watchlist {args.WATCHLIST} is empty.")
+    first = requests[0]
+    tvdc = TvDataCollector(args.USERNAME, args.PASSWORD, first.exchange,
+                           first.ticker_sym, first.currency, first.frame,
+                           first.bars)
+    logger.info(f"{len(requests)} symbols are watched.")
+    if args.METRICS_PORT is not None:
+        metrics.start_http_server(args.METRICS_PORT)
+    Scheduler(tvdc, requests, args.OUTPUT, args.DELAY).run()
@@ -0,0 +1,159 @@
+# Copyright 2022 Aleksey Ustinov.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied. See the License for the specific language governing
+# permissions and limitations under the License.
+"""This module stores the bars on disk in columnar format.
+
+Every column (DateTime in seconds, Open, High, Low, Close, Volume) is
+an append-only file of little-endian float64 values in the store
+folder:
+    store/DateTime.f8
+    store/Open.f8
+    ...
+
+The chunks are appended in any order (for example, the older chunks
+received by get_history are appended after the newer ones), the bars
+are sorted and deduplicated by time when the store is read. The files
+are read over memory mapping.
+
+Classes:
+    - BarStore: The append-only columnar store of bars.
+
+Functions:
+    - store_path: Gets the folder of the store of a symbol and frame.
+"""
+# Import the standard libraries.
+import logging
+import os
+from typing import Tuple
+
+# Import the third party libraries.
+import numpy as np
+import pandas as pd
+
+# Import the local/project packages and modules.
+from fia import metrics
+from fia.constants import COLUMNS
+
+
+# Set the module logger.
+logger = logging.getLogger(__name__)
+
+
+def store_path(output_path: str, exchange: str, ticker_sym: str,
+               frame: str) -> str:
+    """Gets the folder of the store of a symbol and frame.
+
+    Args:
+        output_path: The folder of all stores.
+        exchange: An exchange (NYSE, CME, etc.).
+        ticker_sym: A ticker symbol (AAPL, BTC, etc.)
+        frame: The name of the frame (DAY, MIN1, etc.)
+
+    Returns:
+        path: The folder similar to output_path/AAPL_NASDAQ_DAY.
+    """
+    return os.path.join(output_path, f"{ticker_sym}_{exchange}_{frame}")
+
+
+class BarStore:
+    """The append-only columnar store of bars.
+
+    Attributes:
+        path: The folder of the store (it is created if it does not
+            exist).
+
+    Methods:
+        append(values): Appends a chunk of bars.
+        version(): Gets the number of rows and the modification time.
+        to_numpy(): Gets the sorted unique bars as a (n, 6) array.
+        to_pandas(tz): Gets the sorted unique bars as DataFrame.
+    """
+    def __init__(self, path: str) -> None:
+        """Class constructor.
+        See attributes in the class level docstring.
+        """
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+
+    def _file(self, column: str) -> str:
+        """Gets the file path of a column."""
+        return os.path.join(self.path, f"{column}.f8")
+
+    def __len__(self) -> int:
+        """Gets the number of stored rows (including duplicates)."""
+        sizes = [os.path.getsize(self._file(column))
+                 if os.path.exists(self._file(column)) else 0
+                 for column in COLUMNS]
+        # The columns can have different lengths if the process was
+        # killed during the append. The shortest length is used.
+        return min(sizes) // 8
+
+    def version(self) -> Tuple[int, int]:
+        """Gets the version of the stored bars.
+
+        Returns:
+            version: The number of stored rows and the latest
+                modification time of the files in nanoseconds. The
+                version is changed by every append.
+        """
+        mtimes = [os.stat(self._file(column)).st_mtime_ns
+                  for column in COLUMNS if os.path.exists(self._file(column))]
+        return len(self), max(mtimes, default=0)
+
+    def append(self, values: np.ndarray) -> None:
+        """Appends a chunk of bars.
+
+        Args:
+            values: The bars as a (n, 6) array (DateTime in seconds,
+                Open, High, Low, Close, Volume).
+        """
+        values = np.asarray(values, dtype="<f8").reshape(-1, len(COLUMNS))
+        for pos, column in enumerate(COLUMNS):
+            with open(self._file(column), "ab") as file:
+                values[:, pos].tofile(file)
+        metrics.inc("fia_written_rows_total", len(values), format="store")
+        logger.debug(f"{len(values)} bars were appended to {self.path}.")
+
+    def to_numpy(self) -> np.ndarray:
+        """Gets the sorted unique bars.
+
+        Returns:
+            values: The bars as a (n, 6) array sorted by DateTime. The
+                last appended bar is used for the same DateTime.
+        """
+        rows = len(self)
+        if rows == 0:
+            return np.empty((0, len(COLUMNS)))
+        columns = [np.memmap(self._file(column), dtype="<f8", mode="r",
+                             shape=(rows,))
+                   for column in COLUMNS]
+        # The last occurrence of every DateTime wins.
+        times = columns[0][::-1]
+        _, first = np.unique(times, return_index=True)
+        order = rows - 1 - first
+        return np.column_stack([column[order] for column in columns])
+
+    def to_pandas(self, tz: str = "UTC") -> pd.DataFrame:
+        """Gets the sorted unique bars as DataFrame.
+
+        Args:
+            tz: A timezone (optional). The UTC time is used by default.
+
+        Returns:
+            df: The market data with the same columns as
+                get_pandas_data returns.
+        """
+        df = pd.DataFrame(self.to_numpy(), columns=list(COLUMNS))
+        df["DateTime"] = (pd.to_datetime(df["DateTime"], unit="s", utc=True)
+                          .dt.tz_convert(tz))
+        return df
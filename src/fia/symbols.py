@@ -0,0 +1,219 @@
+# Copyright 2022 Aleksey Ustinov.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied. See the License for the specific language governing
+# permissions and limitations under the License.
+"""This module caches the symbol metadata on disk.
+
+Every request receives the symbol_resolved message (3-5 KB) with the
+symbol metadata: "pricescale", "timezone", "session",
+"session_holidays", "has_intraday", etc. The metadata barely changes,
+so the payloads are kept in a JSON file with the time when they were
+received:
+    {"NASDAQ:AAPL:USD": {"received": 1670907793.7, "info": {...}}}
+
+The payloads older than max_age are stale and are not returned.
+
+Usage:
+    TvDataCollector.symbol_cache = SymbolCache()
+    info = tvdc.get_symbol_info()
+
+Classes:
+    - SymbolInfo: The typed symbol metadata.
+    - SymbolCache: The persistent cache of the symbol metadata.
+"""
+# Import the standard libraries.
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, Mapping, NamedTuple, Optional
+
+# Import the local/project packages and modules.
+from fia.constants import SYMBOL_CACHE_PATH, SYMBOL_MAX_AGE
+from fia.request import TvRequest
+from fia.resample import Session
+
+
+# Set the module logger.
+logger = logging.getLogger(__name__)
+
+
+class SymbolInfo(NamedTuple):
+    """The typed symbol metadata.
+
+    Attributes:
+        symbol: The full symbol name ("NASDAQ:AAPL").
+        description: The symbol description ("Apple Inc.").
+        type: The symbol type ("stock", "futures", etc.)
+        currency_code: The price currency ("USD", etc.)
+        timezone: The exchange timezone ("America/New_York", etc.)
+        session: The trading session ("0930-1600", "24x7", etc.)
+        session_holidays: The holidays ("20221124,20221226", etc.)
+        pricescale: The number of price units in 1 currency unit.
+        minmov: The minimal price change in price units.
+        has_intraday: True if the symbol has the intraday bars.
+        payload: The whole symbol_resolved payload.
+    """
+    symbol: str
+    description: str
+    type: str
+    currency_code: str
+    timezone: str
+    session: str
+    session_holidays: str
+    pricescale: int
+    minmov: int
+    has_intraday: bool
+    payload: Dict[str, Any]
+
+    @classmethod
+    def from_payload(cls, payload: Mapping[str, Any]) -> "SymbolInfo":
+        """Creates the metadata from the symbol_resolved payload."""
+        return cls(symbol=str(payload.get("pro_name", "")),
+                   description=str(payload.get("description", "")),
+                   type=str(payload.get("type", "")),
+                   currency_code=str(payload.get("currency_code", "")),
+                   timezone=str(payload.get("timezone", "Etc/UTC")),
+                   session=str(payload.get("session", "24x7")),
+                   session_holidays=str(payload.get("session_holidays",
+                                                    "")),
+                   pricescale=int(payload.get("pricescale", 1)),
+                   minmov=int(payload.get("minmov", 1)),
+                   has_intraday=bool(payload.get("has_intraday", False)),
+                   payload=dict(payload))
+
+    @property
+    def tick_size(self) -> float:
+        """The minimal price change in the currency units."""
+        return self.minmov / self.pricescale
+
+    @property
+    def trading_session(self) -> Session:
+        """The trading session calendar (see fia.resample.Session)."""
+        return Session.from_symbol_info(self.payload)
+
+
+class SymbolCache:
+    """The persistent cache of the symbol metadata.
+
+    Attributes:
+        path: The JSON file of the cache (it is created on the first
+            put).
+        max_age: The age in seconds after which the metadata is stale.
+
+    Methods:
+        get(request, max_age): Gets the fresh metadata or None.
+        put(request, payload): Caches the symbol_resolved payload.
+        age(request): Gets the age of the cached metadata.
+        clear(): Removes all metadata.
+    """
+    def __init__(self,
+                 path: str = SYMBOL_CACHE_PATH,
+                 max_age: float = SYMBOL_MAX_AGE) -> None:
+        """Class constructor.
+        See attributes in the class level docstring.
+        """
+        self.path = path
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._entries: Optional[Dict[str, Dict[str, Any]]] = None
+
+    @staticmethod
+    def _key(request: TvRequest) -> str:
+        """Gets the key of the symbol ("NASDAQ:AAPL:USD")."""
+        return f"{request.exchange}:{request.ticker_sym}:{request.currency}"
+
+    def _read(self) -> Dict[str, Dict[str, Any]]:
+        """Reads the cache file (an empty cache if it is broken)."""
+        try:
+            with open(self.path, encoding="utf-8") as file:
+                entries: Dict[str, Dict[str, Any]] = json.load(file)
+        except FileNotFoundError:
+            return {}
+        except (OSError, json.JSONDecodeError) as e:
+            logger.warning(f"The symbol cache {self.path} cannot be read: "
+                           f"{e}")
+            return {}
+        return entries
+
+    def _load(self) -> Dict[str, Dict[str, Any]]:
+        """Gets the entries, the file is read once."""
+        if self._entries is None:
+            self._entries = self._read()
+        return self._entries
+
+    def age(self, request: TvRequest) -> Optional[float]:
+        """Gets the age of the cached metadata in seconds.
+
+        Returns:
+            age: The age or None if the symbol is not cached.
+        """
+        with self._lock:
+            entry = self._load().get(self._key(request))
+        return None if entry is None else time.time() - entry["received"]
+
+    def get(self, request: TvRequest,
+            max_age: Optional[float] = None) -> Optional[SymbolInfo]:
+        """Gets the fresh metadata of the symbol.
+
+        Args:
+            request: The request of the symbol (the frame and the bars
+                are not used).
+            max_age: The maximal age in seconds (self.max_age by
+                default).
+
+        Returns:
+            info: The metadata or None if it is not cached or stale.
+        """
+        max_age = self.max_age if max_age is None else max_age
+        with self._lock:
+            entry = self._load().get(self._key(request))
+        if entry is None or time.time() - entry["received"] > max_age:
+            return None
+        return SymbolInfo.from_payload(entry["info"])
+
+    def put(self, request: TvRequest,
+            payload: Mapping[str, Any]) -> SymbolInfo:
+        """Caches the symbol_resolved payload.
+
+        The file is read again before the write, so the symbols cached
+        by other processes are kept. The file is replaced atomically.
+
+        Args:
+            request: The request of the symbol.
+            payload: The symbol_resolved payload.
+
+        Returns:
+            info: The metadata of the payload.
+        """
+        with self._lock:
+            entries = self._read()
+            entries[self._key(request)] = {"received": time.time(),
+                                           "info": dict(payload)}
+            self._entries = entries
+            folder = os.path.dirname(self.path)
+            if folder:
+                os.makedirs(folder, exist_ok=True)
+            temp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(temp_path, "w", encoding="utf-8") as file:
+                json.dump(entries, file)
+            os.replace(temp_path, self.path)
+        logger.debug(f"The metadata of {self._key(request)} was cached.")
+        return SymbolInfo.from_payload(payload)
+
+    def clear(self) -> None:
+        """Removes all metadata."""
+        with self._lock:
+            self._entries = {}
+            if os.path.exists(self.path):
+                os.remove(self.path)
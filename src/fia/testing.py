@@ -0,0 +1,236 @@
+# Copyright 2022 Aleksey Ustinov.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied. See the License for the specific language governing
+# permissions and limitations under the License.
+"""This module generates the synthetic TradingView transcripts.
+
+A transcript is the sequence of the Websocket frames that TradingView
+sends in response to one request (see TvDataCollector.get_data):
+    - The session message ({"session_id": ..., "protocol": "json"}).
+    - The symbol_resolved message of every series.
+    - The timescale_update message with all bars of every series.
+    - The series_completed message of every series.
+    - The tail: the du messages with the updates of the last bar and
+      the heartbeats (~h~{n}), as if the connection was kept open.
+
+The bars are a deterministic random walk (the same seed gives the same
+transcript), so the transcripts can be used by the tests, the
+benchmarks and the stand-in server (fia.fake_server) without the
+network.
+
+Usage:
+    raw_data = make_transcript(bars=100_000, du_tail=1000,
+                               heartbeats=50)
+    df = tvdc.get_pandas_data(raw_data)
+
+Functions:
+    - frame_message: Frames a JSON message with the ~m~{n}~m~ prefix.
+    - synthetic_bars: Generates the random walk bars.
+    - symbol_info: Builds the symbol_resolved payload.
+    - series_data: Builds the series data of timescale_update and du.
+    - tail_frames: Generates the du messages and the heartbeats.
+    - transcript_frames: Generates the frames of a transcript.
+    - make_transcript: Generates the raw data of a transcript.
+"""
+# Import the standard libraries.
+import random
+from typing import Any, Dict, List
+
+# Import the local/project packages and modules.
+from fia.constants import (FRAME_SECONDS, MONTH_SECONDS, SYNTHETIC_CS_TOKEN,
+                           SYNTHETIC_START, Frame)
+from fia.messages import RawData, _frame
+
+
+def frame_message(message: Dict[str, Any]) -> str:
+    """Frames a JSON message with the ~m~{n}~m~ prefix.
+
+    The message is converted to the compact JSON as TradingView sends
+    it (see TvDataCollector._create_message).
+    """
+    return _frame(message)
+
+
+def synthetic_bars(count: int,
+                   frame: Frame = Frame.MIN1,
+                   start: float = SYNTHETIC_START,
+                   seed: int = 0) -> List[List[float]]:
+    """Generates the random walk bars.
+
+    Args:
+        count: The number of bars.
+        frame: The timeframe of the bars.
+        start: The open time of the first bar in seconds.
+        seed: The seed of the random walk.
+
+    Returns:
+        bars: A list of bars [time, open, high, low, close, volume].
+    """
+    rng = random.Random(seed)
+    step = FRAME_SECONDS.get(frame, MONTH_SECONDS)
+    bars = []
+    close = 100.0
+    for i in range(count):
+        open_ = close
+        close = round(max(1.0, open_ + rng.gauss(0.0, 1.0)), 2)
+        high = round(max(open_, close) + rng.random(), 2)
+        low = round(max(0.01, min(open_, close) - rng.random()), 2)
+        bars.append([float(start + i * step), open_, high, low, close,
+                     float(rng.randint(1, 100_000))])
+    return bars
+
+
+def symbol_info(symbol: str) -> Dict[str, Any]:
+    """Builds the symbol_resolved payload of the synthetic symbol.
+
+    Args:
+        symbol: The symbol ("NASDAQ:AAPL").
+
+    Returns:
+        symbol_info: The payload with the 24x7 session in UTC.
+    """
+    exchange, _, ticker_sym = symbol.partition(":")
+    return {"name": ticker_sym, "pro_name": symbol, "exchange": exchange,
+            "description": f"{ticker_sym} synthetic", "type": "stock",
+            "currency_code": "USD", "session": "24x7",
+            "timezone": "Etc/UTC", "session_holidays": "",
+            "pricescale": 100, "minmov": 1, "has_intraday": True}
+
+
+def series_data(bars: List[List[float]], first: int,
+                bar_close_time: float) -> Dict[str, Any]:
+    """Builds the series data of timescale_update and du.
+
+    Args:
+        bars: The bars [time, open, high, low, close, volume].
+        first: The index of the first bar.
+        bar_close_time: The close time of the last bar.
+
+    Returns:
+        data: The data of one series ({"s": [{"i": 0, "v": [...]}]...}).
+    """
+    return {"s": [{"i": first + i, "v": bar} for i, bar in enumerate(bars)],
+            "ns": {"d": "", "indexes": "nochange"},
+            "t": "s1",
+            "lbs": {"bar_close_time": bar_close_time}}
+
+
+def tail_frames(all_bars: List[List[List[float]]], du_tail: int,
+                heartbeats: int, close_time: float,
+                seed: int = 0) -> List[str]:
+    """Generates the du messages and the heartbeats after the series.
+
+    The du messages update the last bar of a random series. The last
+    bars in all_bars are replaced by the updated ones.
+
+    Args:
+        all_bars: The bars of every series (sds_1, sds_2, ...).
+        du_tail: The number of du messages.
+        heartbeats: The number of heartbeats mixed into the tail.
+        close_time: The close time of the last bar.
+        seed: The seed of the updates.
+
+    Returns:
+        frames: The frames of the tail.
+    """
+    rng = random.Random(seed)
+    frames = []
+    # The heartbeats are spread evenly over the tail.
+    every = du_tail // heartbeats + 1 if heartbeats else 0
+    sent = 0
+    for n in range(du_tail):
+        k = rng.randrange(len(all_bars))
+        if all_bars[k]:
+            last = list(all_bars[k][-1])
+            last[4] = round(last[4] + rng.gauss(0.0, 0.1), 2)
+            last[5] += float(rng.randint(1, 100))
+            all_bars[k][-1] = last
+            frames.append(frame_message({"m": "du", "p": [
+                SYNTHETIC_CS_TOKEN,
+                {f"sds_{k + 1}": series_data([last], len(all_bars[k]) - 1,
+                                             close_time)}
+            ]}))
+        if every and n % every == 0 and sent < heartbeats:
+            sent += 1
+            frames.append(f"~m~{len(str(sent)) + 3}~m~~h~{sent}")
+    for beat in range(sent + 1, heartbeats + 1):
+        frames.append(f"~m~{len(str(beat)) + 3}~m~~h~{beat}")
+    return frames
+
+
+def transcript_frames(bars: int = 100,
+                      series: int = 1,
+                      *,
+                      du_tail: int = 0,
+                      heartbeats: int = 0,
+                      frame: Frame = Frame.MIN1,
+                      symbol: str = "NASDAQ:AAPL",
+                      seed: int = 0) -> List[str]:
+    """Generates the frames of a transcript.
+
+    Args:
+        bars: The number of bars of every series.
+        series: The number of series (sds_1, sds_2, ...).
+        du_tail: The number of du messages after series_completed.
+        heartbeats: The number of heartbeats mixed into the tail.
+        frame: The timeframe of the bars.
+        symbol: The symbol of symbol_resolved.
+        seed: The seed of the random walk.
+
+    Returns:
+        frames: The Websocket frames in the order they are received.
+    """
+    step = FRAME_SECONDS.get(frame, MONTH_SECONDS)
+    frames = [frame_message({"session_id": "<0.1.0>_synthetic",
+                             "timestamp": SYNTHETIC_START,
+                             "protocol": "json",
+                             "auth_scheme_vsn": 2})]
+    all_bars = [synthetic_bars(bars, frame, seed=seed + k)
+                for k in range(series)]
+    close_time = SYNTHETIC_START + bars * step
+    for k in range(1, series + 1):
+        frames.append(frame_message({"m": "symbol_resolved", "p": [
+            SYNTHETIC_CS_TOKEN, f"sds_sym_{k}", symbol_info(symbol)
+        ]}))
+    for k, series_bars in enumerate(all_bars, 1):
+        frames.append(frame_message({"m": "timescale_update", "p": [
+            SYNTHETIC_CS_TOKEN,
+            {f"sds_{k}": series_data(series_bars, 0, close_time)}
+        ]}))
+    for k in range(1, series + 1):
+        frames.append(frame_message({"m": "series_completed", "p": [
+            SYNTHETIC_CS_TOKEN, f"sds_{k}", "streaming"
+        ]}))
+    frames.extend(tail_frames(all_bars, du_tail, heartbeats, close_time,
+                              seed))
+    return frames
+
+
+def make_transcript(bars: int = 100,
+                    series: int = 1,
+                    *,
+                    du_tail: int = 0,
+                    heartbeats: int = 0,
+                    frame: Frame = Frame.MIN1,
+                    symbol: str = "NASDAQ:AAPL",
+                    seed: int = 0) -> RawData:
+    """Generates the raw data of a transcript.
+
+    See the arguments in transcript_frames.
+
+    Returns:
+        raw_data: The concatenated frames (the series is completed).
+    """
+    return RawData("".join(transcript_frames(
+        bars, series, du_tail=du_tail, heartbeats=heartbeats, frame=frame,
+        symbol=symbol, seed=seed
+    )))
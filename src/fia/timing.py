@@ -0,0 +1,308 @@
+# Copyright 2022 Aleksey Ustinov.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied. See the License for the specific language governing
+# permissions and limitations under the License.
+"""This module records the latency of the phases of every collection.
+
+Every collection (get_data, collect) produces a timing record
+(raw_data.timing) with the monotonic start and end of every phase:
+    - throttle: Waiting for the rate limiter.
+    - sign_in: The sign in request.
+    - connect: The Websocket (and TLS) handshake.
+    - symbol_resolved: Waiting for the symbol_resolved message.
+    - timescale_update: Streaming the bars till series_completed.
+    - close: Waiting for the remote host to close the connection.
+    - retry_wait: The backoff delay before a retry.
+    - parse: Parsing the received messages.
+
+The phases repeat if the connection is retried. The record also has
+the counters: bytes and packets received, bars, retries, etc.
+
+The conversion of the raw data (get_pandas_data) produces a separate
+record "convert" (df.attrs["timing"]) with the phases get_json_data
+and dataframe.
+
+Every finished record is passed to the hooks, so it can be shipped to
+any telemetry:
+    fia.timing.add_hook(lambda timing: print(timing.as_dict()))
+
+The observer (see fia.profiling) is notified when a phase begins and
+ends, even if there is no current record.
+
+Usage:
+    raw_data = tvdc.get_data()
+    print(raw_data.timing.durations())
+
+Classes:
+    - Timing: The timing record of one collection or conversion.
+
+Functions:
+    - current: Gets the record of the current thread.
+    - phase: Records a phase into the record of the current thread.
+    - record: Creates the record of the current thread.
+    - add_hook: Adds a hook called with every finished record.
+    - remove_hook: Removes a hook.
+    - set_observer: Sets the observer of the phase changes.
+"""
+# Import the standard libraries.
+import contextlib
+import contextvars
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+
+# Set the module logger.
+logger = logging.getLogger(__name__)
+
+
+class Timing:
+    """The timing record of one collection or conversion.
+
+    All times are time.monotonic() values in seconds.
+
+    Attributes:
+        name: The kind of the record ("collect", "convert").
+        key: The key of the request ("NASDAQ:AAPL:USD:DAY:100").
+        start: The start time of the record.
+        end: The end time of the record (None until it is finished).
+        phases: The list of the (phase, start, end) tuples in order.
+        counters: The counters (bytes, packets, bars, etc.)
+        error: The error that stopped the record (None if there was
+            no error).
+
+    Methods:
+        phase(name): Records the phase of the block.
+        begin(name): Ends the open phase and begins the next one.
+        end_phase(): Ends the open phase.
+        count(**values): Increases the counters.
+        finish(): Ends the record.
+        durations(): Gets the total duration of every phase.
+        as_dict(): Gets the record as a dictionary.
+    """
+    def __init__(self, name: str, key: str = "") -> None:
+        """Class constructor.
+        See attributes in the class level docstring.
+        """
+        self.name = name
+        self.key = key
+        self.start = time.monotonic()
+        self.end: Optional[float] = None
+        self.phases: List[Tuple[str, float, float]] = []
+        self.counters: Dict[str, int] = {}
+        self.error: Optional[str] = None
+        self._open: Optional[Tuple[str, float]] = None
+
+    @property
+    def duration(self) -> float:
+        """The duration of the record in seconds (till now if it is
+        not finished)."""
+        end = time.monotonic() if self.end is None else self.end
+        return end - self.start
+
+    @contextlib.contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """Records the phase of the block."""
+        _notify(name, True)
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self.phases.append((name, start, time.monotonic()))
+            _notify(name, False)
+
+    def begin(self, name: str) -> None:
+        """Ends the open phase and begins the next one."""
+        now = time.monotonic()
+        if self._open is not None:
+            self.phases.append((*self._open, now))
+            _notify(self._open[0], False)
+        _notify(name, True)
+        self._open = (name, now)
+
+    def end_phase(self) -> None:
+        """Ends the open phase."""
+        if self._open is not None:
+            self.phases.append((*self._open, time.monotonic()))
+            _notify(self._open[0], False)
+        self._open = None
+
+    def count(self, **values: int) -> None:
+        """Increases the counters."""
+        for name, value in values.items():
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def finish(self) -> None:
+        """Ends the open phase and the record."""
+        self.end_phase()
+        if self.end is None:
+            self.end = time.monotonic()
+
+    def durations(self) -> Dict[str, float]:
+        """Gets the total duration of every phase in seconds."""
+        durations: Dict[str, float] = {}
+        for name, start, end in self.phases:
+            durations[name] = durations.get(name, 0.0) + end - start
+        return durations
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Gets the record as a dictionary.
+
+        Returns:
+            record: The name, key, error, total duration, durations of
+                the phases, phases with the times relative to the start
+                of the record and counters.
+        """
+        return {"name": self.name,
+                "key": self.key,
+                "error": self.error,
+                "duration": self.duration,
+                "durations": self.durations(),
+                "phases": [(name, start - self.start, end - self.start)
+                           for name, start, end in self.phases],
+                **self.counters}
+
+    def __repr__(self) -> str:
+        durations = ", ".join(f"{name}={seconds:.3f}s"
+                              for name, seconds in self.durations().items())
+        return (f"Timing({self.name} {self.key} {self.duration:.3f}s: "
+                f"{durations})")
+
+
+class _NoTiming(Timing):
+    """The record that keeps nothing (there is no current record)."""
+    @contextlib.contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        _notify(name, True)
+        try:
+            yield
+        finally:
+            _notify(name, False)
+
+    def begin(self, name: str) -> None:
+        pass
+
+    def end_phase(self) -> None:
+        pass
+
+    def count(self, **values: int) -> None:
+        pass
+
+
+_NO_TIMING = _NoTiming("none")
+# The record of the current thread (or task).
+_current: contextvars.ContextVar[Timing] = contextvars.ContextVar(
+    "fia_timing", default=_NO_TIMING
+)
+_hooks: List[Callable[[Timing], Any]] = []
+_hooks_lock = threading.Lock()
+# The observer of the phase changes (None - there is no observer).
+# pylint: disable-next=invalid-name
+_observer: Optional[Callable[[str, bool], Any]] = None
+
+
+def current() -> Timing:
+    """Gets the record of the current thread.
+
+    Returns:
+        timing: The current record. If there is no current record,
+            the record keeps nothing.
+    """
+    return _current.get()
+
+
+def phase(name: str) -> "contextlib.AbstractContextManager[None]":
+    """Records a phase into the record of the current thread.
+
+    Usage:
+        with phase("sign_in"):
+            ...
+    """
+    return _current.get().phase(name)
+
+
+@contextlib.contextmanager
+def record(name: str, key: str = "") -> Iterator[Timing]:
+    """Creates the record of the current thread.
+
+    The phases and counters of the block are kept in the record. The
+    record is finished and passed to the hooks when the block ends
+    (also on errors).
+
+    Args:
+        name: The kind of the record ("collect", "convert").
+        key: The key of the request.
+
+    Yields:
+        timing: The record.
+    """
+    timing = Timing(name, key)
+    token = _current.set(timing)
+    try:
+        yield timing
+    except BaseException as e:
+        timing.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        _current.reset(token)
+        timing.finish()
+        _emit(timing)
+
+
+def add_hook(hook: Callable[[Timing], Any]) -> None:
+    """Adds a hook called with every finished record.
+
+    The hooks are called in the thread of the collection, so they have
+    to be fast (for example, put the record into a queue).
+    """
+    with _hooks_lock:
+        _hooks.append(hook)
+
+
+def remove_hook(hook: Callable[[Timing], Any]) -> None:
+    """Removes a hook (nothing happens if it was not added)."""
+    with _hooks_lock:
+        if hook in _hooks:
+            _hooks.remove(hook)
+
+
+def _emit(timing: Timing) -> None:
+    """Passes the record to the hooks, the hook errors are logged."""
+    with _hooks_lock:
+        hooks = list(_hooks)
+    for hook in hooks:
+        try:
+            hook(timing)
+        # A broken telemetry must not break the collection.
+        # pylint: disable-next=broad-except
+        except Exception as e:
+            logger.warning(f"The timing hook {hook!r} failed: {e}")
+
+
+def set_observer(observer: Optional[Callable[[str, bool], Any]]) -> None:
+    """Sets the observer of the phase changes.
+
+    Args:
+        observer: The function called with the phase name and True
+            when the phase begins, False when it ends (in the thread of
+            the phase). None removes the observer.
+    """
+    global _observer  # pylint: disable=global-statement
+    _observer = observer
+
+
+def _notify(name: str, begins: bool) -> None:
+    """Notifies the observer about the phase change."""
+    observer = _observer
+    if observer is not None:
+        observer(name, begins)
@@ -0,0 +1,146 @@
+# Copyright 2022 Aleksey Ustinov.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied. See the License for the specific language governing
+# permissions and limitations under the License.
+"""This module traces the Websocket frames at a low cost.
+
+Every thread keeps its last frames in a ring buffer. A frame is cut to
+max_chars characters when it is recorded, so the buffer size is
+bounded and the big frames (timescale_update of thousands of bars) are
+not kept. The authorization token is masked.
+
+The frames are written to the debug log only if DEBUG is enabled for
+the "fia.tracing" logger and only every n-th frame (sampling). The log
+message is not built otherwise. The ring buffer is dumped to the log
+with the ERROR level only when a collection fails, so the failures can
+be diagnosed without the verbose logging:
+    ERROR The last 3 frames before: The series is not completed.
+    ERROR   -0.412 s >> ~m~55~m~{"m":"chart_create_session",...
+    ERROR   -0.102 s << ~m~4312~m~{"m":"timescale_update",... (4330 ch)
+
+Usage:
+    TvDataCollector.tracer = Tracer(size=500, max_chars=200, sample=10)
+
+Classes:
+    - Tracer: Keeps the last frames of every thread.
+"""
+# Import the standard libraries.
+import collections
+import itertools
+import logging
+import re
+import threading
+import time
+from typing import Deque, List, Optional, Tuple
+
+# Import the local/project packages and modules.
+from fia.constants import TRACE_MAX_CHARS, TRACE_SAMPLE, TRACE_SIZE
+
+
+# Set the module logger.
+logger = logging.getLogger(__name__)
+
+# The authorization token in the set_auth_token message.
+_AUTH_TOKEN = re.compile(r'("m":"set_auth_token","p":\[")[^"]*')
+
+# The traced frame: the monotonic time, the direction ("<<" - received,
+# ">>" - sent), the cut frame and the length of the whole frame.
+_Frame = Tuple[float, str, str, int]
+
+
+class Tracer:
+    """Keeps the last frames of every thread.
+
+    Attributes:
+        size: The number of the last frames kept by every thread.
+        max_chars: The maximal number of characters of a kept frame.
+        sample: Every n-th frame is written to the debug log (if DEBUG
+            is enabled).
+
+    Methods:
+        received(frame): Traces a received frame.
+        sent(frame): Traces a sent frame.
+        frames(): Gets the kept frames of the current thread.
+        dump(reason): Logs and clears the frames of the current thread.
+    """
+    def __init__(self,
+                 size: int = TRACE_SIZE,
+                 max_chars: int = TRACE_MAX_CHARS,
+                 sample: int = TRACE_SAMPLE) -> None:
+        """Class constructor.
+        See attributes in the class level docstring.
+        """
+        self.size = size
+        self.max_chars = max_chars
+        self.sample = max(1, sample)
+        self._local = threading.local()
+        self._counter = itertools.count()
+
+    def _buffer(self) -> Deque[_Frame]:
+        """Gets the ring buffer of the current thread."""
+        buffer: Optional[Deque[_Frame]] = getattr(self._local, "buffer",
+                                                  None)
+        if buffer is None:
+            buffer = self._local.buffer = collections.deque(maxlen=self.size)
+        return buffer
+
+    def _trace(self, direction: str, frame: str) -> None:
+        """Keeps the cut frame and logs every n-th frame."""
+        cut = frame[:self.max_chars]
+        if "set_auth_token" in cut:
+            cut = _AUTH_TOKEN.sub(r"\1***", cut)
+        self._buffer().append((time.monotonic(), direction, cut, len(frame)))
+        if (next(self._counter) % self.sample == 0
+                and logger.isEnabledFor(logging.DEBUG)):
+            logger.debug(f"{direction} {self._format(cut, len(frame))}")
+
+    def received(self, frame: str) -> None:
+        """Traces a received frame."""
+        self._trace("<<", frame)
+
+    def sent(self, frame: str) -> None:
+        """Traces a sent frame."""
+        self._trace(">>", frame)
+
+    def frames(self) -> List[_Frame]:
+        """Gets the kept frames of the current thread.
+
+        Returns:
+            frames: The (monotonic time, direction, cut frame, length of
+                the whole frame) tuples from the oldest to the newest.
+        """
+        return list(self._buffer())
+
+    def dump(self, reason: str) -> List[str]:
+        """Logs and clears the frames of the current thread.
+
+        Args:
+            reason: The reason of the dump (the error message).
+
+        Returns:
+            lines: The logged lines.
+        """
+        buffer = self._buffer()
+        now = time.monotonic()
+        lines = [f"The last {len(buffer)} frames before: {reason}"]
+        lines.extend(f"  {received - now:.3f} s {direction} "
+                     f"{self._format(cut, length)}"
+                     for received, direction, cut, length in buffer)
+        buffer.clear()
+        for line in lines:
+            logger.error(line)
+        return lines
+
+    @staticmethod
+    def _format(cut: str, length: int) -> str:
+        """Formats the cut frame with the length of the whole one."""
+        return cut if len(cut) == length else f"{cut}... ({length} ch)"
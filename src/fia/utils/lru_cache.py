@@ -0,0 +1,127 @@
+# Copyright 2022 Aleksey Ustinov.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied. See the License for the specific language governing
+# permissions and limitations under the License.
+"""The module keeps the recently used values in a size-bounded cache.
+
+Every value can have its own expiration time, the expired values are
+removed when they are read.
+
+This module is a part of the fia package and should not be used
+separately.
+
+Classes:
+    - LRUCache: The thread-safe least recently used cache.
+"""
+# Import the standard libraries.
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+
+class LRUCache:
+    """The thread-safe least recently used cache.
+
+    When the cache is full, the least recently used value is evicted.
+
+    Attributes:
+        maxsize: The maximal number of values.
+        hits: The number of found values.
+        misses: The number of missed values (including the expired
+            ones).
+        evictions: The number of evicted values.
+        expirations: The number of expired values.
+
+    Methods:
+        get(key): Gets the value or None.
+        put(key, value, expires): Adds the value.
+        clear(): Removes all values.
+        metrics(): Gets the counters.
+    """
+    def __init__(self, maxsize: int = 128) -> None:
+        """Class constructor.
+        See attributes in the class level docstring.
+        """
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self._lock = threading.Lock()
+        # The values and their expiration times by the key.
+        self._values: "OrderedDict[Hashable, Tuple[Any, Optional[float]]]" = (
+            OrderedDict()
+        )
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Gets the value and marks it as recently used.
+
+        Args:
+            key: The key of the value.
+
+        Returns:
+            value: The value or None if there is no value or the value
+                is expired.
+        """
+        with self._lock:
+            if key not in self._values:
+                self.misses += 1
+                return None
+            value, expires = self._values[key]
+            if expires is not None and time.time() >= expires:
+                del self._values[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._values.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: Hashable, value: Any,
+            expires: Optional[float] = None) -> None:
+        """Adds the value and evicts the least recently used values.
+
+        Args:
+            key: The key of the value.
+            value: The value.
+            expires: The expiration time as Unix time in seconds
+                (optional). The value does not expire by default.
+        """
+        with self._lock:
+            self._values[key] = (value, expires)
+            self._values.move_to_end(key)
+            while len(self._values) > self.maxsize:
+                self._values.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        """Removes all values."""
+        with self._lock:
+            self._values.clear()
+
+    def metrics(self) -> Dict[str, int]:
+        """Gets the counters.
+
+        Returns:
+            metrics: The number of hits, misses, evictions,
+                expirations and values.
+        """
+        with self._lock:
+            return {"hits": self.hits,
+                    "misses": self.misses,
+                    "evictions": self.evictions,
+                    "expirations": self.expirations,
+                    "size": len(self._values)}
@@ -0,0 +1,94 @@
+# Copyright 2022 Aleksey Ustinov.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied. See the License for the specific language governing
+# permissions and limitations under the License.
+"""The module shares one call between the threads with the same key.
+
+This module is a part of the fia package and should not be used
+separately.
+
+Classes:
+    - SingleFlight: Shares the in-flight calls by key.
+"""
+# Import the standard libraries.
+import threading
+from typing import Any, Callable, Dict, Hashable, Optional
+
+
+class _Call:
+    """The in-flight call and its result."""
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        self.shared = 0
+
+
+class SingleFlight:
+    """Shares the in-flight calls by key.
+
+    If a call with the same key is running, the thread waits for it
+    and gets the same result (or the same exception) instead of
+    calling the function again. The result is not kept after the call
+    is finished.
+
+    Methods:
+        do(key, function): Calls the function or joins the in-flight
+            call with the same key.
+        in_flight(): Gets the number of the running calls.
+    """
+    def __init__(self) -> None:
+        """Class constructor."""
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+
+    def in_flight(self) -> int:
+        """Gets the number of the running calls."""
+        with self._lock:
+            return len(self._calls)
+
+    def do(self, key: Hashable, function: Callable[[], Any]) -> Any:
+        """Calls the function or joins the in-flight call with the key.
+
+        Args:
+            key: The key of the call (for example, the request).
+            function: The function without arguments.
+
+        Returns:
+            result: The value returned by the function.
+
+        Raises:
+            The exception raised by the function (SystemExit, etc.)
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if call is None:
+                call = _Call()
+                self._calls[key] = call
+            else:
+                call.shared += 1
+        if not leader:
+            call.done.wait()
+        else:
+            try:
+                call.result = function()
+            # The exception is passed to all threads that wait for it.
+            except BaseException as e:  # pylint: disable=broad-except
+                call.error = e
+            finally:
+                with self._lock:
+                    del self._calls[key]
+                call.done.set()
+        if call.error is not None:
+            raise call.error
+        return call.result
@@ -0,0 +1,49 @@
+# Copyright 2022 Aleksey Ustinov.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied. See the License for the specific language governing
+# permissions and limitations under the License.
+"""The module trims the bars collected in chunks to a time range.
+
+Functions:
+    - to_utc: Converts the date to the UTC timestamp.
+    - trim_bars: Sorts, deduplicates and trims the bars to a range.
+"""
+# Import the standard libraries.
+import datetime
+from typing import List, Union
+
+# Import the third party libraries.
+import numpy as np
+import pandas as pd
+
+# Import the local/project packages and modules.
+from fia.constants import COLUMNS
+
+
+def to_utc(value: Union[str, datetime.datetime]) -> pd.Timestamp:
+    """Converts the date to the UTC timestamp (UTC if no timezone)."""
+    timestamp = pd.Timestamp(value)
+    if timestamp.tzinfo is None:
+        return timestamp.tz_localize("UTC")
+    return timestamp.tz_convert("UTC")
+
+
+def trim_bars(bars: List[List[float]], start_ns: int, end_ns: int,
+              tz: str) -> pd.DataFrame:
+    """Sorts, deduplicates and trims the bars to [start_ns, end_ns]."""
+    values = np.array(bars, dtype="float64").reshape(-1, len(COLUMNS))
+    times, first = np.unique(values[:, 0], return_index=True)
+    in_range = (times * 10**9 >= start_ns) & (times * 10**9 <= end_ns)
+    df = pd.DataFrame(values[first[in_range]], columns=list(COLUMNS))
+    df["DateTime"] = (pd.to_datetime(df["DateTime"], unit="s", utc=True)
+                      .dt.tz_convert(tz))
+    return df
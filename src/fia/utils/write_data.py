@@ -0,0 +1,83 @@
+# Copyright 2022 Aleksey Ustinov.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied. See the License for the specific language governing
+# permissions and limitations under the License.
+"""The module writes the market data to a file.
+
+Functions:
+    - write_data: Writes the market data in CSV, JSON or Parquet
+      format.
+"""
+# Import the standard libraries.
+import logging
+import os
+
+# Import the third party libraries.
+import pandas as pd
+
+# Import the local/project packages and modules.
+from fia import metrics, timing
+from fia.constants import OUTPUT_FORMATS
+
+
+# Set the module logger.
+logger = logging.getLogger(__name__)
+
+
+def write_data(df: pd.DataFrame,
+               path: str,
+               file_name: str,
+               output_format: str = "csv") -> str:
+    """Writes the market data in CSV, JSON or Parquet format.
+
+    Creates the folder if it does not exist and writes the DataFrame
+    returned by TvDataCollector.get_pandas_data to the file.
+
+    Args:
+        df: The market data in Pandas DataFrame format.
+        path: The folder for the file.
+        file_name: The file name without the extension.
+        output_format: The output format ("csv", "json" or "parquet").
+            The Parquet format requires the pyarrow package.
+
+    Returns:
+        file_path: The path of the created file.
+
+    Raises:
+        SystemExit: If the output format is not supported or the file
+            cannot be written.
+    """
+    if output_format not in OUTPUT_FORMATS:
+        logger.error(f"The output format has to be one of "
+                     f"{OUTPUT_FORMATS}.",
+                     stack_info=True)
+        raise SystemExit(f"The output format has to be one of "
+                         f"{OUTPUT_FORMATS}.")
+    os.makedirs(path, exist_ok=True)
+    file_path = os.path.join(path, f"{file_name}.{output_format}")
+    try:
+        with timing.phase("write"):
+            if output_format == "csv":
+                df.to_csv(file_path, index=False)
+            elif output_format == "json":
+                df.to_json(file_path, orient="records", date_format="iso")
+            else:
+                df.to_parquet(file_path, index=False)
+    except (ImportError, OSError) as e:
+        logger.error(f"The file {file_path} cannot be written: {e}",
+                     exc_info=True,
+                     stack_info=True)
+        raise SystemExit(f"The file {file_path} cannot be written: "
+                         f"{e}") from e
+    metrics.inc("fia_written_rows_total", len(df), format=output_format)
+    logger.info(f"The file {file_path} was created.")
+    return file_path
@@ -0,0 +1,72 @@
+import time
+
+import pytest
+
+from fia.constants import Frame
+from fia.main import TvDataCollector
+from fia.request import TvRequest
+
+
+def _wait_for_shared(key, shared):
+    """Waits until the number of joined threads is reached."""
+    single_flight = TvDataCollector._in_flight
+    deadline = time.monotonic() + 5
+    while time.monotonic() < deadline:
+        with single_flight._lock:
+            call = single_flight._calls.get(key)
+            if call is not None and call.shared >= shared:
+                return
+        time.sleep(0.001)
+
+
+@pytest.fixture
+def tvdc():
+    """Returns an instance of TvDataCollector."""
+    return TvDataCollector(username="GoodName",
+                           password="StrongPSW123#",
+                           exchange="NASDAQ",
+                           ticker_sym="AAPL",
+                           currency="USD",
+                           frame=Frame.DAY,
+                           bars=50)
+
+
+def test_request_property(tvdc):
+    """Tests the request built from the attributes."""
+    assert tvdc.request == TvRequest("NASDAQ", "AAPL", "USD", Frame.DAY, 50)
+
+
+def test_get_data_uses_request(tvdc, mocker):
+    """Tests that get_data fetches the current request."""
+    fetch = mocker.patch("fia.main.TvDataCollector._fetch",
+                         return_value="raw_data")
+    assert tvdc.get_data() == "raw_data"
+    fetch.assert_called_once_with(tvdc.request)
+
+
+def test_collect_does_not_change_attributes(tvdc, mocker):
+    """Tests that collect does not use the attributes."""
+    fetch = mocker.patch("fia.main.TvDataCollector._fetch",
+                         side_effect=lambda request: request.key)
+    request = TvRequest("CME", "BTC1!", "USD", Frame.HOUR1, 10)
+    assert tvdc.collect(request) == "CME:BTC1!:USD:HOUR1:10"
+    assert tvdc.exchange == "NASDAQ" and tvdc.frame == "D"
+    fetch.assert_called_once_with(request)
+
+
+def test_collect_many_shares_identical_requests(tvdc, mocker):
+    """Tests that the concurrent identical requests are fetched once."""
+    request = TvRequest("CME", "BTC1!", "USD", Frame.HOUR1, 10)
+    other = TvRequest("NASDAQ", "AAPL", "USD", Frame.DAY, 50)
+
+    def fetch(tv_request):
+        if tv_request == request:
+            _wait_for_shared(("GoodName", request), 2)
+        return tv_request.key
+
+    fetch_mock = mocker.patch("fia.main.TvDataCollector._fetch",
+                              side_effect=fetch)
+    raw_data = tvdc.collect_many([request, other, request, request],
+                                 workers=4)
+    assert raw_data == [request.key, other.key, request.key, request.key]
+    assert fetch_mock.call_count == 2
@@ -0,0 +1,111 @@
+import pytest
+
+from fia.constants import Frame
+from fia.main import SignInFailed, TvDataCollector
+from fia.request import TvRequest
+
+
+def _raw_data(times, completed):
+    """Returns the raw data with the DAY bars at the given times."""
+    bars = [{"i": i, "v": [time, 10.0, 11.0, 9.0, 10.5, 1.0]}
+            for i, time in enumerate(times)]
+    raw_data = TvDataCollector._create_message(
+        "timescale_update", ["cs_Lms...eEc", {"sds_1": {"s": bars}}]
+    )
+    if completed:
+        raw_data += TvDataCollector._create_message(
+            "series_completed", ["cs_Lms...eEc", "sds_1"]
+        )
+    return raw_data
+
+
+@pytest.fixture
+def tvdc(monkeypatch):
+    """Returns an instance of TvDataCollector without retry delays."""
+    monkeypatch.setattr("fia.main.time.sleep", lambda delay: None)
+    return TvDataCollector(username="GoodName",
+                           password="StrongPSW123#",
+                           exchange="NASDAQ",
+                           ticker_sym="AAPL",
+                           currency="USD",
+                           frame=Frame.DAY,
+                           bars=5)
+
+
+def test_complete_without_retry(tvdc, mocker):
+    """Tests that the complete series is fetched once."""
+    fetch_once = mocker.patch("fia.main.TvDataCollector._fetch_once",
+                              return_value=_raw_data([1.0, 2.0], True))
+    raw_data = tvdc.get_data()
+    assert raw_data.complete and fetch_once.call_count == 1
+    assert raw_data == _raw_data([1.0, 2.0], True)
+
+
+def test_retry_requests_only_missing_bars(tvdc, mocker):
+    """Tests that the retry requests only the older bars."""
+    day = 86400.0
+    fetch_once = mocker.patch(
+        "fia.main.TvDataCollector._fetch_once",
+        side_effect=[_raw_data([3 * day, 4 * day, 5 * day], False),
+                     SystemExit("Problems with Websocket connection"),
+                     _raw_data([day, 2 * day, 3 * day], True)]
+    )
+    raw_data = tvdc.get_data()
+    request = TvRequest("NASDAQ", "AAPL", "USD", Frame.DAY, 5)
+    assert [call.args for call in fetch_once.call_args_list] == [
+        (request, 5),
+        (request, ["bar_count", "D", 2, int(3 * day)]),
+        (request, ["bar_count", "D", 2, int(3 * day)]),
+    ]
+    assert raw_data.complete
+    df = tvdc.get_pandas_data(raw_data)
+    assert (df["DateTime"].astype("int64") // 10**9).tolist() == [
+        day * i for i in range(1, 6)
+    ]
+
+
+def test_incomplete_after_retries(tvdc, mocker):
+    """Tests the complete flag when all retries are used."""
+    tvdc.retries = 1
+    mocker.patch("fia.main.TvDataCollector._fetch_once",
+                 return_value=_raw_data([1.0], False))
+    raw_data = tvdc.get_data()
+    assert not raw_data.complete
+    assert len(tvdc.get_pandas_data(raw_data)) == 1
+
+
+def test_connection_error_after_retries(tvdc, mocker):
+    """Tests the raise when every connection fails."""
+    tvdc.retries = 2
+    fetch_once = mocker.patch(
+        "fia.main.TvDataCollector._fetch_once",
+        side_effect=SystemExit("Problems with Websocket connection")
+    )
+    with pytest.raises(SystemExit):
+        tvdc.get_data()
+    assert fetch_once.call_count == 3
+
+
+def test_partial_bars_after_retries(tvdc, mocker):
+    """Tests that the bars received before the last failed retry are
+    returned."""
+    tvdc.retries = 1
+    mocker.patch(
+        "fia.main.TvDataCollector._fetch_once",
+        side_effect=[_raw_data([4.0, 5.0], False),
+                     SystemExit("Problems with Websocket connection")]
+    )
+    raw_data = tvdc.get_data()
+    assert not raw_data.complete
+    assert len(tvdc.get_pandas_data(raw_data)) == 2
+
+
+def test_sign_in_failure_is_not_retried(tvdc, mocker):
+    """Tests the raise without retries when the sign in fails."""
+    fetch_once = mocker.patch(
+        "fia.main.TvDataCollector._fetch_once",
+        side_effect=SignInFailed("The authorization token was not received")
+    )
+    with pytest.raises(SignInFailed):
+        tvdc.get_data()
+    assert fetch_once.call_count == 1
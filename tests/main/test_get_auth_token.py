@@ -0,0 +1,54 @@
+import pytest
+import requests
+
+from fia.constants import Frame
+from fia.main import TvDataCollector
+from fia.rate_limit import RateLimiter
+
+
+def _response(status_code, body):
+    """Returns the response of the sign in."""
+    response = requests.Response()
+    response.status_code = status_code
+    response._content = body.encode()
+    return response
+
+
+@pytest.fixture
+def tvdc(monkeypatch):
+    """Returns an instance of TvDataCollector with its own limiter."""
+    monkeypatch.setattr(TvDataCollector, "rate_limiter", RateLimiter(
+        {name: (1000.0, 1000) for name in ("sign_in", "connect", "series")}
+    ))
+    return TvDataCollector(username="GoodName",
+                           password="StrongPSW123#",
+                           exchange="NASDAQ",
+                           ticker_sym="AAPL",
+                           currency="USD",
+                           frame=Frame.DAY,
+                           bars=5)
+
+
+def test_token(tvdc, mocker):
+    """Tests the token of the successful sign in."""
+    mocker.patch("requests.post", return_value=_response(
+        200, '{"user": {"auth_token": "eyJ...9U0"}}'
+    ))
+    assert tvdc.get_auth_token() == "eyJ...9U0"
+
+
+@pytest.mark.parametrize(
+    "status_code, body",
+    [
+        (429, "Too Many Requests"),
+        (500, '{"error": "Internal Server Error"}'),
+        (200, '{"error": "Invalid username or password"}'),
+    ]
+)
+def test_no_token_raises(tvdc, mocker, status_code, body):
+    """Tests the raise when the response has no token."""
+    mocker.patch("requests.post", return_value=_response(status_code, body))
+    penalize = mocker.spy(tvdc.rate_limiter, "penalize")
+    with pytest.raises(SystemExit):
+        tvdc.get_auth_token()
+    assert penalize.called == (status_code == 429)
@@ -0,0 +1,98 @@
+import pandas as pd
+import pytest
+
+from fia.constants import Frame
+from fia.main import TvDataCollector
+from fia.store import BarStore
+
+DAY = 86400.0
+
+
+def _chunk(times):
+    """Returns the frames of a chunk with the DAY bars."""
+    bars = [{"i": i, "v": [time, 10.0, 11.0, 9.0, 10.5, time / DAY]}
+            for i, time in enumerate(times)]
+    return [
+        TvDataCollector._create_message(
+            "timescale_update", ["cs_Lms...eEc", {"sds_1": {"s": bars}}]
+        ) + "~m~4~m~~h~1",
+        TvDataCollector._create_message("series_completed",
+                                        ["cs_Lms...eEc", "sds_1"]),
+    ]
+
+
+class FakeWebSocket:
+    """Returns the chunk frames and records the sent messages."""
+    def __init__(self, chunks):
+        self.frames = [frame for chunk in chunks for frame in chunk]
+        self.sent = []
+        self.closed = False
+
+    def recv(self):
+        import websocket
+        if not self.frames:
+            raise websocket.WebSocketConnectionClosedException()
+        return self.frames.pop(0)
+
+    def send(self, message):
+        self.sent.append(message)
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def tvdc(mocker):
+    """Returns an instance of TvDataCollector without sign in."""
+    mocker.patch("fia.main.TvDataCollector._open_series",
+                 return_value="cs_Lms...eEc")
+    return TvDataCollector(username="GoodName",
+                           password="StrongPSW123#",
+                           exchange="NASDAQ",
+                           ticker_sym="AAPL",
+                           currency="USD",
+                           frame=Frame.DAY,
+                           bars=5)
+
+
+def test_pages_until_start(tvdc, mocker, tmp_path):
+    """Tests the chunks, the overlap and the start date."""
+    ws = FakeWebSocket([_chunk([DAY * i for i in range(7, 10)]),
+                        _chunk([DAY * i for i in range(4, 8)]),
+                        _chunk([DAY * i for i in range(1, 5)])])
+    mocker.patch("fia.main.TvDataCollector.connect", return_value=ws)
+    store = BarStore(str(tmp_path / "store"))
+    total = tvdc.get_history(pd.Timestamp(3 * DAY, unit="s"), store.append,
+                             chunk_bars=3)
+    assert total == 7 and len(store) == 7
+    df = store.to_pandas()
+    assert df["Volume"].tolist() == [3.0, 4.0, 5.0, 6.0, 7.0, 8.0, 9.0]
+    more_data = [message for message in ws.sent
+                 if "request_more_data" in message]
+    assert len(more_data) == 2 and '"sds_1",3]' in more_data[0]
+    # The heartbeats are sent back.
+    assert ws.sent.count("~m~4~m~~h~1") == 3
+    assert ws.closed
+
+
+def test_stops_when_history_ends(tvdc, mocker):
+    """Tests the stop when there are no older bars."""
+    ws = FakeWebSocket([_chunk([DAY * 5, DAY * 6]), _chunk([DAY * 5])])
+    mocker.patch("fia.main.TvDataCollector.connect", return_value=ws)
+    chunks = []
+    total = tvdc.get_history("1970-01-01", chunks.append, chunk_bars=2)
+    assert total == 2 and len(chunks) == 1
+
+
+def test_closed_mid_history(tvdc, mocker):
+    """Tests the raise when the connection is closed inside a chunk."""
+    ws = FakeWebSocket([_chunk([DAY * 5, DAY * 6]),
+                        _chunk([DAY * 3, DAY * 4])[:1]])
+    mocker.patch("fia.main.TvDataCollector.connect", return_value=ws)
+    dump = mocker.patch.object(tvdc.tracer, "dump")
+    chunks = []
+    with pytest.raises(SystemExit):
+        tvdc.get_history("1970-01-01", chunks.append, chunk_bars=2)
+    assert len(chunks) == 1 and len(chunks[0]) == 2
+    assert sum("request_more_data" in message for message in ws.sent) == 1
+    assert dump.called and ws.closed
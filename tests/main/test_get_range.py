@@ -0,0 +1,130 @@
+import json
+
+import pandas as pd
+import pytest
+import websocket
+
+from fia.constants import Frame
+from fia.main import TvDataCollector
+from fia.symbols import SymbolCache
+
+
+def _open(day):
+    """Returns the NASDAQ session open of the day in seconds."""
+    return pd.Timestamp(f"{day} 09:30", tz="America/New_York").timestamp()
+
+
+def _chunk(days):
+    """Returns the frames of a chunk with the DAY bars."""
+    bars = [{"i": i, "v": [_open(day), 10.0, 11.0, 9.0, 10.5, 1.0]}
+            for i, day in enumerate(days)]
+    return [
+        TvDataCollector._create_message(
+            "timescale_update", ["cs_Lms...eEc", {"sds_1": {"s": bars}}]
+        ),
+        TvDataCollector._create_message("series_completed",
+                                        ["cs_Lms...eEc", "sds_1"]),
+    ]
+
+
+class FakeWebSocket:
+    """Returns the frames and records the sent messages."""
+    def __init__(self, frames):
+        self.frames = frames
+        self.sent = []
+
+    def recv(self):
+        if not self.frames:
+            raise websocket.WebSocketConnectionClosedException()
+        return self.frames.pop(0)
+
+    def send(self, message):
+        self.sent.append(message)
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def symbol_resolved():
+    """Returns the NASDAQ symbol_resolved message."""
+    return TvDataCollector._create_message(
+        "symbol_resolved",
+        ["cs_Lms...eEc", "sds_sym_1",
+         {"session": "0930-1600", "timezone": "America/New_York",
+          "session_holidays": "20221124"}]
+    )
+
+
+@pytest.fixture
+def tvdc(mocker):
+    """Returns an instance of TvDataCollector without sign in."""
+    mocker.patch("fia.main.TvDataCollector._open_session",
+                 return_value="cs_Lms...eEc")
+    return TvDataCollector(username="GoodName",
+                           password="StrongPSW123#",
+                           exchange="NASDAQ",
+                           ticker_sym="AAPL",
+                           currency="USD",
+                           frame=Frame.HOUR1,
+                           bars=5)
+
+
+def _sent(ws, m):
+    """Returns the parameters of the sent messages with the name."""
+    return [json.loads(message.split("~m~", 2)[2])["p"]
+            for message in ws.sent if f'"m":"{m}"' in message]
+
+
+def test_minimal_count_and_top_up(tvdc, mocker, symbol_resolved):
+    """Tests the estimated count, the top up and the trimming."""
+    ws = FakeWebSocket([symbol_resolved]
+                       + _chunk(["2022-11-23", "2022-11-25"])
+                       + _chunk(["2022-11-18", "2022-11-21",
+                                 "2022-11-22"]))
+    mocker.patch("fia.main.TvDataCollector.connect", return_value=ws)
+    df = tvdc.get_range("2022-11-21", "2022-11-26", frame=Frame.DAY)
+    end = int(pd.Timestamp("2022-11-26", tz="UTC").timestamp())
+    # 4 trading days: the 24th of November is a holiday.
+    assert _sent(ws, "create_series")[0][5] == ["bar_count", "D", 4, end]
+    assert _sent(ws, "request_more_data") == [["cs_Lms...eEc", "sds_1", 2]]
+    assert df["DateTime"].dt.strftime("%Y-%m-%d").tolist() == [
+        "2022-11-21", "2022-11-22", "2022-11-23", "2022-11-25"
+    ]
+    # The frame attribute is not changed.
+    assert tvdc.frame == "1H"
+
+
+def test_no_top_up_when_covered(tvdc, mocker, symbol_resolved):
+    """Tests that the complete range is requested once."""
+    ws = FakeWebSocket([symbol_resolved]
+                       + _chunk(["2022-11-21", "2022-11-22", "2022-11-23",
+                                 "2022-11-25"]))
+    mocker.patch("fia.main.TvDataCollector.connect", return_value=ws)
+    df = tvdc.get_range("2022-11-21", "2022-11-26", frame=Frame.DAY,
+                        tz="America/New_York")
+    assert _sent(ws, "request_more_data") == [] and len(df) == 4
+    assert str(df["DateTime"].dt.tz) == "America/New_York"
+
+
+def test_no_symbol_resolved(tvdc, mocker):
+    """Tests the raise when the symbol is not resolved."""
+    mocker.patch("fia.main.TvDataCollector.connect",
+                 return_value=FakeWebSocket(["~m~4~m~~h~1"]))
+    with pytest.raises(SystemExit) as exc_info:
+        tvdc.get_range("2022-11-21", "2022-11-26")
+    expected = "There is no symbol_resolved message in the raw data."
+    assert exc_info.value.args[0] == expected
+
+
+def test_cached_symbol_info(tvdc, mocker, symbol_resolved, tmp_path):
+    """Tests that the cached session is used without symbol_resolved."""
+    cache = SymbolCache(str(tmp_path / "symbols.json"))
+    cache.put(tvdc.request, json.loads(symbol_resolved.split("~m~", 2)[2])
+              ["p"][2])
+    mocker.patch.object(TvDataCollector, "symbol_cache", cache)
+    ws = FakeWebSocket(_chunk(["2022-11-21", "2022-11-22", "2022-11-23",
+                               "2022-11-25"]))
+    mocker.patch("fia.main.TvDataCollector.connect", return_value=ws)
+    df = tvdc.get_range("2022-11-21", "2022-11-26", frame=Frame.DAY)
+    assert _sent(ws, "create_series")[0][5][2] == 4 and len(df) == 4
@@ -1,11 +1,11 @@
-import importlib
-
 import pandas as pd
 import pytest
 from unittest import mock
+import os
 import sys
 
 
+from fia.cli_args import parse_cli_args
 from fia.main import main
 
 
@@ -29,12 +29,7 @@ def cli_args(monkeypatch, args_list):
     """Sets the env variables and returns the argparse.Namespace."""
     monkeypatch.setenv("TV_USERNAME", "GoodName")
     monkeypatch.setenv("TV_PASSWORD", "StrongPSW123#")
-    with mock.patch.object(sys, "argv", args_list):
-        # print("Mock sys.argv:", sys.argv, "\n")
-        from fia.cli_args import cli_args
-        importlib.reload(sys.modules["fia.cli_args"])
-        # print(cli_args)
-    return cli_args
+    return parse_cli_args(args_list[1:])
 
 
 @pytest.fixture
@@ -50,6 +45,36 @@ def test_returned_type(cli_args, mocker, raw_data):
         "fia.main.TvDataCollector.get_data",
         return_value=raw_data
     )
-    df = main()
+    df = main(cli_args)
+    assert isinstance(df, pd.DataFrame)
+
+
+def test_parses_sys_argv(monkeypatch, mocker, args_list, raw_data):
+    """Tests that main parses sys.argv without the cli_args."""
+    monkeypatch.setenv("TV_USERNAME", "GoodName")
+    monkeypatch.setenv("TV_PASSWORD", "StrongPSW123#")
+    mocker.patch(
+        "fia.main.TvDataCollector.get_data",
+        return_value=raw_data
+    )
+    with mock.patch.object(sys, "argv", args_list):
+        df = main()
     assert isinstance(df, pd.DataFrame)
 
+
+
+def test_profile(monkeypatch, mocker, args_list, raw_data, tmp_path, capsys):
+    """Tests that --profile writes the profiles of the phases."""
+    monkeypatch.setenv("TV_USERNAME", "GoodName")
+    monkeypatch.setenv("TV_PASSWORD", "StrongPSW123#")
+    mocker.patch(
+        "fia.main.TvDataCollector.get_data",
+        return_value=raw_data
+    )
+    cli_args = parse_cli_args(args_list[1:] + ["--profile", "cpu",
+                                               "--profile-dir",
+                                               str(tmp_path)])
+    main(cli_args)
+    assert {"get_json_data.prof", "get_pandas_data.prof",
+            "write.prof"} <= set(os.listdir(tmp_path))
+    assert "CPU profile by phase" in capsys.readouterr().err
@@ -0,0 +1,127 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from fia.aggregator import Bar, BarAggregator
+from fia.constants import Frame
+from fia.main import TvDataCollector
+from fia.resample import bucket_keys, resample_bars
+
+
+@pytest.fixture
+def min1_bars():
+    """Returns 2 hours of MIN1 bars from 2022-12-01 00:00 UTC."""
+    start = 1669852800.0
+    return [
+        [start + 60 * i, 10.0 + i, 11.0 + i, 9.0 + i, 10.5 + i, 1.0]
+        for i in range(120)
+    ]
+
+
+def test_closed_bars_match_resample(min1_bars):
+    """Tests that the streaming and batch aggregations are the same."""
+    closed = []
+    aggregator = BarAggregator(
+        [Frame.MIN5, Frame.MIN15, Frame.HOUR1],
+        on_close=lambda frame, bar: closed.append((frame, bar))
+    )
+    for bar in min1_bars:
+        aggregator.update(bar)
+    aggregator.flush()
+    df = pd.DataFrame(min1_bars, columns=["DateTime", "Open", "High", "Low",
+                                          "Close", "Volume"])
+    df["DateTime"] = pd.to_datetime(df["DateTime"], unit="s", utc=True)
+    for frame in (Frame.MIN5, Frame.MIN15, Frame.HOUR1):
+        expected = resample_bars(df, frame)
+        actual = [bar for closed_frame, bar in closed if closed_frame is frame]
+        assert len(actual) == len(expected)
+        np.testing.assert_array_equal(
+            np.array(actual)[:, 1:],
+            expected[["Open", "High", "Low", "Close", "Volume"]].to_numpy()
+        )
+
+
+def test_close_event_on_next_bucket(min1_bars):
+    """Tests that the bar is closed when the next bucket starts."""
+    closed = []
+    aggregator = BarAggregator(
+        [Frame.MIN5],
+        on_close=lambda frame, bar: closed.append(bar)
+    )
+    for bar in min1_bars[:5]:
+        aggregator.update(bar)
+    assert closed == []
+    aggregator.update(min1_bars[5])
+    assert closed == [Bar(1669852800.0, 10.0, 15.0, 9.0, 14.5, 5.0)]
+
+
+def test_live_update_replaces_last_bar(min1_bars):
+    """Tests that the du update replaces the current bar."""
+    aggregator = BarAggregator([Frame.MIN5])
+    aggregator.update(min1_bars[0])
+    aggregator.update(min1_bars[1])
+    aggregator.update([min1_bars[1][0], 11.0, 30.0, 1.0, 20.0, 3.0])
+    assert aggregator.bars[Frame.MIN5] == Bar(
+        1669852800.0, 10.0, 30.0, 1.0, 20.0, 4.0
+    )
+
+
+def test_old_bars_are_skipped(min1_bars):
+    """Tests that the bars older than the current one are skipped."""
+    aggregator = BarAggregator([Frame.MIN5])
+    aggregator.update(min1_bars[1])
+    aggregator.update(min1_bars[0])
+    assert aggregator.bars[Frame.MIN5].open == min1_bars[1][1]
+
+
+def test_feed_du_messages(min1_bars):
+    """Tests the updates from the du messages."""
+    raw_data = "".join(
+        TvDataCollector._create_message(
+            "du",
+            ["cs_Lms...eEc", {"sds_1": {"s": [{"i": i, "v": bar}]}}]
+        )
+        for i, bar in enumerate(min1_bars[:3])
+    )
+    aggregator = BarAggregator([Frame.MIN15])
+    aggregator.feed(raw_data)
+    assert aggregator.bars[Frame.MIN15].volume == 3.0
+
+
+def test_overnight_session_across_dst(mocker):
+    """Tests the keys of the overnight session across the DST change
+    and that they are calculated only at the ends of the bars."""
+    symbol_info = {"session": "1700-1600:23456",
+                   "timezone": "America/Chicago",
+                   "session_holidays": "20221111"}
+    start = pd.Timestamp("2022-10-28", tz="UTC").timestamp()
+    bars = [[start + 900 * i, 10.0 + i, 11.0 + i, 9.0 + i, 10.5 + i, 1.0]
+            for i in range(96 * 18)]
+    frames = [Frame.MIN45, Frame.HOUR4, Frame.DAY, Frame.WEEK]
+    keys = mocker.patch("fia.aggregator.bucket_keys",
+                        wraps=bucket_keys)
+    closed = []
+    aggregator = BarAggregator(
+        frames, symbol_info,
+        on_close=lambda frame, bar: closed.append((frame, bar))
+    )
+    for bar in bars:
+        aggregator.update(bar)
+    aggregator.flush()
+    # Once for every frame and date (18 days and the overnight start).
+    assert keys.call_count <= 19 * len(frames)
+    df = pd.DataFrame(bars, columns=["DateTime", "Open", "High", "Low",
+                                     "Close", "Volume"])
+    df["DateTime"] = pd.to_datetime(df["DateTime"], unit="s", utc=True)
+    for frame in frames:
+        expected = resample_bars(df, frame, symbol_info)
+        actual = np.array([bar for closed_frame, bar in closed
+                           if closed_frame is frame])
+        np.testing.assert_array_equal(
+            actual[:, 0] * 10**9,
+            expected["DateTime"].astype("int64").to_numpy()
+        )
+        np.testing.assert_array_equal(
+            actual[:, 1:],
+            expected[["Open", "High", "Low", "Close", "Volume"]].to_numpy()
+        )
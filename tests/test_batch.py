@@ -0,0 +1,145 @@
+import os
+
+import pandas as pd
+import pytest
+
+from fia import metrics
+from fia.batch import batch_main, read_manifest, run_batch
+from fia.cli_args import parse_batch_args
+from fia.constants import Frame
+from fia.main import TvDataCollector
+from fia.request import TvRequest
+
+
+@pytest.fixture
+def raw_data():
+    """Returns the raw data with 3 DAY bars."""
+    bars = [
+        {"i": i, "v": [1669852800.0 + 86400 * i, 10.0, 11.0, 9.0, 10.5, 1.0]}
+        for i in range(3)
+    ]
+    return (
+        TvDataCollector._create_message(
+            "timescale_update",
+            ["cs_Lms...eEc", {"sds_1": {"s": bars}}]
+        )
+        + TvDataCollector._create_message("series_completed",
+                                          ["cs_Lms...eEc", "sds_1"])
+    )
+
+
+@pytest.fixture
+def requests_list():
+    """Returns 2 requests."""
+    return [TvRequest("NASDAQ", "AAPL", "USD", Frame.DAY, 3),
+            TvRequest("CME", "BTC1!", "USD", Frame.HOUR1, 3)]
+
+
+def test_read_toml_manifest(tmp_path):
+    """Tests the defaults and the deduplication of TOML jobs."""
+    path = tmp_path / "manifest.toml"
+    path.write_text(
+        '[defaults]\ncurrency = "USD"\nframe = "DAY"\nbars = 50\n'
+        '[[jobs]]\nexchange = "NASDAQ"\nticker_sym = "AAPL"\n'
+        '[[jobs]]\nexchange = "CME"\nticker_sym = "BTC1!"\n'
+        'frame = "HOUR1"\nbars = 500\n'
+        '[[jobs]]\nexchange = "NASDAQ"\nticker_sym = "AAPL"\n'
+    )
+    assert read_manifest(str(path)) == [
+        TvRequest("NASDAQ", "AAPL", "USD", Frame.DAY, 50),
+        TvRequest("CME", "BTC1!", "USD", Frame.HOUR1, 500),
+    ]
+
+
+def test_read_csv_manifest(tmp_path):
+    """Tests the CSV jobs."""
+    path = tmp_path / "manifest.csv"
+    path.write_text("exchange,ticker_sym,currency,frame,bars\n"
+                    "NASDAQ,AAPL,USD,DAY,50\n")
+    assert read_manifest(str(path)) == [
+        TvRequest("NASDAQ", "AAPL", "USD", Frame.DAY, 50)
+    ]
+
+
+def test_read_manifest_wrong_frame(tmp_path):
+    """Tests the raise when the job has a wrong frame."""
+    path = tmp_path / "manifest.csv"
+    path.write_text("exchange,ticker_sym,currency,frame,bars\n"
+                    "NASDAQ,AAPL,USD,DAY2,50\n")
+    with pytest.raises(SystemExit):
+        read_manifest(str(path))
+
+
+def test_run_batch(tmp_path, mocker, raw_data, requests_list):
+    """Tests the output files and the summary."""
+    mocker.patch("fia.main.TvDataCollector.get_data", return_value=raw_data)
+    summary = run_batch(requests_list, "GoodName", "StrongPSW123#",
+                        output_path=str(tmp_path), output_format="json",
+                        workers=2, connections=1)
+    assert summary["status"].tolist() == ["done", "done"]
+    for path in summary["path"]:
+        assert path.endswith(".json") and os.path.exists(path)
+        assert len(pd.read_json(path)) == 3
+
+
+def test_run_batch_unique_files(tmp_path, mocker, raw_data):
+    """Tests the files of the jobs of one symbol and frame."""
+    mocker.patch("fia.main.TvDataCollector.get_data", return_value=raw_data)
+    requests = [TvRequest("NASDAQ", "AAPL", "USD", Frame.DAY, 3),
+                TvRequest("NASDAQ", "AAPL", "EUR", Frame.DAY, 3),
+                TvRequest("NASDAQ", "AAPL", "USD", Frame.DAY, 5)]
+    summary = run_batch(requests, "GoodName", "StrongPSW123#",
+                        output_path=str(tmp_path), workers=3, connections=3)
+    assert summary["status"].tolist() == ["done"] * 3
+    assert summary["path"].nunique() == 3
+    assert all(os.path.exists(path) for path in summary["path"])
+
+
+def test_run_batch_metrics(tmp_path, mocker, raw_data, requests_list):
+    """Tests the queue depth and the written rows metrics."""
+    registry = metrics.enable(metrics.Registry())
+    try:
+        mocker.patch("fia.main.TvDataCollector.get_data",
+                     return_value=raw_data)
+        run_batch(requests_list, "GoodName", "StrongPSW123#",
+                  output_path=str(tmp_path), workers=2, connections=1)
+    finally:
+        metrics.disable()
+    assert registry.get("fia_queue_depth", {"queue": "batch"}) == 0
+    assert registry.get("fia_queue_depth", {"queue": "connections"}) == 0
+    assert registry.get("fia_written_rows_total", {"format": "csv"}) == 6
+
+
+def test_run_batch_resumes(tmp_path, mocker, raw_data, requests_list):
+    """Tests that the finished jobs are skipped with the state file."""
+    state_file = str(tmp_path / "state.jsonl")
+    get_data = mocker.patch("fia.main.TvDataCollector.get_data",
+                            return_value=raw_data)
+    run_batch(requests_list[:1], "GoodName", "StrongPSW123#",
+              output_path=str(tmp_path), state_file=state_file)
+    summary = run_batch(requests_list, "GoodName", "StrongPSW123#",
+                        output_path=str(tmp_path), state_file=state_file)
+    assert summary["status"].tolist() == ["skipped", "done"]
+    assert get_data.call_count == 2
+
+
+def test_run_batch_failed_job(tmp_path, mocker, raw_data, requests_list):
+    """Tests that a failed job does not stop other jobs."""
+    mocker.patch("fia.main.TvDataCollector.get_data",
+                 side_effect=[SystemExit("Connection error"), raw_data])
+    summary = run_batch(requests_list, "GoodName", "StrongPSW123#",
+                        output_path=str(tmp_path), workers=1)
+    assert summary["status"].tolist() == ["failed", "done"]
+
+
+def test_batch_main(tmp_path, monkeypatch, mocker, raw_data):
+    """Tests the "fia batch" arguments."""
+    monkeypatch.setenv("TV_USERNAME", "GoodName")
+    monkeypatch.setenv("TV_PASSWORD", "StrongPSW123#")
+    mocker.patch("fia.main.TvDataCollector.get_data", return_value=raw_data)
+    path = tmp_path / "manifest.csv"
+    path.write_text("exchange,ticker_sym,currency,frame,bars\n"
+                    "NASDAQ,AAPL,USD,DAY,3\n")
+    summary = batch_main(parse_batch_args([str(path), "-o", str(tmp_path),
+                                          "-w", "1"]))
+    assert summary["status"].tolist() == ["done"]
@@ -0,0 +1,167 @@
+import gzip
+import multiprocessing
+import os
+import time
+
+import pytest
+
+from fia.capture import Capture, Replayer, iter_capture_file, read_index
+from fia.cli_args import parse_batch_args
+from fia.constants import CAPTURE_PATH, Frame
+from fia.fake_server import FakeTvServer
+from fia.main import TvDataCollector
+from fia.rate_limit import RateLimiter
+from fia.request import TvRequest
+from fia.testing import transcript_frames
+
+
+@pytest.fixture
+def request_aapl():
+    """Returns the request of the market data."""
+    return TvRequest("NASDAQ", "AAPL", "USD", Frame.MIN1, 20)
+
+
+def capture_frames(capture, request, frames, complete=True):
+    """Captures the frames as one collection."""
+    capture.start()
+    for frame in frames:
+        capture.received(frame)
+    return capture.finish(request, complete)
+
+
+def test_finish_without_start(tmp_path, request_aapl):
+    """Tests that nothing is written if the capture was not started."""
+    capture = Capture(str(tmp_path))
+    capture.received("~m~4~m~~h~1")
+    assert capture.finish(request_aapl) is None
+    assert os.listdir(tmp_path) == []
+
+
+def test_capture_and_replay(tmp_path, request_aapl):
+    """Tests that the frames are read back by the index."""
+    capture = Capture(str(tmp_path))
+    frames = transcript_frames(20, heartbeats=2)
+    capture_frames(capture, request_aapl, frames)
+    msft = request_aapl._replace(ticker_sym="MSFT")
+    capture_frames(capture, msft, frames[:3], complete=False)
+    entries = read_index(str(tmp_path))
+    assert [entry.symbol for entry in entries] == ["NASDAQ:AAPL",
+                                                   "NASDAQ:MSFT"]
+    assert [entry.complete for entry in entries] == [True, False]
+    replayer = Replayer(str(tmp_path))
+    (entry, raw_data), = replayer.replay(symbol="NASDAQ:MSFT")
+    assert entry.key == msft.key and entry.frames == 3
+    assert raw_data == "".join(frames[:3]) and not raw_data.complete
+    assert [frame for _, frame in replayer.read(entries[0])] == frames
+
+
+def test_capture_file_is_gzip(tmp_path, request_aapl):
+    """Tests that the appended members are one gzip file."""
+    capture = Capture(str(tmp_path))
+    for _ in range(3):
+        capture_frames(capture, request_aapl, ["~m~4~m~~h~1"])
+    entry = read_index(str(tmp_path))[-1]
+    path = os.path.join(tmp_path, entry.file)
+    with gzip.open(path, "rt") as file:
+        assert len(file.read().splitlines()) == 6
+    collections = list(iter_capture_file(path))
+    assert len(collections) == 3
+    assert collections[0][0]["key"] == request_aapl.key
+    assert [frame for _, frame in collections[0][1]] == ["~m~4~m~~h~1"]
+
+
+def _capture_in_process(path, request):
+    """Captures the collections in a worker process."""
+    capture = Capture(path)
+    for i in range(20):
+        capture_frames(capture, request, [f"~m~4~m~~h~{i}"] * (i + 1))
+
+
+def test_processes_write_own_files(tmp_path, request_aapl):
+    """Tests the offsets of the collections of many processes."""
+    context = multiprocessing.get_context("fork")
+    processes = [
+        context.Process(target=_capture_in_process,
+                        args=(str(tmp_path),
+                              request_aapl._replace(ticker_sym=ticker_sym)))
+        for ticker_sym in ("AAPL", "MSFT", "NVDA")
+    ]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+    entries = read_index(str(tmp_path))
+    assert len({entry.file for entry in entries}) == 3
+    assert len(entries) == 60
+    replayer = Replayer(str(tmp_path))
+    for entry in entries:
+        assert len(replayer.read(entry)) == entry.frames
+
+
+def test_real_time_replay(tmp_path, request_aapl):
+    """Tests that the recorded delays are kept in real time."""
+    capture = Capture(str(tmp_path))
+    capture.start()
+    capture.received("~m~4~m~~h~1")
+    time.sleep(0.1)
+    capture.received("~m~4~m~~h~2")
+    entry = capture.finish(request_aapl)
+    start = time.monotonic()
+    assert list(Replayer(str(tmp_path), speed=1.0).frames(entry)) == [
+        "~m~4~m~~h~1", "~m~4~m~~h~2"
+    ]
+    assert time.monotonic() - start >= 0.09
+    start = time.monotonic()
+    list(Replayer(str(tmp_path)).frames(entry))
+    assert time.monotonic() - start < 0.09
+
+
+def test_get_data_is_captured(tmp_path, monkeypatch):
+    """Tests the capture of get_data and the reprocessing."""
+    monkeypatch.setattr(TvDataCollector, "rate_limiter", RateLimiter(
+        {name: (1000.0, 1000) for name in ("sign_in", "connect", "series")}
+    ))
+    monkeypatch.setattr(TvDataCollector, "capture", Capture(str(tmp_path)))
+    tvdc = TvDataCollector(username="GoodName", password="StrongPSW123#",
+                           exchange="NASDAQ", ticker_sym="AAPL",
+                           currency="USD", frame=Frame.HOUR1, bars=30)
+    with FakeTvServer(bars=100) as server:
+        monkeypatch.setattr(TvDataCollector, "sign_in_url",
+                            server.sign_in_url)
+        monkeypatch.setattr(TvDataCollector, "ws_url", server.ws_url)
+        raw_data = tvdc.get_data()
+    (entry, replayed), = Replayer(str(tmp_path)).replay()
+    assert entry.key == "NASDAQ:AAPL:USD:HOUR1:30"
+    assert replayed == raw_data and replayed.complete
+    df = tvdc.get_pandas_data(replayed, tz="America/New_York")
+    assert len(df) == 30 and str(df["DateTime"].dt.tz) == "America/New_York"
+
+
+def test_retries_are_merged(tmp_path, monkeypatch):
+    """Tests that the replay merges the connections of the retries."""
+    monkeypatch.setattr("fia.main.RETRY_BACKOFF", 0)
+    monkeypatch.setattr(TvDataCollector, "rate_limiter", RateLimiter(
+        {name: (1000.0, 1000) for name in ("sign_in", "connect", "series")}
+    ))
+    monkeypatch.setattr(TvDataCollector, "capture", Capture(str(tmp_path)))
+    tvdc = TvDataCollector(username="GoodName", password="StrongPSW123#",
+                           exchange="NASDAQ", ticker_sym="AAPL",
+                           currency="USD", frame=Frame.MIN1, bars=100)
+    with FakeTvServer(bars=100, disconnect=0.5, seed=1) as server:
+        monkeypatch.setattr(TvDataCollector, "sign_in_url",
+                            server.sign_in_url)
+        monkeypatch.setattr(TvDataCollector, "ws_url", server.ws_url)
+        raw_data = tvdc.get_data()
+    (entry, replayed), = Replayer(str(tmp_path)).replay()
+    assert len(entry.connections) > 1
+    assert replayed == raw_data and replayed.complete
+    assert len(tvdc.get_pandas_data(replayed)) == 100
+
+
+def test_batch_capture_flag(monkeypatch):
+    """Tests the default capture folder of the --capture flag."""
+    monkeypatch.setenv("TV_USERNAME", "GoodName")
+    monkeypatch.setenv("TV_PASSWORD", "StrongPSW123#")
+    assert parse_batch_args(["jobs.toml"]).CAPTURE is None
+    assert parse_batch_args(["jobs.toml", "--capture"]).CAPTURE == \
+        CAPTURE_PATH
@@ -5,6 +5,8 @@ import pytest
 import sys
 from unittest import mock
 
+from fia.cli_args import parse_batch_args, parse_cli_args
+
 
 # We do not have to set all args. Some args have the default values.
 # The are 3 typical cases. For every case, we create fixtures.
@@ -58,40 +60,25 @@ def max_args_list():
 
 
 # Create fixture for 3 cases (set environmental variables by using
-# monkeypatch and mock sys.argv by using mock.patch.object.
+# monkeypatch and parse the list of args without the program name).
 @pytest.fixture
 def cli_args_min(monkeypatch, min_args_list):
     """Returns argparse.Namespace for the minimal list of args."""
     monkeypatch.setenv("TV_USERNAME", "GoodName")
     monkeypatch.setenv("TV_PASSWORD", "StrongPSW123#")
-    with mock.patch.object(sys, "argv", min_args_list):
-        # print("Mock sys.argv:", sys.argv, "\n")
-        from fia.cli_args import cli_args
-        # print(cli_args)
-    return cli_args
+    return parse_cli_args(min_args_list[1:])
 
 
 @pytest.fixture
 def cli_args_mid(monkeypatch, mid_args_list):
     """Returns argparse.Namespace for the middle list of args."""
-    with mock.patch.object(sys, "argv", mid_args_list):
-        # print("Mock sys.argv:", sys.argv, "\n")
-        # Force to reload fia.cli_args to set new Namespace
-        importlib.reload(sys.modules["fia.cli_args"])
-        from fia.cli_args import cli_args
-        # print(cli_args)
-    return cli_args
+    return parse_cli_args(mid_args_list[1:])
 
 
 @pytest.fixture
 def cli_args_max(monkeypatch, max_args_list):
     """Returns argparse.Namespace for the maximal list of args."""
-    with mock.patch.object(sys, "argv", max_args_list):
-        # print("Mock sys.argv:", sys.argv, "\n")
-        importlib.reload(sys.modules["fia.cli_args"])
-        from fia.cli_args import cli_args
-        # print(cli_args)
-    return cli_args
+    return parse_cli_args(max_args_list[1:])
 
 
 # Generate tests.
@@ -178,17 +165,34 @@ def test_arg_parse_raises(monkeypatch, args):
     """Tests the raise when username or/and password is None."""
     monkeypatch.delenv("TV_USERNAME", raising=False)
     monkeypatch.delenv("TV_PASSWORD", raising=False)
-    with mock.patch.object(sys, "argv", args):
-        # print("Mock sys.argv:", sys.argv, "\n")
-        expected = ("You have to set up USERNAME OR/AND PASSWORD over command "
-                    "line interface or add environment variables.")
-        with pytest.raises(SystemExit) as exc_info:
-            importlib.reload(sys.modules["fia.cli_args"])
-            from fia.cli_args import cli_args
-            # print(cli_args)
-        assert exc_info.value.args[0] == expected
+    expected = ("You have to set up USERNAME OR/AND PASSWORD over command "
+                "line interface or add environment variables.")
+    with pytest.raises(SystemExit) as exc_info:
+        parse_cli_args(args[1:])
+    assert exc_info.value.args[0] == expected
 
 
+def test_import_does_not_parse(monkeypatch):
+    """Tests that the import does not parse sys.argv."""
+    monkeypatch.delenv("TV_USERNAME", raising=False)
+    monkeypatch.delenv("TV_PASSWORD", raising=False)
+    with mock.patch.object(sys, "argv", ["prog"]):
+        importlib.reload(sys.modules["fia.cli_args"])
+
 
+def test_cli_args_attribute(monkeypatch, min_args_list):
+    """Tests that the cli_args attribute parses sys.argv."""
+    monkeypatch.setenv("TV_USERNAME", "GoodName")
+    monkeypatch.setenv("TV_PASSWORD", "StrongPSW123#")
+    with mock.patch.object(sys, "argv", min_args_list):
+        from fia.cli_args import cli_args
+    assert cli_args.TICKER_SYM == "AAPL"
 
 
+def test_parse_batch_args(monkeypatch):
+    """Tests the "fia batch" arguments."""
+    monkeypatch.setenv("TV_USERNAME", "GoodName")
+    monkeypatch.setenv("TV_PASSWORD", "StrongPSW123#")
+    args = parse_batch_args(["jobs.toml", "--format", "json", "-w", "2"])
+    assert (args.MANIFEST, args.FORMAT, args.WORKERS) == ("jobs.toml",
+                                                          "json", 2)
@@ -0,0 +1,116 @@
+import json
+import os
+
+import pytest
+
+from fia.capture import Capture
+from fia.cli_args import parse_convert_args
+from fia.constants import CONVERT_STATE, Frame
+from fia.convert import decode_file, find_inputs, run_convert
+from fia.request import TvRequest
+from fia.store import BarStore, store_path
+from fia.testing import synthetic_bars, transcript_frames
+
+
+def write_capture(path, ticker_syms, bars=50):
+    """Captures one collection of every symbol."""
+    capture = Capture(str(path))
+    for ticker_sym in ticker_syms:
+        capture.start()
+        for frame in transcript_frames(bars, du_tail=3, heartbeats=2,
+                                       symbol=f"NASDAQ:{ticker_sym}"):
+            capture.received(frame)
+        capture.finish(TvRequest("NASDAQ", ticker_sym, "USD", Frame.MIN1,
+                                 bars))
+
+
+def test_find_inputs(tmp_path):
+    """Tests that only the capture and raw data files are found."""
+    (tmp_path / "sub").mkdir()
+    for name in ("a.capture.gz", "a.capture.gz.idx", "sub/B_X_DAY.raw",
+                 "c.csv"):
+        (tmp_path / name).write_text("")
+    assert find_inputs(str(tmp_path)) == [
+        str(tmp_path / "a.capture.gz"), str(tmp_path / "sub/B_X_DAY.raw")
+    ]
+
+
+def test_decoded_bars_are_unique(tmp_path):
+    """Tests that the du updates do not repeat the bars."""
+    raw_file = tmp_path / "AAPL_NASDAQ_MIN1.raw"
+    raw_file.write_text("".join(transcript_frames(100, du_tail=50)))
+    result = decode_file(str(raw_file))
+    (exchange, ticker_sym, frame, values), = result["bars"]
+    assert (exchange, ticker_sym, frame) == ("NASDAQ", "AAPL", "MIN1")
+    assert values.shape == (100, 6)
+    assert values[:, 0].tolist() == sorted(set(values[:, 0]))
+
+
+def test_convert_captures_to_store(tmp_path):
+    """Tests the bars of the stores and the skip of the second run."""
+    write_capture(tmp_path / "capture", ["AAPL", "MSFT"])
+    output = str(tmp_path / "output")
+    summary = run_convert(str(tmp_path / "capture"), output, workers=2)
+    assert summary["status"].tolist() == ["done"]
+    assert summary["collections"].tolist() == [2]
+    for ticker_sym in ("AAPL", "MSFT"):
+        store = BarStore(store_path(output, "NASDAQ", ticker_sym, "MIN1"))
+        values = store.to_numpy()
+        assert len(values) == 50
+        assert values[:, 0].tolist() == sorted(values[:, 0])
+    summary = run_convert(str(tmp_path / "capture"), output, workers=2)
+    assert summary["status"].tolist() == ["skipped"]
+    summary = run_convert(str(tmp_path / "capture"), output, workers=2,
+                          check="hash", force=True)
+    assert summary["status"].tolist() == ["done"]
+    with open(os.path.join(output, CONVERT_STATE), encoding="utf-8") as file:
+        assert len([json.loads(line) for line in file]) == 2
+
+
+def test_changed_capture_is_converted(tmp_path):
+    """Tests that an appended capture is converted again."""
+    write_capture(tmp_path / "capture", ["AAPL"])
+    output = str(tmp_path / "output")
+    run_convert(str(tmp_path / "capture"), output, workers=1)
+    write_capture(tmp_path / "capture", ["MSFT"])
+    summary = run_convert(str(tmp_path / "capture"), output, workers=1)
+    assert summary["status"].tolist() == ["done"]
+    store = BarStore(store_path(output, "NASDAQ", "AAPL", "MIN1"))
+    assert len(store.to_numpy()) == 50
+
+
+def test_convert_raw_file(tmp_path, monkeypatch):
+    """Tests the raw data file read in small chunks."""
+    monkeypatch.setattr("fia.convert.CONVERT_CHUNK", 100)
+    raw_file = tmp_path / "AAPL_NASDAQ_MIN1_20221115_13_03_20.raw"
+    raw_file.write_text("".join(transcript_frames(30, du_tail=2)))
+    (tmp_path / "bad.raw").write_text("~m~4~m~~h~1")
+    output = str(tmp_path / "output")
+    summary = run_convert(str(tmp_path), output, workers=1)
+    statuses = dict(zip(summary["path"].map(os.path.basename),
+                        summary["status"]))
+    assert statuses == {raw_file.name: "done", "bad.raw": "failed"}
+    store = BarStore(store_path(output, "NASDAQ", "AAPL", "MIN1"))
+    expected = [bar[0] for bar in synthetic_bars(30)]
+    assert store.to_numpy()[:, 0].tolist() == expected
+
+
+def test_convert_to_parquet(tmp_path):
+    """Tests the partitioned Parquet files."""
+    pd = pytest.importorskip("pandas")
+    pytest.importorskip("pyarrow")
+    write_capture(tmp_path / "capture", ["AAPL"])
+    output = tmp_path / "output"
+    run_convert(str(tmp_path / "capture"), str(output),
+                output_format="parquet", workers=1)
+    folder = output / "exchange=NASDAQ" / "ticker_sym=AAPL" / "frame=MIN1"
+    (parquet_file,) = folder.iterdir()
+    assert len(pd.read_parquet(parquet_file)) == 50
+
+
+def test_parse_convert_args():
+    """Tests the "fia convert" arguments."""
+    args = parse_convert_args(["captures", "--format", "parquet", "-w", "2",
+                               "--check", "hash", "--force"])
+    assert (args.INPUT, args.FORMAT, args.WORKERS, args.CHECK,
+            args.FORCE) == ("captures", "parquet", 2, "hash", True)
@@ -0,0 +1,75 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from fia.correlation import (RollingCovariance, cov_to_corr, rolling_corr,
+                             rolling_cov)
+
+
+@pytest.fixture(scope="module")
+def panel():
+    """Returns the correlated random panel (300 rows, 5 series)."""
+    rng = np.random.default_rng(7)
+    common = rng.normal(size=(300, 1))
+    return 1000.0 + common + rng.normal(scale=0.5, size=(300, 5))
+
+
+def expected_cov(panel, window, step=1):
+    """Calculates the covariance of every window by numpy.cov."""
+    return np.array([np.cov(panel[end - window + 1:end + 1], rowvar=False)
+                     for end in range(window - 1, len(panel), step)])
+
+
+@pytest.mark.parametrize("window, step, block",
+                         [(20, 1, 256), (20, 3, 7), (50, 1, 16), (300, 1, 8)])
+def test_rolling_cov(panel, window, step, block):
+    """Tests the batch covariance against numpy.cov."""
+    actual = rolling_cov(panel, window, step=step, block=block)
+    np.testing.assert_allclose(actual, expected_cov(panel, window, step),
+                               rtol=1e-9, atol=1e-12)
+
+
+def test_rolling_corr_diagonal(panel):
+    """Tests that the correlation of a series with itself is 1."""
+    corr = rolling_corr(panel, 30)
+    np.testing.assert_allclose(np.diagonal(corr, axis1=1, axis2=2), 1.0)
+
+
+def test_rolling_cov_dataframe(panel):
+    """Tests that DataFrame is accepted."""
+    df = pd.DataFrame(panel, columns=list("ABCDE"))
+    assert rolling_cov(df, 20).shape == (281, 5, 5)
+
+
+def test_short_panel(panel):
+    """Tests that no matrices are returned for a short panel."""
+    assert rolling_cov(panel[:5], 20).shape == (0, 5, 5)
+
+
+def test_incremental_equals_batch(panel):
+    """Tests the incremental covariance against the batch one."""
+    engine = RollingCovariance(5, 20)
+    actual = []
+    for row in panel:
+        engine.update(row)
+        if engine.ready:
+            actual.append(engine.cov())
+    np.testing.assert_allclose(np.array(actual), rolling_cov(panel, 20),
+                               rtol=1e-9, atol=1e-12)
+    np.testing.assert_allclose(engine.corr(),
+                               cov_to_corr(expected_cov(panel, 20)[-1]))
+
+
+def test_not_ready():
+    """Tests NaN matrix when the window is not full."""
+    engine = RollingCovariance(2, 3)
+    engine.update([1.0, 2.0])
+    assert not engine.ready and np.isnan(engine.cov()).all()
+
+
+def test_nan_raises(panel):
+    """Tests the raise when the panel includes NaN."""
+    values = panel.copy()
+    values[3, 1] = np.nan
+    with pytest.raises(SystemExit):
+        rolling_cov(values, 20)
@@ -0,0 +1,124 @@
+import pytest
+
+from fia.constants import Frame
+from fia.fake_server import FakeTvServer
+from fia.main import TvDataCollector
+from fia.rate_limit import RateLimiter
+from fia.request import TvRequest
+from fia.testing import make_transcript
+
+
+@pytest.fixture
+def server(monkeypatch):
+    """Starts the stand-in server and points the collectors to it."""
+    with FakeTvServer(bars=1000) as server:
+        monkeypatch.setattr(TvDataCollector, "sign_in_url",
+                            server.sign_in_url)
+        monkeypatch.setattr(TvDataCollector, "ws_url", server.ws_url)
+        monkeypatch.setattr(TvDataCollector, "rate_limiter", RateLimiter(
+            {name: (1000.0, 1000) for name in ("sign_in", "connect",
+                                               "series")}
+        ))
+        monkeypatch.setattr("fia.main.RETRY_BACKOFF", 0.0)
+        yield server
+
+
+@pytest.fixture
+def tvdc():
+    """Creates the TvDataCollector."""
+    return TvDataCollector(username="GoodName",
+                           password="StrongPSW123#",
+                           exchange="NASDAQ",
+                           ticker_sym="AAPL",
+                           currency="USD",
+                           frame=Frame.MIN1,
+                           bars=100)
+
+
+def test_sign_in(server, tvdc):
+    """Tests the authorization token."""
+    assert tvdc.get_auth_token().startswith("fake_GoodName_")
+
+
+def test_get_data(server, tvdc):
+    """Tests that the last bars of the symbol are received."""
+    raw_data = tvdc.get_data()
+    assert raw_data.complete
+    df = tvdc.get_pandas_data(raw_data)
+    history = server.history("NASDAQ:AAPL", Frame.MIN1)
+    assert df["Close"].tolist() == [bar[4] for bar in history[-100:]]
+    assert server.connections == 1
+
+
+def test_tail(server, tvdc):
+    """Tests the du messages and the heartbeats after the series."""
+    server.du_tail, server.heartbeats = 3, 2
+    raw_data = tvdc.get_data()
+    assert raw_data.count('"m":"du"') == 3
+    assert "~m~4~m~~h~2" in raw_data
+
+
+def test_sign_in_once(server, tvdc, monkeypatch):
+    """Tests that the token is reused until it is rejected."""
+    monkeypatch.setattr(TvDataCollector, "_auth_tokens", {})
+    for _ in range(3):
+        assert tvdc.get_data().complete
+    assert server.sign_ins == 1
+    server.revoked.update(TvDataCollector._auth_tokens.values())
+    # The rejected token is dropped and the retry signs in again.
+    assert tvdc.get_data().complete
+    assert server.sign_ins == 2
+    assert server.connections == 5
+
+
+def test_disconnect(server, tvdc, monkeypatch):
+    """Tests that only the missing bars are requested after the
+    disconnections."""
+    server.disconnect = 1.0
+    monkeypatch.setattr(TvDataCollector, "retries", 1)
+    raw_data = tvdc.get_data()
+    # 50 bars of the first connection and 25 of the retry.
+    assert not raw_data.complete
+    assert len(tvdc.get_pandas_data(raw_data)) == 75
+    assert server.connections == 2
+
+
+def test_get_update_reuses_connection(server, tvdc):
+    """Tests two series over one connection."""
+    ws = tvdc.connect()
+    try:
+        for ticker_sym in ("AAPL", "MSFT"):
+            bars, close_time, symbol_info = tvdc.get_update(
+                ws, TvRequest("NASDAQ", ticker_sym, "USD", Frame.MIN1, 3)
+            )
+            history = server.history(f"NASDAQ:{ticker_sym}", Frame.MIN1)
+            assert bars == history[-3:]
+            assert close_time == history[-1][0] + 60
+            assert symbol_info["name"] == ticker_sym
+    finally:
+        ws.close()
+    assert server.connections == 1
+
+
+def test_invalid_symbol(server, tvdc, monkeypatch):
+    """Tests the stop on symbol_error without waiting for the close."""
+    server.invalid.add("NASDAQ:AAPL")
+    monkeypatch.setattr(TvDataCollector, "retries", 0)
+    ws = tvdc.connect()
+    try:
+        with pytest.raises(SystemExit, match="symbol_error"):
+            tvdc.get_update(ws, tvdc.request)
+    finally:
+        ws.close()
+    with pytest.raises(SystemExit, match="symbol_error"):
+        tvdc.get_range("2022-01-01", "2022-01-02")
+    with pytest.raises(SystemExit, match="symbol_error"):
+        tvdc.get_data()
+
+
+def test_recording(server, tvdc):
+    """Tests that the recorded raw data is replayed."""
+    server.recording = make_transcript(20, heartbeats=1)
+    raw_data = tvdc.get_data()
+    assert raw_data.complete
+    assert len(tvdc.get_pandas_data(raw_data)) == 20
@@ -0,0 +1,147 @@
+import io
+import json
+import threading
+import urllib.error
+import urllib.request
+
+import numpy as np
+import pytest
+
+from fia.http_server import BarServer
+from fia.store import BarStore, store_path
+
+
+@pytest.fixture
+def server(tmp_path):
+    """Runs the server with 5 DAY bars of NASDAQ:AAPL."""
+    store = BarStore(store_path(str(tmp_path), "NASDAQ", "AAPL", "DAY"))
+    store.append(np.array([[86400.0 * i, 10.0 + i, 11.0, 9.0, 10.5, 1.0]
+                           for i in range(5)]))
+    server = BarServer(("127.0.0.1", 0), str(tmp_path))
+    thread = threading.Thread(target=server.serve_forever, args=(0.01,),
+                              daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def _get(server, path, headers=None):
+    """Sends the GET request and returns the response."""
+    url = f"http://127.0.0.1:{server.server_address[1]}{path}"
+    request = urllib.request.Request(url, headers=headers or {})
+    try:
+        with urllib.request.urlopen(request) as response:
+            return response.status, response.headers, response.read()
+    except urllib.error.HTTPError as e:
+        return e.code, e.headers, e.read()
+
+
+def test_range_and_fields(server):
+    """Tests the range query with the projected columns."""
+    status, headers, body = _get(
+        server, "/bars/NASDAQ/AAPL/DAY?start=1970-01-02&end=259200"
+                "&fields=Open,Volume"
+    )
+    assert status == 200
+    assert headers["Content-Type"] == "application/json"
+    records = json.loads(body)
+    assert [list(record) for record in records] == [
+        ["DateTime", "Open", "Volume"]
+    ] * 3
+    assert [record["Open"] for record in records] == [11.0, 12.0, 13.0]
+
+
+def test_after_and_csv(server):
+    """Tests the incremental fetch in CSV format."""
+    status, headers, body = _get(server, "/bars/NASDAQ/AAPL/DAY?after=259200",
+                                 {"Accept": "text/csv"})
+    assert status == 200 and headers["Content-Type"] == "text/csv"
+    assert body.decode().splitlines() == [
+        "DateTime,Open,High,Low,Close,Volume",
+        "1970-01-05 00:00:00+00:00,14.0,11.0,9.0,10.5,1.0",
+    ]
+
+
+def test_etag(server):
+    """Tests the Not Modified response and the cache."""
+    path = "/bars/NASDAQ/AAPL/DAY?fields=Close"
+    _, headers, _ = _get(server, path)
+    status, _, body = _get(server, path, {"If-None-Match": headers["ETag"]})
+    assert status == 304 and body == b""
+    _get(server, path)
+    assert server.cache.metrics()["hits"] == 1
+    # The append changes the version of the store and the ETag.
+    BarStore(store_path(server.output_path, "NASDAQ", "AAPL", "DAY")).append(
+        np.array([[86400.0 * 5, 15.0, 11.0, 9.0, 10.5, 1.0]])
+    )
+    status, new_headers, _ = _get(server, path,
+                                  {"If-None-Match": headers["ETag"]})
+    assert status == 200 and new_headers["ETag"] != headers["ETag"]
+
+
+def test_etag_list(server):
+    """Tests the exact match of the ETags of the If-None-Match list."""
+    path = "/bars/NASDAQ/AAPL/DAY"
+    _, headers, _ = _get(server, path)
+    etag = headers["ETag"]
+    for if_none_match, status in [
+        (f'"x", W/{etag}', 304),
+        ("*", 304),
+        (f'"x{etag[1:-1]}x"', 200),
+        (etag[1:-1], 200),
+        (f'"{etag}"', 200),
+    ]:
+        assert _get(server, path,
+                    {"If-None-Match": if_none_match})[0] == status
+
+
+def test_internal_error(server, mocker):
+    """Tests the 500 response when the store cannot be read."""
+    mocker.patch("fia.http_server.BarStore.to_numpy",
+                 side_effect=OSError("The disk is broken."))
+    status, _, body = _get(server, "/bars/NASDAQ/AAPL/DAY")
+    assert status == 500 and body == b"The bars cannot be read."
+
+
+@pytest.mark.parametrize(
+    "path, status",
+    [
+        ("/bars/NASDAQ/MSFT/DAY", 404),
+        ("/bars/NASDAQ/AAPL/DAY2", 404),
+        ("/symbols", 404),
+        ("/bars/NASDAQ/AAPL/DAY?fields=Price", 400),
+        ("/bars/NASDAQ/AAPL/DAY?start=yesterday", 400),
+        ("/bars/NASDAQ/AAPL/DAY?format=xml", 400),
+    ]
+)
+def test_errors(server, path, status):
+    """Tests the wrong queries."""
+    assert _get(server, path)[0] == status
+
+
+def test_encoded_separators(tmp_path):
+    """Tests that the encoded slashes do not open a store outside."""
+    secret = tmp_path / "secret"
+    BarStore(store_path(str(secret), "NASDAQ", "AAPL", "DAY")).append(
+        np.array([[0.0, 1.0, 1.0, 1.0, 1.0, 1.0]])
+    )
+    server = BarServer(("127.0.0.1", 0), str(tmp_path / "output"))
+    thread = threading.Thread(target=server.serve_forever, args=(0.01,),
+                              daemon=True)
+    thread.start()
+    try:
+        for ticker_sym in (f"{secret}/AAPL".replace("/", "%2F"),
+                           "..%2Fsecret%2FAAPL", "..%5Csecret%5CAAPL"):
+            assert _get(server, f"/bars/NASDAQ/{ticker_sym}/DAY")[0] == 404
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_arrow(server):
+    """Tests the Arrow IPC stream."""
+    pa = pytest.importorskip("pyarrow")
+    _, _, body = _get(server, "/bars/NASDAQ/AAPL/DAY?format=arrow")
+    table = pa.ipc.open_stream(io.BytesIO(body)).read_all()
+    assert table.num_rows == 5
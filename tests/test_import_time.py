@@ -0,0 +1,44 @@
+import subprocess
+import sys
+
+
+# The modules that must not be imported by "import fia" and by the
+# argument parsing.
+HEAVY_MODULES = ("pandas", "numpy", "websocket", "requests")
+
+
+def _run(code):
+    """Runs the code in a new interpreter and returns the result."""
+    return subprocess.run([sys.executable, "-X", "importtime", "-c", code],
+                          capture_output=True, text=True, check=False)
+
+
+def test_import_is_light():
+    """Tests that "import fia" does not import the heavy modules."""
+    result = _run("import sys, fia, fia.cli_args; "
+                  f"print([m for m in {HEAVY_MODULES!r} "
+                  "if m in sys.modules])")
+    assert result.stdout.strip() == "[]"
+
+
+def test_help_is_light():
+    """Tests that "fia --help" exits before the heavy imports."""
+    result = _run("import sys\n"
+                  "sys.argv = ['fia', '--help']\n"
+                  "from fia.cli import main\n"
+                  "try:\n"
+                  "    main()\n"
+                  "except SystemExit:\n"
+                  f"    print([m for m in {HEAVY_MODULES!r} "
+                  "if m in sys.modules])")
+    assert result.stdout.strip().splitlines()[-1] == "[]"
+
+
+def test_import_time_budget():
+    """Tests the cumulative import time of the fia modules."""
+    result = _run("import fia, fia.cli_args")
+    # The lines are "import time: self [us] | cumulative | package".
+    cumulative = [int(line.split("|")[1])
+                  for line in result.stderr.splitlines()
+                  if line.split("|")[-1].strip() == "fia"]
+    assert cumulative and cumulative[0] < 300_000
@@ -0,0 +1,113 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from fia import indicators
+
+
+@pytest.fixture(scope="module")
+def df():
+    """Returns the random walk market data."""
+    rng = np.random.default_rng(42)
+    close = 100.0 + np.cumsum(rng.normal(0.0, 1.0, 500))
+    return pd.DataFrame({
+        "Open": close + rng.normal(0.0, 0.2, 500),
+        "High": close + rng.uniform(0.0, 1.0, 500),
+        "Low": close - rng.uniform(0.0, 1.0, 500),
+        "Close": close,
+        "Volume": rng.uniform(1.0, 100.0, 500)
+    })
+
+
+def replay(indicator, df, columns):
+    """Updates the indicator bar by bar and returns the values."""
+    return np.array([indicator.update(*row)
+                     for row in df[columns].itertuples(index=False)])
+
+
+@pytest.mark.parametrize(
+    "function, indicator",
+    [
+        (lambda df: indicators.sma(df["Close"], 20), indicators.SMA(20)),
+        (lambda df: indicators.ema(df["Close"], 20), indicators.EMA(20)),
+        (lambda df: indicators.rsi(df["Close"], 14), indicators.RSI(14))
+    ],
+    ids=["SMA", "EMA", "RSI"]
+)
+def test_close_indicators_batch_equals_incremental(df, function, indicator):
+    """Tests that the batch and incremental values are equal."""
+    expected = function(df).to_numpy()
+    np.testing.assert_array_equal(replay(indicator, df, ["Close"]), expected)
+
+
+def test_atr_batch_equals_incremental(df):
+    """Tests that the batch and incremental ATR values are equal."""
+    expected = indicators.atr(df, 14).to_numpy()
+    actual = replay(indicators.ATR(14), df, ["High", "Low", "Close"])
+    np.testing.assert_array_equal(actual, expected)
+
+
+def test_vwap_batch_equals_incremental(df):
+    """Tests that the batch and incremental VWAP values are equal."""
+    expected = indicators.vwap(df).to_numpy()
+    actual = replay(indicators.VWAP(), df,
+                    ["High", "Low", "Close", "Volume"])
+    np.testing.assert_array_equal(actual, expected)
+
+
+def test_bollinger_batch_equals_incremental(df):
+    """Tests that the batch and incremental bands are equal."""
+    expected = indicators.bollinger(df["Close"], 20, 2.0).to_numpy()
+    actual = replay(indicators.Bollinger(20, 2.0), df, ["Close"])
+    np.testing.assert_array_equal(actual, expected)
+
+
+@pytest.mark.parametrize("window", [1, 20, 1500])
+def test_bollinger_equal_across_anchors(window):
+    """Tests the equal bands over many blocks of the reference close."""
+    rng = np.random.default_rng(7)
+    close = pd.Series(5000.0 + np.cumsum(rng.normal(0.0, 0.5, 3000)))
+    expected = indicators.bollinger(close, window, 2.0).to_numpy()
+    actual = replay(indicators.Bollinger(window, 2.0), close.to_frame("Close"),
+                    ["Close"])
+    np.testing.assert_array_equal(actual, expected)
+
+
+def test_bollinger_long_series_is_stable():
+    """Tests the bands of a long drifting series at a high level."""
+    rng = np.random.default_rng(3)
+    count = 3_000_000
+    close = pd.Series(1e5 + np.linspace(0.0, 5e4, count)
+                      + np.cumsum(rng.normal(0.0, 0.01, count)))
+    bands = indicators.bollinger(close, 20, 2.0)
+    tail = close.to_numpy()[-20:]
+    width = bands["Upper"].iloc[-1] - bands["Middle"].iloc[-1]
+    np.testing.assert_allclose(width, 2.0 * tail.std(), rtol=1e-6)
+
+
+def test_batch_values_match_pandas(df):
+    """Tests the batch values against the naive pandas versions."""
+    close = df["Close"]
+    np.testing.assert_allclose(indicators.sma(close, 20),
+                               close.rolling(20).mean())
+    np.testing.assert_allclose(indicators.ema(close, 20),
+                               close.ewm(span=20, adjust=False).mean())
+    bands = indicators.bollinger(close, 20, 2.0)
+    std = close.rolling(20).std(ddof=0)
+    np.testing.assert_allclose(bands["Upper"],
+                               close.rolling(20).mean() + 2.0 * std)
+
+
+def test_rsi_range(df):
+    """Tests that RSI is from 0 to 100."""
+    values = indicators.rsi(df["Close"]).dropna()
+    assert values.between(0.0, 100.0).all()
+
+
+@pytest.mark.parametrize("window", [0, -1, 1.5, "10"])
+def test_window_raises(window):
+    """Tests the raise when the window is not a positive integer."""
+    with pytest.raises(SystemExit) as exc_info:
+        indicators.SMA(window)
+    expected = "Check your window value. It has to be a positive integer."
+    assert exc_info.value.args[0] == expected
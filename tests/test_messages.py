@@ -0,0 +1,98 @@
+import pytest
+
+from fia.main import TvDataCollector
+from fia.messages import (RawData, find_message, get_bar_close_time,
+                          get_series_bars, get_symbol_resolved, iter_messages,
+                          merge_raw_data, parse_messages, split_messages)
+
+
+@pytest.fixture(scope="module")
+def raw_data():
+    """Returns the raw data with 2 JSON messages and a heartbeat."""
+    return (
+        TvDataCollector._create_message(
+            "symbol_resolved",
+            ["cs_Lms...eEc", "sds_sym_1", {"session": "0930-1600"}]
+        )
+        + "~m~4~m~~h~1"
+        + TvDataCollector._create_message("series_completed",
+                                          ["cs_Lms...eEc", "sds_1"])
+    )
+
+
+def test_split_messages(raw_data):
+    """Tests the number of messages and the heartbeat."""
+    messages = split_messages(raw_data)
+    assert len(messages) == 3 and messages[1] == "~h~1"
+
+
+@pytest.mark.parametrize("size", [1, 7, 64, 10_000])
+def test_iter_messages(raw_data, size):
+    """Tests that the chunks give the messages of the whole data."""
+    chunks = (raw_data[i:i + size] for i in range(0, len(raw_data), size))
+    assert list(iter_messages(chunks)) == split_messages(raw_data)
+
+
+def test_parse_messages_skips_heartbeats(raw_data):
+    """Tests that only the JSON messages are returned."""
+    names = [message["m"] for message in parse_messages(raw_data)]
+    assert names == ["symbol_resolved", "series_completed"]
+
+
+def test_find_message(raw_data):
+    """Tests the search of the message by its name."""
+    assert find_message(raw_data, "series_completed")["p"][1] == "sds_1"
+    assert find_message(raw_data, "du") is None
+
+
+def test_get_symbol_resolved(raw_data):
+    """Tests the symbol_resolved payload."""
+    assert get_symbol_resolved(raw_data) == {"session": "0930-1600"}
+
+
+def test_get_symbol_resolved_raises():
+    """Tests the raise when there is no symbol_resolved message."""
+    with pytest.raises(SystemExit) as exc_info:
+        get_symbol_resolved("~m~4~m~~h~1")
+    expected = "There is no symbol_resolved message in the raw data."
+    assert exc_info.value.args[0] == expected
+
+
+def test_merge_raw_data():
+    """Tests that the bars are merged by time and sorted."""
+    def part(times, close):
+        bars = [{"i": i, "v": [t, 1.0, 2.0, 0.5, close, 10.0]}
+                for i, t in enumerate(times)]
+        return (
+            TvDataCollector._create_message(
+                "symbol_resolved",
+                ["cs_Lms...eEc", "sds_sym_1", {"session": "0930-1600"}]
+            )
+            + TvDataCollector._create_message(
+                "timescale_update", ["cs_Lms...eEc", {"sds_1": {"s": bars}}]
+            )
+        )
+
+    raw_data = merge_raw_data([part([3.0, 4.0], 1.0), part([1.0, 3.0], 2.0)])
+    bars = get_series_bars(find_message(raw_data, "timescale_update"))
+    assert [bar[0] for bar in bars] == [1.0, 3.0, 4.0]
+    assert bars[1][4] == 2.0
+    assert get_symbol_resolved(raw_data) == {"session": "0930-1600"}
+    assert find_message(raw_data, "series_completed") is not None
+
+
+def test_raw_data_is_str():
+    """Tests that RawData is a string with the complete flag."""
+    raw_data = RawData("~m~4~m~~h~1", complete=False)
+    assert raw_data == "~m~4~m~~h~1" and not raw_data.complete
+
+
+def test_get_bar_close_time():
+    """Tests the close time of the last bar."""
+    message = {"m": "timescale_update",
+               "p": ["cs_Lms...eEc",
+                     {"sds_1": {"s": [], "lbs": {"bar_close_time": 60}}}]}
+    assert get_bar_close_time(message) == 60.0
+    assert get_bar_close_time({"m": "timescale_update",
+                               "p": ["cs_Lms...eEc", {"sds_1": {}}]}) is None
+    assert get_bar_close_time({"m": "series_completed"}) is None
@@ -0,0 +1,126 @@
+import urllib.request
+
+import pytest
+import websocket
+
+from fia import metrics, timing
+from fia.constants import Frame
+from fia.main import TvDataCollector
+
+
+class FakeWebSocket:
+    """Returns the frames and ignores the sent messages."""
+    def __init__(self, frames):
+        self.frames = frames
+
+    def recv(self):
+        if not self.frames:
+            raise websocket.WebSocketConnectionClosedException()
+        return self.frames.pop(0)
+
+    def send(self, message):
+        pass
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def registry():
+    """Enables the metrics and disables them after the test."""
+    yield metrics.enable(metrics.Registry(buckets=(0.1, 1.0)))
+    metrics.disable()
+
+
+def test_disabled():
+    """Tests that the updates are ignored when disabled."""
+    metrics.inc("fia_requests_total", outcome="complete")
+    metrics.observe("fia_phase_seconds", 0.5, record="collect",
+                    phase="connect")
+    assert metrics.get_registry() is None and metrics.expose() == ""
+
+
+def test_expose(registry):
+    """Tests the Prometheus text format."""
+    metrics.inc("fia_requests_total", outcome="complete")
+    metrics.inc("fia_requests_total", 2, outcome="complete")
+    metrics.set_gauge("fia_queue_depth", 3, queue="batch")
+    metrics.observe("fia_phase_seconds", 0.05, record="collect",
+                    phase="connect")
+    metrics.observe("fia_phase_seconds", 0.5, record="collect",
+                    phase="connect")
+    metrics.inc("fia_messages_total", type='du"\n')
+    assert metrics.expose().splitlines() == [
+        "# HELP fia_requests_total The collections by outcome.",
+        "# TYPE fia_requests_total counter",
+        'fia_requests_total{outcome="complete"} 3',
+        "# HELP fia_messages_total The received JSON messages by type.",
+        "# TYPE fia_messages_total counter",
+        'fia_messages_total{type="du\\"\\n"} 1',
+        "# HELP fia_queue_depth The jobs waiting in the queue.",
+        "# TYPE fia_queue_depth gauge",
+        'fia_queue_depth{queue="batch"} 3',
+        "# HELP fia_phase_seconds The latency of the collection phases.",
+        "# TYPE fia_phase_seconds histogram",
+        'fia_phase_seconds_bucket{phase="connect",record="collect",'
+        'le="0.1"} 1',
+        'fia_phase_seconds_bucket{phase="connect",record="collect",'
+        'le="1.0"} 2',
+        'fia_phase_seconds_bucket{phase="connect",record="collect",'
+        'le="+Inf"} 2',
+        'fia_phase_seconds_sum{phase="connect",record="collect"} 0.55',
+        'fia_phase_seconds_count{phase="connect",record="collect"} 2',
+    ]
+
+
+def test_timing_records(registry):
+    """Tests that the phases of the timing records are observed."""
+    with timing.record("convert") as record:
+        record.begin("get_json_data")
+    assert "fia_phase_seconds_count" \
+        '{phase="get_json_data",record="convert"} 1' in metrics.expose()
+
+
+def test_collection(registry, mocker):
+    """Tests the metrics of a collection."""
+    tvdc = TvDataCollector(username="GoodName",
+                           password="StrongPSW123#",
+                           exchange="NASDAQ",
+                           ticker_sym="AAPL",
+                           currency="USD",
+                           frame=Frame.DAY,
+                           bars=1)
+    frames = [
+        tvdc._create_message("symbol_resolved",
+                             ["cs_Lms...eEc", "sds_sym_1", {}]),
+        tvdc._create_message(
+            "timescale_update",
+            ["cs_Lms...eEc",
+             {"sds_1": {"s": [{"i": 0, "v": [0.0, 1, 1, 1, 1, 1]}]}}]
+        ),
+        tvdc._create_message("series_completed", ["cs_Lms...eEc", "sds_1"]),
+    ]
+    mocker.patch("fia.main.TvDataCollector._create_ws_connection",
+                 return_value=FakeWebSocket(list(frames)))
+    mocker.patch("fia.main.TvDataCollector._open_series")
+    raw_data = tvdc.get_data()
+    assert registry.get("fia_requests_total", {"outcome": "complete"}) == 1
+    assert registry.get("fia_connections_total", {"outcome": "ok"}) == 1
+    assert registry.get("fia_received_bytes_total") == len(raw_data)
+    assert registry.get("fia_received_packets_total") == 3
+    assert registry.get("fia_messages_total",
+                        {"type": "timescale_update"}) == 1
+
+
+def test_http_server(registry):
+    """Tests the /metrics endpoint."""
+    metrics.inc("fia_reconnects_total")
+    server = metrics.start_http_server(0)
+    try:
+        url = f"http://127.0.0.1:{server.server_address[1]}/metrics"
+        with urllib.request.urlopen(url) as response:
+            assert response.headers["Content-Type"] == metrics.CONTENT_TYPE
+            assert "fia_reconnects_total 1" in response.read().decode()
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,76 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from fia.panel import build_panel
+
+
+def create_bars(start, periods, freq="1H", volume=1.0):
+    """Creates the market data with the increasing close prices."""
+    return pd.DataFrame({
+        "DateTime": pd.date_range(start, periods=periods, freq=freq,
+                                  tz="UTC"),
+        "Open": np.arange(periods, dtype="float64"),
+        "High": np.arange(periods, dtype="float64"),
+        "Low": np.arange(periods, dtype="float64"),
+        "Close": np.arange(periods, dtype="float64"),
+        "Volume": np.full(periods, volume)
+    })
+
+
+@pytest.fixture(scope="module")
+def results():
+    """Returns the market data of 2 exchanges with a shift."""
+    return {"CME": create_bars("2022-12-01 00:00", 5),
+            "BINANCE": create_bars("2022-12-01 02:00", 5)}
+
+
+def test_inner_join(results):
+    """Tests that only the common DateTime values are kept."""
+    panel = build_panel(results, field="Close", how="inner")
+    assert panel.columns.tolist() == ["CME", "BINANCE"]
+    assert panel.index[0] == pd.Timestamp("2022-12-01 02:00", tz="UTC")
+    assert panel.to_numpy().tolist() == [[2.0, 0.0], [3.0, 1.0],
+                                         [4.0, 2.0]]
+
+
+def test_outer_join(results):
+    """Tests that the gaps are NaN."""
+    panel = build_panel(results, how="outer")
+    assert len(panel) == 7
+    assert np.isnan(panel["BINANCE"].iloc[0])
+    assert np.isnan(panel["CME"].iloc[-1])
+
+
+def test_matches_concat(results):
+    """Tests the panel against the set_index and concat version."""
+    expected = pd.concat(
+        [df.set_index("DateTime")["Volume"].rename(label)
+         for label, df in results.items()],
+        axis=1, join="outer"
+    )
+    actual = build_panel(results, field="Volume", how="outer")
+    pd.testing.assert_frame_equal(actual, expected, check_freq=False,
+                                  check_names=False)
+
+
+def test_freq_sums_volume():
+    """Tests that the volumes are summed within the frequency."""
+    results = {"A": create_bars("2022-12-01", 48, volume=2.0),
+               "B": create_bars("2022-12-01", 4, freq="1D")}
+    panel = build_panel(results, field="Volume", freq="1D")
+    assert panel.to_numpy().tolist() == [[48.0, 1.0], [48.0, 1.0]]
+
+
+def test_numpy_output(results):
+    """Tests the 2-D array and index output."""
+    matrix, index = build_panel(results, as_frame=False)
+    assert matrix.shape == (3, 2) and len(index) == 3
+
+
+def test_how_raises(results):
+    """Tests the raise when the how value is wrong."""
+    with pytest.raises(SystemExit) as exc_info:
+        build_panel(results, how="left")
+    assert exc_info.value.args[0] == ('The how value has to be "inner" or '
+                                      '"outer".')
@@ -0,0 +1,71 @@
+import numpy as np
+import pytest
+
+from fia.constants import Frame
+from fia.main import TvDataCollector
+from fia.parallel import collect_parallel
+from fia.request import TvRequest
+
+
+@pytest.fixture
+def raw_data():
+    """Returns the raw data with 3 DAY bars."""
+    bars = [
+        {"i": i, "v": [1669852800.0 + 86400 * i, 10.0 + i, 11.0, 9.0, 10.5,
+                       1.0]}
+        for i in range(3)
+    ]
+    return (
+        TvDataCollector._create_message(
+            "timescale_update",
+            ["cs_Lms...eEc", {"sds_1": {"s": bars}}]
+        )
+        + TvDataCollector._create_message("series_completed",
+                                          ["cs_Lms...eEc", "sds_1"])
+    )
+
+
+@pytest.fixture
+def requests_list():
+    """Returns 2 unique requests and a duplicate."""
+    return [TvRequest("NASDAQ", "AAPL", "USD", Frame.DAY, 3),
+            TvRequest("CME", "BTC1!", "USD", Frame.DAY, 3),
+            TvRequest("NASDAQ", "AAPL", "USD", Frame.DAY, 3)]
+
+
+def test_collect_parallel(mocker, raw_data, requests_list):
+    """Tests that the shared bars are equal to get_pandas_data."""
+    mocker.patch("fia.main.TvDataCollector.get_data", return_value=raw_data)
+    tvdc = TvDataCollector("GoodName", "StrongPSW123#", "NASDAQ", "AAPL",
+                           "USD", Frame.DAY, 3)
+    expected = tvdc.get_pandas_data(raw_data)
+    with collect_parallel(requests_list, "GoodName", "StrongPSW123#",
+                          workers=2) as results:
+        assert len(results) == 2 and results.errors == {}
+        for request in results:
+            df = results.to_pandas(request)
+            assert df.equals(expected)
+            # The price columns are views of the shared memory.
+            assert np.shares_memory(df["Open"].to_numpy(),
+                                    results.to_numpy(request))
+
+
+def test_collect_parallel_failed(mocker, requests_list):
+    """Tests that the failed requests are reported."""
+    mocker.patch("fia.main.TvDataCollector.get_data", return_value="")
+    with collect_parallel(requests_list, "GoodName", "StrongPSW123#",
+                          workers=1) as results:
+        assert len(results) == 0
+        assert set(results.errors) == set(requests_list)
+
+
+def test_close_releases_blocks(mocker, raw_data, requests_list):
+    """Tests that the shared memory blocks are unlinked."""
+    mocker.patch("fia.main.TvDataCollector.get_data", return_value=raw_data)
+    results = collect_parallel(requests_list[:1], "GoodName",
+                               "StrongPSW123#", workers=1)
+    name = results.bars[requests_list[0]].name
+    results.close()
+    from multiprocessing.shared_memory import SharedMemory
+    with pytest.raises(FileNotFoundError):
+        SharedMemory(name=name)
@@ -0,0 +1,88 @@
+import io
+import os
+import pstats
+import threading
+
+import pytest
+
+from fia import timing
+from fia.cli_args import parse_cli_args
+from fia.profiling import Profiler
+
+
+def _work():
+    """Allocates some memory and spends some time."""
+    return [str(n) * 10 for n in range(20000)]
+
+
+def _collection():
+    """Runs the phases similar to a collection."""
+    with timing.record("collect") as record:
+        with timing.phase("connect"):
+            _work()
+        record.begin("symbol_resolved")
+        record.begin("timescale_update")
+        data = _work()
+        record.end_phase()
+    with timing.phase("write"):
+        _work()
+    return data
+
+
+def test_cpu(tmp_path):
+    """Tests the profile files and the summary of the cpu mode."""
+    stream = io.StringIO()
+    with Profiler("cpu", str(tmp_path), top=3, stream=stream) as profiler:
+        _collection()
+    assert sorted(os.path.basename(path) for path in profiler.files) == [
+        "connect.prof", "other.prof", "recv.prof", "write.prof"
+    ]
+    stats = pstats.Stats(str(tmp_path / "recv.prof"))
+    assert any(name == "_work" for _, _, name in stats.stats)
+    summary = stream.getvalue()
+    assert summary.startswith("CPU profile by phase")
+    assert "recv: " in summary and "test_profiling.py" in summary
+
+
+def test_memory(tmp_path):
+    """Tests the peaks and the files of the memory mode."""
+    with Profiler("memory", str(tmp_path), stream=None) as profiler:
+        data = _collection()
+    assert sorted(os.path.basename(path) for path in profiler.files) == [
+        "memory.snapshot", "memory.txt"
+    ]
+    summary = profiler.summary()
+    assert "recv: peak " in summary and "test_profiling.py" in summary
+    assert (tmp_path / "memory.txt").read_text().startswith(
+        "Memory profile by phase"
+    )
+    assert len(data) == 20000
+
+
+def test_other_threads_are_not_profiled(tmp_path):
+    """Tests that the phases of other threads are ignored."""
+    with Profiler("cpu", str(tmp_path), stream=None) as profiler:
+        thread = threading.Thread(target=_collection)
+        thread.start()
+        thread.join()
+    assert [os.path.basename(path) for path in profiler.files] == [
+        "other.prof"
+    ]
+
+
+def test_wrong_mode():
+    """Tests the raise when the mode is not supported."""
+    with pytest.raises(SystemExit):
+        Profiler("gpu")
+
+
+def test_cli_args(monkeypatch):
+    """Tests the --profile flag."""
+    monkeypatch.setenv("TV_USERNAME", "GoodName")
+    monkeypatch.setenv("TV_PASSWORD", "StrongPSW123#")
+    argv = ["-e", "NASDAQ", "-t", "AAPL", "-c", "USD", "-f", "DAY",
+            "-b", "50"]
+    assert parse_cli_args(argv).PROFILE is None
+    cli_args = parse_cli_args(argv + ["--profile", "memory",
+                                      "--profile-dir", "profile"])
+    assert (cli_args.PROFILE, cli_args.PROFILE_DIR) == ("memory", "profile")
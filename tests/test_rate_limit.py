@@ -0,0 +1,95 @@
+import asyncio
+import multiprocessing
+
+import pytest
+
+from fia.main import TvDataCollector
+from fia.rate_limit import RateLimiter, TokenBucket
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Freezes the monotonic time and records the sleeps."""
+    sleeps = []
+    monkeypatch.setattr("fia.rate_limit.time.monotonic", lambda: 100.0)
+    monkeypatch.setattr("fia.rate_limit.time.sleep", sleeps.append)
+    return sleeps
+
+
+def test_burst_without_waiting(clock):
+    """Tests that the burst is free and the next tokens wait."""
+    bucket = TokenBucket(rate=10, burst=3)
+    waits = [bucket.acquire() for _ in range(5)]
+    assert waits == pytest.approx([0, 0, 0, 0.1, 0.2])
+    assert clock == waits
+
+
+def test_penalize_and_reward(clock):
+    """Tests the multiplicative decrease and the additive increase."""
+    bucket = TokenBucket(rate=10, burst=1, increase=0.25)
+    bucket.penalize()
+    bucket.penalize()
+    assert bucket.current_rate == 2.5
+    for _ in range(10):
+        bucket.reward()
+    assert bucket.current_rate == 10
+
+
+def test_metrics(clock):
+    """Tests the queue-wait metrics."""
+    bucket = TokenBucket(rate=4, burst=1)
+    for _ in range(3):
+        bucket.acquire()
+    metrics = bucket.metrics()
+    assert metrics["acquired"] == 3
+    assert metrics["total_wait"] == pytest.approx(0.75)
+    assert metrics["max_wait"] == pytest.approx(0.5)
+    assert metrics["mean_wait"] == pytest.approx(0.25)
+    assert metrics["waiting"] == 0
+
+
+def test_acquire_async():
+    """Tests that the asyncio tasks share the bucket."""
+    bucket = TokenBucket(rate=1000, burst=2)
+
+    async def run():
+        return await asyncio.gather(*(bucket.acquire_async()
+                                      for _ in range(4)))
+
+    waits = asyncio.run(run())
+    assert waits[:2] == [0, 0] and all(wait > 0 for wait in waits[2:])
+
+
+def test_bucket_is_shared_by_processes():
+    """Tests that a forked process uses the same bucket."""
+    bucket = TokenBucket(rate=1000, burst=10)
+    process = multiprocessing.get_context("fork").Process(
+        target=bucket.acquire
+    )
+    process.start()
+    process.join()
+    assert bucket.metrics()["acquired"] == 1
+
+
+def test_invalid_rate():
+    """Tests the raise when the rate is not positive."""
+    with pytest.raises(SystemExit):
+        TokenBucket(rate=0)
+
+
+def test_observe_error_packets():
+    """Tests that the error packets decrease the rate."""
+    limiter = RateLimiter({"connect": (2.0, 1), "series": (4.0, 1)})
+    raw_data = TvDataCollector._create_message(
+        "critical_error", ["cs_Lms...eEc", "invalid_session"]
+    )
+    limiter.observe(raw_data)
+    assert limiter.buckets["connect"].current_rate == 1.0
+    assert limiter.buckets["series"].current_rate == 4.0
+
+
+def test_default_budgets():
+    """Tests the default budgets of TvDataCollector."""
+    assert set(TvDataCollector.rate_limiter.metrics()) == {
+        "sign_in", "connect", "series"
+    }
@@ -0,0 +1,170 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from fia.constants import Frame
+from fia.resample import Session, resample_bars
+
+
+@pytest.fixture
+def nasdaq_info():
+    """Returns a part of the symbol_resolved payload for NASDAQ."""
+    return {"session": "0930-1600",
+            "timezone": "America/New_York",
+            "session_holidays": "20221124"}
+
+
+@pytest.fixture
+def cme_info():
+    """Returns a part of the symbol_resolved payload for CME."""
+    return {"session": "1700-1600:23456",
+            "timezone": "America/Chicago",
+            "session_holidays": ""}
+
+
+def create_bars(start, periods, freq="1min", tz="UTC"):
+    """Creates the market data with the increasing prices."""
+    values = np.arange(periods, dtype="float64")
+    return pd.DataFrame({
+        "DateTime": pd.date_range(start, periods=periods, freq=freq, tz=tz),
+        "Open": values,
+        "High": values + 0.5,
+        "Low": values - 0.5,
+        "Close": values + 0.25,
+        "Volume": np.ones(periods)
+    })
+
+
+def test_returned_data_column_names():
+    """Tests the columns names in the returned DataFrame data."""
+    df = resample_bars(create_bars("2022-12-01", 10), Frame.MIN5)
+    assert df.columns.tolist() == ["DateTime", "Open", "High", "Low",
+                                   "Close", "Volume"]
+
+
+def test_aggregation():
+    """Tests the aggregation of OHLCV values."""
+    df = resample_bars(create_bars("2022-12-01", 10), Frame.MIN5)
+    assert df.to_dict("list") == {
+        "DateTime": [pd.Timestamp("2022-12-01 00:00", tz="UTC"),
+                     pd.Timestamp("2022-12-01 00:05", tz="UTC")],
+        "Open": [0.0, 5.0],
+        "High": [4.5, 9.5],
+        "Low": [-0.5, 4.5],
+        "Close": [4.25, 9.25],
+        "Volume": [5.0, 5.0]
+    }
+
+
+def test_intraday_bars_start_at_session_open(nasdaq_info):
+    """Tests that the hourly bars are aligned to 09:30."""
+    bars = create_bars("2022-12-01 09:30", 390, tz="America/New_York")
+    df = resample_bars(bars, Frame.HOUR1, nasdaq_info)
+    minutes = df["DateTime"].dt.minute.unique().tolist()
+    assert len(df) == 7 and minutes == [30]
+
+
+def test_timezone_is_kept(nasdaq_info):
+    """Tests that the timezone of the DateTime column is kept."""
+    bars = create_bars("2022-12-01 09:30", 60, tz="America/New_York")
+    df = resample_bars(bars, Frame.MIN15, nasdaq_info)
+    assert str(df["DateTime"].dt.tz) == "America/New_York"
+
+
+def test_overnight_session_day(cme_info):
+    """Tests that the evening bars belong to the next trading day."""
+    # Sunday 16:00 - Monday 18:00 in Chicago.
+    bars = create_bars("2022-12-04 16:00", 26, freq="1H",
+                       tz="America/Chicago")
+    df = resample_bars(bars, Frame.DAY, cme_info)
+    # The Sunday bar before the session open belongs to Monday too.
+    assert df["DateTime"].tolist() == [
+        pd.Timestamp("2022-12-04 17:00", tz="America/Chicago"),
+        pd.Timestamp("2022-12-05 17:00", tz="America/Chicago")
+    ]
+    assert df["Volume"].tolist() == [25.0, 1.0]
+
+
+def test_holiday_belongs_to_next_trading_day(nasdaq_info):
+    """Tests that the bars of a holiday belong to the next day."""
+    bars = create_bars("2022-11-24 10:00", 2, freq="1D",
+                       tz="America/New_York")
+    df = resample_bars(bars, Frame.DAY, nasdaq_info)
+    assert df["DateTime"].tolist() == [
+        pd.Timestamp("2022-11-25 09:30", tz="America/New_York")
+    ]
+
+
+def test_week_and_month(nasdaq_info):
+    """Tests the weekly and monthly bars."""
+    bars = create_bars("2022-11-28 10:00", 10, freq="1D",
+                       tz="America/New_York")
+    weeks = resample_bars(bars, Frame.WEEK, nasdaq_info)
+    months = resample_bars(bars, Frame.MONTH, nasdaq_info)
+    assert weeks["Volume"].tolist() == [5.0, 5.0]
+    assert months["Volume"].tolist() == [3.0, 7.0]
+
+
+def test_empty_data():
+    """Tests that the empty data is returned as is."""
+    bars = create_bars("2022-12-01", 0)
+    assert resample_bars(bars, Frame.DAY).empty
+
+
+@pytest.mark.parametrize(
+    "session, expected",
+    [
+        ("24x7", (0, 0, "1111111")),
+        ("0930-1600", (570, 960, "1111100")),
+        ("1700-1600:23456", (1020, 960, "1111100")),
+        ("0930-1200,1300-1600:2345|0930-1300:6", (570, 960, "1111000"))
+    ]
+)
+def test_session_parsing(session, expected):
+    """Tests the parsing of the session strings."""
+    parsed = Session.from_symbol_info({"session": session})
+    assert (parsed.start, parsed.end, parsed.weekmask) == expected
+
+
+@pytest.mark.parametrize("frame, expected", [
+    (Frame.DAY, 4), (Frame.HOUR1, 28), (Frame.MIN1, 1560), (Frame.WEEK, 1)
+])
+def test_count_bars(nasdaq_info, frame, expected):
+    """Tests the count by the session calendar and the holidays."""
+    session = Session.from_symbol_info(nasdaq_info)
+    start = pd.Timestamp("2022-11-21", tz="UTC").value
+    end = pd.Timestamp("2022-11-26", tz="UTC").value
+    assert session.count_bars(frame, start, end) == expected
+
+
+@pytest.mark.parametrize("info, time, expected", [
+    # The weekend and the Thanksgiving holiday of NASDAQ.
+    ("nasdaq_info", "2022-11-19 12:00", "2022-11-21 14:30"),
+    ("nasdaq_info", "2022-11-23 21:00", "2022-11-25 14:30"),
+    ("nasdaq_info", "2022-11-21 15:00", "2022-11-21 15:00"),
+    # The session of CME opens on the previous day.
+    ("cme_info", "2022-11-19 12:00", "2022-11-20 23:00"),
+    ("cme_info", "2022-11-21 22:30", "2022-11-21 23:00"),
+    ("cme_info", "2022-11-22 03:00", "2022-11-22 03:00"),
+])
+def test_next_open(request, info, time, expected):
+    """Tests the next session open after the close."""
+    session = Session.from_symbol_info(request.getfixturevalue(info))
+    next_open = session.next_open(pd.Timestamp(time, tz="UTC").value)
+    assert next_open == pd.Timestamp(expected, tz="UTC").value
+
+
+@pytest.mark.parametrize("info, time, expected", [
+    # The local midnight of NASDAQ (EDT and EST).
+    ("nasdaq_info", "2022-11-01 15:00", "2022-11-02 04:00"),
+    ("nasdaq_info", "2022-11-21 15:00", "2022-11-22 05:00"),
+    # The session open of CME (the overnight session), before and
+    # after the DST change on 2022-11-06.
+    ("cme_info", "2022-11-04 12:00", "2022-11-04 22:00"),
+    ("cme_info", "2022-11-06 12:00", "2022-11-06 23:00"),
+])
+def test_date_end(request, info, time, expected):
+    """Tests the next time when the trading date can change."""
+    session = Session.from_symbol_info(request.getfixturevalue(info))
+    date_end = session.date_end(pd.Timestamp(time, tz="UTC").value)
+    assert date_end == pd.Timestamp(expected, tz="UTC").value
@@ -0,0 +1,97 @@
+import pytest
+
+from fia.constants import Frame
+from fia.main import TvDataCollector
+from fia.messages import RawData, find_message, get_series_bars
+from fia.request import TvRequest
+from fia.result_cache import ResultCache
+
+
+def _raw_data(count, bar_close_time=None):
+    """Returns the raw data with the MIN1 bars."""
+    bars = [{"i": i, "v": [60.0 * i, 10.0, 11.0, 9.0, 10.5, 1.0]}
+            for i in range(count)]
+    series = {"s": bars}
+    if bar_close_time is not None:
+        series["lbs"] = {"bar_close_time": bar_close_time}
+    return RawData(
+        TvDataCollector._create_message(
+            "timescale_update", ["cs_Lms...eEc", {"sds_1": series}]
+        )
+        + TvDataCollector._create_message("series_completed",
+                                          ["cs_Lms...eEc", "sds_1"])
+    )
+
+
+@pytest.fixture
+def now(mocker):
+    """Sets the current time used by the caches."""
+    clock = mocker.Mock(return_value=1000.0)
+    mocker.patch("fia.result_cache.time.time", clock)
+    mocker.patch("fia.utils.lru_cache.time.time", clock)
+    return clock
+
+
+@pytest.fixture
+def request_min1():
+    """Returns the request of 10 MIN1 bars."""
+    return TvRequest("CME", "BTC1!", "USD", Frame.MIN1, 10)
+
+
+def test_hit_and_slice(now, request_min1):
+    """Tests that a result with more bars answers a smaller request."""
+    cache = ResultCache()
+    cache.put("GoodName", request_min1, _raw_data(10, 1020.0))
+    assert cache.get("GoodName", request_min1) == _raw_data(10, 1020.0)
+    sliced = cache.get("GoodName", request_min1._replace(bars=3))
+    bars = get_series_bars(find_message(sliced, "timescale_update"))
+    assert [bar[0] for bar in bars] == [420.0, 480.0, 540.0]
+    assert cache.get("GoodName", request_min1._replace(bars=11)) is None
+    assert cache.get("OtherName", request_min1) is None
+    assert cache.metrics() == {"hits": 2, "misses": 2, "sliced": 1,
+                               "evictions": 0, "expirations": 0, "size": 1}
+
+
+def test_expires_at_bar_close(now, request_min1):
+    """Tests that the result expires at the close of the last bar."""
+    cache = ResultCache()
+    cache.put("GoodName", request_min1, _raw_data(10, 1020.0))
+    now.return_value = 1020.0
+    assert cache.get("GoodName", request_min1) is None
+    assert cache.metrics()["expirations"] == 1
+
+
+@pytest.mark.parametrize(
+    "frame, bar_close_time, expected",
+    [
+        (Frame.MIN1, None, 1060.0),
+        (Frame.DAY, 500.0, 1000.0 + 86400),
+        (Frame.DAY, 5000.0, 5000.0),
+    ]
+)
+def test_expires_by_frame(now, frame, bar_close_time, expected):
+    """Tests the expiration time without a future bar close."""
+    request = TvRequest("CME", "BTC1!", "USD", frame, 10)
+    assert ResultCache.expires(request,
+                               _raw_data(1, bar_close_time)) == expected
+
+
+def test_incomplete_is_not_cached(now, request_min1):
+    """Tests that the incomplete raw data is not cached."""
+    cache = ResultCache()
+    cache.put("GoodName", request_min1, RawData("", complete=False))
+    assert cache.metrics()["size"] == 0
+
+
+def test_collector_uses_cache(now, mocker, request_min1):
+    """Tests that get_data fetches the identical request once."""
+    fetch = mocker.patch("fia.main.TvDataCollector._fetch",
+                         return_value=_raw_data(10, 1020.0))
+    mocker.patch.object(TvDataCollector, "result_cache", ResultCache())
+    tvdc = TvDataCollector("GoodName", "StrongPSW123#", "CME", "BTC1!",
+                           "USD", Frame.MIN1, 10)
+    tvdc.get_data()
+    tvdc.bars = 5
+    tvdc.get_data()
+    tvdc.collect(request_min1)
+    assert fetch.call_count == 1
@@ -0,0 +1,207 @@
+import json
+
+import pytest
+import websocket
+
+from fia.constants import Frame
+from fia.main import TvDataCollector
+from fia.rate_limit import RateLimiter
+from fia.request import TvRequest
+from fia.serve import Scheduler
+
+
+# The open time of the first MIN1 bar.
+START = 1669852800.0
+
+
+def _chunk(first, count):
+    """Returns the frames of a chunk with the MIN1 bars."""
+    bars = [{"i": i, "v": [START + 60 * (first + i), 10.0, 11.0, 9.0, 10.5,
+                           1.0]}
+            for i in range(count)]
+    close = START + 60 * (first + count)
+    return [
+        TvDataCollector._create_message(
+            "timescale_update",
+            ["cs_Lms...eEc", {"sds_1": {"s": bars,
+                                        "lbs": {"bar_close_time": close}}}]
+        ),
+        TvDataCollector._create_message("series_completed",
+                                        ["cs_Lms...eEc", "sds_1"]),
+    ]
+
+
+class FakeWebSocket:
+    """Returns the frames and records the sent messages."""
+    def __init__(self, frames):
+        self.frames = frames
+        self.sent = []
+        self.closed = False
+
+    def recv(self):
+        if not self.frames:
+            raise websocket.WebSocketTimeoutException()
+        return self.frames.pop(0)
+
+    def send(self, message):
+        self.sent.append(message)
+
+    def settimeout(self, timeout):
+        pass
+
+    def close(self):
+        self.closed = True
+
+
+class FakeClock:
+    """The time that is moved by sleep."""
+    def __init__(self, now):
+        self.now = now
+
+    def time(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(mocker):
+    """Returns the fake clock used by the scheduler."""
+    clock = FakeClock(START + 60 * 3 + 1)
+    mocker.patch("fia.serve.time.time", side_effect=clock.time)
+    mocker.patch("fia.serve.time.sleep", side_effect=clock.sleep)
+    return clock
+
+
+@pytest.fixture
+def tvdc(mocker):
+    """Returns an instance of TvDataCollector without sign in."""
+    mocker.patch("fia.main.TvDataCollector.get_auth_token",
+                 return_value="token")
+    mocker.patch("fia.main.TvDataCollector._open_session",
+                 return_value="cs_Lms...eEc")
+    # The series requests of one test must not wait for the others.
+    mocker.patch.object(TvDataCollector, "rate_limiter", RateLimiter(
+        {name: (1000.0, 1000) for name in ("sign_in", "connect", "series")}
+    ))
+    return TvDataCollector(username="GoodName",
+                           password="StrongPSW123#",
+                           exchange="CME",
+                           ticker_sym="BTC1!",
+                           currency="USD",
+                           frame=Frame.MIN1,
+                           bars=100)
+
+
+@pytest.fixture
+def request_min1():
+    """Returns the watched request."""
+    return TvRequest("CME", "BTC1!", "USD", Frame.MIN1, 100)
+
+
+def _series(ws):
+    """Returns the number of bars of the sent create_series messages."""
+    return [json.loads(message.split("~m~", 2)[2])["p"][5]
+            for message in ws.sent if '"m":"create_series"' in message]
+
+
+def test_refresh_after_bar_close(tvdc, mocker, clock, request_min1,
+                                 tmp_path):
+    """Tests that only the finished bars are stored after the close."""
+    ws = FakeWebSocket(_chunk(0, 4))
+    connect = mocker.patch("fia.main.TvDataCollector.connect",
+                           return_value=ws)
+    scheduler = Scheduler(tvdc, [request_min1], str(tmp_path), delay=2)
+    scheduler.run(cycles=1)
+    # The 4th bar closes at START + 240, it is not finished.
+    assert len(scheduler.store(request_min1)) == 3
+    # The next bar is requested after the close with 2 more bars.
+    ws.frames = _chunk(2, 3)
+    ws.closed = False
+    scheduler.run(cycles=1)
+    assert clock.now == START + 60 * 4 + 2
+    values = scheduler.store(request_min1).to_numpy()
+    assert values[:, 0].tolist() == [START + 60 * i for i in range(4)]
+    assert _series(ws) == [100, 3]
+    # One connection is created for every run.
+    assert connect.call_count == 2
+
+
+def test_failed_refresh_is_retried(tvdc, mocker, clock, request_min1,
+                                   tmp_path):
+    """Tests that a closed connection is created again."""
+    broken = FakeWebSocket([])
+    broken.recv = mocker.Mock(
+        side_effect=websocket.WebSocketConnectionClosedException()
+    )
+    ws = FakeWebSocket(_chunk(0, 4))
+    mocker.patch("fia.main.TvDataCollector.connect",
+                 side_effect=[broken, ws])
+    scheduler = Scheduler(tvdc, [request_min1], str(tmp_path))
+    scheduler.run(cycles=2)
+    assert broken.closed
+    assert len(scheduler.store(request_min1)) == 3
+
+
+def test_failed_refresh_backs_off(tvdc, mocker, clock, request_min1,
+                                  tmp_path, caplog):
+    """Tests the growing retry delay, the kept token and the error log
+    after the failures in a row."""
+    mocker.patch("fia.serve.SERVE_BACKOFF_MAX", 4.0)
+
+    def broken():
+        ws = FakeWebSocket([])
+        ws.recv = mocker.Mock(
+            side_effect=websocket.WebSocketConnectionClosedException()
+        )
+        return ws
+
+    mocker.patch("fia.main.TvDataCollector.connect", side_effect=broken)
+    scheduler = Scheduler(tvdc, [request_min1], str(tmp_path))
+    times = []
+    for _ in range(5):
+        scheduler.run(cycles=1)
+        times.append(clock.now)
+    assert [b - a for a, b in zip(times, times[1:])] == [1.0, 2.0, 4.0, 4.0]
+    assert TvDataCollector.get_auth_token.call_count == 1
+    assert [record.levelname for record in caplog.records
+            if record.name == "fia.serve"] == ["WARNING"] * 4 + ["ERROR"]
+
+
+def test_rejected_token_is_renewed(tvdc, mocker, clock, request_min1,
+                                   tmp_path):
+    """Tests the new sign in after TradingView rejected the token."""
+    rejected = FakeWebSocket([TvDataCollector._create_message(
+        "critical_error", ["set_auth_token", "invalid token"]
+    )])
+    ws = FakeWebSocket(_chunk(0, 4))
+    mocker.patch("fia.main.TvDataCollector.connect",
+                 side_effect=[rejected, ws])
+    scheduler = Scheduler(tvdc, [request_min1], str(tmp_path))
+    scheduler.run(cycles=2)
+    assert TvDataCollector.get_auth_token.call_count == 2
+    assert len(scheduler.store(request_min1)) == 3
+
+
+def test_closed_market_waits_for_open(tvdc, mocker, clock, request_min1,
+                                      tmp_path):
+    """Tests that the closed market is refreshed at the session open."""
+    symbol_resolved = TvDataCollector._create_message(
+        "symbol_resolved",
+        ["cs_Lms...eEc", "sds_sym_1",
+         {"session": "0930-1600", "timezone": "America/New_York"}]
+    )
+    # The last bar closed at START + 180, the market is closed.
+    ws = FakeWebSocket([symbol_resolved, *_chunk(0, 3)])
+    mocker.patch("fia.main.TvDataCollector.connect", return_value=ws)
+    scheduler = Scheduler(tvdc, [request_min1], str(tmp_path), delay=2)
+    scheduler.run(cycles=1)
+    ws.frames = _chunk(3, 1)
+    scheduler.run(cycles=1)
+    # 2022-12-01 09:30 in New York.
+    assert clock.now == START + 14.5 * 3600 + 2
+    assert ws.sent.count(
+        TvDataCollector._create_message("quote_delete_session",
+                                        ["qs_Lms...eEc"])
+    ) == 2
@@ -0,0 +1,33 @@
+import numpy as np
+
+from fia.store import BarStore
+
+
+def _bars(times, close):
+    """Returns the bars at the given times."""
+    return np.array([[t, 1.0, 2.0, 0.5, close, 10.0] for t in times])
+
+
+def test_append_and_read(tmp_path):
+    """Tests that the chunks are sorted and deduplicated."""
+    store = BarStore(str(tmp_path / "store"))
+    store.append(_bars([3.0, 4.0], 1.0))
+    store.append(_bars([1.0, 2.0, 3.0], 2.0))
+    values = store.to_numpy()
+    assert values[:, 0].tolist() == [1.0, 2.0, 3.0, 4.0]
+    # The last appended bar wins.
+    assert values[:, 4].tolist() == [2.0, 2.0, 2.0, 1.0]
+    assert len(store) == 5
+
+
+def test_reopen(tmp_path):
+    """Tests that the store is kept on disk."""
+    BarStore(str(tmp_path / "store")).append(_bars([1.0], 1.0))
+    df = BarStore(str(tmp_path / "store")).to_pandas(tz="America/New_York")
+    assert len(df) == 1 and str(df["DateTime"].dt.tz) == "America/New_York"
+
+
+def test_empty_store(tmp_path):
+    """Tests the empty store."""
+    store = BarStore(str(tmp_path / "store"))
+    assert len(store) == 0 and store.to_numpy().shape == (0, 6)
@@ -0,0 +1,144 @@
+import json
+
+import pytest
+import websocket
+
+from fia.constants import Frame
+from fia.main import TvDataCollector
+from fia.request import TvRequest
+from fia.symbols import SymbolCache, SymbolInfo
+
+
+@pytest.fixture
+def payload():
+    """Returns a part of the symbol_resolved payload for NASDAQ:AAPL."""
+    return {"pro_name": "NASDAQ:AAPL",
+            "description": "Apple Inc.",
+            "type": "stock",
+            "currency_code": "USD",
+            "session": "0930-1600",
+            "timezone": "America/New_York",
+            "session_holidays": "20221124,20221226",
+            "pricescale": 100,
+            "minmov": 1,
+            "has_intraday": True}
+
+
+@pytest.fixture
+def request_day():
+    """Returns the request of NASDAQ:AAPL."""
+    return TvRequest("NASDAQ", "AAPL", "USD", Frame.DAY, 50)
+
+
+@pytest.fixture
+def now(mocker):
+    """Sets the current time used by the cache."""
+    return mocker.patch("fia.symbols.time.time", return_value=1000.0)
+
+
+def test_symbol_info(payload):
+    """Tests the typed accessors."""
+    info = SymbolInfo.from_payload(payload)
+    assert (info.symbol, info.pricescale, info.has_intraday) == (
+        "NASDAQ:AAPL", 100, True
+    )
+    assert info.tick_size == 0.01
+    session = info.trading_session
+    assert (session.start, session.end, len(session.holidays)) == (570, 960,
+                                                                   2)
+
+
+def test_persistence_and_staleness(tmp_path, now, payload, request_day):
+    """Tests that the metadata is kept on disk until it is stale."""
+    path = str(tmp_path / "fia" / "symbols.json")
+    SymbolCache(path).put(request_day, payload)
+    cache = SymbolCache(path, max_age=60)
+    # The frame and the number of bars are not a part of the key.
+    other_frame = request_day._replace(frame=Frame.MIN1, bars=5)
+    assert cache.get(other_frame).timezone == "America/New_York"
+    now.return_value = 1061.0
+    assert cache.age(request_day) == 61.0
+    assert cache.get(request_day) is None
+    assert cache.get(request_day, max_age=100) is not None
+    cache.clear()
+    assert cache.get(request_day, max_age=100) is None
+
+
+def test_broken_file(tmp_path, request_day):
+    """Tests that the broken file is an empty cache."""
+    path = tmp_path / "symbols.json"
+    path.write_text("{broken")
+    assert SymbolCache(str(path)).get(request_day) is None
+
+
+class FakeWebSocket:
+    """Returns the frames and records the sent messages."""
+    def __init__(self, frames):
+        self.frames = frames
+        self.sent = []
+
+    def recv(self):
+        if not self.frames:
+            raise websocket.WebSocketConnectionClosedException()
+        return self.frames.pop(0)
+
+    def send(self, message):
+        self.sent.append(message)
+
+    def close(self):
+        pass
+
+
+def test_get_symbol_info(tmp_path, mocker, payload):
+    """Tests that the symbol is resolved once."""
+    ws = FakeWebSocket([TvDataCollector._create_message(
+        "symbol_resolved", ["cs_Lms...eEc", "sds_sym_1", payload]
+    )])
+    connect = mocker.patch("fia.main.TvDataCollector.connect",
+                           return_value=ws)
+    mocker.patch("fia.main.TvDataCollector._open_session",
+                 return_value="cs_Lms...eEc")
+    mocker.patch.object(TvDataCollector, "symbol_cache",
+                        SymbolCache(str(tmp_path / "symbols.json")))
+    tvdc = TvDataCollector("GoodName", "StrongPSW123#", "NASDAQ", "AAPL",
+                           "USD", Frame.DAY, 50)
+    assert tvdc.get_symbol_info().pricescale == 100
+    assert tvdc.get_symbol_info().session == "0930-1600"
+    assert connect.call_count == 1
+    with open(tmp_path / "symbols.json", encoding="utf-8") as file:
+        assert list(json.load(file)) == ["NASDAQ:AAPL:USD"]
+
+
+def test_get_data_fills_cache(tmp_path, mocker, payload):
+    """Tests that the payload of get_data is cached."""
+    raw_data = TvDataCollector._create_message(
+        "symbol_resolved", ["cs_Lms...eEc", "sds_sym_1", payload]
+    )
+    mocker.patch("fia.main.TvDataCollector._fetch", return_value=raw_data)
+    cache = SymbolCache(str(tmp_path / "symbols.json"))
+    mocker.patch.object(TvDataCollector, "symbol_cache", cache)
+    tvdc = TvDataCollector("GoodName", "StrongPSW123#", "NASDAQ", "AAPL",
+                           "USD", Frame.DAY, 50)
+    tvdc.get_data()
+    assert cache.get(tvdc.request).description == "Apple Inc."
+
+
+def test_fresh_cache_is_not_rewritten(tmp_path, mocker, payload):
+    """Tests that the fresh metadata is put only once."""
+    raw_data = TvDataCollector._create_message(
+        "symbol_resolved", ["cs_Lms...eEc", "sds_sym_1", payload]
+    )
+    mocker.patch("fia.main.TvDataCollector._fetch", return_value=raw_data)
+    cache = SymbolCache(str(tmp_path / "symbols.json"))
+    mocker.patch.object(TvDataCollector, "symbol_cache", cache)
+    put = mocker.spy(cache, "put")
+    tvdc = TvDataCollector("GoodName", "StrongPSW123#", "NASDAQ", "AAPL",
+                           "USD", Frame.DAY, 50)
+    for frame in (Frame.DAY, Frame.HOUR1, Frame.MIN1):
+        tvdc.frame = frame
+        tvdc.get_data()
+    assert put.call_count == 1
+    # The stale metadata is put again.
+    cache.max_age = -1
+    tvdc.get_data()
+    assert put.call_count == 2
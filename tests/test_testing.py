@@ -0,0 +1,63 @@
+import pytest
+
+from fia.constants import Frame
+from fia.main import TvDataCollector
+from fia.messages import (find_message, get_bar_close_time, get_series_bars,
+                          parse_messages, split_messages)
+from fia.testing import make_transcript, synthetic_bars, transcript_frames
+
+
+@pytest.fixture(scope="module")
+def tvdc():
+    """Creates the TvDataCollector."""
+    return TvDataCollector(username="GoodName",
+                           password="StrongPSW123#",
+                           exchange="NASDAQ",
+                           ticker_sym="AAPL",
+                           currency="USD",
+                           frame=Frame.MIN1,
+                           bars=100)
+
+
+def test_synthetic_bars_are_deterministic():
+    """Tests that the same seed gives the same bars."""
+    bars = synthetic_bars(50, seed=7)
+    assert bars == synthetic_bars(50, seed=7)
+    assert bars != synthetic_bars(50, seed=8)
+
+
+def test_synthetic_bars_are_valid():
+    """Tests the times and the high and low prices of the bars."""
+    bars = synthetic_bars(100, Frame.MIN5)
+    assert [bar[0] - bars[0][0] for bar in bars[:3]] == [0, 300, 600]
+    assert all(bar[2] >= max(bar[1], bar[4]) >= min(bar[1], bar[4])
+               >= bar[3] for bar in bars)
+
+
+def test_transcript_frames():
+    """Tests the number of the frames and the heartbeats."""
+    frames = transcript_frames(10, series=2, du_tail=20, heartbeats=5)
+    assert len(frames) == 1 + 2 * 3 + 20 + 5
+    assert [frame for frame in frames if "~h~" in frame] == [
+        f"~m~4~m~~h~{n}" for n in range(1, 6)
+    ]
+
+
+def test_make_transcript_is_parsed():
+    """Tests that the messages and the bars are parsed."""
+    raw_data = make_transcript(100, series=2, du_tail=10, heartbeats=3)
+    assert raw_data.complete
+    assert len(split_messages(raw_data)) == 1 + 2 * 3 + 10 + 3
+    messages = [message.get("m") for message in parse_messages(raw_data)]
+    assert messages.count("timescale_update") == 2
+    assert messages.count("du") == 10
+    message = find_message(raw_data, "timescale_update")
+    assert len(get_series_bars(message)) == 100
+    assert get_bar_close_time(message) == 1_600_000_000 + 100 * 60
+
+
+def test_get_pandas_data(tvdc):
+    """Tests the DataFrame of the first series."""
+    df = tvdc.get_pandas_data(make_transcript(100, heartbeats=2))
+    assert len(df) == 100
+    assert df["Close"].tolist() == [bar[4] for bar in synthetic_bars(100)]
@@ -0,0 +1,113 @@
+import pytest
+import websocket
+
+from fia import timing
+from fia.constants import Frame
+from fia.main import TvDataCollector
+
+
+class FakeWebSocket:
+    """Returns the frames and records the sent messages."""
+    def __init__(self, frames):
+        self.frames = frames
+
+    def recv(self):
+        if not self.frames:
+            raise websocket.WebSocketConnectionClosedException()
+        return self.frames.pop(0)
+
+    def send(self, message):
+        pass
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def records():
+    """Collects the finished records of the hook."""
+    finished = []
+    timing.add_hook(finished.append)
+    yield finished
+    timing.remove_hook(finished.append)
+
+
+def test_record_phases_and_counters(records):
+    """Tests the phases, counters and the hook of a record."""
+    with timing.record("collect", "NASDAQ:AAPL:USD:DAY:5") as record:
+        with timing.phase("connect"):
+            pass
+        timing.current().begin("symbol_resolved")
+        timing.current().begin("timescale_update")
+        timing.current().count(bytes=10, packets=1)
+        timing.current().count(bytes=5, packets=1)
+    assert records == [record]
+    assert [name for name, _, _ in record.phases] == [
+        "connect", "symbol_resolved", "timescale_update"
+    ]
+    assert all(start <= end for _, start, end in record.phases)
+    assert record.end is not None and record.error is None
+    result = record.as_dict()
+    assert result["bytes"] == 15 and result["packets"] == 2
+    assert set(result["durations"]) == {"connect", "symbol_resolved",
+                                        "timescale_update"}
+
+
+def test_no_current_record(records):
+    """Tests that the phases out of a record are not kept."""
+    with timing.phase("connect"):
+        timing.current().count(bytes=10)
+    assert timing.current().counters == {} and records == []
+
+
+def test_error_and_broken_hook(records):
+    """Tests that the error is recorded and a hook error is ignored."""
+    def broken(record):
+        raise ValueError("broken")
+
+    timing.add_hook(broken)
+    try:
+        with pytest.raises(SystemExit):
+            with timing.record("collect"):
+                raise SystemExit("Problems with Websocket connection")
+    finally:
+        timing.remove_hook(broken)
+    assert records[0].error == ("SystemExit: Problems with Websocket "
+                                "connection")
+
+
+def test_collection_timing(mocker, records):
+    """Tests the timing record of get_data and get_pandas_data."""
+    tvdc = TvDataCollector(username="GoodName",
+                           password="StrongPSW123#",
+                           exchange="NASDAQ",
+                           ticker_sym="AAPL",
+                           currency="USD",
+                           frame=Frame.DAY,
+                           bars=2)
+    bars = [{"i": i, "v": [86400.0 * i, 10.0, 11.0, 9.0, 10.5, 1.0]}
+            for i in range(2)]
+    frames = [
+        tvdc._create_message("symbol_resolved",
+                             ["cs_Lms...eEc", "sds_sym_1", {}]),
+        tvdc._create_message("timescale_update",
+                             ["cs_Lms...eEc", {"sds_1": {"s": bars}}]),
+        tvdc._create_message("series_completed", ["cs_Lms...eEc", "sds_1"]),
+    ]
+    mocker.patch("fia.main.TvDataCollector._create_ws_connection",
+                 return_value=FakeWebSocket(list(frames)))
+    mocker.patch("fia.main.TvDataCollector._open_series")
+    raw_data = tvdc.get_data()
+    record = raw_data.timing
+    assert [name for name, _, _ in record.phases] == [
+        "throttle", "connect", "symbol_resolved", "timescale_update",
+        "close", "parse"
+    ]
+    assert record.counters == {"bytes": len(raw_data), "packets": 3,
+                               "bars": 2}
+    df = tvdc.get_pandas_data(raw_data)
+    convert = df.attrs["timing"]
+    assert convert.key == record.key == "NASDAQ:AAPL:USD:DAY:2"
+    assert list(convert.durations()) == ["get_json_data", "dataframe"]
+    assert convert.counters == {"bars": 2}
+    assert records == [record, convert]
@@ -0,0 +1,89 @@
+import logging
+import threading
+
+from fia.constants import Frame
+from fia.main import TvDataCollector
+from fia.tracing import Tracer
+
+
+def test_ring_buffer_and_truncation():
+    """Tests that only the last cut frames are kept."""
+    tracer = Tracer(size=2, max_chars=5)
+    tracer.sent("~m~1~m~a")
+    tracer.received("~m~2~m~bb")
+    tracer.received("~h~1")
+    frames = tracer.frames()
+    assert [(direction, cut, length)
+            for _, direction, cut, length in frames] == [
+        ("<<", "~m~2~", 9), ("<<", "~h~1", 4)
+    ]
+
+
+def test_auth_token_is_masked():
+    """Tests that the authorization token is not kept."""
+    tracer = Tracer()
+    tracer.sent(TvDataCollector._create_message("set_auth_token",
+                                                ["eyJ.secret.9U0"]))
+    assert "secret" not in tracer.frames()[0][2]
+    assert '"p":["***"]' in tracer.frames()[0][2]
+
+
+def test_threads_have_own_buffers():
+    """Tests that the frames of other threads are not dumped."""
+    tracer = Tracer()
+    tracer.received("main")
+    thread = threading.Thread(target=tracer.received, args=("other",))
+    thread.start()
+    thread.join()
+    assert [cut for _, _, cut, _ in tracer.frames()] == ["main"]
+
+
+def test_sampling(caplog):
+    """Tests that every n-th frame is logged with DEBUG."""
+    tracer = Tracer(sample=2)
+    with caplog.at_level(logging.INFO, logger="fia.tracing"):
+        tracer.received("~h~1")
+    with caplog.at_level(logging.DEBUG, logger="fia.tracing"):
+        for n in range(4):
+            tracer.received(f"~h~{n}")
+    assert len(caplog.records) == 2
+    assert len(tracer.frames()) == 5
+
+
+def test_not_logged_without_debug(caplog):
+    """Tests that the frames are not logged if DEBUG is disabled."""
+    tracer = Tracer()
+    with caplog.at_level(logging.INFO, logger="fia.tracing"):
+        tracer.received("~h~1")
+    assert caplog.records == []
+
+
+def test_dump(caplog):
+    """Tests that the dump logs the frames and clears the buffer."""
+    tracer = Tracer(max_chars=3)
+    with caplog.at_level(logging.INFO, logger="fia.tracing"):
+        tracer.received("~h~1")
+    with caplog.at_level(logging.ERROR, logger="fia.tracing"):
+        lines = tracer.dump("The series is not completed.")
+    assert lines[0] == "The last 1 frames before: The series is not " \
+                       "completed."
+    assert lines[1].endswith("s << ~h~... (4 ch)")
+    assert [record.message for record in caplog.records] == lines
+    assert tracer.frames() == []
+
+
+def test_dump_on_incomplete_series(mocker, monkeypatch):
+    """Tests the dump when the series is not completed."""
+    monkeypatch.setattr("fia.main.time.sleep", lambda delay: None)
+    tvdc = TvDataCollector(username="GoodName",
+                           password="StrongPSW123#",
+                           exchange="NASDAQ",
+                           ticker_sym="AAPL",
+                           currency="USD",
+                           frame=Frame.DAY,
+                           bars=5)
+    tvdc.retries = 0
+    mocker.patch("fia.main.TvDataCollector._fetch_once", return_value="")
+    dump = mocker.patch.object(TvDataCollector.tracer, "dump")
+    assert not tvdc.get_data().complete
+    dump.assert_called_once_with("The series is not completed.")
@@ -0,0 +1,24 @@
+from fia.utils.lru_cache import LRUCache
+
+
+def test_eviction_order():
+    """Tests that the least recently used value is evicted."""
+    cache = LRUCache(maxsize=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+    cache.put("c", 3)
+    assert cache.get("b") is None
+    assert (cache.get("a"), cache.get("c")) == (1, 3)
+    assert cache.metrics() == {"hits": 3, "misses": 1, "evictions": 1,
+                               "expirations": 0, "size": 2}
+
+
+def test_expiration(mocker):
+    """Tests that the expired value is removed."""
+    mocker.patch("fia.utils.lru_cache.time.time", return_value=100.0)
+    cache = LRUCache()
+    cache.put("a", 1, expires=100.0)
+    cache.put("b", 2, expires=101.0)
+    assert (cache.get("a"), cache.get("b")) == (None, 2)
+    assert cache.metrics()["expirations"] == 1 and len(cache) == 1
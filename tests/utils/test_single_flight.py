@@ -0,0 +1,72 @@
+import threading
+import time
+
+import pytest
+
+from fia.utils.single_flight import SingleFlight
+
+
+def _wait_for_shared(single_flight, key, shared):
+    """Waits until the number of joined threads is reached."""
+    deadline = time.monotonic() + 5
+    while time.monotonic() < deadline:
+        with single_flight._lock:
+            call = single_flight._calls.get(key)
+            if call is not None and call.shared >= shared:
+                return
+        time.sleep(0.001)
+
+
+def _run_threads(single_flight, key, function, n):
+    """Calls the function in n threads and returns the results."""
+    results = [None] * n
+
+    def target(i):
+        try:
+            results[i] = single_flight.do(key, function)
+        except SystemExit as e:
+            results[i] = e
+
+    threads = [threading.Thread(target=target, args=(i,)) for i in range(n)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def test_concurrent_calls_are_shared():
+    """Tests that the identical concurrent calls run once."""
+    single_flight = SingleFlight()
+    calls = []
+
+    def function():
+        calls.append(1)
+        _wait_for_shared(single_flight, "key", 4)
+        return "raw_data"
+
+    results = _run_threads(single_flight, "key", function, 5)
+    assert results == ["raw_data"] * 5 and len(calls) == 1
+    assert single_flight.in_flight() == 0
+
+
+def test_exception_is_shared():
+    """Tests that all threads get the exception of the call."""
+    single_flight = SingleFlight()
+
+    def function():
+        _wait_for_shared(single_flight, "key", 2)
+        raise SystemExit("Problems with Websocket connection")
+
+    results = _run_threads(single_flight, "key", function, 3)
+    assert all(isinstance(result, SystemExit) for result in results)
+
+
+def test_finished_calls_are_not_cached():
+    """Tests that the next call runs the function again."""
+    single_flight = SingleFlight()
+    assert single_flight.do("key", lambda: 1) == 1
+    assert single_flight.do("key", lambda: 2) == 2
+    with pytest.raises(ValueError):
+        single_flight.do("key", lambda: int("x"))
+    assert single_flight.in_flight() == 0